@@ -120,7 +120,23 @@ if [ ! -z "$DATABASE_URL" ]; then
             echo "✅ Campos Django agregados"
             
             echo "🔄 Sincronizando migraciones con Django..."
-            python manage.py migrate --fake
+            # El backup ya trae el esquema hasta estas migraciones: solo se
+            # marcan como aplicadas. Las posteriores (tablas nuevas, índices y
+            # migraciones de datos) se ejecutan de verdad con el migrate final.
+            python manage.py migrate contenttypes --fake
+            python manage.py migrate auth --fake
+            python manage.py migrate admin --fake
+            python manage.py migrate sessions --fake
+            python manage.py migrate users 0006_create_permission_tables --fake
+            python manage.py migrate suppliers 0005_auditoriareabastecimiento --fake
+            python manage.py migrate inventory 0004_ajusteinventario_alertainventario_and_more --fake
+            python manage.py migrate pos 0005_itemmesa_anotacion --fake
+            python manage.py migrate clients 0005_productocanjeble_producto_inventario --fake
+            python manage.py migrate pqrs 0005_pqrsadjunto_pqrscalificacion_and_more --fake
+            python manage.py migrate core 0001_initial --fake
+
+            echo "🔄 Aplicando migraciones nuevas..."
+            python manage.py migrate --noinput || exit 1
             
             echo "✅ Importación completa finalizada"
         else
@@ -140,5 +156,7 @@ fi
 echo "Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput
 
+bash /app/la_playita_project/procesos_fondo.sh
+
 echo "Iniciando servidor..."
 gunicorn la_playita_project.wsgi:application --bind 0.0.0.0:${PORT:-8000}
\ No newline at end of file
@@ -12,8 +12,8 @@ from .models import PuntosFidelizacion, ProductoCanjeble, CanjeProducto
 
 @admin.register(PuntosFidelizacion)
 class PuntosFidelizacionAdmin(admin.ModelAdmin):
-    list_display = ('cliente_id', 'tipo', 'puntos', 'descripcion', 'fecha_transaccion')
-    list_filter = ('tipo', 'fecha_transaccion')
+    list_display = ('cliente_id', 'tipo', 'puntos', 'descripcion', 'fecha_transaccion', 'aplicado')
+    list_filter = ('tipo', 'aplicado', 'fecha_transaccion')
     search_fields = ('descripcion',)
     readonly_fields = ('fecha_transaccion',)
 
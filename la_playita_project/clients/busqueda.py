@@ -0,0 +1,54 @@
+"""
+Búsqueda de clientes para el selector del POS (typeahead).
+
+Todas las condiciones son de prefijo (``LIKE 'abc%'``), así que usan los
+índices de ``documento`` (único) y ``(nombres, apellidos)`` / ``apellidos`` de
+la tabla cliente. Los resultados se paginan sin COUNT: se pide un registro
+extra para saber si hay más páginas.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Cliente
+
+POR_PAGINA = getattr(settings, 'CLIENTES_BUSQUEDA_POR_PAGINA', 20)
+CONSUMIDOR_FINAL_ID = 1
+
+
+def filtro_clientes(query):
+    """
+    - "1032"        -> documento que empieza por 1032
+    - "ana"         -> nombres o apellidos que empiezan por "ana"
+    - "ana gomez"   -> nombres por "ana" y apellidos por "gomez" (o al revés)
+    """
+    palabras = query.split()
+    if not palabras:
+        return Q()
+    if len(palabras) == 1:
+        palabra = palabras[0]
+        filtro = Q(nombres__istartswith=palabra) | Q(apellidos__istartswith=palabra)
+        if palabra.isdigit():
+            filtro |= Q(documento__startswith=palabra)
+        return filtro
+
+    primera, resto = palabras[0], ' '.join(palabras[1:])
+    return (
+        Q(nombres__istartswith=query)
+        | Q(nombres__istartswith=primera, apellidos__istartswith=resto)
+        | Q(apellidos__istartswith=primera, nombres__istartswith=resto)
+    )
+
+
+def buscar_clientes(query, pagina=1, por_pagina=None, incluir_consumidor_final=False):
+    """
+    Returns:
+        tuple: (lista de Cliente, hay_mas)
+    """
+    por_pagina = min(por_pagina or POR_PAGINA, 50)
+    pagina = max(int(pagina or 1), 1)
+    clientes = Cliente.objects.filter(filtro_clientes((query or '').strip()))
+    if not incluir_consumidor_final:
+        clientes = clientes.exclude(pk=CONSUMIDOR_FINAL_ID)
+    inicio = (pagina - 1) * por_pagina
+    resultados = list(clientes.order_by('nombres', 'apellidos', 'id')[inicio:inicio + por_pagina + 1])
+    return resultados[:por_pagina], len(resultados) > por_pagina
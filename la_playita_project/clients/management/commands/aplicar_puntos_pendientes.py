@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from clients.puntos import aplicar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Suma a Cliente.puntos_totales los puntos ganados en ventas que aún están pendientes en el libro.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Movimientos aplicados por transacción')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y repite cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            total_movimientos = total_clientes = 0
+            while True:
+                movimientos, clientes = aplicar_pendientes(options['lote'])
+                total_movimientos += movimientos
+                total_clientes += clientes
+                if movimientos < options['lote']:
+                    break
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {total_movimientos} movimientos aplicados a {total_clientes} clientes.'
+            ))
+            if options['intervalo'] <= 0:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from clients.metricas import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla metrica_cliente (recencia, frecuencia, valor y puntos) desde las ventas. Programar cada noche.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y repite cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            total = recalcular()
+            self.stdout.write(self.style.SUCCESS(f'✅ Métricas recalculadas para {total} clientes.'))
+            if options['intervalo'] <= 0:
+                return
+            time.sleep(options['intervalo'])
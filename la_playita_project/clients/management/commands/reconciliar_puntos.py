@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from clients.puntos import diferencias_de_saldo, reconciliar, ultimo_movimiento_id
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los saldos de puntos desde puntos_fidelizacion y reporta (o corrige) los que no cuadran.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aplicar', action='store_true',
+                            help='Corrige puntos_totales; sin esta opción solo reporta')
+
+    def handle(self, *args, **options):
+        hasta_id = ultimo_movimiento_id()
+        diferencias = diferencias_de_saldo(hasta_id)
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los saldos cuadran con el libro de puntos.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️  {len(diferencias)} clientes no cuadran:'))
+            for cliente_id, guardado, esperado in diferencias:
+                self.stdout.write(f'  - Cliente #{cliente_id}: guardado {guardado}, según libro {esperado}')
+
+        if options['aplicar']:
+            aplicados = reconciliar(diferencias, hasta_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {len(diferencias)} saldos corregidos, {aplicados} movimientos pendientes aplicados.'
+            ))
+        elif diferencias:
+            self.stdout.write('Ejecute con --aplicar para corregirlos.')
@@ -0,0 +1,119 @@
+"""
+Métricas de compra por cliente (tabla ``metrica_cliente``).
+
+El reporte de clientes sumaba y contaba las ventas de todos los clientes en
+cada visita, y volvía a recorrer ``venta`` para los inactivos. Ahora un
+proceso nocturno (``python manage.py recalcular_metricas_clientes``) hace una
+sola pasada agrupada por cliente sobre ``venta`` y guarda por cliente:
+
+- recencia (días desde la última compra) y fecha de la primera y la última;
+- frecuencia (cantidad de compras);
+- valor (total comprado y ticket promedio);
+- saldo de puntos, contando los movimientos aún no aplicados (clients/puntos.py).
+
+El reporte y los paneles de puntos leen esa tabla, ordenando por columnas
+indexadas. Entre dos recálculos, cada venta y cada canje actualizan la fila
+de su cliente al confirmarse (``actualizar_al_confirmar``); la recencia de
+quien no compra se pone al día en el recálculo nocturno. La migración
+``0009_llenar_metrica_cliente`` llena la tabla al desplegar.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .busqueda import CONSUMIDOR_FINAL_ID
+from .models import Cliente, MetricaCliente, PuntosFidelizacion
+
+TAMANO_LOTE = 1000
+
+
+def _calcular(clientes, ahora):
+    """Métricas (sin guardar) de los clientes del queryset, con una consulta agrupada por tabla."""
+    from pos.models import Venta
+
+    hoy = timezone.localdate(ahora)
+    ids = clientes.values('id')
+    compras = {
+        fila['cliente_id']: fila
+        for fila in Venta.objects.filter(cliente_id__in=ids).order_by().values('cliente_id').annotate(
+            primera=Min('fecha_venta'), ultima=Max('fecha_venta'),
+            cantidad=Count('id'), total=Sum('total_venta'),
+        )
+    }
+    pendientes = dict(
+        PuntosFidelizacion.objects.filter(cliente_id__in=ids, aplicado=False).order_by().values('cliente_id').annotate(
+            total=Sum('puntos')
+        ).values_list('cliente_id', 'total')
+    )
+
+    metricas = []
+    for cliente_id, puntos in clientes.values_list('id', 'puntos_totales').iterator():
+        fila = compras.get(cliente_id)
+        metrica = MetricaCliente(
+            cliente_id=cliente_id,
+            puntos=puntos + pendientes.get(cliente_id, Decimal('0')),
+            actualizado=ahora,
+        )
+        if fila:
+            metrica.primera_compra = fila['primera']
+            metrica.ultima_compra = fila['ultima']
+            metrica.recencia_dias = (hoy - timezone.localdate(fila['ultima'])).days
+            metrica.cantidad_compras = fila['cantidad']
+            metrica.total_compras = fila['total'] or Decimal('0')
+            metrica.ticket_promedio = (metrica.total_compras / fila['cantidad']).quantize(Decimal('0.01'))
+        metricas.append(metrica)
+    return metricas
+
+
+CAMPOS = [
+    'primera_compra', 'ultima_compra', 'recencia_dias', 'cantidad_compras',
+    'total_compras', 'ticket_promedio', 'puntos', 'actualizado',
+]
+
+
+def _guardar(metricas):
+    """
+    Inserta o actualiza las filas (upsert) sin borrar antes: una venta y el
+    recálculo nocturno pueden escribir el mismo cliente a la vez.
+    """
+    # MySQL/MariaDB usan ON DUPLICATE KEY UPDATE y no aceptan unique_fields
+    unicos = ['cliente'] if connection.features.supports_update_conflicts_with_target else None
+    MetricaCliente.objects.bulk_create(
+        metricas, batch_size=TAMANO_LOTE,
+        update_conflicts=True, unique_fields=unicos, update_fields=CAMPOS,
+    )
+
+
+def recalcular():
+    """Recalcula ``metrica_cliente`` para todos los clientes. Devuelve cuántas filas quedaron."""
+    metricas = _calcular(Cliente.objects.exclude(pk=CONSUMIDOR_FINAL_ID), timezone.now())
+    _guardar(metricas)
+    return len(metricas)
+
+
+def actualizar(cliente_ids):
+    """Vuelve a calcular solo las filas de los clientes indicados."""
+    cliente_ids = set(cliente_ids) - {CONSUMIDOR_FINAL_ID}
+    if not cliente_ids:
+        return
+    _guardar(_calcular(Cliente.objects.filter(pk__in=cliente_ids), timezone.now()))
+
+
+def actualizar_al_confirmar(cliente_ids):
+    """
+    Actualiza las filas de esos clientes cuando la transacción (venta, canje)
+    se confirme. Si falla, solo se registra en el log: la venta ya quedó
+    guardada y la fila se corrige en el recálculo nocturno.
+    """
+    cliente_ids = set(cliente_ids)
+    transaction.on_commit(lambda: actualizar(cliente_ids), robust=True)
+
+
+def de_cliente(cliente_id):
+    """Métricas guardadas de un cliente; si aún no tiene fila, se calculan en el momento (sin guardar)."""
+    metrica = MetricaCliente.objects.filter(cliente_id=cliente_id).first()
+    if metrica is None and cliente_id != CONSUMIDOR_FINAL_ID:
+        metrica = next(iter(_calcular(Cliente.objects.filter(pk=cliente_id), timezone.now())), None)
+    return metrica
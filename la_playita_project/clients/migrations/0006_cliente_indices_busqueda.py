@@ -0,0 +1,23 @@
+# Índices de prefijo para el selector de clientes del POS
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_productocanjeble_producto_inventario'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE INDEX IF NOT EXISTS idx_cliente_nombres ON cliente (nombres, apellidos);",
+                "CREATE INDEX IF NOT EXISTS idx_cliente_apellidos ON cliente (apellidos);",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS idx_cliente_nombres ON cliente;",
+                "DROP INDEX IF EXISTS idx_cliente_apellidos ON cliente;",
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0006_cliente_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='puntosfidelizacion',
+            name='aplicado',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0007_puntosfidelizacion_aplicado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrica', serialize=False, to='clients.cliente')),
+                ('primera_compra', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('ultima_compra', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('recencia_dias', models.PositiveIntegerField(blank=True, null=True)),
+                ('cantidad_compras', models.PositiveIntegerField(default=0)),
+                ('total_compras', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=14)),
+                ('ticket_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('puntos', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10)),
+                ('actualizado', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'metrica_cliente',
+                'managed': True,
+            },
+        ),
+    ]
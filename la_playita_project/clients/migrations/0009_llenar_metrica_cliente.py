@@ -0,0 +1,81 @@
+# Llena metrica_cliente con el historial existente (lo mismo que
+# recalcular_metricas_clientes), para que el reporte de clientes y los paneles
+# de puntos no arranquen vacíos después del deploy.
+#
+# No usa clients.metricas ni los modelos actuales: cliente y venta son tablas
+# heredadas (managed=False) sin todas sus columnas en el estado de las
+# migraciones, así que se leen con SQL y el cálculo queda congelado aquí.
+
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+CONSUMIDOR_FINAL_ID = 1
+
+
+def _fecha(valor):
+    if isinstance(valor, str):
+        valor = parse_datetime(valor)
+    if timezone.is_naive(valor):
+        valor = timezone.make_aware(valor, dt_timezone.utc)
+    return valor
+
+
+def llenar_metricas(apps, schema_editor):
+    conexion = schema_editor.connection
+    tablas = conexion.introspection.table_names()
+    if 'cliente' not in tablas or 'venta' not in tablas:
+        return  # base nueva sin las tablas heredadas cliente/venta
+    MetricaCliente = apps.get_model('clients', 'MetricaCliente')
+    PuntosFidelizacion = apps.get_model('clients', 'PuntosFidelizacion')
+
+    ahora = timezone.now()
+    hoy = timezone.localdate(ahora)
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            'SELECT cliente_id, MIN(fecha_venta), MAX(fecha_venta), COUNT(id), SUM(total_venta) '
+            'FROM venta WHERE cliente_id <> %s GROUP BY cliente_id', [CONSUMIDOR_FINAL_ID]
+        )
+        compras = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+        cursor.execute('SELECT id, puntos_totales FROM cliente WHERE id <> %s', [CONSUMIDOR_FINAL_ID])
+        clientes = cursor.fetchall()
+    pendientes = dict(
+        PuntosFidelizacion.objects.filter(aplicado=False).order_by().values('cliente_id').annotate(
+            total=Sum('puntos')
+        ).values_list('cliente_id', 'total')
+    )
+
+    metricas = []
+    for cliente_id, puntos in clientes:
+        metrica = MetricaCliente(
+            cliente_id=cliente_id,
+            puntos=Decimal(str(puntos or 0)) + pendientes.get(cliente_id, Decimal('0')),
+            actualizado=ahora,
+        )
+        if cliente_id in compras:
+            primera, ultima, cantidad, total = compras[cliente_id]
+            metrica.primera_compra = _fecha(primera)
+            metrica.ultima_compra = _fecha(ultima)
+            metrica.recencia_dias = (hoy - timezone.localdate(metrica.ultima_compra)).days
+            metrica.cantidad_compras = cantidad
+            metrica.total_compras = Decimal(str(total or 0))
+            metrica.ticket_promedio = (metrica.total_compras / cantidad).quantize(Decimal('0.01'))
+        metricas.append(metrica)
+
+    MetricaCliente.objects.all().delete()
+    MetricaCliente.objects.bulk_create(metricas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0008_metrica_cliente'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_metricas, migrations.RunPython.noop),
+    ]
@@ -83,6 +83,8 @@ class PuntosFidelizacion(models.Model):
     fecha_transaccion = models.DateTimeField(auto_now_add=True)
     venta_id = models.IntegerField(null=True, blank=True)  # Referencia débil a Venta
     canje = models.ForeignKey(CanjeProducto, null=True, blank=True, on_delete=models.SET_NULL)
+    # False mientras el movimiento no se haya sumado a Cliente.puntos_totales (ver clients/puntos.py)
+    aplicado = models.BooleanField(default=True, db_index=True)
 
     def __str__(self):
         return f"{self.cliente} - {self.puntos} pts"
@@ -93,3 +95,27 @@ class PuntosFidelizacion(models.Model):
 
 
 
+
+
+class MetricaCliente(models.Model):
+    """
+    Métricas de compra por cliente (recencia, frecuencia y valor), recalculadas
+    cada noche por ``python manage.py recalcular_metricas_clientes`` y por
+    cliente en cada venta o canje (ver clients/metricas.py). Las leen el reporte de clientes y los paneles de puntos.
+    """
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, primary_key=True, related_name='metrica')
+    primera_compra = models.DateTimeField(null=True, blank=True, db_index=True)
+    ultima_compra = models.DateTimeField(null=True, blank=True, db_index=True)
+    recencia_dias = models.PositiveIntegerField(null=True, blank=True)
+    cantidad_compras = models.PositiveIntegerField(default=0)
+    total_compras = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_index=True)
+    ticket_promedio = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    puntos = models.DecimalField(max_digits=10, decimal_places=2, default=0, db_index=True)
+    actualizado = models.DateTimeField()
+
+    def __str__(self):
+        return f"Métricas de {self.cliente_id}"
+
+    class Meta:
+        db_table = 'metrica_cliente'
+        managed = True
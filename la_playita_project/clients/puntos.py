@@ -0,0 +1,186 @@
+"""
+Libro de puntos de fidelización.
+
+Las ventas no tocan ``Cliente.puntos_totales``: solo agregan un movimiento a
+``puntos_fidelizacion`` con ``aplicado=False`` dentro de la transacción de la
+venta, así que dos cajas vendiéndole al mismo cliente no compiten por su fila.
+
+Un proceso periódico (``python manage.py aplicar_puntos_pendientes``) suma los
+movimientos pendientes por cliente y los aplica a ``puntos_totales`` con un
+solo UPDATE. Mientras tanto, ``saldo_disponible`` incluye lo pendiente.
+
+Los canjes y ajustes siguen descontando/sumando en el momento y se guardan ya
+aplicados (``aplicado=True``, el valor por defecto).
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from . import metricas
+from .models import Cliente, PuntosFidelizacion
+
+
+def movimiento_ganancia(cliente_id, puntos, venta_id, total_venta):
+    """Movimiento pendiente por una compra (sin guardar, para bulk_create)."""
+    return PuntosFidelizacion(
+        cliente_id=cliente_id,
+        tipo=PuntosFidelizacion.TIPO_GANANCIA,
+        puntos=puntos,
+        descripcion=f'Compra de ${total_venta} - Venta #{venta_id}',
+        venta_id=venta_id,
+        aplicado=False,
+    )
+
+
+def registrar_ganancia(cliente_id, puntos, venta_id, total_venta):
+    movimiento = movimiento_ganancia(cliente_id, puntos, venta_id, total_venta)
+    movimiento.save()
+    return movimiento
+
+
+def ultimo_movimiento_id():
+    return PuntosFidelizacion.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+
+def puntos_pendientes(cliente_id):
+    return PuntosFidelizacion.objects.filter(
+        cliente_id=cliente_id, aplicado=False
+    ).aggregate(total=Sum('puntos'))['total'] or Decimal('0')
+
+
+def saldo_disponible(cliente):
+    """Saldo real del cliente: lo aplicado más lo que aún no procesa el acumulador."""
+    return cliente.puntos_totales + puntos_pendientes(cliente.id)
+
+
+def con_saldo(clientes):
+    """Asigna ``saldo`` (como ``saldo_disponible``) a cada cliente de la lista, con una sola consulta."""
+    clientes = list(clientes)
+    pendientes = dict(
+        PuntosFidelizacion.objects.filter(cliente_id__in=[c.id for c in clientes], aplicado=False)
+        .order_by().values('cliente_id').annotate(total=Sum('puntos')).values_list('cliente_id', 'total')
+    )
+    for cliente in clientes:
+        cliente.saldo = cliente.puntos_totales + pendientes.get(cliente.id, Decimal('0'))
+    return clientes
+
+
+def anotar_saldo(clientes):
+    """Queryset de Cliente con ``saldo`` (lo aplicado más lo pendiente) calculado en la base."""
+    pendientes = PuntosFidelizacion.objects.filter(
+        cliente_id=OuterRef('pk'), aplicado=False
+    ).order_by().values('cliente_id').annotate(total=Sum('puntos')).values('total')
+    return clientes.annotate(saldo=ExpressionWrapper(
+        F('puntos_totales') + Coalesce(Subquery(pendientes), Value(Decimal('0'))),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ))
+
+
+def descontar_puntos(cliente, puntos):
+    """Resta puntos (canjes) con una suma atómica y actualiza la instancia."""
+    Cliente.objects.filter(pk=cliente.pk).update(puntos_totales=F('puntos_totales') - puntos)
+    cliente.refresh_from_db(fields=['puntos_totales'])
+    metricas.actualizar_al_confirmar([cliente.pk])
+
+
+def _sumar_por_cliente(movimientos):
+    deltas = {}
+    for cliente_id, puntos in movimientos:
+        deltas[cliente_id] = deltas.get(cliente_id, Decimal('0')) + puntos
+    return deltas
+
+
+def _aplicar_deltas(deltas):
+    """Suma los deltas de todos los clientes con un único UPDATE ... CASE."""
+    if not deltas:
+        return
+    Cliente.objects.filter(pk__in=deltas.keys()).update(
+        puntos_totales=Case(
+            *[When(pk=cliente_id, then=F('puntos_totales') + delta) for cliente_id, delta in deltas.items()],
+            default=F('puntos_totales'),
+        )
+    )
+
+
+@transaction.atomic
+def aplicar_pendientes(limite=5000):
+    """
+    Suma a ``puntos_totales`` hasta ``limite`` movimientos pendientes.
+
+    Returns:
+        tuple: (movimientos aplicados, clientes actualizados)
+    """
+    pendientes = PuntosFidelizacion.objects.filter(aplicado=False).order_by('id')
+    if connection.features.has_select_for_update_skip_locked:
+        # Dos acumuladores en paralelo se reparten los movimientos
+        pendientes = pendientes.select_for_update(skip_locked=True)
+    else:
+        pendientes = pendientes.select_for_update()
+    movimientos = list(pendientes.values_list('id', 'cliente_id', 'puntos')[:limite])
+    if not movimientos:
+        return 0, 0
+
+    deltas = _sumar_por_cliente((cliente_id, puntos) for _, cliente_id, puntos in movimientos)
+    _aplicar_deltas(deltas)
+    PuntosFidelizacion.objects.filter(id__in=[m[0] for m in movimientos]).update(aplicado=True)
+    return len(movimientos), len(deltas)
+
+
+def diferencias_de_saldo(hasta_id=None):
+    """
+    Recalcula los saldos desde el libro con una sola consulta agrupada y los
+    compara con ``puntos_totales`` más lo pendiente de aplicar.
+
+    Args:
+        hasta_id (int): solo considera movimientos con id <= hasta_id, para
+            no mezclar ventas que llegan mientras se reconcilia.
+
+    Returns:
+        list: [(cliente_id, saldo_guardado, saldo_segun_libro)] de los clientes que no cuadran.
+    """
+    libro = PuntosFidelizacion.objects.all()
+    if hasta_id is not None:
+        libro = libro.filter(id__lte=hasta_id)
+    saldos = {
+        fila['cliente_id']: fila
+        for fila in libro.values('cliente_id').annotate(
+            total=Sum('puntos'),
+            pendiente=Sum('puntos', filter=Q(aplicado=False)),
+        )
+    }
+
+    diferencias = []
+    clientes = Cliente.objects.filter(Q(pk__in=saldos.keys()) | ~Q(puntos_totales=0))
+    for cliente_id, guardado in clientes.values_list('id', 'puntos_totales'):
+        fila = saldos.get(cliente_id, {})
+        esperado = fila.get('total') or Decimal('0')
+        if guardado + (fila.get('pendiente') or Decimal('0')) != esperado:
+            diferencias.append((cliente_id, guardado, esperado))
+    return sorted(diferencias)
+
+
+@transaction.atomic
+def reconciliar(diferencias, hasta_id):
+    """
+    Deja ``puntos_totales`` igual al libro (hasta ``hasta_id``) y marca esos
+    movimientos como aplicados. Lo posterior lo sumará el acumulador.
+    """
+    pendientes = PuntosFidelizacion.objects.filter(aplicado=False, id__lte=hasta_id)
+    list(pendientes.select_for_update().values_list('id', flat=True))
+    if diferencias:
+        Cliente.objects.filter(pk__in=[d[0] for d in diferencias]).update(
+            puntos_totales=Case(
+                *[When(pk=cliente_id, then=Value(esperado)) for cliente_id, _, esperado in diferencias],
+                default=F('puntos_totales'),
+            )
+        )
+    # Los clientes que sí cuadran reciben su pendiente como lo haría el acumulador
+    corregidos = {d[0] for d in diferencias}
+    _aplicar_deltas(_sumar_por_cliente(
+        pendientes.exclude(cliente_id__in=corregidos).values_list('cliente_id', 'puntos')
+    ))
+    return pendientes.update(aplicado=True)
@@ -0,0 +1,157 @@
+"""
+Tests para las métricas de compra por cliente (clients/metricas.py)
+"""
+import importlib
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.apps import apps
+from django.db import OperationalError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from pos import resumen
+from pos.models import Venta
+from reportes.views import exportar_clientes
+from users.models import Rol, Usuario
+from . import metricas
+from .metricas import de_cliente, recalcular
+from .models import Cliente, MetricaCliente
+from .puntos import descontar_puntos, registrar_ganancia
+
+
+class MetricasClienteTest(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='44444444', password='testpass123', first_name='Admin',
+            last_name='Reportes', email='admin@test.com', rol=Rol.objects.create(nombre='Administrador')
+        )
+        self.final = Cliente.objects.create(nombres='Consumidor', apellidos='Final', documento='0',
+                                            telefono='0', correo='cf@test.com')
+        self.ana = Cliente.objects.create(nombres='Ana', apellidos='Ríos', documento='1',
+                                          telefono='1', correo='ana@test.com', puntos_totales=Decimal('3'))
+        self.luis = Cliente.objects.create(nombres='Luis', apellidos='Mora', documento='2',
+                                           telefono='2', correo='luis@test.com')
+        self.sara = Cliente.objects.create(nombres='Sara', apellidos='Gil', documento='3',
+                                           telefono='3', correo='sara@test.com')
+
+    def vender(self, cliente, total, dias_atras=0):
+        return Venta.objects.create(cliente=cliente, usuario=self.usuario, total_venta=Decimal(total),
+                                    fecha_venta=timezone.now() - timedelta(days=dias_atras))
+
+    def test_recalcula_recencia_frecuencia_valor_y_puntos(self):
+        self.vender(self.ana, '100.00', dias_atras=10)
+        self.vender(self.ana, '50.00', dias_atras=2)
+        self.vender(self.luis, '20.00', dias_atras=90)
+        self.vender(self.final, '999.00')
+        registrar_ganancia(self.ana.id, Decimal('1.50'), 1, Decimal('100'))
+
+        self.assertEqual(recalcular(), 3)
+
+        ana = MetricaCliente.objects.get(cliente=self.ana)
+        self.assertEqual((ana.cantidad_compras, ana.total_compras, ana.ticket_promedio), (2, Decimal('150'), Decimal('75')))
+        self.assertEqual(ana.recencia_dias, 2)
+        self.assertEqual(ana.puntos, Decimal('4.50'))
+        sara = MetricaCliente.objects.get(cliente=self.sara)
+        self.assertEqual((sara.cantidad_compras, sara.ultima_compra), (0, None))
+        self.assertFalse(MetricaCliente.objects.filter(cliente=self.final).exists())
+
+    def test_consultas_no_crecen_con_los_clientes(self):
+        with CaptureQueriesContext(connection) as pocas:
+            recalcular()
+        for n in range(30):
+            cliente = Cliente.objects.create(nombres=f'Cliente {n}', apellidos='X', documento=f'9{n}',
+                                             telefono='9', correo=f'c{n}@test.com')
+            self.vender(cliente, '10.00')
+        with CaptureQueriesContext(connection) as muchas:
+            recalcular()
+        self.assertEqual(len(muchas), len(pocas))
+
+    def test_reporte_y_panel_leen_la_tabla(self):
+        self.vender(self.ana, '100.00', dias_atras=5)
+        self.vender(self.luis, '20.00', dias_atras=90)
+        recalcular()
+
+        libro = load_workbook(BytesIO(exportar_clientes({})[2]))
+        self.assertEqual(list(libro['Top Clientes'].values)[1][:4], ('Ana Ríos', 100, 1, 100))
+        self.assertEqual([fila[0] for fila in libro['Clientes Inactivos'].values][1:], ['Luis Mora'])
+        self.assertEqual(list(libro['Clientes Inactivos'].values)[1][2], 90)
+
+        self.client.force_login(self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('reportes:reporte_clientes'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"venta"' in consulta['sql'] for consulta in consultas.captured_queries))
+        self.assertContains(response, 'Ana')
+
+        response = self.client.get(reverse('clients:panel_puntos', args=[self.ana.id]))
+        self.assertContains(response, '<h6>Total Comprado</h6>', html=True)
+        self.assertEqual(response.context['metrica'].cantidad_compras, 1)
+
+    def test_migracion_llena_la_tabla(self):
+        self.vender(self.ana, '100.00', dias_atras=5)
+        self.vender(self.ana, '50.00', dias_atras=1)
+        registrar_ganancia(self.ana.id, Decimal('1.50'), 1, Decimal('100'))
+        recalcular()
+        esperadas = list(MetricaCliente.objects.order_by('cliente_id').values_list(
+            'cliente_id', 'primera_compra', 'ultima_compra', 'recencia_dias', 'cantidad_compras',
+            'total_compras', 'ticket_promedio', 'puntos'
+        ))
+        MetricaCliente.objects.all().delete()
+
+        migracion = importlib.import_module('clients.migrations.0009_llenar_metrica_cliente')
+        migracion.llenar_metricas(apps, connection.schema_editor())
+
+        self.assertEqual(list(MetricaCliente.objects.order_by('cliente_id').values_list(
+            'cliente_id', 'primera_compra', 'ultima_compra', 'recencia_dias', 'cantidad_compras',
+            'total_compras', 'ticket_promedio', 'puntos'
+        )), esperadas)
+        self.assertEqual(len(esperadas), 3)
+
+    def test_ventas_y_canjes_actualizan_la_fila_del_cliente(self):
+        recalcular()
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = self.vender(self.ana, '40.00')
+            registrar_ganancia(self.ana.id, Decimal('0.40'), venta.id, Decimal('40'))
+            resumen.acumular_ventas([venta.id])
+
+        ana = MetricaCliente.objects.get(cliente=self.ana)
+        self.assertEqual((ana.cantidad_compras, ana.total_compras, ana.recencia_dias), (1, Decimal('40'), 0))
+        self.assertEqual(ana.puntos, Decimal('3.40'))
+        self.assertEqual(MetricaCliente.objects.get(cliente=self.luis).cantidad_compras, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            descontar_puntos(self.ana, Decimal('2'))
+        self.assertEqual(MetricaCliente.objects.get(cliente=self.ana).puntos, Decimal('1.40'))
+
+    def test_recalcular_y_actualizar_no_duplican_filas(self):
+        self.vender(self.ana, '10.00')
+        recalcular()
+        metricas.actualizar([self.ana.id])
+        recalcular()
+
+        self.assertEqual(MetricaCliente.objects.filter(cliente=self.ana).count(), 1)
+        self.assertEqual(MetricaCliente.objects.get(cliente=self.ana).cantidad_compras, 1)
+
+    def test_falla_al_actualizar_no_rompe_la_venta(self):
+        with mock.patch.object(metricas, 'actualizar', side_effect=OperationalError(1213, 'Deadlock')) as actualizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                resumen.acumular_ventas([self.vender(self.ana, '40.00').id])
+
+        actualizar.assert_called_once_with({self.ana.id})
+
+        self.assertTrue(Venta.objects.filter(cliente=self.ana).exists())
+
+    def test_cliente_sin_fila_se_calcula_en_el_momento(self):
+        self.vender(self.luis, '20.00', dias_atras=3)
+
+        metrica = de_cliente(self.luis.id)
+
+        self.assertEqual((metrica.cantidad_compras, metrica.recencia_dias), (1, 3))
+        self.assertFalse(MetricaCliente.objects.exists())
@@ -0,0 +1,93 @@
+"""
+Tests para el libro de puntos de fidelización (clients/puntos.py)
+"""
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from users.models import Rol, Usuario
+from .models import Cliente, ProductoCanjeble, PuntosFidelizacion
+from .puntos import (
+    anotar_saldo, aplicar_pendientes, con_saldo, descontar_puntos, diferencias_de_saldo, reconciliar,
+    registrar_ganancia, saldo_disponible, ultimo_movimiento_id,
+)
+
+
+class LibroPuntosTest(TestCase):
+
+    def setUp(self):
+        Cliente.objects.create(nombres='Consumidor', apellidos='Final', documento='0',
+                               telefono='0', correo='cf@test.com')
+        self.ana = Cliente.objects.create(nombres='Ana', apellidos='Ríos', documento='1',
+                                          telefono='1', correo='ana@test.com')
+        self.luis = Cliente.objects.create(nombres='Luis', apellidos='Mora', documento='2',
+                                           telefono='2', correo='luis@test.com')
+
+    def test_la_venta_solo_escribe_en_el_libro(self):
+        registrar_ganancia(self.ana.id, Decimal('5.50'), 10, Decimal('66000'))
+
+        self.ana.refresh_from_db()
+        self.assertEqual(self.ana.puntos_totales, 0)
+        self.assertEqual(saldo_disponible(self.ana), Decimal('5.50'))
+
+    def test_acumulador_aplica_en_bloque(self):
+        registrar_ganancia(self.ana.id, Decimal('5.50'), 10, Decimal('66000'))
+        registrar_ganancia(self.ana.id, Decimal('2.00'), 11, Decimal('24000'))
+        registrar_ganancia(self.luis.id, Decimal('1.00'), 12, Decimal('12000'))
+
+        self.assertEqual(aplicar_pendientes(), (3, 2))
+        self.assertEqual(aplicar_pendientes(), (0, 0))
+
+        self.ana.refresh_from_db()
+        self.luis.refresh_from_db()
+        self.assertEqual(self.ana.puntos_totales, Decimal('7.50'))
+        self.assertEqual(self.luis.puntos_totales, Decimal('1.00'))
+        self.assertFalse(PuntosFidelizacion.objects.filter(aplicado=False).exists())
+
+    def test_canje_descuenta_sin_pisar_el_acumulador(self):
+        registrar_ganancia(self.ana.id, Decimal('10.00'), 10, Decimal('120000'))
+        aplicar_pendientes()
+        ana_en_memoria = Cliente.objects.get(pk=self.ana.pk)
+
+        registrar_ganancia(self.ana.id, Decimal('3.00'), 11, Decimal('36000'))
+        aplicar_pendientes()
+        descontar_puntos(ana_en_memoria, Decimal('4.00'))
+
+        self.assertEqual(ana_en_memoria.puntos_totales, Decimal('9.00'))
+
+    def test_reconciliacion(self):
+        registrar_ganancia(self.ana.id, Decimal('5.00'), 10, Decimal('60000'))
+        aplicar_pendientes()
+        registrar_ganancia(self.luis.id, Decimal('2.00'), 11, Decimal('24000'))
+        # Saldo alterado por fuera del libro
+        Cliente.objects.filter(pk=self.ana.pk).update(puntos_totales=Decimal('50.00'))
+
+        hasta_id = ultimo_movimiento_id()
+        diferencias = diferencias_de_saldo(hasta_id)
+        self.assertEqual(diferencias, [(self.ana.id, Decimal('50.00'), Decimal('5.00'))])
+
+        reconciliar(diferencias, hasta_id)
+        self.ana.refresh_from_db()
+        self.luis.refresh_from_db()
+        self.assertEqual(self.ana.puntos_totales, Decimal('5.00'))
+        self.assertEqual(self.luis.puntos_totales, Decimal('2.00'))
+        self.assertEqual(diferencias_de_saldo(), [])
+
+    def test_pantallas_muestran_el_saldo_con_pendientes(self):
+        Cliente.objects.filter(pk=self.ana.pk).update(puntos_totales=Decimal('4.00'))
+        registrar_ganancia(self.ana.id, Decimal('6.00'), 10, Decimal('72000'))
+        ProductoCanjeble.objects.create(nombre='Gaseosa', puntos_requeridos=Decimal('10'), stock_disponible=5)
+
+        saldos = {c.id: c.saldo for c in anotar_saldo(Cliente.objects.all())}
+        self.assertEqual(saldos[self.ana.id], Decimal('10.00'))
+        self.assertEqual(saldos[self.luis.id], Decimal('0'))
+        self.assertEqual([c.saldo for c in con_saldo(Cliente.objects.filter(pk__in=[self.ana.pk, self.luis.pk]).order_by('pk'))], [Decimal('10.00'), Decimal('0')])
+
+        usuario = Usuario.objects.create_user(
+            username='55555555', password='testpass123', first_name='Ana', last_name='Ríos',
+            email='ana@test.com', rol=Rol.objects.create(nombre='Cliente')
+        )
+        self.client.force_login(usuario)
+        response = self.client.get(reverse('clients:productos_canjebles'))
+        self.assertContains(response, 'Canjear Ahora')
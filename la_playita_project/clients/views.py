@@ -2,6 +2,9 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from users.decorators import check_user_role
 from .models import Cliente, PuntosFidelizacion, ProductoCanjeble, CanjeProducto
+from .busqueda import buscar_clientes
+from . import metricas
+from .puntos import anotar_saldo, con_saldo, descontar_puntos, saldo_disponible
 from inventory.models import Producto, MovimientoInventario
 from django.views.decorators.http import require_POST, require_http_methods
 from django.http import JsonResponse
@@ -25,7 +28,7 @@ from django.utils.html import strip_tags
 @check_user_role(allowed_roles=["Administrador", "Vendedor"])
 def cliente_list(request):
     """Lista todos los clientes del sistema."""
-    clientes = Cliente.objects.all().order_by("nombres")
+    clientes = anotar_saldo(Cliente.objects.all()).order_by("nombres")
     es_vendedor = request.user.rol.nombre == "Vendedor"
     return render(
         request,
@@ -92,7 +95,7 @@ def cliente_get_ajax(request, cliente_id):
                 "documento": cliente.documento,
                 "correo": cliente.correo,
                 "telefono": cliente.telefono,
-                "puntos_totales": float(cliente.puntos_totales),
+                "puntos_totales": float(saldo_disponible(cliente)),
             }
         })
     except Exception as e:
@@ -157,8 +160,9 @@ def panel_puntos(request, cliente_id):
     context = {
         "cliente": cliente,
         "transacciones": transacciones,
-        "puntos_totales": cliente.puntos_totales,
+        "puntos_totales": saldo_disponible(cliente),
         "productos": productos,
+        "metrica": metricas.de_cliente(cliente.id),
     }
     return render(request, "clients/panel_puntos.html", context)
 
@@ -207,7 +211,8 @@ def mi_panel_puntos(request):
         "transacciones": transacciones,
         "canjes": canjes,
         "productos": productos,
-        "puntos_totales": cliente.puntos_totales,
+        "puntos_totales": saldo_disponible(cliente),
+        "metrica": metricas.de_cliente(cliente.id),
     }
     return render(request, "clients/mi_panel_puntos.html", context)
 
@@ -225,7 +230,11 @@ def productos_canjebles(request):
         cliente = Cliente.objects.get(correo=request.user.email)
     except Cliente.DoesNotExist:
         cliente = None
-    context = {"productos": productos, "cliente": cliente}
+    context = {
+        "productos": productos,
+        "cliente": cliente,
+        "puntos_totales": saldo_disponible(cliente) if cliente else None,
+    }
     return render(request, "clients/productos_canjebles.html", context)
 
 
@@ -481,10 +490,11 @@ def canjear_producto(request, producto_id):
             messages.error(request, error_msg)
             return redirect("clients:panel_puntos", cliente_id=cliente_id)
 
-        if cliente.puntos_totales < producto.puntos_requeridos:
+        saldo = saldo_disponible(cliente)
+        if saldo < producto.puntos_requeridos:
             error_msg = (
                 f"Puntos insuficientes. Requiere {producto.puntos_requeridos} pts, "
-                f"tienes {cliente.puntos_totales} pts"
+                f"tienes {saldo} pts"
             )
             if is_ajax:
                 return JsonResponse({"success": False, "error": error_msg}, status=400)
@@ -501,8 +511,7 @@ def canjear_producto(request, producto_id):
             )
 
             # Descontar puntos del cliente
-            cliente.puntos_totales -= producto.puntos_requeridos
-            cliente.save()
+            descontar_puntos(cliente, producto.puntos_requeridos)
 
             # Reducir stock del producto
             producto.stock_disponible -= 1
@@ -524,7 +533,7 @@ def canjear_producto(request, producto_id):
                     "success": True,
                     "mensaje": f"Canje realizado exitosamente. Canje #{canje.id}",
                     "canje_id": canje.id,
-                    "puntos_restantes": float(cliente.puntos_totales),
+                    "puntos_restantes": float(saldo_disponible(cliente)),
                     "redirect_url": reverse("clients:detalle_canje", args=[canje.id]),
                 }
             )
@@ -588,7 +597,7 @@ def canjearproducto_web(request, producto_id):
         return redirect("clients:mi_panel_puntos")
 
     if request.method == "GET":
-        puntos_disponibles = cliente.puntos_totales
+        puntos_disponibles = saldo_disponible(cliente)
         puntos_requeridos = producto.puntos_requeridos
         puede_canjear = puntos_disponibles >= puntos_requeridos
         context = {
@@ -604,7 +613,7 @@ def canjearproducto_web(request, producto_id):
         return render(request, "clients/confirmar_canje.html", context)
 
     # POST
-    puntos_disponibles = cliente.puntos_totales
+    puntos_disponibles = saldo_disponible(cliente)
     puntos_requeridos = producto.puntos_requeridos
 
     # Validaciones
@@ -623,8 +632,7 @@ def canjearproducto_web(request, producto_id):
         # Transacción atómica
         with transaction.atomic():
             # 1. Descontar puntos del cliente
-            cliente.puntos_totales -= puntos_requeridos
-            cliente.save()
+            descontar_puntos(cliente, puntos_requeridos)
 
             # 2. Reducir stock del producto
             producto.stock_disponible -= 1
@@ -720,6 +728,7 @@ def detalle_canje(request, canje_id):
     context = {
         "canje": canje,
         "puede_enviar_correo": bool(canje.cliente.correo),
+        "puntos_cliente": saldo_disponible(canje.cliente),
     }
     return render(request, "clients/detalle_canje.html", context)
 
@@ -806,7 +815,7 @@ def canjes_cliente(request, cliente_id):
         "-fecha_canje"
     )
 
-    context = {"cliente": cliente, "canjes": canjes}
+    context = {"cliente": cliente, "canjes": canjes, "puntos_totales": saldo_disponible(cliente)}
     return render(request, "clients/canjes_cliente.html", context)
 
 
@@ -831,25 +840,26 @@ def mis_canjes(request):
 
 
 @login_required
-@require_POST
+@require_http_methods(["GET", "POST"])
 @check_user_role(allowed_roles=["Administrador", "Vendedor"])
 def buscar_cliente_ajax(request):
-    """Busca clientes por documento o nombre (para el POS)."""
+    """
+    Busca clientes por prefijo de documento o nombre (para el POS).
+    Acepta GET (?q=&pagina=) o POST con JSON {"query", "pagina"}.
+    """
     try:
-        data = json.loads(request.body)
-        query = data.get("query", "").strip()
+        if request.method == "POST":
+            data = json.loads(request.body)
+            query = data.get("query", "").strip()
+            pagina = data.get("pagina", 1)
+        else:
+            query = request.GET.get("q", "").strip()
+            pagina = request.GET.get("pagina", 1)
 
         if not query:
-            return JsonResponse({"clientes": []})
-
-        # Buscar por documento o nombre
-        clientes = (
-            Cliente.objects.filter(documento__icontains=query)
-            | Cliente.objects.filter(nombres__icontains=query)
-            | Cliente.objects.filter(apellidos__icontains=query)
-        )
+            return JsonResponse({"clientes": [], "pagina": 1, "hay_mas": False})
 
-        clientes = clientes.order_by("nombres")[:10]  # Limitar a 10 resultados
+        clientes, hay_mas = buscar_clientes(query, pagina=pagina, incluir_consumidor_final=True)
 
         clientes_data = [
             {
@@ -859,11 +869,11 @@ def buscar_cliente_ajax(request):
                 "documento": c.documento,
                 "telefono": c.telefono,
                 "correo": c.correo,
-                "puntos_totales": float(c.puntos_totales),
+                "puntos_totales": float(c.saldo),
             }
-            for c in clientes
+            for c in con_saldo(clientes)
         ]
 
-        return JsonResponse({"clientes": clientes_data})
+        return JsonResponse({"clientes": clientes_data, "pagina": int(pagina), "hay_mas": hay_mas})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
@@ -1,137 +1,134 @@
 """
 Backend de correo para Brevo (ex-Sendinblue) usando API HTTP
 Evita el bloqueo de SMTP en Railway
+
+Los correos con el mismo remitente y los mismos adjuntos viajan en una sola
+petición usando ``messageVersions`` (hasta ``BREVO_TAMANO_LOTE`` por
+petición); la sesión HTTP y el pool de hilos son los de core/http_backend.py.
 """
-import requests
-import logging
 import base64
+import json
+import logging
+
 from django.conf import settings
-from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail import EmailMultiAlternatives
 
+from .http_backend import HttpEmailBackend
+
 logger = logging.getLogger(__name__)
 
 
-class BrevoEmailBackend(BaseEmailBackend):
+class BrevoEmailBackend(HttpEmailBackend):
     """
     Backend de correo que usa la API HTTP de Brevo
     """
-    
+
+    NOMBRE = 'brevo'
     API_URL = "https://api.brevo.com/v3/smtp/email"
-    
+    # Brevo acepta hasta 1000 versiones por petición
+    TAMANO_LOTE = getattr(settings, 'BREVO_TAMANO_LOTE', 100)
+
     def __init__(self, fail_silently=False, **kwargs):
         super().__init__(fail_silently=fail_silently, **kwargs)
         self.api_key = getattr(settings, 'BREVO_API_KEY', '')
-    
-    def send_messages(self, email_messages):
-        if not self.api_key:
-            error_msg = "BREVO_API_KEY no configurado"
-            logger.error(f"[BREVO] {error_msg}")
-            if not self.fail_silently:
-                raise Exception(error_msg)
-            return 0
-        
-        num_sent = 0
-        for message in email_messages:
-            try:
-                if self._send(message):
-                    num_sent += 1
-                    logger.info(f"[BREVO] ✓ Correo enviado a {', '.join(message.to)}")
-            except Exception as e:
-                logger.error(f"[BREVO] ✗ Error enviando correo: {e}")
-                if not self.fail_silently:
-                    raise
-        
-        return num_sent
-    
-    def _send(self, message):
-        headers = {
+        self.api_url = getattr(settings, 'BREVO_API_URL', self.API_URL)
+
+    def _api_key(self):
+        return self.api_key
+
+    def _headers(self):
+        return {
             "api-key": self.api_key,
             "Content-Type": "application/json"
         }
-        
-        # Preparar destinatarios
-        to_list = [{"email": email} for email in message.to]
-        
+
+    def _adjuntos(self, message):
+        adjuntos = []
+        for attachment in message.attachments:
+            try:
+                # Para MIMEImage y otros adjuntos
+                if hasattr(attachment, 'get_payload'):
+                    content = attachment.get_payload(decode=True)
+                    filename = attachment.get_filename() or "attachment"
+                else:
+                    filename, content, _ = attachment
+                    if isinstance(content, str):
+                        content = content.encode('utf-8')
+                if content:
+                    adjuntos.append({
+                        "name": filename,
+                        "content": base64.b64encode(content).decode('utf-8')
+                    })
+            except Exception as e:
+                logger.warning(f"[BREVO] No se pudo procesar adjunto: {e}")
+        return adjuntos
+
+    def _payload(self, message):
         # Preparar payload
         payload = {
             "sender": {"email": message.from_email or settings.DEFAULT_FROM_EMAIL},
-            "to": to_list,
+            "to": [{"email": email} for email in message.to],
             "subject": message.subject,
         }
-        
+
         # CC y BCC
         if message.cc:
             payload["cc"] = [{"email": email} for email in message.cc]
         if message.bcc:
             payload["bcc"] = [{"email": email} for email in message.bcc]
-        
+
         # Manejar contenido HTML y texto para EmailMultiAlternatives
+        html_content = None
         if isinstance(message, EmailMultiAlternatives):
-            # Buscar alternativa HTML
-            html_content = None
             for content, mimetype in message.alternatives:
                 if mimetype == 'text/html':
                     html_content = content
                     break
-            
-            if html_content:
-                payload["htmlContent"] = html_content
+        elif getattr(message, 'content_subtype', None) == 'html':
+            html_content = message.body
+
+        if html_content:
+            payload["htmlContent"] = html_content
+            if html_content is not message.body:
                 payload["textContent"] = message.body  # Texto plano como fallback
-            else:
-                payload["textContent"] = message.body
-                
-            # Manejar adjuntos (como imágenes del logo)
-            if hasattr(message, 'attachments') and message.attachments:
-                attachments = []
-                for attachment in message.attachments:
-                    try:
-                        # Para MIMEImage y otros adjuntos
-                        if hasattr(attachment, 'get_payload'):
-                            content = attachment.get_payload(decode=True)
-                            filename = attachment.get_filename() or "attachment"
-                            if content:
-                                attachments.append({
-                                    "name": filename,
-                                    "content": base64.b64encode(content).decode('utf-8')
-                                })
-                                logger.info(f"[BREVO] Adjunto procesado: {filename}")
-                    except Exception as e:
-                        logger.warning(f"[BREVO] No se pudo procesar adjunto: {e}")
-                
-                if attachments:
-                    payload["attachment"] = attachments
         else:
-            # Detectar si el body es HTML
-            if hasattr(message, 'content_subtype') and message.content_subtype == 'html':
-                payload["htmlContent"] = message.body
-            else:
-                payload["textContent"] = message.body
-        
-        # Log del envío
-        logger.info(f"[BREVO] Enviando correo a {', '.join(message.to)} - Asunto: {message.subject}")
-        
-        try:
-            response = requests.post(
-                self.API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code in [200, 201]:
-                logger.info(f"[BREVO] ✓ API respondió exitosamente: {response.status_code}")
-                return True
-            else:
-                error_msg = f"Brevo API error: {response.status_code} - {response.text}"
-                logger.error(f"[BREVO] ✗ {error_msg}")
-                if not self.fail_silently:
-                    raise Exception(error_msg)
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Error de conexión con Brevo API: {e}"
-            logger.error(f"[BREVO] ✗ {error_msg}")
-            if not self.fail_silently:
-                raise Exception(error_msg)
-            return False
+            payload["textContent"] = message.body
+
+        adjuntos = self._adjuntos(message)
+        if adjuntos:
+            payload["attachment"] = adjuntos
+        return payload
+
+    def _version(self, payload):
+        """Lo que cambia de un correo a otro dentro de una petición por lotes."""
+        return {
+            clave: payload[clave]
+            for clave in ("to", "cc", "bcc", "subject", "htmlContent", "textContent")
+            if clave in payload
+        }
+
+    def _peticiones(self, mensajes):
+        grupos = {}
+        for indice, message in enumerate(mensajes):
+            payload = self._payload(message)
+            # Una versión sin htmlContent (o sin textContent) heredaría el del cuerpo
+            # global: solo se agrupan correos con las mismas claves de contenido
+            contenido = [clave for clave in ("htmlContent", "textContent") if clave in payload]
+            clave = json.dumps([payload["sender"], payload.get("attachment"), contenido], sort_keys=True)
+            grupos.setdefault(clave, []).append((indice, payload))
+
+        peticiones = []
+        for grupo in grupos.values():
+            for inicio in range(0, len(grupo), self.TAMANO_LOTE):
+                lote = grupo[inicio:inicio + self.TAMANO_LOTE]
+                indices = [indice for indice, _ in lote]
+                if len(lote) == 1:
+                    peticiones.append((indices, self.api_url, lote[0][1]))
+                    continue
+                # El cuerpo global es el del primero; cada versión trae el suyo
+                base = {clave: valor for clave, valor in lote[0][1].items() if clave not in ("to", "cc", "bcc")}
+                base["messageVersions"] = [self._version(payload) for _, payload in lote]
+                peticiones.append((indices, self.api_url, base))
+
+        logger.info(f"[BREVO] Enviando {len(mensajes)} correos en {len(peticiones)} peticiones")
+        return peticiones
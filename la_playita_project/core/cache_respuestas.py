@@ -0,0 +1,140 @@
+"""
+Caché de respuestas para endpoints de reportes y dashboards.
+
+Los endpoints de solo lectura se decoran con ``@cache_respuesta(nombre,
+grupos)``. La respuesta (200) se guarda en la caché configurada en
+``CACHES`` (memoria local, archivos o Redis, según el entorno) con una
+clave que incluye:
+
+- el nombre del endpoint y su querystring;
+- el rol del usuario (el Vendedor ve datos filtrados) y, si el endpoint lo
+  pide, su id;
+- la versión de cada grupo de datos del que depende (``ventas``,
+  ``inventario``).
+
+Para invalidar no se borran claves: ``invalidar('ventas')`` sube la versión
+del grupo y todas las respuestas que dependían de él dejan de encontrarse.
+Las ventas (pos/resumen.py) y los movimientos de inventario
+(core/signals.py) llaman a ``invalidar_al_confirmar``.
+
+El TTL de cada endpoint se puede cambiar con ``CACHE_TTL_ENDPOINTS`` en
+settings (``{'nombre': segundos}``); ``CACHE_RESPUESTAS_ACTIVA = False``
+desactiva la caché de respuestas. Es el valor por defecto cuando la caché es
+memoria local: una invalidación en un proceso no llegaría a los demás.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+VENTAS = 'ventas'
+INVENTARIO = 'inventario'
+
+TTL_POR_DEFECTO = 60
+TTL_ENDPOINTS = {
+    'api_ventas_por_fecha': 60 * 5,
+    'dashboard_stats': 60,
+    'dashboard_inventario': 60 * 2,
+    'resumen_alertas': 60 * 2,
+    'productos_obsoletos': 60 * 30,
+}
+TTL_ENDPOINTS.update(getattr(settings, 'CACHE_TTL_ENDPOINTS', {}))
+
+CLAVE_VERSION = 'resp:version:{}'
+CLAVE_RESPUESTA = 'resp:{nombre}:{versiones}:{alcance}:{consulta}'
+
+
+def activa():
+    return getattr(settings, 'CACHE_RESPUESTAS_ACTIVA', False)
+
+
+def version(grupo):
+    cache.add(CLAVE_VERSION.format(grupo), int(time.time()), timeout=None)
+    return cache.get(CLAVE_VERSION.format(grupo))
+
+
+def invalidar(*grupos):
+    """Descarta todas las respuestas que dependen de los grupos indicados."""
+    for grupo in grupos:
+        try:
+            cache.incr(CLAVE_VERSION.format(grupo))
+        except ValueError:
+            cache.set(CLAVE_VERSION.format(grupo), int(time.time()), timeout=None)
+
+
+def invalidar_al_confirmar(*grupos):
+    transaction.on_commit(lambda: invalidar(*grupos))
+
+
+def _alcance(request, por_usuario):
+    """Parte de la clave que depende de quién consulta."""
+    rol = getattr(getattr(request.user, 'rol', None), 'nombre', None) or 'sin_rol'
+    if por_usuario:
+        return f'{rol}:{request.user.pk}'
+    return rol
+
+
+def clave_respuesta(nombre, grupos, request, por_usuario=False):
+    versiones = cache.get_many([CLAVE_VERSION.format(g) for g in grupos])
+    versiones = '.'.join(
+        str(versiones.get(CLAVE_VERSION.format(g)) or version(g)) for g in grupos
+    )
+    consulta = urlencode(sorted(request.GET.lists()), doseq=True)
+    consulta = hashlib.sha1(consulta.encode()).hexdigest()[:16]
+    return CLAVE_RESPUESTA.format(
+        nombre=nombre, versiones=versiones, alcance=_alcance(request, por_usuario), consulta=consulta
+    )
+
+
+def _guardar(response):
+    """Lo que se guarda: los datos de DRF o el contenido ya renderizado."""
+    if isinstance(response, Response):
+        return ('drf', response.data)
+    return ('http', response.content, response['Content-Type'])
+
+
+def _reconstruir(guardado):
+    if guardado[0] == 'drf':
+        return Response(guardado[1])
+    return HttpResponse(guardado[1], content_type=guardado[2])
+
+
+def cache_respuesta(nombre, grupos=(VENTAS,), por_usuario=False):
+    """
+    Guarda en caché las respuestas 200 de una vista de solo lectura.
+
+    Sirve para vistas de Django (``JsonResponse``), vistas de función de DRF
+    (debajo de ``@api_view``) y acciones de un ViewSet (con
+    ``method_decorator``). Agrega el header ``X-Cache: HIT|MISS``.
+
+    Args:
+        nombre (str): nombre del endpoint; define su TTL en ``TTL_ENDPOINTS``.
+        grupos (tuple): datos de los que depende (``VENTAS``, ``INVENTARIO``).
+        por_usuario (bool): la respuesta depende del usuario, no solo del rol.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not activa() or request.method != 'GET':
+                return vista(request, *args, **kwargs)
+
+            clave = clave_respuesta(nombre, grupos, request, por_usuario)
+            guardado = cache.get(clave)
+            if guardado is not None:
+                response = _reconstruir(guardado)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = vista(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(clave, _guardar(response), TTL_ENDPOINTS.get(nombre, TTL_POR_DEFECTO))
+            response['X-Cache'] = 'MISS'
+            return response
+        return envoltura
+    return decorador
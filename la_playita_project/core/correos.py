@@ -0,0 +1,257 @@
+"""
+Bandeja de salida de correos.
+
+Las vistas no envían correos: arman el mensaje como siempre
+(``EmailMessage`` / ``EmailMultiAlternatives``) y lo guardan con
+``encolar(mensaje, origen)``. Como es un INSERT, queda dentro de la
+transacción de la vista: si la vista falla, el correo tampoco sale.
+
+El comando ``python manage.py enviar_correos`` (normalmente con
+``--intervalo``) procesa la bandeja:
+
+- Toma hasta ``lote`` correos vencidos con ``SELECT ... FOR UPDATE SKIP
+  LOCKED`` y les corre ``siguiente_intento`` ``CORREOS_BLOQUEO_SEGUNDOS``
+  hacia adelante antes de enviarlos. Si el proceso muere a mitad de lote,
+  esos correos vuelven a estar disponibles cuando vence el bloqueo; ninguno
+  se pierde (a lo sumo alguno sale dos veces).
+- Los envía por una sola conexión de ``CORREOS_BACKEND`` (por defecto
+  ``EMAIL_BACKEND``, que en producción es ``core.brevo_backend.BrevoEmailBackend``).
+  Con los backends HTTP el lote completo sale en peticiones por lotes y en
+  paralelo, y cada correo recibe su propio resultado.
+- Si un envío falla, lo reprograma con backoff exponencial
+  (``CORREOS_BACKOFF_BASE`` segundos, duplicando hasta
+  ``CORREOS_BACKOFF_MAXIMO``). Después de ``CORREOS_MAX_INTENTOS`` queda
+  ``fallido`` y se puede reintentar con ``enviar_correos --reintentar-fallidos``.
+"""
+import base64
+import logging
+from datetime import timedelta
+from email import encoders
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, 'CORREOS_MAX_INTENTOS', 8)
+BACKOFF_BASE = getattr(settings, 'CORREOS_BACKOFF_BASE', 60)
+BACKOFF_MAXIMO = getattr(settings, 'CORREOS_BACKOFF_MAXIMO', 60 * 60 * 6)
+BLOQUEO_SEGUNDOS = getattr(settings, 'CORREOS_BLOQUEO_SEGUNDOS', 60 * 10)
+
+
+def _backend():
+    return getattr(settings, 'CORREOS_BACKEND', None) or settings.EMAIL_BACKEND
+
+
+def _adjunto(adjunto):
+    """Adjunto de Django (MIMEBase o (nombre, contenido, mimetype)) a JSON."""
+    if isinstance(adjunto, MIMEBase):
+        nombre = adjunto.get_filename() or 'adjunto'
+        contenido = adjunto.get_payload(decode=True) or b''
+        mimetype = adjunto.get_content_type()
+    else:
+        nombre, contenido, mimetype = adjunto
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+    return {
+        'nombre': nombre,
+        'contenido': base64.b64encode(contenido).decode('ascii'),
+        'mimetype': mimetype or 'application/octet-stream',
+    }
+
+
+@transaction.atomic
+def encolar(mensaje, origen=''):
+    """
+    Guarda ``mensaje`` en la bandeja de salida en lugar de enviarlo. Dentro
+    de otra transacción usa un savepoint: si el INSERT falla, la transacción
+    de la vista sigue usable.
+
+    Args:
+        mensaje (EmailMessage): el correo tal como se enviaría.
+        origen (str): etiqueta para las métricas (``factura``, ``pqrs``...).
+
+    Returns:
+        CorreoSaliente: el registro creado.
+    """
+    html = ''
+    texto = mensaje.body
+    for contenido, mimetype in getattr(mensaje, 'alternatives', []):
+        if mimetype == 'text/html':
+            html = contenido
+            break
+    if not html and mensaje.content_subtype == 'html':
+        html, texto = mensaje.body, strip_tags(mensaje.body)
+
+    return CorreoSaliente.objects.create(
+        origen=origen,
+        asunto=mensaje.subject,
+        remitente=mensaje.from_email or '',
+        destinatarios=list(mensaje.to),
+        cc=list(mensaje.cc),
+        bcc=list(mensaje.bcc),
+        cuerpo_texto=texto,
+        cuerpo_html=html,
+        adjuntos=[_adjunto(a) for a in mensaje.attachments],
+        siguiente_intento=timezone.now(),
+    )
+
+
+def _mensaje(correo, conexion):
+    """Reconstruye el EmailMultiAlternatives guardado."""
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto,
+        body=correo.cuerpo_texto,
+        from_email=correo.remitente or None,
+        to=correo.destinatarios,
+        cc=correo.cc,
+        bcc=correo.bcc,
+        connection=conexion,
+    )
+    if correo.cuerpo_html:
+        mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+    for adjunto in correo.adjuntos:
+        # Como MIMEBase: así lo reconocen tanto SMTP como BrevoEmailBackend
+        tipo, _, subtipo = adjunto['mimetype'].partition('/')
+        parte = MIMEBase(tipo, subtipo or 'octet-stream')
+        parte.set_payload(base64.b64decode(adjunto['contenido']))
+        encoders.encode_base64(parte)
+        parte.add_header('Content-Disposition', 'attachment', filename=adjunto['nombre'])
+        mensaje.attach(parte)
+    return mensaje
+
+
+def espera_reintento(intentos):
+    """Segundos hasta el próximo intento después de ``intentos`` fallidos."""
+    return min(BACKOFF_BASE * 2 ** (intentos - 1), BACKOFF_MAXIMO)
+
+
+@transaction.atomic
+def reclamar(limite):
+    """
+    Toma hasta ``limite`` correos vencidos y los aparta por
+    ``BLOQUEO_SEGUNDOS`` para que otro proceso no los envíe a la vez.
+    """
+    ahora = timezone.now()
+    vencidos = CorreoSaliente.objects.filter(
+        estado=CorreoSaliente.ESTADO_PENDIENTE, siguiente_intento__lte=ahora
+    ).order_by('siguiente_intento', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        vencidos = vencidos.select_for_update(skip_locked=True)
+    else:
+        vencidos = vencidos.select_for_update()
+    ids = list(vencidos.values_list('id', flat=True)[:limite])
+    if not ids:
+        return []
+
+    CorreoSaliente.objects.filter(id__in=ids).update(
+        intentos=F('intentos') + 1,
+        siguiente_intento=ahora + timedelta(seconds=BLOQUEO_SEGUNDOS),
+    )
+    return list(CorreoSaliente.objects.filter(id__in=ids).order_by('id'))
+
+
+def _registrar_fallo(correo, error, ahora):
+    correo.ultimo_error = str(error)[:2000]
+    if correo.intentos >= MAX_INTENTOS:
+        correo.estado = CorreoSaliente.ESTADO_FALLIDO
+        logger.error(f"[CORREOS] ✗ Correo #{correo.id} descartado tras {correo.intentos} intentos: {error}")
+    else:
+        correo.siguiente_intento = ahora + timedelta(seconds=espera_reintento(correo.intentos))
+        logger.warning(f"[CORREOS] Correo #{correo.id} falló (intento {correo.intentos}), "
+                       f"se reintenta a las {correo.siguiente_intento:%H:%M:%S}: {error}")
+    correo.save(update_fields=['estado', 'siguiente_intento', 'ultimo_error'])
+
+
+def _enviar_uno(conexion, mensaje):
+    try:
+        if not conexion.send_messages([mensaje]):
+            raise ValueError('El backend no aceptó el mensaje')
+    except Exception as e:
+        return e
+    return None
+
+
+def _enviar(conexion, mensajes):
+    """Resultado de cada mensaje: ``None`` si salió o la excepción."""
+    if hasattr(conexion, 'enviar_mensajes'):
+        # Backends HTTP (core/http_backend.py): peticiones por lotes y en paralelo
+        return conexion.enviar_mensajes(mensajes)
+    return [_enviar_uno(conexion, mensaje) for mensaje in mensajes]
+
+
+def enviar_lote(limite=20):
+    """
+    Envía un lote de la bandeja de salida.
+
+    Returns:
+        dict: ``enviados``, ``reintentos`` y ``fallidos`` del lote.
+    """
+    resultado = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+    correos = reclamar(limite)
+    if not correos:
+        return resultado
+
+    enviados = []
+    conexion = get_connection(backend=_backend(), fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        # Sin conexión no se intenta ninguno del lote
+        for correo in correos:
+            _registrar_fallo(correo, e, timezone.now())
+        fallidos = sum(c.estado == CorreoSaliente.ESTADO_FALLIDO for c in correos)
+        return {'enviados': 0, 'reintentos': len(correos) - fallidos, 'fallidos': fallidos}
+
+    try:
+        errores = _enviar(conexion, [_mensaje(correo, conexion) for correo in correos])
+    except Exception as e:
+        errores = [e] * len(correos)
+    finally:
+        conexion.close()
+
+    ahora = timezone.now()
+    for correo, error in zip(correos, errores):
+        if error is None:
+            enviados.append(correo.id)
+            continue
+        _registrar_fallo(correo, error, ahora)
+        clave = 'fallidos' if correo.estado == CorreoSaliente.ESTADO_FALLIDO else 'reintentos'
+        resultado[clave] += 1
+
+    CorreoSaliente.objects.filter(id__in=enviados).update(
+        estado=CorreoSaliente.ESTADO_ENVIADO, enviado=timezone.now(), ultimo_error=''
+    )
+    resultado['enviados'] = len(enviados)
+    return resultado
+
+
+def reintentar_fallidos():
+    """Devuelve a la cola los correos descartados (por ejemplo, tras corregir la API key)."""
+    return CorreoSaliente.objects.filter(estado=CorreoSaliente.ESTADO_FALLIDO).update(
+        estado=CorreoSaliente.ESTADO_PENDIENTE, intentos=0, siguiente_intento=timezone.now()
+    )
+
+
+def metricas():
+    """Estado de la bandeja de salida en una sola consulta."""
+    ahora = timezone.now()
+    pendiente = Q(estado=CorreoSaliente.ESTADO_PENDIENTE)
+    datos = CorreoSaliente.objects.aggregate(
+        pendientes=Count('id', filter=pendiente),
+        en_reintento=Count('id', filter=pendiente & Q(intentos__gt=0)),
+        fallidos=Count('id', filter=Q(estado=CorreoSaliente.ESTADO_FALLIDO)),
+        enviados_24h=Count('id', filter=Q(estado=CorreoSaliente.ESTADO_ENVIADO,
+                                          enviado__gte=ahora - timedelta(hours=24))),
+        pendiente_mas_antiguo=Min('creado', filter=pendiente),
+    )
+    antiguo = datos.pop('pendiente_mas_antiguo')
+    datos['antiguedad_segundos'] = int((ahora - antiguo).total_seconds()) if antiguo else 0
+    return datos
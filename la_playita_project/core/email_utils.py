@@ -6,11 +6,13 @@ Incluye fallbacks y manejo de errores para Railway.app
 import logging
 import os
 from datetime import datetime
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from .correos import encolar
+
 logger = logging.getLogger(__name__)
 
 def send_email_with_fallback(subject, message, recipient_list, html_message=None, attachment=None):
@@ -274,7 +276,8 @@ def _log_email_for_manual_review(subject, message, recipient_list, html_message=
 
 def send_invoice_email(venta, recipient_email=None):
     """
-    Envía correo con factura de venta
+    Deja en la bandeja de salida el correo con la factura de venta
+    (lo envía el comando enviar_correos)
     
     Args:
         venta: Instancia de Venta
@@ -328,13 +331,29 @@ def send_invoice_email(venta, recipient_email=None):
         # Asunto del correo
         subject = f"Factura de venta #{venta.id} - La Playita"
         
-        # Enviar correo
-        return send_email_with_fallback(
+        mensaje = EmailMultiAlternatives(
             subject=subject,
-            message=text_content,
-            recipient_list=[email],
-            html_message=html_content
+            body=text_content,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email]
         )
+        mensaje.attach_alternative(html_content, "text/html")
+        
+        # PDF ya generado al confirmar la venta (pos/facturas.py)
+        try:
+            from pos.facturas import leer_pdf
+            mensaje.attach(f'factura_venta_{venta.id}.pdf', leer_pdf(venta), 'application/pdf')
+        except Exception as pdf_error:
+            logger.warning(f"Factura #{venta.id} enviada sin PDF adjunto: {pdf_error}")
+        
+        # El envío lo hace el comando enviar_correos (core/correos.py)
+        encolar(mensaje, origen='factura')
+        logger.info(f"Factura #{venta.id} en cola de envío a {email}")
+        return {
+            'success': True,
+            'message': 'Factura en cola de envío. Llegará al correo en unos momentos.',
+            'method': 'cola'
+        }
         
     except Exception as e:
         logger.error(f"Error preparando correo de factura: {str(e)}")
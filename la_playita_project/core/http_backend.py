@@ -0,0 +1,150 @@
+"""
+Base de los backends de correo por API HTTP (Brevo, Resend).
+
+- Todas las conexiones del proceso comparten una ``requests.Session`` por
+  proveedor, con un pool de ``CORREOS_HTTP_WORKERS`` conexiones keep-alive:
+  el handshake TLS se paga una vez y no por correo.
+- Cada backend agrupa los mensajes en peticiones (``_peticiones``) usando el
+  endpoint de envío por lotes del proveedor cuando se puede, y las
+  peticiones salen en paralelo por un pool de hilos acotado.
+- ``enviar_mensajes`` devuelve el resultado de cada mensaje (la bandeja de
+  salida lo usa para reintentar solo los que fallaron); ``send_messages``
+  es la interfaz normal de Django encima de eso.
+- Los endpoints por lotes aceptan o rechazan la petición entera: si el
+  proveedor rechaza un lote (4xx, salvo 429), sus correos se reenvían de a
+  uno para que solo falle el que tiene el problema (un destinatario inválido).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'CORREOS_HTTP_WORKERS', 4)
+TIMEOUT = getattr(settings, 'CORREOS_HTTP_TIMEOUT', 30)
+
+_sesiones = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+class ErrorProveedorCorreo(Exception):
+    """El proveedor rechazó la petición o no respondió."""
+
+    def __init__(self, mensaje, estado=None):
+        super().__init__(mensaje)
+        self.estado = estado
+
+    @property
+    def rechazada(self):
+        """El proveedor rechazó el contenido (4xx); 429 es límite de envío, no un correo malo."""
+        return self.estado is not None and 400 <= self.estado < 500 and self.estado != 429
+
+
+class HttpEmailBackend(BaseEmailBackend):
+    """
+    Subclases: definen ``NOMBRE``, ``_api_key()``, ``_headers()`` y
+    ``_peticiones(mensajes)``.
+    """
+    NOMBRE = 'http'
+    CODIGOS_OK = (200, 201, 202)
+
+    def _api_key(self):
+        raise NotImplementedError
+
+    def _headers(self):
+        raise NotImplementedError
+
+    def _peticiones(self, mensajes):
+        """Lista de ``(indices, url, payload)``: qué mensajes viajan en cada petición."""
+        raise NotImplementedError
+
+    @classmethod
+    def _sesion(cls):
+        with _lock:
+            if cls.NOMBRE not in _sesiones:
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS)
+                sesion.mount('https://', adaptador)
+                sesion.mount('http://', adaptador)
+                _sesiones[cls.NOMBRE] = sesion
+            return _sesiones[cls.NOMBRE]
+
+    @classmethod
+    def _pool(cls):
+        with _lock:
+            if cls.NOMBRE not in _pools:
+                _pools[cls.NOMBRE] = ThreadPoolExecutor(
+                    max_workers=WORKERS, thread_name_prefix=f'correo-{cls.NOMBRE}'
+                )
+            return _pools[cls.NOMBRE]
+
+    def _post(self, url, payload):
+        """None si el proveedor aceptó la petición; si no, la excepción."""
+        try:
+            response = self._sesion().post(url, headers=self._headers(), json=payload, timeout=TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            return ErrorProveedorCorreo(f'Error de conexión con {self.NOMBRE}: {e}')
+        if response.status_code in self.CODIGOS_OK:
+            return None
+        return ErrorProveedorCorreo(
+            f'{self.NOMBRE} API error: {response.status_code} - {response.text}', estado=response.status_code
+        )
+
+    def enviar_mensajes(self, mensajes):
+        """
+        Envía ``mensajes`` y devuelve una lista alineada con ellos: ``None``
+        si el mensaje salió o la excepción que lo impidió.
+        """
+        mensajes = list(mensajes)
+        if not self._api_key():
+            error = ErrorProveedorCorreo(f'API key de {self.NOMBRE} no configurada')
+            return [error] * len(mensajes)
+
+        resultados = [None] * len(mensajes)
+        peticiones = self._peticiones(mensajes)
+        errores = self._enviar(peticiones)
+
+        separados = []
+        for (indices, _, _), error in zip(peticiones, errores):
+            for indice in indices:
+                resultados[indice] = error
+            if len(indices) > 1 and isinstance(error, ErrorProveedorCorreo) and error.rechazada:
+                separados.extend(indices)
+
+        if separados:
+            logger.warning(f"[{self.NOMBRE.upper()}] Lote rechazado: reenviando {len(separados)} correos de a uno")
+            individuales = [
+                ([indice], url, payload)
+                for indice in separados
+                for _, url, payload in self._peticiones([mensajes[indice]])
+            ]
+            for (indices, _, _), error in zip(individuales, self._enviar(individuales)):
+                resultados[indices[0]] = error
+        return resultados
+
+    def _enviar(self, peticiones):
+        """Errores de cada petición (en paralelo si hay más de una)."""
+        if len(peticiones) == 1:
+            return [self._post(url, payload) for _, url, payload in peticiones]
+        futuros = [self._pool().submit(self._post, url, payload) for _, url, payload in peticiones]
+        return [futuro.result() for futuro in futuros]
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        resultados = self.enviar_mensajes(email_messages)
+        enviados = sum(error is None for error in resultados)
+        errores = [error for error in resultados if error is not None]
+
+        logger.info(f"[{self.NOMBRE.upper()}] {enviados}/{len(resultados)} correos enviados")
+        if errores:
+            logger.error(f"[{self.NOMBRE.upper()}] ✗ Error enviando correo: {errores[0]}")
+            if not self.fail_silently:
+                raise errores[0]
+        return enviados
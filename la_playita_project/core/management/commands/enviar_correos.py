@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.correos import enviar_lote, metricas, reintentar_fallidos
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos de la bandeja de salida (tabla correo_saliente) por lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=20,
+                            help='Correos tomados por vuelta')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y revisa la bandeja cada N segundos')
+        parser.add_argument('--reintentar-fallidos', action='store_true',
+                            help='Devuelve a la cola los correos que agotaron sus intentos')
+        parser.add_argument('--metricas', action='store_true',
+                            help='Solo muestra el estado de la bandeja')
+
+    def _mostrar_metricas(self):
+        datos = metricas()
+        self.stdout.write(
+            f"Pendientes: {datos['pendientes']} (en reintento: {datos['en_reintento']}) | "
+            f"Fallidos: {datos['fallidos']} | Enviados 24h: {datos['enviados_24h']} | "
+            f"Pendiente más antiguo: {datos['antiguedad_segundos']} s"
+        )
+
+    def handle(self, *args, **options):
+        if options['metricas']:
+            self._mostrar_metricas()
+            return
+        if options['reintentar_fallidos']:
+            devueltos = reintentar_fallidos()
+            self.stdout.write(self.style.SUCCESS(f'✅ {devueltos} correos fallidos devueltos a la cola.'))
+
+        while True:
+            totales = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+            while True:
+                resultado = enviar_lote(options['lote'])
+                for clave, valor in resultado.items():
+                    totales[clave] += valor
+                if sum(resultado.values()) < options['lote']:
+                    break
+
+            if totales['reintentos'] or totales['fallidos']:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  {totales['enviados']} enviados, {totales['reintentos']} para reintentar, "
+                    f"{totales['fallidos']} descartados."
+                ))
+            elif totales['enviados'] or options['intervalo'] <= 0:
+                self.stdout.write(self.style.SUCCESS(f"✅ {totales['enviados']} correos enviados."))
+
+            if options['intervalo'] <= 0:
+                self._mostrar_metricas()
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,58 @@
+import time
+
+import requests
+from django.core.mail import EmailMultiAlternatives
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.brevo_backend import BrevoEmailBackend
+from core.resend_backend import ResendEmailBackend
+from core.servidor_correo_prueba import ServidorCorreoPrueba
+
+BACKENDS = {
+    'brevo': (BrevoEmailBackend, 'BREVO_API_URL', '/v3/smtp/email'),
+    'resend': (ResendEmailBackend, 'RESEND_API_URL', '/emails'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Mide correos por segundo de los backends HTTP contra un servidor local que '
+            'imita al proveedor (no envía correos reales).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proveedor', choices=sorted(BACKENDS), default='brevo')
+        parser.add_argument('--mensajes', type=int, default=200)
+        parser.add_argument('--latencia-ms', type=int, default=50,
+                            help='Lo que tarda el servidor falso en responder cada petición')
+
+    def _mensajes(self, cantidad):
+        mensajes = []
+        for n in range(cantidad):
+            mensaje = EmailMultiAlternatives(f'Prueba {n}', 'Texto', 'tienda@test.com', [f'cliente{n}@test.com'])
+            mensaje.attach_alternative(f'<p>Prueba {n}</p>', 'text/html')
+            mensajes.append(mensaje)
+        return mensajes
+
+    def handle(self, *args, **options):
+        backend, ajuste, ruta = BACKENDS[options['proveedor']]
+        mensajes = self._mensajes(options['mensajes'])
+
+        with ServidorCorreoPrueba(latencia=options['latencia_ms'] / 1000) as servidor:
+            url = servidor.url + ruta
+            with override_settings(**{ajuste: url, 'BREVO_API_KEY': 'prueba', 'RESEND_API_KEY': 'prueba'}):
+                # Como antes: un requests.post (conexión nueva) por correo, en serie
+                inicio = time.perf_counter()
+                for mensaje in mensajes:
+                    requests.post(url, json=backend()._payload(mensaje), timeout=30)
+                antes = time.perf_counter() - inicio
+
+                peticiones_previas = len(servidor.peticiones)
+                inicio = time.perf_counter()
+                enviados = backend().send_messages(mensajes)
+                ahora = time.perf_counter() - inicio
+                peticiones = len(servidor.peticiones) - peticiones_previas
+
+        total = len(mensajes)
+        self.stdout.write(f'Secuencial sin sesión: {total / antes:,.0f} correos/s ({antes:.2f} s, {total} peticiones)')
+        self.stdout.write(f'Backend con sesión y lotes: {enviados / ahora:,.0f} correos/s ({ahora:.2f} s, {peticiones} peticiones)')
+        self.stdout.write(self.style.SUCCESS(f'✅ {antes / ahora:.1f}x más rápido con {options["proveedor"]}.'))
@@ -0,0 +1,22 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core.procesos_fondo import DIARIA, HORA_DIARIA, TAREAS, iniciar
+
+
+class Command(BaseCommand):
+    help = 'Corre todas las tareas de fondo (correos, reportes, puntos, métricas y purgas) en un solo proceso.'
+
+    def handle(self, *args, **options):
+        for comando, intervalo in TAREAS:
+            cada = f'cada día a las {HORA_DIARIA}:00' if intervalo == DIARIA else f'cada {intervalo} s'
+            self.stdout.write(f'  {comando}: {cada}')
+
+        detener = threading.Event()
+        hilos = iniciar(detener)
+        try:
+            for hilo in hilos:
+                hilo.join()
+        except KeyboardInterrupt:
+            detener.set()
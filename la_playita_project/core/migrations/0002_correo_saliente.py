@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origen', models.CharField(blank=True, help_text='Quién generó el correo (factura, pqrs, ...)', max_length=40)),
+                ('asunto', models.CharField(max_length=255)),
+                ('remitente', models.CharField(blank=True, max_length=254)),
+                ('destinatarios', models.JSONField(default=list)),
+                ('cc', models.JSONField(blank=True, default=list)),
+                ('bcc', models.JSONField(blank=True, default=list)),
+                ('cuerpo_texto', models.TextField(blank=True)),
+                ('cuerpo_html', models.TextField(blank=True)),
+                ('adjuntos', models.JSONField(blank=True, default=list, help_text='[{nombre, contenido (base64), mimetype}]')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('siguiente_intento', models.DateTimeField()),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('enviado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'correo_saliente',
+                'indexes': [models.Index(fields=['estado', 'siguiente_intento'], name='idx_correo_estado_siguiente')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import models
+
+
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida de correos (ver core/correos.py).
+
+    Las vistas guardan aquí el mensaje ya armado y responden de inmediato; el
+    comando ``enviar_correos`` los envía por lotes. Un correo que falla vuelve
+    a ``pendiente`` con ``siguiente_intento`` más adelante (backoff
+    exponencial) hasta agotar los intentos, y entonces queda ``fallido``.
+    """
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_ENVIADO = 'enviado'
+    ESTADO_FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_ENVIADO, 'Enviado'),
+        (ESTADO_FALLIDO, 'Fallido'),
+    ]
+
+    origen = models.CharField(max_length=40, blank=True, help_text="Quién generó el correo (factura, pqrs, ...)")
+    asunto = models.CharField(max_length=255)
+    remitente = models.CharField(max_length=254, blank=True)
+    destinatarios = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    cuerpo_texto = models.TextField(blank=True)
+    cuerpo_html = models.TextField(blank=True)
+    adjuntos = models.JSONField(default=list, blank=True,
+                                help_text="[{nombre, contenido (base64), mimetype}]")
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    siguiente_intento = models.DateTimeField()
+    ultimo_error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.asunto} -> {', '.join(self.destinatarios)} ({self.estado})"
+
+    class Meta:
+        db_table = 'correo_saliente'
+        indexes = [
+            models.Index(fields=['estado', 'siguiente_intento'], name='idx_correo_estado_siguiente'),
+        ]
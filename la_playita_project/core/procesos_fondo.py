@@ -0,0 +1,89 @@
+"""
+Procesos de fondo en un solo proceso de Django.
+
+``python manage.py procesos_fondo`` (lo lanza ``procesos_fondo.sh`` en el
+contenedor de gunicorn) corre cada tarea de ``TAREAS`` en su propio hilo, con
+una pasada del comando de la tarea (``call_command`` sin ``--intervalo``)
+cada tanto:
+
+- Las tareas con intervalo en segundos hacen su primera pasada al arrancar.
+- Las diarias corren a la hora local ``PROCESOS_FONDO_HORA_DIARIA`` (3 por
+  defecto), no al arrancar: un reinicio del contenedor no las repite.
+
+Un solo proceso carga Django, WeasyPrint y openpyxl una vez (la memoria de un
+worker de gunicorn) en vez de una vez por tarea. Un error en una pasada se
+registra y la tarea sigue en la siguiente; si el proceso entero termina,
+``procesos_fondo.sh`` lo vuelve a lanzar.
+"""
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DIARIA = 'diaria'
+HORA_DIARIA = getattr(settings, 'PROCESOS_FONDO_HORA_DIARIA', 3)
+
+# (comando, segundos entre pasadas o DIARIA)
+TAREAS = [
+    # Bandeja de salida de correos (core/correos.py)
+    ('enviar_correos', 10),
+    # Cola de exportaciones (reportes/trabajos.py): los archivos quedan en el
+    # disco local (REPORTES_DIR) que sirve gunicorn
+    ('procesar_reportes', 5),
+    # Libro de puntos de fidelización (clients/puntos.py)
+    ('aplicar_puntos_pendientes', 60),
+    # Claves de idempotencia de ventas vencidas (pos/idempotencia.py)
+    ('purgar_claves_idempotencia', 60 * 60),
+    # Recencia de los clientes que no compran (clients/metricas.py)
+    ('recalcular_metricas_clientes', DIARIA),
+    # Facturas PDF sin uso (pos/facturas.py), en el disco local
+    ('purgar_facturas', DIARIA),
+]
+
+
+def segundos_hasta_diaria(ahora, hora=HORA_DIARIA):
+    """Segundos desde ``ahora`` (aware) hasta la próxima ``hora`` local en punto."""
+    ahora = timezone.localtime(ahora)
+    proxima = timezone.make_aware(datetime.combine(ahora.date(), time(hora)))
+    if proxima <= ahora:
+        proxima = timezone.make_aware(datetime.combine(ahora.date() + timedelta(days=1), time(hora)))
+    return (proxima - ahora).total_seconds()
+
+
+def pasada(comando):
+    """Una pasada del comando; los errores se registran y no detienen la tarea."""
+    try:
+        call_command(comando)
+    except Exception:
+        logger.exception(f"[FONDO] ✗ {comando} falló")
+    finally:
+        # El hilo duerme entre pasadas: no dejar la conexión abierta hasta que
+        # MySQL la cierre por inactividad
+        connection.close()
+
+
+def _repetir(comando, intervalo, detener):
+    if intervalo == DIARIA:
+        while not detener.wait(segundos_hasta_diaria(timezone.now())):
+            pasada(comando)
+        return
+    while not detener.is_set():
+        pasada(comando)
+        detener.wait(intervalo)
+
+
+def iniciar(detener, tareas=None):
+    """Arranca un hilo por tarea; terminan cuando se activa ``detener``."""
+    hilos = []
+    for comando, intervalo in tareas or TAREAS:
+        hilo = threading.Thread(target=_repetir, args=(comando, intervalo, detener),
+                                name=f'fondo-{comando}', daemon=True)
+        hilo.start()
+        hilos.append(hilo)
+    return hilos
@@ -2,85 +2,93 @@
 Backend de correo personalizado para Resend usando API HTTP
 Evita el bloqueo de SMTP en Railway
 Usa requests directamente sin dependencias adicionales
+
+Los correos sin adjuntos salen de a ``RESEND_TAMANO_LOTE`` por petición en
+``/emails/batch`` (el endpoint por lotes de Resend no acepta adjuntos); la
+sesión HTTP y el pool de hilos son los de core/http_backend.py.
 """
-import requests
+import base64
+
 from django.conf import settings
-from django.core.mail.backends.base import BaseEmailBackend
+
+from .http_backend import HttpEmailBackend
 
 
-class ResendEmailBackend(BaseEmailBackend):
+class ResendEmailBackend(HttpEmailBackend):
     """
     Backend de correo que usa la API HTTP de Resend
     en lugar de SMTP para evitar bloqueos en Railway
     """
-    
+
+    NOMBRE = 'resend'
     API_URL = "https://api.resend.com/emails"
-    
+    # Máximo que acepta /emails/batch
+    TAMANO_LOTE = getattr(settings, 'RESEND_TAMANO_LOTE', 100)
+
     def __init__(self, fail_silently=False, **kwargs):
         super().__init__(fail_silently=fail_silently, **kwargs)
         self.api_key = getattr(settings, 'RESEND_API_KEY', '')
-    
-    def send_messages(self, email_messages):
-        """
-        Envía uno o más mensajes de correo usando la API de Resend
-        """
-        if not self.api_key:
-            if not self.fail_silently:
-                raise Exception("RESEND_API_KEY no configurado")
-            return 0
-        
-        num_sent = 0
-        for message in email_messages:
-            try:
-                sent = self._send(message)
-                if sent:
-                    num_sent += 1
-            except Exception as e:
-                if not self.fail_silently:
-                    raise
-        
-        return num_sent
-    
-    def _send(self, message):
-        """
-        Envía un mensaje individual usando la API HTTP de Resend
-        """
-        headers = {
+        self.api_url = getattr(settings, 'RESEND_API_URL', self.API_URL)
+
+    def _api_key(self):
+        return self.api_key
+
+    def _headers(self):
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
-        # Preparar el payload
+
+    def _payload(self, message):
+        """
+        Payload de un mensaje individual para la API HTTP de Resend
+        """
         payload = {
             "from": message.from_email or settings.DEFAULT_FROM_EMAIL,
             "to": list(message.to),
             "subject": message.subject,
         }
-        
+
         # Agregar CC y BCC si existen
         if message.cc:
             payload["cc"] = list(message.cc)
         if message.bcc:
             payload["bcc"] = list(message.bcc)
-        
+
         # Determinar si es HTML o texto plano
         if hasattr(message, 'content_subtype') and message.content_subtype == 'html':
             payload["html"] = message.body
         else:
             payload["text"] = message.body
-        
-        # Enviar usando requests
-        response = requests.post(
-            self.API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return True
-        else:
-            error_msg = f"Resend API error: {response.status_code} - {response.text}"
-            if not self.fail_silently:
-                raise Exception(error_msg)
-            return False
+            for content, mimetype in getattr(message, 'alternatives', []):
+                if mimetype == 'text/html':
+                    payload["html"] = content
+                    break
+
+        adjuntos = []
+        for attachment in message.attachments:
+            if hasattr(attachment, 'get_payload'):
+                filename, content = attachment.get_filename() or "attachment", attachment.get_payload(decode=True)
+            else:
+                filename, content, _ = attachment
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+            adjuntos.append({"filename": filename, "content": base64.b64encode(content).decode('utf-8')})
+        if adjuntos:
+            payload["attachments"] = adjuntos
+        return payload
+
+    def _peticiones(self, mensajes):
+        payloads = [self._payload(message) for message in mensajes]
+        peticiones = [
+            ([indice], self.api_url, payload)
+            for indice, payload in enumerate(payloads) if "attachments" in payload
+        ]
+        sin_adjuntos = [indice for indice, payload in enumerate(payloads) if "attachments" not in payload]
+        for inicio in range(0, len(sin_adjuntos), self.TAMANO_LOTE):
+            indices = sin_adjuntos[inicio:inicio + self.TAMANO_LOTE]
+            if len(indices) == 1:
+                peticiones.append((indices, self.api_url, payloads[indices[0]]))
+            else:
+                peticiones.append((indices, f"{self.api_url}/batch", [payloads[i] for i in indices]))
+        return peticiones
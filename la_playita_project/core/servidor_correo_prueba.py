@@ -0,0 +1,82 @@
+"""
+Servidor HTTP local que imita los endpoints de envío de Brevo y Resend.
+
+Lo usan los tests de los backends y el comando ``medir_envio_correos`` para
+medir correos por segundo sin salir a internet::
+
+    with ServidorCorreoPrueba(latencia=0.05) as servidor:
+        with override_settings(BREVO_API_URL=servidor.url + '/v3/smtp/email'):
+            ...
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como las APIs reales
+
+    def do_POST(self):
+        servidor = self.server.prueba
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+        if isinstance(cuerpo, list):
+            correos = len(cuerpo)
+        else:
+            correos = len(cuerpo.get('messageVersions') or [None])
+        with servidor.lock:
+            servidor.peticiones.append((self.path, cuerpo))
+            servidor.conexiones.add(self.client_address)
+            servidor.correos += correos
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+
+        # Como los proveedores, la petición se acepta o se rechaza entera
+        estado = servidor.estado
+        if any(destinatario in json.dumps(cuerpo) for destinatario in servidor.rechazar):
+            estado = 400
+        respuesta = json.dumps({'messageIds': [f'<{n}@prueba>' for n in range(correos)]}).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(respuesta)))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorCorreoPrueba:
+    """
+    Args:
+        latencia (float): segundos que tarda cada respuesta.
+        estado (int): código HTTP que responde (201 por defecto).
+        rechazar (iterable): destinatarios inválidos; la petición que los
+            incluya responde 400.
+    """
+
+    def __init__(self, latencia=0, estado=201, rechazar=()):
+        self.latencia = latencia
+        self.estado = estado
+        self.rechazar = set(rechazar)
+        self.lock = threading.Lock()
+        self.peticiones = []
+        self.conexiones = set()
+        self.correos = 0
+        self._http = None
+
+    @property
+    def url(self):
+        host, puerto = self._http.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+    def __enter__(self):
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+        self._http.daemon_threads = True
+        self._http.prueba = self
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._http.shutdown()
+        self._http.server_close()
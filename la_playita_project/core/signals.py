@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from inventory.models import AlertaInventario, Lote, MovimientoInventario, Producto
+from .cache_respuestas import INVENTARIO, invalidar_al_confirmar
+
+
+@receiver(post_save, sender=MovimientoInventario)
+@receiver(post_delete, sender=MovimientoInventario)
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=AlertaInventario)
+@receiver(post_delete, sender=AlertaInventario)
+def invalidar_respuestas_inventario(sender, **kwargs):
+    """Movimientos, lotes, productos o alertas cambiaron: descartar los dashboards de inventario."""
+    invalidar_al_confirmar(INVENTARIO)
@@ -0,0 +1,100 @@
+"""
+Tests de los backends HTTP de correo contra un servidor local (core/servidor_correo_prueba.py)
+"""
+from django.core.mail import EmailMultiAlternatives
+from django.test import TestCase, override_settings
+
+from . import correos
+from .brevo_backend import BrevoEmailBackend
+from .http_backend import ErrorProveedorCorreo
+from .models import CorreoSaliente
+from .resend_backend import ResendEmailBackend
+from .servidor_correo_prueba import ServidorCorreoPrueba
+
+
+def mensajes(cantidad, adjunto=False):
+    lista = []
+    for n in range(cantidad):
+        mensaje = EmailMultiAlternatives(f'Asunto {n}', f'Texto {n}', 'tienda@test.com', [f'c{n}@test.com'])
+        mensaje.attach_alternative(f'<p>{n}</p>', 'text/html')
+        if adjunto:
+            mensaje.attach('factura.pdf', b'%PDF', 'application/pdf')
+        lista.append(mensaje)
+    return lista
+
+
+class BackendsHttpTest(TestCase):
+
+    def setUp(self):
+        self.servidor = ServidorCorreoPrueba().__enter__()
+        self.addCleanup(self.servidor.__exit__, None, None, None)
+        ajustes = override_settings(
+            BREVO_API_KEY='clave', RESEND_API_KEY='clave',
+            BREVO_API_URL=self.servidor.url + '/v3/smtp/email',
+            RESEND_API_URL=self.servidor.url + '/emails',
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_brevo_agrupa_en_message_versions(self):
+        lote = mensajes(5) + mensajes(1, adjunto=True)
+
+        self.assertEqual(BrevoEmailBackend().send_messages(lote), 6)
+
+        self.assertEqual(self.servidor.correos, 6)
+        self.assertEqual(len(self.servidor.peticiones), 2)
+        agrupada = next(cuerpo for _, cuerpo in self.servidor.peticiones if 'messageVersions' in cuerpo)
+        self.assertEqual([v['to'] for v in agrupada['messageVersions']],
+                         [[{'email': f'c{n}@test.com'}] for n in range(5)])
+        self.assertEqual(agrupada['messageVersions'][3]['htmlContent'], '<p>3</p>')
+
+    def test_brevo_no_mezcla_correos_de_solo_texto_con_html(self):
+        solo_texto = [EmailMultiAlternatives(f'Aviso {n}', f'Aviso {n}', 'tienda@test.com', [f't{n}@test.com'])
+                      for n in range(2)]
+
+        self.assertEqual(BrevoEmailBackend().send_messages(mensajes(2) + solo_texto), 4)
+
+        self.assertEqual(len(self.servidor.peticiones), 2)
+        for _, cuerpo in self.servidor.peticiones:
+            claves = {clave for version in cuerpo['messageVersions'] for clave in version} | set(cuerpo)
+            self.assertEqual('htmlContent' in claves, cuerpo['subject'].startswith('Asunto'))
+
+    def test_lote_rechazado_se_reenvia_de_a_uno(self):
+        self.servidor.rechazar = {'c2@test.com'}
+
+        for backend in (BrevoEmailBackend(), ResendEmailBackend()):
+            resultados = backend.enviar_mensajes(mensajes(4))
+
+            self.assertEqual([r is None for r in resultados], [True, True, False, True])
+            self.assertEqual(resultados[2].estado, 400)
+        self.assertEqual(len(self.servidor.peticiones), 2 * (1 + 4))
+
+    def test_resend_usa_batch_salvo_con_adjuntos(self):
+        self.assertEqual(ResendEmailBackend().send_messages(mensajes(3) + mensajes(1, adjunto=True)), 4)
+
+        rutas = sorted(ruta for ruta, _ in self.servidor.peticiones)
+        self.assertEqual(rutas, ['/emails', '/emails/batch'])
+
+    def test_reutiliza_conexiones(self):
+        for _ in range(5):
+            BrevoEmailBackend().send_messages(mensajes(1))
+        self.assertEqual(len(self.servidor.peticiones), 5)
+        self.assertEqual(len(self.servidor.conexiones), 1)
+
+    def test_error_del_proveedor(self):
+        self.servidor.estado = 500
+
+        resultados = BrevoEmailBackend().enviar_mensajes(mensajes(2))
+        self.assertTrue(all(isinstance(r, ErrorProveedorCorreo) for r in resultados))
+        self.assertEqual(BrevoEmailBackend(fail_silently=True).send_messages(mensajes(2)), 0)
+        with self.assertRaises(ErrorProveedorCorreo):
+            BrevoEmailBackend().send_messages(mensajes(1))
+
+    @override_settings(CORREOS_BACKEND='core.brevo_backend.BrevoEmailBackend')
+    def test_bandeja_de_salida_envia_el_lote_en_una_peticion(self):
+        for mensaje in mensajes(4):
+            correos.encolar(mensaje)
+
+        self.assertEqual(correos.enviar_lote()['enviados'], 4)
+        self.assertEqual(len(self.servidor.peticiones), 1)
+        self.assertFalse(CorreoSaliente.objects.exclude(estado=CorreoSaliente.ESTADO_ENVIADO).exists())
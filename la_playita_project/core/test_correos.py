@@ -0,0 +1,85 @@
+"""
+Tests para la bandeja de salida de correos (core/correos.py)
+"""
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import correos
+from .models import CorreoSaliente
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class BackendCaido(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('Brevo API error: 503')
+
+
+def mensaje(destinatario='ana@test.com'):
+    email = EmailMultiAlternatives('Factura #1', 'Texto', 'tienda@test.com', [destinatario])
+    email.attach_alternative('<p>HTML</p>', 'text/html')
+    email.attach('factura_venta_1.pdf', b'%PDF-1.4 contenido', 'application/pdf')
+    return email
+
+
+@override_settings(CORREOS_BACKEND=LOCMEM)
+class BandejaSalidaTest(TestCase):
+
+    def test_encolar_no_envia_y_el_worker_si(self):
+        correos.encolar(mensaje(), origen='factura')
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(correos.enviar_lote(), {'enviados': 1, 'reintentos': 0, 'fallidos': 0})
+
+        enviado = mail.outbox[0]
+        self.assertEqual(enviado.to, ['ana@test.com'])
+        self.assertEqual(enviado.alternatives[0][0], '<p>HTML</p>')
+        adjunto = enviado.attachments[0]
+        self.assertEqual(adjunto.get_filename(), 'factura_venta_1.pdf')
+        self.assertEqual(adjunto.get_payload(decode=True), b'%PDF-1.4 contenido')
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual((correo.estado, correo.intentos), (CorreoSaliente.ESTADO_ENVIADO, 1))
+        self.assertEqual(correos.enviar_lote(), {'enviados': 0, 'reintentos': 0, 'fallidos': 0})
+
+    @override_settings(CORREOS_BACKEND='core.test_correos.BackendCaido')
+    def test_backoff_y_descarte(self):
+        correo = correos.encolar(mensaje())
+
+        antes = timezone.now()
+        self.assertEqual(correos.enviar_lote()['reintentos'], 1)
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, CorreoSaliente.ESTADO_PENDIENTE)
+        self.assertIn('503', correo.ultimo_error)
+        self.assertGreaterEqual(correo.siguiente_intento, antes + timedelta(seconds=correos.BACKOFF_BASE))
+        # Todavía no vence: el siguiente lote no lo toca
+        self.assertEqual(correos.enviar_lote()['reintentos'], 0)
+
+        for _ in range(correos.MAX_INTENTOS - 1):
+            CorreoSaliente.objects.update(siguiente_intento=timezone.now())
+            correos.enviar_lote()
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, CorreoSaliente.ESTADO_FALLIDO)
+        self.assertEqual(correos.metricas()['fallidos'], 1)
+
+        self.assertEqual(correos.reintentar_fallidos(), 1)
+        with self.settings(CORREOS_BACKEND=LOCMEM):
+            self.assertEqual(correos.enviar_lote()['enviados'], 1)
+
+    def test_reclamado_por_un_worker_que_murio_se_reenvia(self):
+        correos.encolar(mensaje())
+        self.assertEqual(len(correos.reclamar(10)), 1)  # el worker muere sin enviar
+
+        self.assertEqual(correos.enviar_lote()['enviados'], 0)
+        CorreoSaliente.objects.update(siguiente_intento=timezone.now())  # vence el bloqueo
+        self.assertEqual(correos.enviar_lote()['enviados'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_espera_exponencial_con_tope(self):
+        self.assertEqual(correos.espera_reintento(1), correos.BACKOFF_BASE)
+        self.assertEqual(correos.espera_reintento(3), correos.BACKOFF_BASE * 4)
+        self.assertEqual(correos.espera_reintento(50), correos.BACKOFF_MAXIMO)
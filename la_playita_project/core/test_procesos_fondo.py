@@ -0,0 +1,38 @@
+"""
+Tests para el planificador de procesos de fondo (core/procesos_fondo.py)
+"""
+import threading
+from datetime import datetime
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from . import procesos_fondo
+
+
+class ProcesosFondoTest(SimpleTestCase):
+
+    def test_las_diarias_esperan_a_su_hora(self):
+        antes = timezone.make_aware(datetime(2026, 3, 10, 1, 30))
+        despues = timezone.make_aware(datetime(2026, 3, 10, 4, 0))
+
+        self.assertEqual(procesos_fondo.segundos_hasta_diaria(antes, hora=3), 90 * 60)
+        self.assertEqual(procesos_fondo.segundos_hasta_diaria(despues, hora=3), 23 * 60 * 60)
+
+    @mock.patch.object(procesos_fondo, 'call_command')
+    def test_un_error_no_detiene_la_tarea(self, call_command):
+        detener = threading.Event()
+
+        def pasada(comando):
+            if call_command.call_count == 1:
+                raise RuntimeError('SMTP caído')
+            detener.set()
+        call_command.side_effect = pasada
+
+        with self.assertLogs('core.procesos_fondo', level='ERROR'):
+            hilos = procesos_fondo.iniciar(detener, [('enviar_correos', 0.01)])
+            hilos[0].join(timeout=5)
+
+        self.assertFalse(hilos[0].is_alive())
+        self.assertEqual(call_command.call_count, 2)
@@ -5,7 +5,9 @@ from rest_framework.permissions import IsAuthenticated
 from django.db import connection
 from django.db.models import Q, Sum, F, Count
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from datetime import date, timedelta
+from core.cache_respuestas import INVENTARIO, VENTAS, cache_respuesta
 from .models import (
     Categoria, Producto, Lote, MovimientoInventario,
     AjusteInventario, DescarteProducto, AlertaInventario,
@@ -20,6 +22,24 @@ from .serializers import (
     ValorizacionInventarioSerializer, ConfiguracionAlertaSerializer,
     TasaIVASerializer, DashboardInventarioSerializer, KardexProductoSerializer
 )
+from .busqueda import buscar_ids, ordenar_por_relevancia
+
+
+class BusquedaProductoFilter(filters.SearchFilter):
+    """
+    SearchFilter sobre el índice de búsqueda de productos en lugar de
+    ``LIKE '%q%'``. Sin ``?ordering=`` los resultados quedan por relevancia,
+    por eso debe ir después de OrderingFilter en ``filter_backends``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        consulta = request.query_params.get(self.search_param, '')
+        if not consulta.strip():
+            return queryset
+        ids = buscar_ids(consulta, productos=queryset)
+        if request.query_params.get('ordering'):
+            return queryset.filter(pk__in=ids)
+        return ordenar_por_relevancia(queryset, ids)
 
 
 class CategoriaViewSet(viewsets.ModelViewSet):
@@ -45,7 +65,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
 class ProductoViewSet(viewsets.ModelViewSet):
     queryset = Producto.objects.filter(estado='activo').select_related('categoria', 'tasa_iva')
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaProductoFilter]
     search_fields = ['nombre', 'codigo_barras', 'descripcion']
     ordering_fields = ['nombre', 'stock_actual', 'precio_unitario', 'costo_promedio']
     ordering = ['nombre']
@@ -446,6 +466,7 @@ class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     
     @action(detail=False, methods=['get'])
+    @method_decorator(cache_respuesta('dashboard_inventario', grupos=(INVENTARIO,)))
     def inventario(self, request):
         """Retorna KPIs del dashboard de inventario"""
         with connection.cursor() as cursor:
@@ -547,6 +568,7 @@ from decimal import Decimal
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_respuesta('dashboard_stats', grupos=(INVENTARIO,))
 def dashboard_stats(request):
     """
     Estadísticas principales del dashboard
@@ -664,6 +686,7 @@ def stock_disponible(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_respuesta('productos_obsoletos', grupos=(VENTAS, INVENTARIO))
 def productos_obsoletos(request):
     """
     Consulta la vista v_productos_obsoletos
@@ -693,6 +716,7 @@ def productos_obsoletos(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_respuesta('resumen_alertas', grupos=(INVENTARIO,))
 def resumen_alertas_view(request):
     """
     Consulta la vista v_resumen_alertas
@@ -0,0 +1,182 @@
+"""
+Búsqueda de productos sobre un índice invertido (tabla producto_termino_busqueda).
+
+Cada producto se indexa como:
+
+- palabras normalizadas (minúsculas, sin tildes) del nombre, la descripción
+  y los códigos, que se buscan por prefijo (``LIKE 'abc%'`` usa el índice);
+- trigramas de las palabras del nombre, para encontrar "cola" dentro de
+  "cocacola" o tolerar errores de digitación cuando el prefijo no alcanza.
+
+Las consultas son de rango sobre el índice (tipo, termino, producto) y siempre
+devuelven como máximo ``PRODUCTO_BUSQUEDA_LIMITE_MAXIMO`` resultados, así que la
+latencia no crece con el tamaño del catálogo como el ``icontains`` anterior.
+"""
+import math
+import re
+import unicodedata
+from functools import reduce
+from operator import add, or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Value, When
+
+from .models import Producto, TerminoBusquedaProducto
+
+LIMITE = getattr(settings, 'PRODUCTO_BUSQUEDA_LIMITE', 20)
+LIMITE_MAXIMO = getattr(settings, 'PRODUCTO_BUSQUEDA_LIMITE_MAXIMO', 50)
+
+# Peso de cada campo en el ranking
+PESO_CODIGO = 5
+PESO_NOMBRE = 3
+PESO_DESCRIPCION = 1
+BONO_PALABRA_EXACTA = 2
+
+# Fracción mínima de trigramas de la consulta que debe compartir un producto
+SIMILITUD_TRIGRAMAS = 0.5
+MAX_PALABRAS_CONSULTA = 5
+
+
+def normalizar(texto):
+    """'Café Águila 500g' -> ['cafe', 'aguila', '500g']"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return [palabra[:50] for palabra in re.findall(r'[a-z0-9]+', texto)]
+
+
+def trigramas(palabra):
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+def terminos_producto(producto):
+    """
+    Términos del índice para un producto.
+
+    Returns:
+        dict: {(termino, tipo): peso}
+    """
+    terminos = {}
+
+    def agregar(termino, tipo, peso):
+        clave = (termino, tipo)
+        terminos[clave] = max(peso, terminos.get(clave, 0))
+
+    for palabra in normalizar(producto.descripcion):
+        agregar(palabra, 'palabra', PESO_DESCRIPCION)
+    for palabra in normalizar(producto.nombre):
+        agregar(palabra, 'palabra', PESO_NOMBRE)
+        for trigrama in trigramas(palabra):
+            agregar(trigrama, 'trigrama', 1)
+    for codigo in (producto.codigo_barras, producto.sku_alternativo):
+        for palabra in normalizar(codigo):
+            agregar(palabra, 'palabra', PESO_CODIGO)
+    return terminos
+
+
+@transaction.atomic
+def indexar_productos(productos):
+    """Reemplaza los términos de los productos indicados (2 consultas por llamada)."""
+    productos = list(productos)
+    if not productos:
+        return 0
+    TerminoBusquedaProducto.objects.filter(producto_id__in=[p.id for p in productos]).delete()
+    nuevos = TerminoBusquedaProducto.objects.bulk_create([
+        TerminoBusquedaProducto(producto_id=producto.id, termino=termino, tipo=tipo, peso=peso)
+        for producto in productos
+        for (termino, tipo), peso in terminos_producto(producto).items()
+    ], batch_size=1000)
+    return len(nuevos)
+
+
+def _filtrar_productos(terminos, productos):
+    if productos is not None:
+        terminos = terminos.filter(producto__in=productos.values('pk'))
+    return terminos
+
+
+def _buscar_por_prefijo(palabras, productos, limite):
+    """Productos que tienen todas las palabras de la consulta como prefijo de algún término."""
+    def coincide(palabra):
+        # Una sola letra solo coincide exacta, para no recorrer medio índice
+        return Q(termino=palabra) if len(palabra) == 1 else Q(termino__startswith=palabra)
+
+    terminos = TerminoBusquedaProducto.objects.filter(tipo='palabra').filter(
+        reduce(or_, (coincide(palabra) for palabra in palabras))
+    )
+    puntajes = {
+        f'p{i}': Max(Case(
+            When(termino=palabra, then=F('peso') + BONO_PALABRA_EXACTA),
+            When(coincide(palabra), then=F('peso')),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for i, palabra in enumerate(palabras)
+    }
+    filas = (
+        _filtrar_productos(terminos, productos)
+        .values('producto_id')
+        .annotate(**puntajes)
+        .filter(**{f'{nombre}__gt': 0 for nombre in puntajes})
+        .annotate(puntaje=reduce(add, (F(nombre) for nombre in puntajes)))
+        .order_by('-puntaje', 'producto__nombre')[:limite]
+    )
+    return [fila['producto_id'] for fila in filas]
+
+
+def _buscar_por_trigramas(palabras, productos, limite, excluir):
+    consulta = set().union(*(trigramas(palabra) for palabra in palabras))
+    if not consulta:
+        return []
+    minimo = math.ceil(len(consulta) * SIMILITUD_TRIGRAMAS)
+    filas = (
+        _filtrar_productos(
+            TerminoBusquedaProducto.objects.filter(tipo='trigrama', termino__in=consulta), productos
+        )
+        .exclude(producto_id__in=excluir)
+        .values('producto_id')
+        .annotate(coincidencias=Count('termino'))
+        .filter(coincidencias__gte=minimo)
+        .order_by('-coincidencias', 'producto__nombre')[:limite]
+    )
+    return [fila['producto_id'] for fila in filas]
+
+
+def buscar_ids(consulta, productos=None, limite=None):
+    """
+    Busca productos y los devuelve ordenados por relevancia.
+
+    Args:
+        consulta (str): texto escrito por el usuario.
+        productos (QuerySet): restringe la búsqueda (p. ej. solo con stock).
+        limite (int): máximo de resultados, acotado a ``LIMITE_MAXIMO``.
+
+    Returns:
+        list: ids de Producto, el más relevante primero.
+    """
+    palabras = normalizar(consulta)[:MAX_PALABRAS_CONSULTA]
+    if not palabras:
+        return []
+    limite = min(limite or LIMITE, LIMITE_MAXIMO)
+
+    ids = _buscar_por_prefijo(palabras, productos, limite)
+    if len(ids) < limite:
+        ids += _buscar_por_trigramas(palabras, productos, limite - len(ids), ids)
+    return ids
+
+
+def buscar_productos(consulta, productos=None, limite=None):
+    """Como ``buscar_ids`` pero devuelve las instancias de Producto en orden."""
+    ids = buscar_ids(consulta, productos, limite)
+    encontrados = (productos if productos is not None else Producto.objects.all()).in_bulk(ids)
+    return [encontrados[pk] for pk in ids if pk in encontrados]
+
+
+def ordenar_por_relevancia(queryset, ids):
+    """Filtra un queryset a ``ids`` conservando el orden de la búsqueda."""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*[When(pk=pk, then=Value(posicion)) for posicion, pk in enumerate(ids)],
+             output_field=IntegerField())
+    )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from inventory.busqueda import indexar_productos
+from inventory.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de productos (producto_termino_busqueda).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-lote', type=int, default=500,
+                            help='Productos indexados por transacción')
+
+    def handle(self, *args, **options):
+        tamano = options['tamano_lote']
+        productos = Producto.objects.only('id', 'nombre', 'descripcion', 'codigo_barras', 'sku_alternativo').order_by('id')
+        total = productos.count()
+        self.stdout.write(f'Indexando {total} productos...')
+
+        indexados = terminos = 0
+        ultimo_id = 0
+        while True:
+            lote = list(productos.filter(id__gt=ultimo_id)[:tamano])
+            if not lote:
+                break
+            terminos += indexar_productos(lote)
+            indexados += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f'  - {indexados}/{total}')
+
+        self.stdout.write(self.style.SUCCESS(f'Índice reconstruido: {indexados} productos, {terminos} términos.'))
@@ -0,0 +1,17 @@
+# Índice para la asignación FEFO de lotes en el checkout del POS
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_ajusteinventario_alertainventario_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS idx_lote_fefo ON lote (producto_id, fecha_caducidad, id);",
+            reverse_sql="DROP INDEX IF EXISTS idx_lote_fefo ON lote;"
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_lote_fefo_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusquedaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(help_text='Texto normalizado: minúsculas y sin tildes', max_length=50)),
+                ('tipo', models.CharField(choices=[('palabra', 'Palabra'), ('trigrama', 'Trigrama')], max_length=10)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='inventory.producto')),
+            ],
+            options={
+                'db_table': 'producto_termino_busqueda',
+                'indexes': [models.Index(fields=['tipo', 'termino', 'producto'], name='idx_termino_busqueda')],
+            },
+        ),
+    ]
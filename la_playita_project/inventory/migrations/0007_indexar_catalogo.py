@@ -0,0 +1,80 @@
+# Llena producto_termino_busqueda con el catálogo existente (lo mismo que
+# reindexar_busqueda_productos), para que la búsqueda del POS funcione desde
+# el deploy.
+#
+# No usa inventory.busqueda: el tokenizador queda congelado aquí tal como era
+# al crear la tabla, así que cambiarlo después no cambia lo que hace esta
+# migración (para reindexar con el nuevo, reindexar_busqueda_productos).
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+TAMANO_LOTE = 500
+PESO_CODIGO = 5
+PESO_NOMBRE = 3
+PESO_DESCRIPCION = 1
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return [palabra[:50] for palabra in re.findall(r'[a-z0-9]+', texto)]
+
+
+def _trigramas(palabra):
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+def terminos_producto(producto):
+    """{(termino, tipo): peso} de un producto."""
+    terminos = {}
+
+    def agregar(termino, tipo, peso):
+        clave = (termino, tipo)
+        terminos[clave] = max(peso, terminos.get(clave, 0))
+
+    for palabra in _normalizar(producto.descripcion):
+        agregar(palabra, 'palabra', PESO_DESCRIPCION)
+    for palabra in _normalizar(producto.nombre):
+        agregar(palabra, 'palabra', PESO_NOMBRE)
+        for trigrama in _trigramas(palabra):
+            agregar(trigrama, 'trigrama', 1)
+    for codigo in (producto.codigo_barras, producto.sku_alternativo):
+        for palabra in _normalizar(codigo):
+            agregar(palabra, 'palabra', PESO_CODIGO)
+    return terminos
+
+
+def indexar_catalogo(apps, schema_editor):
+    """Indexa todos los productos por lotes de ``TAMANO_LOTE``."""
+    Producto = apps.get_model('inventory', 'Producto')
+    if Producto._meta.db_table not in schema_editor.connection.introspection.table_names():
+        return  # base nueva sin la tabla heredada producto: no hay catálogo que indexar
+    TerminoBusquedaProducto = apps.get_model('inventory', 'TerminoBusquedaProducto')
+    productos = Producto.objects.only('id', 'nombre', 'descripcion', 'codigo_barras', 'sku_alternativo').order_by('id')
+
+    ultimo_id = 0
+    while True:
+        lote = list(productos.filter(id__gt=ultimo_id)[:TAMANO_LOTE])
+        if not lote:
+            break
+        TerminoBusquedaProducto.objects.filter(producto_id__in=[p.id for p in lote]).delete()
+        TerminoBusquedaProducto.objects.bulk_create([
+            TerminoBusquedaProducto(producto_id=producto.id, termino=termino, tipo=tipo, peso=peso)
+            for producto in lote
+            for (termino, tipo), peso in terminos_producto(producto).items()
+        ], batch_size=1000)
+        ultimo_id = lote[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_termino_busqueda_producto'),
+    ]
+
+    operations = [
+        migrations.RunPython(indexar_catalogo, migrations.RunPython.noop),
+    ]
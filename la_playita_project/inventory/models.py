@@ -719,3 +719,28 @@ class RotacionInventario(models.Model):
         managed = False
         unique_together = (('producto', 'periodo'),)
         ordering = ['-periodo', 'producto__nombre']
+
+
+class TerminoBusquedaProducto(models.Model):
+    """
+    Índice invertido para la búsqueda de productos (ver inventory/busqueda.py).
+    Se mantiene desde las señales de Producto; no se edita a mano.
+    """
+    TIPO_CHOICES = [
+        ('palabra', 'Palabra'),
+        ('trigrama', 'Trigrama'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='terminos_busqueda')
+    termino = models.CharField(max_length=50, help_text="Texto normalizado: minúsculas y sin tildes")
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    peso = models.PositiveSmallIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.termino} ({self.tipo}) -> {self.producto_id}"
+
+    class Meta:
+        db_table = 'producto_termino_busqueda'
+        indexes = [
+            models.Index(fields=['tipo', 'termino', 'producto'], name='idx_termino_busqueda'),
+        ]
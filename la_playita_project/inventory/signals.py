@@ -8,4 +8,15 @@ def actualizar_stock_producto_on_lote_delete(sender, instance, **kwargs):
 
 @receiver(post_save, sender=Lote)
 def actualizar_stock_producto_on_lote_save(sender, instance, created, **kwargs):
-    """
\ No newline at end of file
+    """
+
+CAMPOS_BUSQUEDA = {'nombre', 'descripcion', 'codigo_barras', 'sku_alternativo'}
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto_para_busqueda(sender, instance, update_fields=None, **kwargs):
+    """Mantiene al día los términos de búsqueda del producto."""
+    if update_fields and not CAMPOS_BUSQUEDA.intersection(update_fields):
+        return
+    from .busqueda import indexar_productos
+    indexar_productos([instance])
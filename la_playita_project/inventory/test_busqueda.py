@@ -0,0 +1,100 @@
+"""
+Tests para el índice de búsqueda de productos (inventory/busqueda.py)
+"""
+import importlib
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import Rol
+from .busqueda import LIMITE_MAXIMO, buscar_ids, normalizar
+from .models import Categoria, Producto, TerminoBusquedaProducto
+
+Usuario = get_user_model()
+
+
+class BusquedaProductosTest(TestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+
+    def crear_producto(self, nombre, **kwargs):
+        return Producto.objects.create(
+            nombre=nombre, precio_unitario=Decimal('2500.00'), categoria=self.categoria, **kwargs
+        )
+
+    def test_normaliza_tildes_y_mayusculas(self):
+        self.assertEqual(normalizar('Café ÁGUILA 500g'), ['cafe', 'aguila', '500g'])
+
+    def test_indexa_al_guardar_y_reindexa_al_renombrar(self):
+        producto = self.crear_producto('Jugo de Mora')
+        self.assertTrue(TerminoBusquedaProducto.objects.filter(producto=producto, termino='mora').exists())
+
+        producto.nombre = 'Jugo de Lulo'
+        producto.save()
+        self.assertEqual(buscar_ids('mora'), [])
+        self.assertEqual(buscar_ids('lulo'), [producto.id])
+
+    def test_prefijo_sin_tildes(self):
+        cafe = self.crear_producto('Café Águila')
+        self.crear_producto('Chocolate')
+        self.assertEqual(buscar_ids('cafe agu'), [cafe.id])
+        self.assertEqual(buscar_ids('CAFÉ'), [cafe.id])
+
+    def test_nombre_pesa_mas_que_descripcion(self):
+        en_descripcion = self.crear_producto('Malta', descripcion='Bebida sabor a limón')
+        en_nombre = self.crear_producto('Limonada natural')
+        self.assertEqual(buscar_ids('limon'), [en_nombre.id, en_descripcion.id])
+
+    def test_por_codigo_de_barras(self):
+        producto = self.crear_producto('Agua 600ml', codigo_barras='7702001')
+        self.assertEqual(buscar_ids('7702001'), [producto.id])
+
+    def test_trigramas_encuentran_subcadenas_y_errores(self):
+        producto = self.crear_producto('Cocacola 1.5L')
+        self.assertEqual(buscar_ids('cola'), [producto.id])
+        self.assertEqual(buscar_ids('cocacolla'), [producto.id])
+
+    def test_limite_y_consultas_constantes(self):
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Gaseosa {i}', precio_unitario=Decimal('1.00'), categoria=self.categoria)
+            for i in range(LIMITE_MAXIMO + 10)
+        ])
+        from .busqueda import indexar_productos
+        indexar_productos(Producto.objects.all())
+
+        with CaptureQueriesContext(connection) as consultas:
+            ids = buscar_ids('gaseosa', limite=1000)
+        self.assertEqual(len(ids), LIMITE_MAXIMO)
+        self.assertEqual(len(consultas), 1)
+
+    def test_migracion_indexa_el_catalogo_existente(self):
+        producto = self.crear_producto('Jugo de Mora')
+        TerminoBusquedaProducto.objects.all().delete()
+
+        migracion = importlib.import_module('inventory.migrations.0007_indexar_catalogo')
+        migracion.indexar_catalogo(apps, connection.schema_editor())
+
+        self.assertEqual(buscar_ids('mora'), [producto.id])
+
+    def test_api_productos_usa_el_indice(self):
+        rol = Rol.objects.create(nombre='Administrador')
+        usuario = Usuario.objects.create_user(
+            username='33333333', password='testpass123', first_name='Admin',
+            last_name='Inventario', email='admin@test.com', rol=rol
+        )
+        producto = self.crear_producto('Néctar de Durazno')
+        self.crear_producto('Agua con gas')
+
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        respuesta = cliente.get('/api/inventory/productos/', {'search': 'nectar'})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        resultados = datos['results'] if isinstance(datos, dict) else datos
+        self.assertEqual([p['id'] for p in resultados], [producto.id])
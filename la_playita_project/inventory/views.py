@@ -1,3 +1,4 @@
+import itertools
 import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
@@ -10,14 +11,13 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
 from datetime import datetime
 
 from .models import Producto, Lote, Categoria, MovimientoInventario, TasaIVA
 from suppliers.models import Proveedor
 from .forms import ProductoForm, LoteForm, CategoriaForm
 from users.decorators import check_user_role
+from reportes import consultas, trabajos, xlsx
 
 # ----------------------------------------------
 # Vistas Modernas de Inventario
@@ -246,88 +246,81 @@ def reportes(request):
     """Vista de reportes de inventario"""
     return render(request, 'inventory/reportes.html')
 
+def _estado_stock(stock_actual, stock_minimo):
+    """Estado de stock (basado en la lógica del modelo)"""
+    if stock_actual <= 0:
+        return 'SIN_STOCK'
+    elif stock_actual < stock_minimo:
+        return 'STOCK_CRITICO'
+    elif stock_actual < (stock_minimo * 1.5):
+        return 'STOCK_BAJO'
+    return 'NORMAL'
+
+
+def exportar_productos(parametros):
+    """
+    Excel de productos activos con los filtros ``search`` y ``categoria``.
+    Lo genera el worker de reportes (reportes/trabajos.py) por bloques.
+    """
+    # Obtener productos
+    productos = Producto.objects.filter(estado='activo')
+
+    # Aplicar filtros si existen
+    search = parametros.get('search')
+    if search:
+        productos = productos.filter(nombre__icontains=search)
+
+    categoria = parametros.get('categoria')
+    if categoria:
+        productos = productos.filter(categoria_id=categoria)
+
+    filas = consultas.recorrer_por_id(
+        productos, 'id', 'nombre', 'descripcion', 'categoria__nombre', 'codigo_barras',
+        'stock_actual', 'stock_minimo', 'precio_unitario', 'costo_promedio', 'estado',
+    )
+
+    # Encabezados simples
+    headers = [
+        'ID', 'Nombre', 'Descripción', 'Categoría', 'Código de Barras',
+        'Stock Actual', 'Stock Mínimo', 'Precio Unitario', 'Costo Promedio',
+        'Valor Inventario', 'Estado Stock', 'Estado'
+    ]
+
+    libro = xlsx.LibroStreaming()
+    libro.hoja('Productos', itertools.chain([headers], (
+        [
+            producto_id,
+            nombre,
+            descripcion or '',
+            categoria_nombre or '',
+            codigo_barras or '',
+            stock_actual,
+            stock_minimo,
+            float(precio_unitario),
+            float(costo_promedio),
+            float(stock_actual) * float(costo_promedio),
+            _estado_stock(stock_actual, stock_minimo),
+            estado,
+        ]
+        for (producto_id, nombre, descripcion, categoria_nombre, codigo_barras,
+             stock_actual, stock_minimo, precio_unitario, costo_promedio, estado) in filas
+    )))
+    filename = f'productos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    return filename, libro.CONTENT_TYPE, libro.generar()
+
+
 @login_required
 @check_user_role(allowed_roles=['Administrador', 'Vendedor'])
 def exportar_productos_excel(request):
-    """Exportar productos a Excel"""
+    """Exportar productos a Excel: se genera en segundo plano y la pantalla consulta el estado"""
     try:
-        # Crear workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Productos"
-        
-        # Encabezados simples
-        headers = [
-            'ID', 'Nombre', 'Descripción', 'Categoría', 'Código de Barras',
-            'Stock Actual', 'Stock Mínimo', 'Precio Unitario', 'Costo Promedio',
-            'Valor Inventario', 'Estado Stock', 'Estado'
-        ]
-        
-        # Escribir encabezados
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Obtener productos
-        productos = Producto.objects.select_related('categoria').filter(estado='activo')
-        
-        # Aplicar filtros si existen
-        search = request.GET.get('search')
-        if search:
-            productos = productos.filter(nombre__icontains=search)
-        
-        categoria = request.GET.get('categoria')
-        if categoria:
-            productos = productos.filter(categoria_id=categoria)
-        
-        # Escribir datos
-        for row, producto in enumerate(productos, 2):
-            # Calcular estado de stock (basado en la lógica del modelo)
-            if producto.stock_actual <= 0:
-                estado_stock = 'SIN_STOCK'
-            elif producto.stock_actual < producto.stock_minimo:
-                estado_stock = 'STOCK_CRITICO'
-            elif producto.stock_actual < (producto.stock_minimo * 1.5):
-                estado_stock = 'STOCK_BAJO'
-            else:
-                estado_stock = 'NORMAL'
-            
-            # Calcular valor inventario
-            valor_inventario = float(producto.stock_actual) * float(producto.costo_promedio)
-            
-            data = [
-                producto.id,
-                producto.nombre,
-                producto.descripcion or '',
-                producto.categoria.nombre if producto.categoria else '',
-                producto.codigo_barras or '',
-                producto.stock_actual,
-                producto.stock_minimo,
-                float(producto.precio_unitario),
-                float(producto.costo_promedio),
-                valor_inventario,
-                estado_stock,
-                producto.estado
-            ]
-            
-            for col, value in enumerate(data, 1):
-                ws.cell(row=row, column=col, value=value)
-        
-        # Preparar respuesta
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-        filename = f'productos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Guardar workbook
-        wb.save(response)
-        
-        return response
-        
+        return trabajos.responder(request, 'productos', {
+            'search': request.GET.get('search', ''),
+            'categoria': request.GET.get('categoria', ''),
+        }, roles=['Administrador', 'Vendedor'])
     except Exception as e:
         # En caso de error, devolver JSON con el error
         return JsonResponse({
             'error': True,
             'message': f'Error al generar Excel: {str(e)}'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
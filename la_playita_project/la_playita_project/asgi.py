@@ -1,7 +1,14 @@
 """
 ASGI config for la_playita_project project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+The site is served by the WSGI app (``la_playita_project.wsgi``). This module
+backs a separate, small ASGI process that only answers the table board stream
+(``/pos/api/mesas/eventos/``, see pos/tablero.py), so those long-lived
+connections do not tie up gunicorn's sync workers. ``procesos_fondo.sh``
+starts it with uvicorn on ``EVENTOS_ASGI_PUERTO`` (8001 by default); the proxy
+in front of the app must route that path to it. Any other path gets a 404
+here, and if the stream reaches the WSGI app instead it answers 204 and the
+board is fetched when the modal opens.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +16,23 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'la_playita_project.settings')
+# settings.py turns off persistent database connections for this process
+os.environ.setdefault('SERVIDOR_ASGI', '1')
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+
+django_application = get_asgi_application()
+
+RUTA_EVENTOS = '/pos/api/mesas/eventos/'
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    """Only the table board stream reaches Django; anything else is a 404."""
+    if scope['type'] == 'http' and scope['path'] == RUTA_EVENTOS:
+        await django_application(scope, receive, send)
+        return
+    if scope['type'] == 'http':
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
@@ -116,7 +116,9 @@ if os.environ.get("DATABASE_URL"):
     DATABASES = {
         "default": dj_database_url.config(
             default=os.environ["DATABASE_URL"],
-            conn_max_age=600,
+            # El proceso ASGI de eventos (la_playita_project/asgi.py) atiende
+            # cada petición en otro hilo: ahí no se reutilizarían
+            conn_max_age=0 if os.environ.get("SERVIDOR_ASGI") else 600,
             conn_health_checks=True,
         )
     }
@@ -133,6 +135,54 @@ else:
     }
 
 
+# =======================
+# Caché
+# =======================
+# El backend se elige solo con variables de entorno:
+# REDIS_URL: Redis compartido por todos los workers (requiere el paquete redis)
+# CACHE_DIR: caché en archivos en esa carpeta, compartida por los workers del
+#            mismo contenedor (sin incr atómico entre procesos)
+# Sin ninguna de las dos, memoria local de cada proceso (sin caché de respuestas).
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": "laplayita",
+        }
+    }
+elif os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "laplayita",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Solo Redis es a la vez compartido por todos los procesos y atómico en incr/add
+# (el catálogo de 24 h del POS y los ids de eventos del tablero de mesas lo necesitan)
+CACHE_COMPARTIDA = CACHES["default"]["BACKEND"].endswith("RedisCache")
+
+# La caché de respuestas (core/cache_respuestas.py) y la foto del reporte de
+# inventario se invalidan subiendo una versión en la caché. Con memoria local
+# cada worker de gunicorn y cada proceso de fondo tiene la suya y no vería la
+# invalidación de los demás: en ese caso quedan desactivadas.
+CACHE_RESPUESTAS_ACTIVA = not CACHES["default"]["BACKEND"].endswith("LocMemCache")
+
+# TTL (segundos) por endpoint para core/cache_respuestas.py, p. ej. {"dashboard_stats": 30}
+CACHE_TTL_ENDPOINTS = {}
+
+
 # =======================
 # Autenticación
 # =======================
@@ -0,0 +1,152 @@
+"""
+Catálogo del POS precalculado en la caché compartida (``CACHE_COMPARTIDA``).
+
+El catálogo (categorías con productos en stock y sus precios) se guarda por
+partes en la caché de Django:
+
+- ``pos:catalogo:categorias``: las categorías con su conteo de productos;
+- ``pos:catalogo:categoria:<id>``: los productos en stock de cada categoría;
+- ``pos:catalogo:version``: un contador que cambia con cada invalidación y
+  sirve como ETag del documento JSON.
+
+Cuando un producto cambia de precio, de categoría o su stock pasa por cero
+solo se descartan las categorías afectadas; el resto del catálogo se sigue
+sirviendo desde la caché y se regenera únicamente lo que falta.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from inventory.models import Categoria, Producto
+
+CLAVE_VERSION = 'pos:catalogo:version'
+CLAVE_CATEGORIAS = 'pos:catalogo:categorias'
+CLAVE_CATEGORIA = 'pos:catalogo:categoria:{}'
+# Sin Redis (CACHE_COMPARTIDA False: memoria local o archivos) las
+# invalidaciones no llegan a todos los procesos: las partes duran
+# solo unos segundos para que un producto agotado o repuesto no quede mal.
+if getattr(settings, 'CACHE_COMPARTIDA', False):
+    TIMEOUT = getattr(settings, 'POS_CATALOGO_TIMEOUT', 60 * 60 * 24)
+else:
+    TIMEOUT = getattr(settings, 'POS_CATALOGO_TIMEOUT_LOCAL', 15)
+
+
+def version():
+    # Si la caché se vació, la nueva versión no coincide con ETags anteriores
+    cache.add(CLAVE_VERSION, int(time.time()), timeout=None)
+    return cache.get(CLAVE_VERSION)
+
+
+def etag(request=None):
+    if getattr(settings, 'CACHE_COMPARTIDA', False):
+        return f'catalogo-{version()}'
+    # Sin caché compartida la versión de este worker no ve las invalidaciones
+    # de los demás: el ETag cambia al menos cada TIMEOUT segundos
+    return f'catalogo-{version()}-{int(time.time()) // TIMEOUT}'
+
+
+def _nueva_version():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, int(time.time()), timeout=None)
+
+
+def categorias():
+    """Categorías con al menos un producto en stock, con su conteo."""
+    datos = cache.get(CLAVE_CATEGORIAS)
+    if datos is None:
+        datos = list(
+            Categoria.objects.annotate(
+                total_productos=Count('producto', filter=Q(producto__stock_actual__gt=0))
+            ).filter(total_productos__gt=0).order_by('nombre').values('id', 'nombre', 'total_productos')
+        )
+        cache.set(CLAVE_CATEGORIAS, datos, TIMEOUT)
+    return datos
+
+
+def _productos_por_categoria(categoria_ids):
+    productos = defaultdict(list)
+    for p in (Producto.objects
+              .filter(categoria_id__in=categoria_ids, stock_actual__gt=0)
+              .order_by('nombre')
+              .values('id', 'nombre', 'descripcion', 'precio_unitario', 'categoria_id', 'codigo_barras')):
+        productos[p['categoria_id']].append({
+            'id': p['id'],
+            'nombre': p['nombre'],
+            'descripcion': p['descripcion'] or '',
+            'precio': str(p['precio_unitario']),
+            'codigo_barras': p['codigo_barras'],
+        })
+    return productos
+
+
+def catalogo():
+    """
+    Documento completo del catálogo. Las categorías que siguen en caché no
+    se consultan; las que faltan se regeneran con una sola consulta.
+    """
+    version_actual = version()
+    indice = categorias()
+    claves = {CLAVE_CATEGORIA.format(c['id']): c['id'] for c in indice}
+    en_cache = cache.get_many(claves.keys())
+
+    faltantes = [categoria_id for clave, categoria_id in claves.items() if clave not in en_cache]
+    if faltantes:
+        nuevos = _productos_por_categoria(faltantes)
+        regenerados = {CLAVE_CATEGORIA.format(c): nuevos.get(c, []) for c in faltantes}
+        cache.set_many(regenerados, TIMEOUT)
+        en_cache.update(regenerados)
+
+    return {
+        'version': version_actual,
+        'generado': timezone.now().isoformat(),
+        'categorias': [
+            dict(categoria, productos=en_cache[CLAVE_CATEGORIA.format(categoria['id'])])
+            for categoria in indice
+        ],
+    }
+
+
+def invalidar_categorias(categoria_ids):
+    """Descarta las categorías indicadas (y el índice, cuyos conteos cambian)."""
+    categoria_ids = {c for c in categoria_ids if c is not None}
+    if not categoria_ids:
+        return
+    cache.delete_many([CLAVE_CATEGORIAS] + [CLAVE_CATEGORIA.format(c) for c in categoria_ids])
+    _nueva_version()
+
+
+def invalidar_al_confirmar(categoria_ids):
+    categoria_ids = set(categoria_ids)
+    transaction.on_commit(lambda: invalidar_categorias(categoria_ids))
+
+
+def invalidar_agotados(productos, vendido):
+    """
+    Tras una venta, invalida las categorías de los productos que se quedaron
+    sin stock.
+
+    Args:
+        productos (dict): {producto_id: Producto} leídos antes de descontar.
+        vendido (dict): {producto_id: cantidad vendida}
+    """
+    agotados = [
+        productos[producto_id].categoria_id
+        for producto_id, cantidad in vendido.items()
+        if productos[producto_id].stock_actual <= cantidad
+    ]
+    if agotados:
+        invalidar_al_confirmar(agotados)
+
+
+def vendido_por_producto(lineas):
+    vendido = defaultdict(int)
+    for linea in lineas:
+        vendido[linea['producto_id']] += linea['cantidad']
+    return vendido
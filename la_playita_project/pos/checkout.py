@@ -0,0 +1,323 @@
+"""
+Motor de checkout del POS.
+
+Registra una venta completa (venta, pago, detalles, movimientos de inventario
+y descuento de lotes) con un número fijo de consultas, sin importar cuántas
+líneas tenga el ticket.
+"""
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, ExpressionWrapper, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+
+from inventory.models import Lote, MovimientoInventario, Producto
+from . import catalogo, resumen
+from .models import Pago, Venta, VentaDetalle
+
+
+# Constante: 5.5 puntos por cada $66,000 pesos
+PUNTOS_POR_COMPRA = Decimal('5.5')
+VALOR_BASE_PUNTOS = Decimal('66000')
+CONSUMIDOR_FINAL_ID = 1
+
+
+class StockInsuficiente(ValueError):
+    """Algún lote no alcanza para lo solicitado (o se agotó mientras se vendía)."""
+
+
+def normalizar_items(cart_items):
+    """
+    Convierte los items del carrito recibidos por JSON en líneas de venta.
+
+    ``lote_id`` y ``precio`` son opcionales: sin lote, el servidor asigna los
+    lotes por FEFO; sin precio, se usa el precio actual del producto.
+
+    Returns:
+        list: [{'producto_id': int, 'lote_id': int|None, 'cantidad': int, 'precio': Decimal|None}]
+    """
+    lineas = []
+    for item in cart_items:
+        cantidad = int(item['cantidad'])
+        if cantidad <= 0:
+            raise ValueError('La cantidad de cada producto debe ser mayor a cero.')
+        lineas.append({
+            'producto_id': int(item['producto_id']),
+            'lote_id': int(item['lote_id']) if item.get('lote_id') else None,
+            'cantidad': cantidad,
+            'precio': Decimal(str(item['precio'])) if item.get('precio') not in (None, '') else None,
+        })
+    return lineas
+
+
+def cargar_productos_y_lotes(lineas):
+    """
+    Trae los productos del ticket y sus lotes con una consulta para cada tabla.
+
+    Los lotes elegidos por el cliente y los candidatos FEFO de las líneas sin
+    lote se bloquean juntos (SELECT ... FOR UPDATE en orden de id, el mismo
+    orden que usa descontar_lotes). Si otra caja agota el lote que vence
+    primero, esta espera su commit y reparte sobre el stock vigente en vez de
+    fallar al descontar.
+    """
+    productos = Producto.objects.in_bulk({linea['producto_id'] for linea in lineas})
+    lote_ids = {linea['lote_id'] for linea in lineas if linea['lote_id']}
+    sin_lote = {linea['producto_id'] for linea in lineas if not linea['lote_id']}
+    condicion = Q(id__in=lote_ids)
+    if sin_lote:
+        condicion |= Q(
+            producto_id__in=sin_lote,
+            cantidad_disponible__gt=0,
+            fecha_caducidad__gte=timezone.localdate(),
+        ) & ~Q(estado__in=['vencido', 'descartado'])
+    lotes = {lote.id: lote for lote in Lote.objects.select_for_update().filter(condicion).order_by('id')}
+
+    for linea in lineas:
+        if linea['producto_id'] not in productos:
+            raise ValueError(f"El producto #{linea['producto_id']} no existe.")
+        if linea['precio'] is None:
+            linea['precio'] = productos[linea['producto_id']].precio_unitario
+        if not linea['lote_id']:
+            continue
+        if linea['lote_id'] not in lotes:
+            raise ValueError(f"El lote #{linea['lote_id']} no existe.")
+        if lotes[linea['lote_id']].producto_id != linea['producto_id']:
+            raise ValueError(
+                f"El lote {lotes[linea['lote_id']].numero_lote} no pertenece a "
+                f"'{productos[linea['producto_id']].nombre}'."
+            )
+    return productos, lotes
+
+
+def lotes_fefo(producto_ids):
+    """
+    Lotes vendibles de los productos indicados, del que vence primero al último.
+    Usa el índice (producto_id, fecha_caducidad, id) de la tabla lote.
+    """
+    return (
+        Lote.objects
+        .filter(
+            producto_id__in=producto_ids,
+            cantidad_disponible__gt=0,
+            fecha_caducidad__gte=timezone.localdate(),
+        )
+        .exclude(estado__in=['vencido', 'descartado'])
+        .order_by('producto_id', 'fecha_caducidad', 'id')
+    )
+
+
+def es_vendible(lote, hoy):
+    """Mismo criterio que ``lotes_fefo``, sobre un lote ya cargado."""
+    return (lote.cantidad_disponible > 0 and lote.fecha_caducidad >= hoy
+            and lote.estado not in ('vencido', 'descartado'))
+
+
+def asignar_lotes_fefo(lineas, productos, lotes):
+    """
+    Reparte las líneas sin lote entre los lotes del producto en orden FEFO
+    (first-expired-first-out). Una línea puede quedar dividida en varios lotes.
+
+    Los candidatos salen de ``lotes``, que ``cargar_productos_y_lotes`` ya
+    trajo bloqueados; aquí solo se ordenan en memoria.
+
+    Returns:
+        list: las líneas, todas con ``lote_id`` asignado.
+    """
+    sin_lote = {linea['producto_id'] for linea in lineas if not linea['lote_id']}
+    if not sin_lote:
+        return lineas
+
+    hoy = timezone.localdate()
+    candidatos = {}
+    for lote in sorted(lotes.values(), key=lambda l: (l.fecha_caducidad, l.id)):
+        if lote.producto_id in sin_lote and es_vendible(lote, hoy):
+            candidatos.setdefault(lote.producto_id, []).append(lote)
+
+    # Lo que ya pidió el cliente explícitamente no se puede volver a asignar
+    restante = {lote.id: lote.cantidad_disponible for lote in lotes.values()}
+    for lote_id, cantidad in cantidades_por_lote([l for l in lineas if l['lote_id']]).items():
+        restante[lote_id] -= cantidad
+
+    asignadas = []
+    for linea in lineas:
+        if linea['lote_id']:
+            asignadas.append(linea)
+        else:
+            asignadas.extend(repartir_linea(linea, candidatos.get(linea['producto_id'], []), restante, productos))
+    return asignadas
+
+
+def repartir_linea(linea, candidatos, restante, productos):
+    """
+    Divide una línea sin lote entre ``candidatos`` (ya en orden FEFO),
+    descontando de ``restante`` ({lote_id: cantidad libre}) lo que toma.
+    """
+    partes = []
+    pendiente = linea['cantidad']
+    for lote in candidatos:
+        if pendiente == 0:
+            break
+        tomar = min(pendiente, restante[lote.id])
+        if tomar <= 0:
+            continue
+        partes.append(dict(linea, lote_id=lote.id, cantidad=tomar))
+        restante[lote.id] -= tomar
+        pendiente -= tomar
+
+    if pendiente:
+        producto = productos[linea['producto_id']]
+        raise StockInsuficiente(
+            f"No hay suficiente stock de '{producto.nombre}'. Solicitado: {linea['cantidad']}, "
+            f"Disponible: {linea['cantidad'] - pendiente}"
+        )
+    return partes
+
+
+def cantidades_por_lote(lineas):
+    """Suma lo solicitado por lote (un mismo lote puede aparecer en varias líneas)."""
+    cantidades = {}
+    for linea in lineas:
+        cantidades[linea['lote_id']] = cantidades.get(linea['lote_id'], 0) + linea['cantidad']
+    return cantidades
+
+
+def validar_stock(lineas, productos, lotes):
+    """Valida en memoria que cada lote alcance para lo solicitado."""
+    for lote_id, cantidad in cantidades_por_lote(lineas).items():
+        lote = lotes[lote_id]
+        if lote.cantidad_disponible < cantidad:
+            producto = productos[lote.producto_id]
+            raise StockInsuficiente(
+                f"No hay suficiente stock de '{producto.nombre}'. Solicitado: {cantidad}, "
+                f"Disponible: {lote.cantidad_disponible} (Lote: {lote.numero_lote})"
+            )
+
+
+def descontar_lotes(cantidades):
+    """
+    Descuenta las cantidades de todos los lotes con un único UPDATE ... CASE
+    condicionado a que cada lote tenga stock suficiente:
+
+        UPDATE lote SET cantidad_disponible = CASE id WHEN .. THEN cantidad_disponible - n .. END
+        WHERE (id = .. AND cantidad_disponible >= n) OR ...
+
+    La resta la hace la base de datos sobre el valor vigente de la fila, así que
+    dos cajas vendiendo del mismo lote no se pisan. Las filas se bloquean en
+    orden de id (recorrido de la llave primaria), de modo que dos checkouts
+    concurrentes siempre toman los bloqueos en el mismo orden.
+
+    Args:
+        cantidades (dict): {lote_id: cantidad a descontar}
+
+    Raises:
+        StockInsuficiente: si algún lote no alcanzó; la transacción debe revertirse.
+    """
+    if not cantidades:
+        return 0
+    condicion = reduce(or_, (
+        Q(id=lote_id, cantidad_disponible__gte=cantidad)
+        for lote_id, cantidad in cantidades.items()
+    ))
+    actualizados = Lote.objects.filter(condicion).update(
+        cantidad_disponible=Case(
+            *[When(id=lote_id, then=ExpressionWrapper(F('cantidad_disponible') - cantidad,
+                                                      output_field=PositiveIntegerField()))
+              for lote_id, cantidad in cantidades.items()],
+            default=F('cantidad_disponible'),
+        )
+    )
+    if actualizados != len(cantidades):
+        agotados = Lote.objects.filter(id__in=cantidades.keys()).select_related('producto')
+        detalle = ', '.join(
+            f"'{lote.producto.nombre}' (Lote: {lote.numero_lote}, Disponible: {lote.cantidad_disponible}, "
+            f"Solicitado: {cantidades[lote.id]})"
+            for lote in agotados if lote.cantidad_disponible < cantidades[lote.id]
+        )
+        raise StockInsuficiente(f'No hay suficiente stock de {detalle or "uno de los productos"}.')
+    return actualizados
+
+
+def registrar_lineas(venta, lineas, productos, lotes, descripcion):
+    """
+    Inserta los detalles de venta y los movimientos de inventario con bulk_create
+    y descuenta los lotes en una sola sentencia.
+
+    Args:
+        descripcion (str): Plantilla del movimiento; recibe ``venta`` y ``producto``.
+    """
+    VentaDetalle.objects.bulk_create([
+        VentaDetalle(
+            venta=venta,
+            producto=productos[linea['producto_id']],
+            lote=lotes[linea['lote_id']],
+            cantidad=linea['cantidad'],
+            subtotal=linea['precio'] * linea['cantidad'],
+        )
+        for linea in lineas
+    ])
+
+    descontar_lotes(cantidades_por_lote(lineas))
+
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(
+            producto=productos[linea['producto_id']],
+            lote=lotes[linea['lote_id']],
+            cantidad=-linea['cantidad'],  # Negativo porque es una salida
+            tipo_movimiento='salida',
+            descripcion=descripcion.format(venta=venta, producto=productos[linea['producto_id']]),
+            venta=venta,
+        )
+        for linea in lineas
+    ])
+
+    # El stock cambió: las fotos de la caché de escaneo quedan desactualizadas
+    from .escaneo import invalidar_al_confirmar
+    invalidar_al_confirmar(productos)
+    catalogo.invalidar_agotados(productos, catalogo.vendido_por_producto(lineas))
+
+
+def calcular_puntos(cliente_id, total_venta):
+    """Puntos de fidelización que gana el cliente por una compra."""
+    if cliente_id == CONSUMIDOR_FINAL_ID:  # No agregar puntos a "Consumidor Final"
+        return Decimal('0')
+    return ((total_venta / VALOR_BASE_PUNTOS) * PUNTOS_POR_COMPRA).quantize(Decimal('0.01'))
+
+
+def registrar_venta(usuario, cliente, canal_venta, metodo_pago, cart_items):
+    """
+    Registra una venta del POS. Debe llamarse dentro de ``transaction.atomic``.
+
+    Cada item necesita ``producto_id`` y ``cantidad``; si no trae ``lote_id``
+    el servidor lo reparte entre los lotes del producto por FEFO.
+
+    Returns:
+        Venta: la venta creada, con ``total_venta`` calculado.
+    """
+    lineas = normalizar_items(cart_items)
+    if not lineas:
+        raise ValueError('El carrito está vacío.')
+
+    productos, lotes = cargar_productos_y_lotes(lineas)
+    lineas = asignar_lotes_fefo(lineas, productos, lotes)
+    validar_stock(lineas, productos, lotes)
+
+    total_venta = sum(linea['precio'] * linea['cantidad'] for linea in lineas)
+
+    venta = Venta.objects.create(
+        cliente=cliente,
+        usuario=usuario,
+        canal_venta=canal_venta,
+        total_venta=total_venta
+    )
+
+    Pago.objects.create(
+        venta=venta,
+        monto=total_venta,
+        metodo_pago=metodo_pago,
+        estado='completado'
+    )
+
+    registrar_lineas(venta, lineas, productos, lotes, 'Venta #{venta.id} - {producto.nombre}')
+    resumen.acumular_ventas([venta.id])
+    return venta
@@ -0,0 +1,72 @@
+"""
+Total de la cuenta de las mesas abiertas.
+
+``Mesa.total_cuenta`` se mantiene con sumas y restas atómicas
+(``F('total_cuenta') + delta``) al agregar o quitar items, en lugar de
+volver a sumar todos los ``ItemMesa`` de la mesa en cada clic. Dos meseros
+sobre la misma mesa no se pisan: la base de datos aplica cada delta sobre
+el valor vigente.
+
+Si algo escribe items por fuera de las vistas (admin, SQL a mano, una
+caída a mitad de camino) el total puede desviarse; ``diferencias`` lo
+detecta con una sola consulta agrupada y ``reparar`` lo corrige en un solo
+UPDATE (comando ``cuadrar_totales_mesas``).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import tablero
+from .models import Mesa
+
+
+def sumar(mesa, delta):
+    """Aplica ``delta`` al total de la mesa y deja ``mesa.total_cuenta`` al día."""
+    if delta:
+        Mesa.objects.filter(pk=mesa.pk).update(total_cuenta=F('total_cuenta') + delta)
+    mesa.refresh_from_db(fields=['total_cuenta'])
+    # update() no dispara post_save: el tablero se entera por aquí
+    tablero.publicar_al_confirmar('mesa', tablero.mesa_a_dict(mesa))
+    return mesa.total_cuenta
+
+
+def diferencias(mesa_ids=None):
+    """
+    Mesas con cuenta abierta cuyo total no coincide con la suma de sus items
+    sin facturar. Devuelve ``[(mesa_id, total_guardado, total_real)]``.
+    """
+    mesas = Mesa.objects.filter(cuenta_abierta=True)
+    if mesa_ids is not None:
+        mesas = mesas.filter(pk__in=mesa_ids)
+    filas = (
+        mesas.annotate(real=Coalesce(
+            Sum('items__subtotal', filter=Q(items__facturado=False)),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+        .exclude(total_cuenta=F('real'))
+        .values_list('id', 'total_cuenta', 'real')
+        .order_by('id')
+    )
+    return [(mesa_id, guardado, Decimal(real)) for mesa_id, guardado, real in filas]
+
+
+@transaction.atomic
+def reparar(mesa_ids=None):
+    """Corrige en bloque los totales desviados. Devuelve las diferencias encontradas."""
+    # Bloquear las mesas: un delta que llegue entre la lectura y el UPDATE espera y no se pierde
+    mesas = Mesa.objects.select_for_update().filter(cuenta_abierta=True)
+    if mesa_ids is not None:
+        mesas = mesas.filter(pk__in=mesa_ids)
+    encontradas = diferencias(list(mesas.values_list('pk', flat=True)))
+    if encontradas:
+        ids = [mesa_id for mesa_id, _, _ in encontradas]
+        Mesa.objects.filter(pk__in=ids).update(total_cuenta=Case(
+            *[When(pk=mesa_id, then=Value(real)) for mesa_id, _, real in encontradas],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+        for mesa in Mesa.objects.filter(pk__in=ids).select_related('cliente'):
+            tablero.publicar_al_confirmar('mesa', tablero.mesa_a_dict(mesa))
+    return encontradas
@@ -0,0 +1,126 @@
+"""
+Búsqueda de productos por código de barras para la caja.
+
+Cada worker mantiene una caché LRU en memoria con una "foto" del producto
+(precio, IVA, stock y lote FEFO) para responder los escaneos sin ir a la base
+de datos. Las fotos se invalidan cuando cambia un Producto o un Lote en este
+worker (señales y checkout) y, para los cambios hechos por otros workers,
+expiran a los ``POS_SCAN_CACHE_TTL`` segundos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from inventory.models import Producto
+from .checkout import lotes_fefo
+
+
+class CacheProductos:
+    """Caché LRU thread-safe de fotos de producto indexada por código."""
+
+    def __init__(self, max_items=2000, ttl=30):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._fotos = OrderedDict()   # codigo -> (expira, foto)
+        self._codigos = {}            # producto_id -> {codigos}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, codigo):
+        with self._lock:
+            entrada = self._fotos.get(codigo)
+            if entrada is None or entrada[0] < time.monotonic():
+                self.fallos += 1
+                return None
+            self._fotos.move_to_end(codigo)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, codigo, foto):
+        with self._lock:
+            self._fotos[codigo] = (time.monotonic() + self.ttl, foto)
+            self._fotos.move_to_end(codigo)
+            self._codigos.setdefault(foto['id'], set()).add(codigo)
+            while len(self._fotos) > self.max_items:
+                codigo_viejo, (_, foto_vieja) = self._fotos.popitem(last=False)
+                self._codigos.get(foto_vieja['id'], set()).discard(codigo_viejo)
+
+    def invalidar(self, producto_ids):
+        with self._lock:
+            for producto_id in producto_ids:
+                for codigo in self._codigos.pop(producto_id, ()):
+                    self._fotos.pop(codigo, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._fotos.clear()
+            self._codigos.clear()
+
+
+cache_productos = CacheProductos(
+    max_items=getattr(settings, 'POS_SCAN_CACHE_SIZE', 2000),
+    ttl=getattr(settings, 'POS_SCAN_CACHE_TTL', 30),
+)
+
+
+def foto_producto(producto):
+    """Datos que la caja necesita para agregar el producto al carrito."""
+    lote = lotes_fefo([producto.id]).first()
+    return {
+        'id': producto.id,
+        'nombre': producto.nombre,
+        'codigo_barras': producto.codigo_barras,
+        'sku_alternativo': producto.sku_alternativo,
+        'precio': str(producto.precio_unitario),
+        'iva_porcentaje': str(producto.tasa_iva.porcentaje),
+        'stock': producto.stock_actual,
+        'lote': {
+            'id': lote.id,
+            'numero_lote': lote.numero_lote,
+            'cantidad': lote.cantidad_disponible,
+            'fecha_caducidad': lote.fecha_caducidad.strftime('%Y-%m-%d'),
+        } if lote else None,
+    }
+
+
+def buscar_por_codigo(codigo):
+    """
+    Busca un producto por ``codigo_barras`` o ``sku_alternativo``.
+
+    Returns:
+        dict | None: la foto del producto, o None si el código no existe.
+    """
+    codigo = (codigo or '').strip()
+    if not codigo:
+        return None
+
+    foto = cache_productos.obtener(codigo)
+    if foto is not None:
+        return foto
+
+    # Ambas columnas están indexadas; el código de barras (único) tiene prioridad
+    productos = Producto.objects.select_related('tasa_iva')
+    producto = (
+        productos.filter(codigo_barras=codigo).first()
+        or productos.filter(sku_alternativo=codigo).order_by('id').first()
+    )
+    if producto is None:
+        return None
+
+    foto = foto_producto(producto)
+    cache_productos.guardar(codigo, foto)
+    return foto
+
+
+def invalidar_productos(producto_ids):
+    cache_productos.invalidar(producto_ids)
+
+
+def invalidar_al_confirmar(producto_ids):
+    """Invalida las fotos cuando la transacción en curso se confirme."""
+    producto_ids = set(producto_ids)
+    transaction.on_commit(lambda: invalidar_productos(producto_ids))
@@ -0,0 +1,150 @@
+"""
+Almacén de facturas PDF.
+
+Generar el PDF con WeasyPrint cuesta cientos de milisegundos de CPU, así que
+cada factura se genera una sola vez y se guarda en disco:
+
+- La ruta del archivo es el SHA-256 del HTML de la factura
+  (``POS_FACTURAS_DIR/ab/abcdef....pdf``). Renderizar el HTML es barato; si la
+  venta, sus detalles o su pago cambian, cambia el HTML y con él la ruta, así
+  que el PDF se vuelve a generar solo cuando la venta cambió.
+- Al confirmarse una venta, ``generar_al_confirmar`` encola la generación en
+  un pool de hilos (``POS_FACTURAS_WORKERS``) para que la descarga o el
+  correo posteriores encuentren el archivo listo.
+- ``obtener_pdf`` devuelve la ruta del archivo y lo genera en el momento si
+  todavía no existe. Cada uso actualiza la fecha de modificación del archivo.
+- Los PDF de versiones anteriores de una venta quedan huérfanos: ``purgar``
+  (comando ``purgar_facturas``) borra los que no se usan hace más de
+  ``POS_FACTURAS_DIAS`` días (30 por defecto). Si se borra uno vigente, se
+  vuelve a generar la próxima vez que se pida.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.template.loader import render_to_string
+from weasyprint import HTML
+
+from .models import Pago, Venta, VentaDetalle
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO = getattr(settings, 'POS_FACTURAS_DIR', os.path.join(settings.BASE_DIR, 'facturas'))
+WORKERS = getattr(settings, 'POS_FACTURAS_WORKERS', 2)
+EN_SEGUNDO_PLANO = getattr(settings, 'POS_FACTURAS_EN_SEGUNDO_PLANO', True)
+DIAS_RETENCION = getattr(settings, 'POS_FACTURAS_DIAS', 30)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='facturas')
+        return _pool
+
+
+def html_factura(venta):
+    """HTML de la factura (el mismo que se convierte a PDF)."""
+    detalles = VentaDetalle.objects.filter(venta=venta).select_related('producto', 'lote').order_by('id')
+    pago = Pago.objects.filter(venta=venta).order_by('id').first()
+    impuesto = float(venta.total_venta) * 0.19
+    return render_to_string('pos/factura.html', {
+        'venta': venta,
+        'detalles': detalles,
+        'pago': pago,
+        'impuesto': impuesto
+    })
+
+
+def ruta_factura(html):
+    huella = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    return os.path.join(DIRECTORIO, huella[:2], f'{huella}.pdf')
+
+
+def _escribir(ruta, contenido):
+    """Escritura atómica: otro proceso nunca ve un PDF a medio escribir."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def obtener_pdf(venta):
+    """
+    Ruta del PDF de la factura de ``venta``; lo genera si no está guardado.
+
+    Returns:
+        str: ruta absoluta del archivo
+    """
+    html = html_factura(venta)
+    ruta = ruta_factura(html)
+    try:
+        os.utime(ruta)  # último uso: purgar() conserva las facturas que se siguen pidiendo
+    except FileNotFoundError:
+        _escribir(ruta, HTML(string=html).write_pdf())
+    return ruta
+
+
+def leer_pdf(venta):
+    with open(obtener_pdf(venta), 'rb') as archivo:
+        return archivo.read()
+
+
+def _generar(venta_id):
+    close_old_connections()
+    try:
+        venta = Venta.objects.select_related('cliente', 'usuario').get(pk=venta_id)
+        obtener_pdf(venta)
+    except Exception:
+        logger.exception('No se pudo generar la factura de la venta #%s', venta_id)
+    finally:
+        close_old_connections()
+
+
+def generar_al_confirmar(venta_ids):
+    """Encola la generación de las facturas cuando la transacción se confirme."""
+    venta_ids = list(venta_ids)
+    if not EN_SEGUNDO_PLANO:
+        return
+
+    def encolar():
+        pool = _obtener_pool()
+        for venta_id in venta_ids:
+            pool.submit(_generar, venta_id)
+    transaction.on_commit(encolar)
+
+
+def purgar(dias=None):
+    """Borra los PDF (y temporales) sin uso en los últimos ``dias``. Devuelve cuántos archivos."""
+    limite = time.time() - (dias if dias is not None else DIAS_RETENCION) * 24 * 60 * 60
+    eliminados = 0
+    for carpeta, _, archivos in os.walk(DIRECTORIO, topdown=False):
+        for nombre in archivos:
+            ruta = os.path.join(carpeta, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    eliminados += 1
+            except FileNotFoundError:
+                pass
+        if carpeta != DIRECTORIO:
+            try:
+                os.rmdir(carpeta)  # solo si quedó vacía
+            except OSError:
+                pass
+    return eliminados
@@ -0,0 +1,99 @@
+"""
+Claves de idempotencia para el registro de ventas.
+
+La caja genera un UUID por venta y lo envía en el header ``Idempotency-Key``
+(o en el campo ``idempotency_key`` del cuerpo). Si la red falla y la caja
+reintenta, el servidor devuelve la respuesta de la venta original en lugar de
+volver a cobrar y descontar inventario.
+
+La fila de la clave se inserta dentro de la misma transacción que la venta:
+
+- si la venta falla, la clave se revierte con ella y el reintento se procesa;
+- si dos reintentos llegan a la vez, el segundo INSERT espera el bloqueo del
+  índice único y, cuando el primero confirma, recibe la respuesta guardada.
+"""
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import SolicitudIdempotente
+
+HEADER = 'Idempotency-Key'
+DIAS_RETENCION = getattr(settings, 'POS_IDEMPOTENCIA_DIAS', 7)
+
+
+def obtener_clave(request, data):
+    """
+    Returns:
+        uuid.UUID | None
+
+    Raises:
+        ValueError: si la clave enviada no es un UUID.
+    """
+    clave = request.headers.get(HEADER) or data.get('idempotency_key')
+    if not clave:
+        return None
+    try:
+        return uuid.UUID(str(clave))
+    except ValueError:
+        raise ValueError('La clave de idempotencia debe ser un UUID.')
+
+
+def huella(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def respuesta_guardada(clave, request, bloquear=False):
+    """
+    Respuesta de una venta ya procesada con esta clave, o None si no existe.
+
+    ``bloquear`` hace una lectura con bloqueo, que ve las filas confirmadas por
+    otras transacciones después de iniciada la actual.
+    """
+    solicitudes = SolicitudIdempotente.objects.filter(clave=clave)
+    if bloquear:
+        solicitudes = solicitudes.select_for_update()
+    solicitud = solicitudes.first()
+    if solicitud is None:
+        return None
+
+    if solicitud.usuario_id != request.user.id or solicitud.huella != huella(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'La clave de idempotencia ya se usó para otra venta.'
+        }, status=422)
+
+    respuesta = JsonResponse(solicitud.respuesta)
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def reservar_clave(clave, request):
+    """
+    Inserta la clave dentro de la transacción en curso.
+
+    Returns:
+        bool: False si otra solicitud con la misma clave ya la confirmó.
+    """
+    try:
+        with transaction.atomic():
+            SolicitudIdempotente.objects.create(clave=clave, usuario=request.user, huella=huella(request))
+        return True
+    except IntegrityError:
+        return False
+
+
+def guardar_respuesta(clave, venta, respuesta):
+    SolicitudIdempotente.objects.filter(clave=clave).update(venta=venta, respuesta=respuesta)
+
+
+def purgar_claves(dias=None):
+    """Elimina las claves más antiguas que el periodo de retención."""
+    limite = timezone.now() - timedelta(days=dias if dias is not None else DIAS_RETENCION)
+    eliminadas, _ = SolicitudIdempotente.objects.filter(fecha_creacion__lt=limite).delete()
+    return eliminadas
@@ -0,0 +1,122 @@
+"""
+Comando para comparar la latencia del checkout en bloque contra el camino
+anterior fila por fila.
+
+Todos los datos de prueba se crean dentro de una transacción que se revierte
+al final, así que puede ejecutarse contra la base de datos real.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from clients.models import Cliente
+from inventory.models import Categoria, Lote, MovimientoInventario, Producto
+from pos.checkout import registrar_venta
+from pos.models import Pago, Venta, VentaDetalle
+from users.models import Usuario
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _checkout_por_fila(usuario, cliente, items):
+    """Réplica del procesar_venta original: 5 consultas por línea del ticket."""
+    total_venta = sum(Decimal(item['precio']) * int(item['cantidad']) for item in items)
+    venta = Venta.objects.create(cliente=cliente, usuario=usuario, canal_venta='mostrador', total_venta=total_venta)
+    Pago.objects.create(venta=venta, monto=total_venta, metodo_pago='efectivo', estado='completado')
+    for item in items:
+        producto = Producto.objects.get(pk=item['producto_id'])
+        lote = Lote.objects.get(pk=item['lote_id'])
+        cantidad = int(item['cantidad'])
+        if lote.cantidad_disponible < cantidad:
+            raise ValueError('Stock insuficiente')
+        VentaDetalle.objects.create(venta=venta, producto=producto, lote=lote, cantidad=cantidad,
+                                    subtotal=Decimal(item['precio']) * cantidad)
+        lote.cantidad_disponible -= cantidad
+        lote.save()
+        MovimientoInventario.objects.create(producto=producto, lote=lote, cantidad=-cantidad,
+                                            tipo_movimiento='salida',
+                                            descripcion=f'Venta #{venta.id} - {producto.nombre}', venta=venta)
+    return venta
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del checkout (en bloque vs. fila por fila) para tickets de 1, 10, 50 y 200 líneas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', nargs='+', type=int, default=[1, 10, 50, 200],
+                            help='Tamaños de ticket a medir')
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Tickets por tamaño y por camino')
+
+    def handle(self, *args, **options):
+        tamanos = options['lineas']
+        repeticiones = options['repeticiones']
+
+        usuario = Usuario.objects.filter(estado='activo').first()
+        if usuario is None:
+            raise CommandError('Se necesita al menos un usuario activo para registrar las ventas de prueba.')
+
+        try:
+            with transaction.atomic():
+                self._ejecutar(usuario, tamanos, repeticiones)
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS('\nDatos de prueba revertidos.'))
+
+    def _ejecutar(self, usuario, tamanos, repeticiones):
+        cliente = Cliente.objects.filter(pk=1).first() or Cliente.objects.create(
+            nombres='Benchmark', apellidos='Checkout', documento='BENCH-0000',
+            telefono='0000000', correo='benchmark.checkout@laplayita.local'
+        )
+        categoria = Categoria.objects.create(nombre='BENCH checkout')
+
+        max_lineas = max(tamanos)
+        cantidad_inicial = (repeticiones * 2 + 1) * len(tamanos)
+        items = []
+        for i in range(max_lineas):
+            producto = Producto.objects.create(
+                nombre=f'BENCH checkout {i:04d}',
+                precio_unitario=Decimal('1000.00'),
+                categoria=categoria,
+            )
+            lote = Lote.objects.create(
+                producto=producto,
+                numero_lote=f'BENCH-{i:04d}',
+                cantidad_disponible=cantidad_inicial,
+                costo_unitario_lote=Decimal('500.00'),
+                fecha_caducidad=date.today() + timedelta(days=365),
+            )
+            items.append({'producto_id': producto.id, 'lote_id': lote.id, 'cantidad': 1, 'precio': '1000.00'})
+
+        self.stdout.write(f"{'Líneas':>7} | {'Por fila (ms)':>14} | {'Consultas':>9} | "
+                          f"{'En bloque (ms)':>14} | {'Consultas':>9} | {'Mejora':>7}")
+        self.stdout.write('-' * 76)
+
+        for tamano in tamanos:
+            ticket = items[:tamano]
+            por_fila, consultas_fila = self._medir(
+                lambda: _checkout_por_fila(usuario, cliente, ticket), repeticiones)
+            en_bloque, consultas_bloque = self._medir(
+                lambda: registrar_venta(usuario, cliente, 'mostrador', 'efectivo', ticket), repeticiones)
+            self.stdout.write(
+                f'{tamano:>7} | {por_fila:>14.2f} | {consultas_fila:>9} | '
+                f'{en_bloque:>14.2f} | {consultas_bloque:>9} | {por_fila / en_bloque:>6.1f}x'
+            )
+
+    def _medir(self, checkout, repeticiones):
+        """Devuelve la mediana en ms y las consultas del último ticket."""
+        tiempos = []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                with transaction.atomic():
+                    checkout()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), len(consultas)
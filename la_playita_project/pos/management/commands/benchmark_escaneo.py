@@ -0,0 +1,92 @@
+"""
+Comando para medir la latencia del escaneo de códigos de barras.
+
+Compara la búsqueda por código (fría y con la caché del worker caliente)
+contra la búsqueda ``icontains`` por nombre que usaba la caja. Los productos
+de prueba se crean dentro de una transacción que se revierte al final.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import Categoria, Producto
+from pos.escaneo import buscar_por_codigo, cache_productos
+
+OBJETIVO_MS = 5
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia (p50/p95) del endpoint de escaneo con y sin caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=2000,
+                            help='Productos de prueba a crear')
+        parser.add_argument('--escaneos', type=int, default=500,
+                            help='Escaneos a medir por escenario')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._ejecutar(options['productos'], options['escaneos'])
+                raise _Rollback()
+        except _Rollback:
+            cache_productos.limpiar()
+            self.stdout.write(self.style.SUCCESS('\nDatos de prueba revertidos.'))
+
+    def _ejecutar(self, total, escaneos):
+        categoria = Categoria.objects.create(nombre='BENCH escaneo')
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'BENCH escaneo {i:05d}',
+                precio_unitario=Decimal('1000.00'),
+                categoria=categoria,
+                codigo_barras=f'770BENCH{i:05d}',
+            )
+            for i in range(total)
+        ])
+        codigos = [f'770BENCH{i:05d}' for i in range(total)]
+        muestra = [random.choice(codigos) for _ in range(escaneos)]
+
+        cache_productos.limpiar()
+        frio = self._medir(lambda codigo: buscar_por_codigo(codigo), muestra, limpiar=True)
+        for codigo in muestra:  # calentar la caché
+            buscar_por_codigo(codigo)
+        caliente = self._medir(lambda codigo: buscar_por_codigo(codigo), muestra)
+        nombre = self._medir(
+            lambda codigo: list(Producto.objects.filter(nombre__icontains=codigo[-5:])[:20]), muestra)
+
+        self.stdout.write(f"{'Escenario':<28} | {'p50 (ms)':>9} | {'p95 (ms)':>9}")
+        self.stdout.write('-' * 52)
+        for etiqueta, tiempos in [
+            ('Código (sin caché)', frio),
+            ('Código (caché caliente)', caliente),
+            ('Nombre icontains', nombre),
+        ]:
+            p50, p95 = self._percentiles(tiempos)
+            estilo = self.style.SUCCESS if p95 < OBJETIVO_MS else self.style.WARNING
+            self.stdout.write(estilo(f'{etiqueta:<28} | {p50:>9.3f} | {p95:>9.3f}'))
+
+        self.stdout.write(f'\nObjetivo: p95 < {OBJETIVO_MS} ms. '
+                          f'Aciertos de caché: {cache_productos.aciertos}, fallos: {cache_productos.fallos}')
+
+    def _medir(self, buscar, muestra, limpiar=False):
+        tiempos = []
+        for codigo in muestra:
+            if limpiar:
+                cache_productos.limpiar()
+            inicio = time.perf_counter()
+            buscar(codigo)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def _percentiles(self, tiempos):
+        cortes = statistics.quantiles(tiempos, n=20)
+        return statistics.median(tiempos), cortes[18]
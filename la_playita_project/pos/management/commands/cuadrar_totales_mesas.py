@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from pos import cuentas_mesa
+
+
+class Command(BaseCommand):
+    help = 'Compara el total de cada mesa abierta con la suma de sus items sin facturar y, con --reparar, lo corrige en bloque.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true',
+                            help='Corrige los totales desviados (un solo UPDATE)')
+        parser.add_argument('--mesa', type=int, action='append', dest='mesas',
+                            help='Limitar a esta mesa (se puede repetir)')
+
+    def handle(self, *args, **options):
+        if options['reparar']:
+            encontradas = cuentas_mesa.reparar(options['mesas'])
+        else:
+            encontradas = cuentas_mesa.diferencias(options['mesas'])
+
+        if not encontradas:
+            self.stdout.write(self.style.SUCCESS('✅ Los totales de las mesas abiertas coinciden con sus items.'))
+            return
+
+        for mesa_id, guardado, real in encontradas:
+            self.stdout.write(f'  Mesa #{mesa_id}: guardado {guardado} / items {real} (diferencia {guardado - real})')
+        if options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(encontradas)} mesas corregidas.'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {len(encontradas)} mesas con el total desviado. Ejecute con --reparar para corregirlas.'
+            ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from pos.idempotencia import DIAS_RETENCION, purgar_claves
+
+
+class Command(BaseCommand):
+    help = 'Elimina las claves de idempotencia de ventas más antiguas que el periodo de retención.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_RETENCION,
+                            help=f'Días de retención (por defecto {DIAS_RETENCION})')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y repite cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            eliminadas = purgar_claves(options['dias'])
+            self.stdout.write(self.style.SUCCESS(f'✅ {eliminadas} claves de idempotencia eliminadas.'))
+            if options['intervalo'] <= 0:
+                return
+            time.sleep(options['intervalo'])
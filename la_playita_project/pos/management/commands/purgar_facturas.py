@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from pos.facturas import DIAS_RETENCION, purgar
+
+
+class Command(BaseCommand):
+    help = 'Elimina las facturas PDF guardadas que no se usan hace más del periodo de retención.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_RETENCION,
+                            help=f'Días sin uso antes de borrar un PDF (por defecto {DIAS_RETENCION})')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y repite cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            eliminados = purgar(options['dias'])
+            self.stdout.write(self.style.SUCCESS(f'✅ {eliminados} facturas PDF eliminadas.'))
+            if options['intervalo'] <= 0:
+                return
+            time.sleep(options['intervalo'])
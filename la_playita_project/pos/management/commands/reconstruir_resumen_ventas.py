@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from pos.models import Venta
+from pos.resumen import fecha_local, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla venta_resumen_diario desde las ventas, un día por transacción.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial AAAA-MM-DD (por defecto, la primera venta)')
+        parser.add_argument('--hasta', help='Fecha final AAAA-MM-DD (por defecto, hoy)')
+
+    def _fecha(self, valor, nombre):
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f'--{nombre} debe tener el formato AAAA-MM-DD')
+        return fecha
+
+    def handle(self, *args, **options):
+        hasta = self._fecha(options['hasta'], 'hasta') if options['hasta'] else timezone.localdate()
+        if options['desde']:
+            desde = self._fecha(options['desde'], 'desde')
+        else:
+            primera = Venta.objects.aggregate(primera=Min('fecha_venta'))['primera']
+            if primera is None:
+                self.stdout.write(self.style.WARNING('⚠️  No hay ventas registradas.'))
+                return
+            desde = fecha_local(primera)
+
+        dia = desde
+        filas = 0
+        while dia <= hasta:
+            filas += reconstruir(dia, dia)
+            dia += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Resumen reconstruido del {desde} al {hasta}: {filas} filas.'
+        ))
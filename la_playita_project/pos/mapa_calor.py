@@ -0,0 +1,98 @@
+"""
+Mapa de calor de ventas: hora del día × día de la semana.
+
+Se calcula con una sola consulta agrupada por ``ExtractWeekDay`` y
+``ExtractHour`` en la hora local del negocio (``America/Bogota`` por
+defecto), sin traer las ventas a Python. El resultado se guarda en la caché
+por ventana de días y vendedor durante ``POS_MAPA_CALOR_TIMEOUT`` segundos.
+"""
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay
+from django.utils import timezone
+
+from .models import Venta
+
+ZONA_HORARIA = ZoneInfo(getattr(settings, 'POS_ZONA_HORARIA_REPORTES', 'America/Bogota'))
+DIAS_POR_DEFECTO = 7
+DIAS_MAXIMOS = getattr(settings, 'POS_MAPA_CALOR_MAX_DIAS', 366)
+TIMEOUT = getattr(settings, 'POS_MAPA_CALOR_TIMEOUT', 60 * 5)
+CLAVE = 'pos:mapa_calor:{dias}:{usuario}:{fecha}'
+
+# ExtractWeekDay devuelve 1 = domingo ... 7 = sábado; el mapa empieza en lunes
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def validar_dias(valor):
+    """Convierte el parámetro ``dias`` de la URL; ValueError si no es válido."""
+    if valor in (None, ''):
+        return DIAS_POR_DEFECTO
+    try:
+        dias = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError('El parámetro dias debe ser un número entero.')
+    if not 1 <= dias <= DIAS_MAXIMOS:
+        raise ValueError(f'El parámetro dias debe estar entre 1 y {DIAS_MAXIMOS}.')
+    return dias
+
+
+def _calcular(dias, usuario_id):
+    ventas = Venta.objects.filter(fecha_venta__gte=timezone.now() - timedelta(days=dias))
+    if usuario_id is not None:
+        ventas = ventas.filter(usuario_id=usuario_id)
+
+    filas = (
+        ventas.annotate(
+            dia=ExtractWeekDay('fecha_venta', tzinfo=ZONA_HORARIA),
+            hora=ExtractHour('fecha_venta', tzinfo=ZONA_HORARIA),
+        )
+        .values('dia', 'hora')
+        .annotate(cantidad=Count('id'), total=Sum('total_venta'))
+        .order_by()
+    )
+
+    cantidades = [[0] * 24 for _ in DIAS_SEMANA]
+    totales = [[0.0] * 24 for _ in DIAS_SEMANA]
+    for fila in filas:
+        dia = (fila['dia'] + 5) % 7  # domingo (1) -> 6, lunes (2) -> 0
+        cantidades[dia][fila['hora']] = fila['cantidad']
+        totales[dia][fila['hora']] = float(fila['total'] or 0)
+
+    por_hora = [sum(cantidades[d][h] for d in range(7)) for h in range(24)]
+    hora_pico = max(range(24), key=lambda h: (por_hora[h], -h)) if any(por_hora) else None
+
+    return {
+        'dias': dias,
+        'zona_horaria': str(ZONA_HORARIA),
+        'dias_semana': DIAS_SEMANA,
+        'horas': [f'{h:02d}:00' for h in range(24)],
+        'cantidades': cantidades,
+        'totales': totales,
+        'hora_pico': hora_pico,
+    }
+
+
+def mapa_calor(dias=DIAS_POR_DEFECTO, usuario_id=None):
+    """
+    Ventas de los últimos ``dias`` días por día de la semana y hora local.
+
+    Args:
+        usuario_id (int): si se indica, solo las ventas de ese vendedor.
+
+    Returns:
+        dict: ``cantidades`` y ``totales`` son matrices de 7 filas (lunes a
+        domingo) por 24 columnas (horas).
+    """
+    clave = CLAVE.format(
+        dias=dias, usuario=usuario_id if usuario_id is not None else 'todos',
+        fecha=timezone.localdate(timezone=ZONA_HORARIA).isoformat(),
+    )
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _calcular(dias, usuario_id)
+        cache.set(clave, datos, TIMEOUT)
+    return datos
@@ -0,0 +1,280 @@
+"""
+Motor de métricas del dashboard de reportes.
+
+Todos los KPIs del dashboard salen de unas pocas consultas con agregación
+condicional (``Sum``/``Count`` con ``filter=``) en lugar de una consulta por
+número. Las de ventas leen el resumen diario (pos/resumen.py):
+
+- ventas: totales y conteos de hoy, 7 y 30 días y del período anterior;
+- serie: totales por fecha (gráfico); la hora pico sale del mapa de calor
+  de la última semana (pos/mapa_calor.py);
+- productos: resumen de los últimos 30 días agrupado por producto (margen,
+  top productos y producto del día);
+- inventario: conteos de alertas y valor del inventario;
+- listas cortas (top 10 de cada alerta, top vendedores y clientes).
+
+El resultado es un ``MetricasDashboard`` con los valores ya calculados.
+"""
+import json
+from dataclasses import dataclass, fields
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import ClassVar
+
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from clients.models import Cliente
+from inventory.models import Producto
+from . import mapa_calor, resumen
+from .models import Venta, VentaResumenDiario
+
+TOP_PRODUCTOS = 5
+TOP_VENDEDORES = 5
+TOP_CLIENTES = 5
+LISTA_ALERTAS = 10
+
+
+@dataclass(frozen=True, slots=True)
+class MetricasDashboard:
+    """Resultado del motor de métricas: un atributo por KPI del dashboard."""
+
+    # Ventas
+    total_hoy: Decimal
+    cantidad_hoy: Decimal
+    total_7dias: Decimal
+    cantidad_7dias: Decimal
+    total_30dias: Decimal
+    cantidad_30dias: Decimal
+    ticket_promedio: Decimal
+    crecimiento: Decimal
+    ingresos_30dias: Decimal
+    costos_30dias: Decimal
+    ganancia_bruta: Decimal
+    margen_porcentaje: Decimal
+    metodos_pago: list
+    canales_venta: list
+    top_productos: list
+    top_vendedores: list
+    top_clientes: list
+    producto_dia: dict | None
+    hora_pico: int
+    ventas_fechas: list
+    ventas_totales: list
+    # Inventario y clientes
+    total_productos: int
+    productos_bajos_stock: int
+    productos_agotados: int
+    productos_sin_movimiento: int
+    valor_inventario: Decimal
+    total_clientes: int
+    lista_productos_stock_bajo: list
+    lista_productos_agotados: list
+    lista_productos_sin_movimiento: list
+
+    # Montos que el template recibe como float
+    MONTOS: ClassVar[tuple] = (
+        'total_hoy', 'total_7dias', 'total_30dias', 'ticket_promedio', 'crecimiento',
+        'ingresos_30dias', 'costos_30dias', 'ganancia_bruta', 'margen_porcentaje',
+        'valor_inventario',
+    )
+
+    def como_contexto(self):
+        """Diccionario para el template de ``dashboard_reportes``."""
+        contexto = {campo.name: getattr(self, campo.name) for campo in fields(self)}
+        for campo in self.MONTOS:
+            contexto[campo] = float(contexto[campo])
+        contexto['ventas_fechas_json'] = json.dumps(contexto.pop('ventas_fechas'))
+        contexto['ventas_totales_json'] = json.dumps(contexto.pop('ventas_totales'))
+        return contexto
+
+
+def _metricas_ventas(propias, hoy, desde_7, desde_30, desde_60):
+    """Totales y conteos por período en una sola consulta sobre el resumen diario."""
+    periodos = {'hoy': hoy, '7dias': desde_7, '30dias': desde_30}
+    agregados = {}
+    for nombre, desde in periodos.items():
+        condicion = propias & Q(fecha__gte=desde)
+        agregados[f'total_{nombre}'] = Sum('total_ventas', filter=condicion)
+        agregados[f'cantidad_{nombre}'] = Sum('numero_ventas', filter=condicion)
+    agregados['total_anterior'] = Sum('total_ventas', filter=Q(fecha__lt=desde_30))
+
+    datos = resumen.resumen(desde=desde_60).aggregate(**agregados)
+    for clave, valor in datos.items():
+        if valor is None:
+            datos[clave] = Decimal('0')
+    return datos
+
+
+def _serie_ventas(propias, desde_30):
+    """Totales por fecha de los últimos 30 días (gráfico)."""
+    filas = (
+        resumen.resumen(desde=desde_30).filter(propias)
+        .values('fecha').annotate(total=Sum('total_ventas'), cantidad=Sum('numero_ventas'))
+        .filter(cantidad__gt=0).order_by('fecha')
+    )
+    fechas, totales = [], []
+    for fila in filas:
+        fechas.append(fila['fecha'].strftime('%Y-%m-%d'))
+        totales.append(float(fila['total']))
+    return fechas, totales
+
+
+def _metricas_productos_vendidos(propias, hoy, desde_30):
+    """
+    Resumen de los últimos 30 días agrupado por producto: de ahí salen el
+    margen, el top de productos y el producto del día.
+    """
+    filas = list(
+        resumen.resumen(desde=desde_30)
+        .values('producto_id', 'producto__nombre')
+        .annotate(
+            ingresos_total=Sum('subtotal'),
+            costos=Sum('costo'),
+            cantidad_total=Sum('cantidad', filter=propias or None),
+            ingresos=Sum('subtotal', filter=propias or None),
+            cantidad_hoy=Sum('cantidad', filter=Q(fecha=hoy)),
+        )
+    )
+
+    ingresos = sum((f['ingresos_total'] for f in filas), Decimal('0'))
+    costos = sum((f['costos'] for f in filas), Decimal('0'))
+    filas = [f for f in filas if f['producto_id'] != resumen.SIN_PRODUCTO]
+
+    propias = [f for f in filas if f['cantidad_total']]
+    propias.sort(key=lambda f: (-f['cantidad_total'], f['producto__nombre']))
+    top_productos = [
+        {'producto__nombre': f['producto__nombre'], 'cantidad_total': f['cantidad_total'], 'ingresos': f['ingresos']}
+        for f in propias[:TOP_PRODUCTOS]
+    ]
+
+    vendidos_hoy = [f for f in filas if f['cantidad_hoy']]
+    producto_dia = None
+    if vendidos_hoy:
+        mejor = max(vendidos_hoy, key=lambda f: f['cantidad_hoy'])
+        producto_dia = {'producto__nombre': mejor['producto__nombre'], 'cantidad_total': mejor['cantidad_hoy']}
+
+    return ingresos, costos, top_productos, producto_dia
+
+
+def _metricas_inventario(desde_30):
+    """Conteos de alertas y valor del inventario en una sola consulta."""
+    vendido_recientemente = VentaResumenDiario.objects.filter(
+        producto=OuterRef('pk'), fecha__gte=desde_30, cantidad__gt=0
+    )
+    sin_movimiento = Q(stock_actual__gt=0) & ~Exists(vendido_recientemente)
+    stock_bajo = Q(stock_actual__lt=F('stock_minimo'))
+    agotados = Q(stock_actual=0)
+
+    datos = Producto.objects.aggregate(
+        total_productos=Count('id'),
+        productos_bajos_stock=Count('id', filter=stock_bajo),
+        productos_agotados=Count('id', filter=agotados),
+        productos_sin_movimiento=Count('id', filter=sin_movimiento),
+        valor_inventario=Sum(F('stock_actual') * F('costo_promedio')),
+    )
+    datos['valor_inventario'] = datos['valor_inventario'] or Decimal('0')
+
+    datos['lista_productos_stock_bajo'] = list(
+        Producto.objects.filter(stock_bajo).order_by('stock_actual')[:LISTA_ALERTAS]
+    )
+    datos['lista_productos_agotados'] = list(
+        Producto.objects.filter(agotados).order_by('nombre')[:LISTA_ALERTAS]
+    )
+    datos['lista_productos_sin_movimiento'] = list(
+        Producto.objects.filter(sin_movimiento).order_by('nombre')[:LISTA_ALERTAS]
+    )
+    return datos
+
+
+def calcular_metricas(usuario=None, ahora=None):
+    """
+    Calcula todos los KPIs del dashboard.
+
+    Args:
+        usuario: si se indica (rol Vendedor), las ventas, el top de productos y
+            el top de clientes se limitan a sus propias ventas.
+        ahora (datetime): instante de referencia (por defecto, ahora).
+
+    Returns:
+        MetricasDashboard
+    """
+    ahora = ahora or timezone.now()
+    hoy = timezone.localdate(ahora)
+    # Períodos en días locales completos; "30 días" incluye hoy y los 29 anteriores
+    desde_7 = hoy - timedelta(days=6)
+    desde_30 = hoy - timedelta(days=29)
+    desde_60 = hoy - timedelta(days=59)
+
+    # Q() vacío = sin filtro; en los agregados se pasa como ``filter=None``
+    propias = Q(usuario=usuario) if usuario is not None else Q()
+
+    ventas = _metricas_ventas(propias, hoy, desde_7, desde_30, desde_60)
+    total_30dias = ventas['total_30dias']
+    cantidad_30dias = ventas['cantidad_30dias']
+    total_anterior = ventas['total_anterior']
+    if total_anterior > 0:
+        crecimiento = (total_30dias - total_anterior) / total_anterior * 100
+    else:
+        crecimiento = 100 if total_30dias > 0 else 0
+
+    ventas_fechas, ventas_totales = _serie_ventas(propias, desde_30)
+    hora_pico = mapa_calor.mapa_calor(7)['hora_pico'] or 0
+    ingresos, costos, top_productos, producto_dia = _metricas_productos_vendidos(propias, hoy, desde_30)
+    ganancia_bruta = ingresos - costos
+
+    ultimos_30 = resumen.resumen(desde=desde_30).filter(numero_ventas__gt=0)
+    metodos_pago = list(
+        ultimos_30.exclude(metodo_pago=resumen.METODO_SIN_PAGO).values('metodo_pago')
+        .annotate(total=Sum('total_ventas'), cantidad=Sum('numero_ventas')).order_by('-total')
+    )
+    canales_venta = list(
+        ultimos_30.values('canal_venta')
+        .annotate(total=Sum('total_ventas'), cantidad=Sum('numero_ventas')).order_by('-total')
+    )
+
+    if usuario is None:
+        top_vendedores = list(
+            ultimos_30.values('usuario__first_name', 'usuario__last_name', 'usuario__username')
+            .annotate(total_ventas=Sum('total_ventas'), cantidad=Sum('numero_ventas'))
+            .order_by('-total_ventas')[:TOP_VENDEDORES]
+        )
+    else:
+        top_vendedores = []
+
+    # El resumen no tiene la dimensión cliente: el top sale de las ventas
+    hace_30_dias = timezone.make_aware(datetime.combine(desde_30, time.min))
+    top_clientes = list(
+        Venta.objects.filter(propias, fecha_venta__gte=hace_30_dias)
+        .exclude(cliente__nombres='Consumidor', cliente__apellidos='Final')
+        .values('cliente__nombres', 'cliente__apellidos')
+        .annotate(total_compras=Sum('total_venta'), cantidad=Count('id'))
+        .order_by('-total_compras')[:TOP_CLIENTES]
+    )
+    total_clientes = Cliente.objects.exclude(nombres='Consumidor', apellidos='Final').count()
+
+    return MetricasDashboard(
+        total_hoy=ventas['total_hoy'],
+        cantidad_hoy=ventas['cantidad_hoy'],
+        total_7dias=ventas['total_7dias'],
+        cantidad_7dias=ventas['cantidad_7dias'],
+        total_30dias=total_30dias,
+        cantidad_30dias=cantidad_30dias,
+        ticket_promedio=total_30dias / cantidad_30dias if cantidad_30dias > 0 else Decimal('0'),
+        crecimiento=crecimiento,
+        ingresos_30dias=ingresos,
+        costos_30dias=costos,
+        ganancia_bruta=ganancia_bruta,
+        margen_porcentaje=(ganancia_bruta / ingresos * 100) if ingresos > 0 else Decimal('0'),
+        metodos_pago=metodos_pago,
+        canales_venta=canales_venta,
+        top_productos=top_productos,
+        top_vendedores=top_vendedores,
+        top_clientes=top_clientes,
+        producto_dia=producto_dia,
+        hora_pico=hora_pico,
+        ventas_fechas=ventas_fechas,
+        ventas_totales=ventas_totales,
+        total_clientes=total_clientes,
+        **_metricas_inventario(desde_30),
+    )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0005_itemmesa_anotacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.UUIDField(unique=True)),
+                ('huella', models.CharField(help_text='SHA-256 del cuerpo de la solicitud', max_length=64)),
+                ('respuesta', models.JSONField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='pos.venta')),
+            ],
+            options={
+                'db_table': 'solicitud_idempotente',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_termino_busqueda_producto'),
+        ('pos', '0006_solicitud_idempotente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día local de la venta')),
+                ('canal_venta', models.CharField(max_length=20)),
+                ('metodo_pago', models.CharField(max_length=25)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('numero_ventas', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(blank=True, db_constraint=False, help_text='Vacío solo para ventas sin detalle', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.producto')),
+                ('usuario', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'venta_resumen_diario',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'canal_venta', 'metodo_pago', 'usuario', 'producto'), name='uniq_venta_resumen_diario')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Índices sobre venta.fecha_venta para los reportes por rango de fechas
+# (mapa de calor por hora y día de la semana, con o sin vendedor)
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0007_venta_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE INDEX IF NOT EXISTS idx_venta_fecha ON venta (fecha_venta, usuario_id, total_venta);",
+                "CREATE INDEX IF NOT EXISTS idx_venta_usuario_fecha ON venta (usuario_id, fecha_venta, total_venta);",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS idx_venta_fecha ON venta;",
+                "DROP INDEX IF EXISTS idx_venta_usuario_fecha ON venta;",
+            ],
+        ),
+    ]
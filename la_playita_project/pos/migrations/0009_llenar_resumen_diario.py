@@ -0,0 +1,102 @@
+# Llena venta_resumen_diario con el historial de ventas existente (lo mismo
+# que reconstruir_resumen_ventas), para que el dashboard y los reportes no
+# arranquen en cero después del deploy.
+#
+# No usa pos.models ni pos.resumen: venta, venta_detalle, pago y lote son
+# tablas heredadas (managed=False) sin sus llaves foráneas en el estado de las
+# migraciones, así que se leen con SQL y el cálculo queda congelado aquí.
+
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+TAMANO_LOTE = 2000
+METODO_SIN_PAGO = 'sin_pago'
+
+
+def _decimal(valor):
+    return Decimal(str(valor or 0))
+
+
+def _fecha_local(fecha_venta):
+    if timezone.is_naive(fecha_venta):
+        fecha_venta = timezone.make_aware(fecha_venta, dt_timezone.utc)
+    return timezone.localtime(fecha_venta).date()
+
+
+def _sumar_lote(cursor, ventas, deltas):
+    marcas = ', '.join(['%s'] * len(ventas))
+    ids = [venta[0] for venta in ventas]
+
+    cursor.execute(
+        f'SELECT venta_id, metodo_pago FROM pago WHERE venta_id IN ({marcas}) ORDER BY id DESC', ids
+    )
+    metodos = dict(cursor.fetchall())  # con varios pagos queda el primero
+
+    cursor.execute(
+        'SELECT d.venta_id, d.producto_id, d.cantidad, d.subtotal, l.costo_unitario_lote '
+        'FROM venta_detalle d LEFT JOIN lote l ON l.id = d.lote_id '
+        f'WHERE d.venta_id IN ({marcas})', ids
+    )
+    lineas_por_venta = {}
+    for venta_id, producto_id, cantidad, subtotal, costo in cursor.fetchall():
+        lineas_por_venta.setdefault(venta_id, []).append((producto_id, cantidad, subtotal, costo))
+
+    for venta_id, fecha_venta, canal_venta, usuario_id, total_venta in ventas:
+        base = (_fecha_local(fecha_venta), canal_venta, metodos.get(venta_id, METODO_SIN_PAGO), usuario_id)
+        lineas = sorted(lineas_por_venta.get(venta_id, []), key=lambda linea: linea[0])
+        if not lineas:
+            lineas = [(None, 0, 0, None)]
+        for i, (producto_id, cantidad, subtotal, costo) in enumerate(lineas):
+            medidas = deltas.setdefault(base + (producto_id,), [0, Decimal('0'), Decimal('0'), 0, Decimal('0')])
+            medidas[0] += cantidad
+            medidas[1] += _decimal(subtotal)
+            medidas[2] += cantidad * _decimal(costo)
+            if i == 0:
+                # La venta se cuenta una sola vez: en la fila de su primer producto
+                medidas[3] += 1
+                medidas[4] += _decimal(total_venta)
+
+
+def llenar_resumen(apps, schema_editor):
+    conexion = schema_editor.connection
+    if 'venta' not in conexion.introspection.table_names():
+        return  # base nueva sin la tabla heredada venta
+    VentaResumenDiario = apps.get_model('pos', 'VentaResumenDiario')
+
+    deltas = {}
+    ultimo_id = 0
+    with conexion.cursor() as cursor:
+        while True:
+            cursor.execute(
+                'SELECT id, fecha_venta, canal_venta, usuario_id, total_venta FROM venta '
+                'WHERE id > %s ORDER BY id LIMIT %s', [ultimo_id, TAMANO_LOTE]
+            )
+            ventas = cursor.fetchall()
+            if not ventas:
+                break
+            _sumar_lote(cursor, ventas, deltas)
+            ultimo_id = ventas[-1][0]
+
+    VentaResumenDiario.objects.all().delete()
+    VentaResumenDiario.objects.bulk_create([
+        VentaResumenDiario(
+            fecha=fecha, canal_venta=canal, metodo_pago=metodo, usuario_id=usuario_id, producto_id=producto_id,
+            cantidad=medidas[0], subtotal=medidas[1], costo=medidas[2],
+            numero_ventas=medidas[3], total_ventas=medidas[4],
+        )
+        for (fecha, canal, metodo, usuario_id, producto_id), medidas in deltas.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0008_venta_indices_fecha'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_resumen, migrations.RunPython.noop),
+    ]
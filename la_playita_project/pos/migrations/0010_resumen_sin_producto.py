@@ -0,0 +1,41 @@
+# Las ventas sin detalle pasan de producto NULL a producto 0 (resumen.SIN_PRODUCTO):
+# con NULL la llave única uniq_venta_resumen_diario no las agrupaba en MySQL.
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+SIN_PRODUCTO = 0
+DIMENSIONES = ('fecha', 'canal_venta', 'metodo_pago', 'usuario_id')
+MEDIDAS = ('cantidad', 'subtotal', 'costo', 'numero_ventas', 'total_ventas')
+
+
+def unir_filas_sin_producto(apps, schema_editor):
+    VentaResumenDiario = apps.get_model('pos', 'VentaResumenDiario')
+    sin_producto = VentaResumenDiario.objects.filter(producto__isnull=True)
+    grupos = list(sin_producto.values(*DIMENSIONES).annotate(**{f'suma_{m}': Sum(m) for m in MEDIDAS}))
+    sin_producto.delete()
+    VentaResumenDiario.objects.bulk_create([
+        VentaResumenDiario(
+            producto_id=SIN_PRODUCTO,
+            **{d: grupo[d] for d in DIMENSIONES},
+            **{m: grupo[f'suma_{m}'] for m in MEDIDAS},
+        )
+        for grupo in grupos
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0009_llenar_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.RunPython(unir_filas_sin_producto, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ventaresumendiario',
+            name='producto',
+            field=models.ForeignKey(db_constraint=False, help_text='0 (resumen.SIN_PRODUCTO) para ventas sin detalle', on_delete=django.db.models.deletion.DO_NOTHING, to='inventory.producto'),
+        ),
+    ]
@@ -137,4 +137,59 @@ class ItemMesa(models.Model):
         return f"{self.cantidad} x {self.producto.nombre} - Mesa {self.mesa.numero}"
     
     class Meta:
-        db_table = 'item_mesa'
\ No newline at end of file
+        db_table = 'item_mesa'
+
+class SolicitudIdempotente(models.Model):
+    """
+    Venta ya procesada, indexada por la clave (UUID) que genera la caja.
+    Un reintento con la misma clave recibe la respuesta guardada en lugar de
+    registrar otra venta (ver pos/idempotencia.py).
+    """
+    clave = models.UUIDField(unique=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    huella = models.CharField(max_length=64, help_text="SHA-256 del cuerpo de la solicitud")
+    venta = models.ForeignKey(Venta, on_delete=models.SET_NULL, null=True, blank=True)
+    respuesta = models.JSONField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.clave} -> Venta #{self.venta_id}"
+
+    class Meta:
+        db_table = 'solicitud_idempotente'
+
+
+class VentaResumenDiario(models.Model):
+    """
+    Resumen diario de ventas por día × canal × método de pago × vendedor ×
+    producto (ver pos/resumen.py). Se actualiza en la misma transacción de
+    cada venta y los reportes lo leen en lugar de recorrer venta/venta_detalle.
+
+    ``cantidad``, ``subtotal`` y ``costo`` son de las líneas del producto.
+    ``numero_ventas`` y ``total_ventas`` se cargan una sola vez por venta (en
+    la fila de su primer producto), así que se pueden sumar por cualquier
+    combinación de dimensiones que no incluya el producto.
+    """
+    fecha = models.DateField(help_text="Día local de la venta")
+    canal_venta = models.CharField(max_length=20)
+    metodo_pago = models.CharField(max_length=25)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False)
+    producto = models.ForeignKey('inventory.Producto', on_delete=models.DO_NOTHING, db_constraint=False,
+                                 help_text="0 (resumen.SIN_PRODUCTO) para ventas sin detalle")
+    cantidad = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    numero_ventas = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.fecha} {self.canal_venta}/{self.metodo_pago} - {self.producto_id}"
+
+    class Meta:
+        db_table = 'venta_resumen_diario'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'canal_venta', 'metodo_pago', 'usuario', 'producto'],
+                name='uniq_venta_resumen_diario',
+            ),
+        ]
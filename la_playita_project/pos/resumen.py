@@ -0,0 +1,165 @@
+"""
+Resumen diario de ventas (tabla ``venta_resumen_diario``).
+
+Cada venta suma sus líneas al resumen dentro de su propia transacción
+(``acumular_ventas``), así que el resumen nunca queda con ventas a medias ni
+con ventas revertidas. Los reportes agrupan el resumen por día en lugar de
+recorrer ``venta``/``venta_detalle``/``pago``: su costo depende de los días
+del rango y no de la cantidad de ventas.
+
+``reconstruir`` vuelve a calcular un rango de fechas desde las tablas de
+ventas (comando ``reconstruir_resumen_ventas``).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from clients import metricas
+from core.cache_respuestas import INVENTARIO, VENTAS, invalidar_al_confirmar
+from .models import Pago, Venta, VentaDetalle, VentaResumenDiario
+
+DIMENSIONES = ('fecha', 'canal_venta', 'metodo_pago', 'usuario_id', 'producto_id')
+MEDIDAS = ('cantidad', 'subtotal', 'costo', 'numero_ventas', 'total_ventas')
+METODO_SIN_PAGO = 'sin_pago'
+# Producto de las ventas sin detalle. No es NULL: MySQL no considera duplicadas
+# dos filas con NULL en la llave única y el resumen las repetiría.
+SIN_PRODUCTO = 0
+
+
+def fecha_local(fecha_venta):
+    return timezone.localtime(fecha_venta).date()
+
+
+def _calcular_deltas(ventas, detalles, metodos):
+    """
+    Agrupa las líneas de las ventas por las dimensiones del resumen.
+
+    Args:
+        ventas (iterable): dicts con id, fecha_venta, canal_venta, usuario_id, total_venta
+        detalles (iterable): dicts con venta_id, producto_id, cantidad, subtotal, costo_unitario
+        metodos (dict): {venta_id: metodo_pago}
+
+    Returns:
+        dict: {(fecha, canal, metodo, usuario_id, producto_id): [cantidad, subtotal, costo, numero_ventas, total]}
+    """
+    lineas_por_venta = {}
+    for detalle in detalles:
+        lineas_por_venta.setdefault(detalle['venta_id'], []).append(detalle)
+
+    deltas = {}
+    for venta in ventas:
+        base = (
+            fecha_local(venta['fecha_venta']), venta['canal_venta'],
+            metodos.get(venta['id'], METODO_SIN_PAGO), venta['usuario_id'],
+        )
+        lineas = sorted(lineas_por_venta.get(venta['id'], []), key=lambda d: d['producto_id'])
+        if not lineas:
+            lineas = [{'producto_id': SIN_PRODUCTO, 'cantidad': 0, 'subtotal': Decimal('0'), 'costo_unitario': None}]
+
+        for i, linea in enumerate(lineas):
+            medidas = deltas.setdefault(base + (linea['producto_id'],), [0, Decimal('0'), Decimal('0'), 0, Decimal('0')])
+            medidas[0] += linea['cantidad']
+            medidas[1] += linea['subtotal']
+            medidas[2] += linea['cantidad'] * (linea['costo_unitario'] or Decimal('0'))
+            if i == 0:
+                # La venta se cuenta una sola vez: en la fila de su primer producto
+                medidas[3] += 1
+                medidas[4] += venta['total_venta']
+    return deltas
+
+
+def _leer_ventas(ventas):
+    """Ventas, detalles y método de pago de un queryset de Venta (3 consultas)."""
+    ventas = list(ventas.values('id', 'fecha_venta', 'canal_venta', 'usuario_id', 'total_venta'))
+    ids = [v['id'] for v in ventas]
+    detalles = (
+        VentaDetalle.objects.filter(venta_id__in=ids)
+        .values('venta_id', 'producto_id', 'cantidad', 'subtotal', costo_unitario=F('lote__costo_unitario_lote'))
+    )
+    metodos = {}
+    for venta_id, metodo in Pago.objects.filter(venta_id__in=ids).order_by('-id').values_list('venta_id', 'metodo_pago'):
+        metodos[venta_id] = metodo  # con varios pagos queda el primero
+    return _calcular_deltas(ventas, detalles, metodos)
+
+
+def _clave(fila):
+    return tuple(fila[d] for d in DIMENSIONES)
+
+
+def _aplicar_deltas(deltas):
+    """
+    Suma los deltas: primero crea en cero las filas que falten y luego las
+    incrementa con un solo UPDATE ... CASE.
+
+    No se bloquean llaves que todavía no existen (SELECT ... FOR UPDATE sobre
+    un hueco del índice toma un gap lock en InnoDB y dos primeras ventas del
+    día se bloquean mutuamente al insertar). ``ignore_conflicts`` deja la fila
+    que otra venta haya creado antes y el incremento con ``F()`` es atómico.
+    """
+    if not deltas:
+        return
+    claves = sorted(deltas)  # mismo orden de bloqueo en todas las ventas
+    VentaResumenDiario.objects.bulk_create(
+        [VentaResumenDiario(**dict(zip(DIMENSIONES, clave))) for clave in claves],
+        ignore_conflicts=True,
+    )
+
+    condicion = Q()
+    for clave in claves:
+        condicion |= Q(**dict(zip(DIMENSIONES, clave)))
+    ids = {_clave(fila): fila['id'] for fila in VentaResumenDiario.objects.filter(condicion).values('id', *DIMENSIONES)}
+
+    VentaResumenDiario.objects.filter(id__in=ids.values()).update(**{
+        medida: Case(
+            *[When(id=ids[clave], then=F(medida) + Value(deltas[clave][i])) for clave in claves],
+            default=F(medida),
+        )
+        for i, medida in enumerate(MEDIDAS)
+    })
+
+
+def acumular_ventas(venta_ids):
+    """
+    Suma las ventas indicadas al resumen. Se llama dentro de la transacción
+    que las registra, después de insertar sus detalles y pagos.
+    """
+    ventas = Venta.objects.filter(id__in=list(venta_ids))
+    _aplicar_deltas(_leer_ventas(ventas))
+    # La fila de metrica_cliente de cada comprador, con los puntos ya registrados
+    metricas.actualizar_al_confirmar(ventas.values_list('cliente_id', flat=True))
+    # Las ventas también escriben movimientos de inventario (con bulk_create, sin señales)
+    invalidar_al_confirmar(VENTAS, INVENTARIO)
+
+
+@transaction.atomic
+def reconstruir(desde, hasta):
+    """
+    Recalcula el resumen de ``desde`` a ``hasta`` (fechas locales, inclusive)
+    a partir de las ventas.
+
+    Returns:
+        int: filas del resumen escritas
+    """
+    VentaResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    deltas = _leer_ventas(Venta.objects.filter(fecha_venta__gte=inicio, fecha_venta__lt=fin))
+    VentaResumenDiario.objects.bulk_create(
+        [VentaResumenDiario(**dict(zip(DIMENSIONES, clave)), **dict(zip(MEDIDAS, medidas)))
+         for clave, medidas in deltas.items()],
+        batch_size=1000,
+    )
+    return len(deltas)
+
+
+def resumen(desde=None, hasta=None, **filtros):
+    """Filas del resumen en un rango de fechas (inclusive), para agrupar con values()."""
+    filas = VentaResumenDiario.objects.filter(**filtros)
+    if desde is not None:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta is not None:
+        filas = filas.filter(fecha__lte=hasta)
+    return filas
@@ -0,0 +1,88 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from inventory.models import Lote, Producto
+from .models import ItemMesa, Mesa
+from . import catalogo, tablero
+from .escaneo import invalidar_al_confirmar
+
+CAMPOS_CATALOGO = ('categoria_id', 'nombre', 'descripcion', 'precio_unitario', 'codigo_barras')
+
+
+def _foto_catalogo(producto):
+    return tuple(getattr(producto, campo) for campo in CAMPOS_CATALOGO) + (producto.stock_actual > 0,)
+
+
+@receiver(pre_save, sender=Producto)
+def recordar_producto_anterior(sender, instance, **kwargs):
+    """Guarda cómo estaba el producto para saber si el catálogo cambió."""
+    instance._catalogo_anterior = None
+    if instance.pk:
+        anterior = Producto.objects.filter(pk=instance.pk).first()
+        if anterior is not None:
+            instance._catalogo_anterior = _foto_catalogo(anterior)
+
+
+@receiver(post_save, sender=Producto)
+def invalidar_catalogo_producto(sender, instance, created, **kwargs):
+    """Precio, categoría, datos o disponibilidad cambiaron: regenerar sus categorías."""
+    anterior = getattr(instance, '_catalogo_anterior', None)
+    if anterior is not None and anterior == _foto_catalogo(instance):
+        return
+    categorias = {instance.categoria_id}
+    if anterior is not None:
+        categorias.add(anterior[0])
+    catalogo.invalidar_al_confirmar(categorias)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_foto_producto(sender, instance, **kwargs):
+    """Precio, IVA o códigos cambiaron: descartar la foto de la caché de escaneo."""
+    invalidar_al_confirmar([instance.pk])
+
+
+@receiver(post_delete, sender=Producto)
+def invalidar_catalogo_producto_eliminado(sender, instance, **kwargs):
+    catalogo.invalidar_al_confirmar([instance.categoria_id])
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_foto_producto_por_lote(sender, instance, **kwargs):
+    """Cambió el stock o el lote FEFO del producto."""
+    invalidar_al_confirmar([instance.producto_id])
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_catalogo_por_lote(sender, instance, **kwargs):
+    """Un ingreso o ajuste de lote puede hacer que el producto entre o salga del catálogo."""
+    categoria_id = Producto.objects.filter(pk=instance.producto_id).values_list('categoria_id', flat=True).first()
+    catalogo.invalidar_al_confirmar([categoria_id])
+
+
+@receiver(post_save, sender=Mesa)
+def publicar_mesa(sender, instance, **kwargs):
+    """Foto de la mesa para el tablero en tiempo real (pos/tablero.py)."""
+    if instance.activa:
+        tablero.publicar_al_confirmar('mesa', tablero.mesa_a_dict(instance))
+    else:
+        tablero.publicar_al_confirmar('mesa_eliminada', {'id': instance.pk})
+
+
+@receiver(post_delete, sender=Mesa)
+def publicar_mesa_eliminada(sender, instance, **kwargs):
+    tablero.publicar_al_confirmar('mesa_eliminada', {'id': instance.pk})
+
+
+@receiver(post_save, sender=ItemMesa)
+def publicar_item_mesa(sender, instance, **kwargs):
+    if instance.facturado:
+        tablero.publicar_al_confirmar('item_eliminado', {'mesa_id': instance.mesa_id, 'id': instance.pk})
+    else:
+        tablero.publicar_al_confirmar('item', {'mesa_id': instance.mesa_id, 'item': tablero.item_a_dict(instance)})
+
+
+@receiver(post_delete, sender=ItemMesa)
+def publicar_item_mesa_eliminado(sender, instance, **kwargs):
+    tablero.publicar_al_confirmar('item_eliminado', {'mesa_id': instance.mesa_id, 'id': instance.pk})
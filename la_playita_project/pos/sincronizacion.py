@@ -0,0 +1,285 @@
+"""
+Sincronización de ventas registradas sin conexión.
+
+Cuando la caja pierde la red sigue vendiendo y encola las ventas; al volver,
+las envía en lotes a ``/pos/api/sincronizar-ventas/``. Cada lote se aplica en
+una sola transacción:
+
+1. Se descartan las ventas cuya clave de idempotencia ya se registró.
+2. Se bloquean (en orden de id) los lotes de inventario de todos los productos
+   del lote de ventas y se reparte el stock en memoria, venta por venta. Una
+   venta que no alcanza se reporta como conflicto sin afectar a las demás.
+3. Las ventas aceptadas se insertan con bulk_create en venta, pago,
+   venta_detalle y movimiento_inventario, y los lotes se descuentan con un
+   único UPDATE.
+"""
+import hashlib
+import json
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from clients import puntos
+from clients.models import Cliente, PuntosFidelizacion
+from inventory.models import Lote, MovimientoInventario, Producto
+from . import catalogo, facturas, resumen
+from .checkout import (
+    CONSUMIDOR_FINAL_ID, StockInsuficiente, calcular_puntos, cantidades_por_lote,
+    descontar_lotes, normalizar_items, repartir_linea,
+)
+from .escaneo import invalidar_al_confirmar
+from .models import Pago, SolicitudIdempotente, Venta, VentaDetalle
+
+MAX_VENTAS_POR_LOTE = getattr(settings, 'POS_SYNC_MAX_VENTAS', 200)
+
+REGISTRADA = 'registrada'
+DUPLICADA = 'duplicada'
+CONFLICTO = 'conflicto'
+INVALIDA = 'invalida'
+
+
+def huella_venta(datos):
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _preparar(datos, claves_vistas):
+    """Valida una venta del lote; lanza ValueError si está mal formada."""
+    try:
+        clave = uuid.UUID(str(datos.get('idempotency_key')))
+    except ValueError:
+        raise ValueError('Cada venta necesita un idempotency_key (UUID).')
+    if clave in claves_vistas:
+        raise ValueError('La clave de idempotencia está repetida en el lote.')
+    claves_vistas.add(clave)
+
+    fecha = timezone.now()
+    if datos.get('fecha_venta'):
+        fecha = parse_datetime(str(datos['fecha_venta']))
+        if fecha is None:
+            raise ValueError('fecha_venta no tiene un formato ISO 8601 válido.')
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+
+    lineas = normalizar_items(datos.get('items') or [])
+    if not lineas:
+        raise ValueError('El carrito está vacío.')
+    return {
+        'clave': clave,
+        'huella': huella_venta(datos),
+        'cliente_id': int(datos.get('cliente_id') or CONSUMIDOR_FINAL_ID),
+        'canal_venta': datos['canal_venta'],
+        'metodo_pago': datos['metodo_pago'],
+        'fecha': fecha,
+        'lineas': lineas,
+    }
+
+
+def _cargar_inventario(ventas):
+    """
+    Productos y lotes vendibles de todo el lote de ventas, con los lotes
+    bloqueados (SELECT ... FOR UPDATE en orden de id, el mismo orden que
+    usa descontar_lotes, para no provocar deadlocks con el checkout).
+    """
+    candidatos = defaultdict(list)
+    lineas = [linea for venta in ventas for linea in venta['lineas']]
+    if not lineas:
+        return {}, {}, candidatos
+    producto_ids = {linea['producto_id'] for linea in lineas}
+    explicitos = {linea['lote_id'] for linea in lineas if linea['lote_id']}
+    hoy = timezone.localdate()
+
+    productos = Producto.objects.in_bulk(producto_ids)
+    vendibles = Q(
+        producto_id__in=producto_ids,
+        cantidad_disponible__gt=0,
+        fecha_caducidad__gte=hoy,
+    ) & ~Q(estado__in=['vencido', 'descartado'])
+    lotes = {
+        lote.id: lote
+        for lote in Lote.objects.select_for_update().filter(vendibles | Q(id__in=explicitos)).order_by('id')
+    }
+
+    # Mismo criterio y orden que checkout.lotes_fefo, aplicado en memoria
+    for lote in sorted(lotes.values(), key=lambda l: (l.fecha_caducidad, l.id)):
+        if (lote.producto_id in producto_ids and lote.cantidad_disponible > 0
+                and lote.fecha_caducidad >= hoy and lote.estado not in ('vencido', 'descartado')):
+            candidatos[lote.producto_id].append(lote)
+    return productos, lotes, candidatos
+
+
+def _asignar(venta, productos, lotes, candidatos, restante):
+    """
+    Reparte las líneas de una venta contra el stock ``restante``. Solo si toda
+    la venta alcanza se aplican los descuentos a ``restante``.
+    """
+    for linea in venta['lineas']:
+        producto = productos.get(linea['producto_id'])
+        if producto is None:
+            raise ValueError(f"El producto #{linea['producto_id']} no existe.")
+        if linea['precio'] is None:
+            linea['precio'] = producto.precio_unitario
+        if linea['lote_id'] and (linea['lote_id'] not in lotes
+                                 or lotes[linea['lote_id']].producto_id != linea['producto_id']):
+            raise ValueError(f"El lote #{linea['lote_id']} no existe o no pertenece a '{producto.nombre}'.")
+
+    prueba = dict(restante)
+    asignadas = []
+    for linea in venta['lineas']:
+        if linea['lote_id']:
+            if prueba[linea['lote_id']] < linea['cantidad']:
+                lote = lotes[linea['lote_id']]
+                raise StockInsuficiente(
+                    f"No hay suficiente stock de '{productos[linea['producto_id']].nombre}'. "
+                    f"Solicitado: {linea['cantidad']}, Disponible: {prueba[lote.id]} (Lote: {lote.numero_lote})"
+                )
+            prueba[linea['lote_id']] -= linea['cantidad']
+            asignadas.append(linea)
+        else:
+            asignadas.extend(repartir_linea(linea, candidatos[linea['producto_id']], prueba, productos))
+
+    restante.update(prueba)
+    venta['lineas'] = asignadas
+    venta['total'] = sum(linea['precio'] * linea['cantidad'] for linea in asignadas)
+
+
+def _insertar_ventas(objetos):
+    """bulk_create de Venta; sin RETURNING en el motor se insertan una por una para obtener los ids."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Venta.objects.bulk_create(objetos)
+    for venta in objetos:
+        venta.save(force_insert=True)
+    return objetos
+
+
+def sincronizar_ventas(usuario, ventas_datos):
+    """
+    Aplica un lote de ventas sin conexión. Debe llamarse dentro de
+    ``transaction.atomic``.
+
+    Returns:
+        list: un resultado por venta, en el orden recibido:
+            {'idempotency_key', 'estado', 'venta_id', 'total', 'puntos_ganados', 'error'}
+    """
+    if len(ventas_datos) > MAX_VENTAS_POR_LOTE:
+        raise ValueError(f'Un lote admite como máximo {MAX_VENTAS_POR_LOTE} ventas.')
+
+    resultados = []
+    preparadas = []
+    claves_vistas = set()
+    for datos in ventas_datos:
+        resultado = {'idempotency_key': str(datos.get('idempotency_key') or '')}
+        resultados.append(resultado)
+        try:
+            venta = _preparar(datos, claves_vistas)
+        except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+            resultado.update(estado=INVALIDA, error=str(e) if not isinstance(e, KeyError) else f'Falta el campo {e}.')
+            continue
+        venta['resultado'] = resultado
+        preparadas.append(venta)
+
+    # 1. Ventas ya registradas (reintentos de un lote anterior)
+    existentes = SolicitudIdempotente.objects.in_bulk([v['clave'] for v in preparadas], field_name='clave')
+    pendientes = []
+    for venta in preparadas:
+        solicitud = existentes.get(venta['clave'])
+        if solicitud is None:
+            pendientes.append(venta)
+        elif solicitud.usuario_id == usuario.id and solicitud.huella == venta['huella']:
+            venta['resultado'].update(solicitud.respuesta or {}, estado=DUPLICADA, venta_id=solicitud.venta_id)
+        else:
+            venta['resultado'].update(estado=CONFLICTO, error='La clave de idempotencia ya se usó para otra venta.')
+
+    if not pendientes:
+        return resultados
+
+    # 2. Reparto del stock en memoria, venta por venta
+    productos, lotes, candidatos = _cargar_inventario(pendientes)
+    clientes = set(Cliente.objects.filter(
+        pk__in={v['cliente_id'] for v in pendientes}
+    ).values_list('pk', flat=True))
+    restante = {lote.id: lote.cantidad_disponible for lote in lotes.values()}
+    aceptadas = []
+    for venta in pendientes:
+        try:
+            if venta['cliente_id'] not in clientes:
+                raise ValueError(f"El cliente #{venta['cliente_id']} no existe.")
+            _asignar(venta, productos, lotes, candidatos, restante)
+        except StockInsuficiente as e:
+            venta['resultado'].update(estado=CONFLICTO, error=str(e))
+            continue
+        except ValueError as e:
+            venta['resultado'].update(estado=INVALIDA, error=str(e))
+            continue
+        aceptadas.append(venta)
+
+    if not aceptadas:
+        return resultados
+
+    # 3. Escritura en bloque
+    objetos = _insertar_ventas([
+        Venta(cliente_id=v['cliente_id'], usuario=usuario, canal_venta=v['canal_venta'],
+              total_venta=v['total'], fecha_venta=v['fecha'])
+        for v in aceptadas
+    ])
+    for venta, objeto in zip(aceptadas, objetos):
+        venta['venta'] = objeto
+
+    Pago.objects.bulk_create([
+        Pago(venta=v['venta'], monto=v['total'], metodo_pago=v['metodo_pago'],
+             estado='completado', fecha_pago=v['fecha'])
+        for v in aceptadas
+    ])
+    VentaDetalle.objects.bulk_create([
+        VentaDetalle(venta=v['venta'], producto_id=linea['producto_id'], lote_id=linea['lote_id'],
+                     cantidad=linea['cantidad'], subtotal=linea['precio'] * linea['cantidad'])
+        for v in aceptadas for linea in v['lineas']
+    ])
+    descontar_lotes(cantidades_por_lote([linea for v in aceptadas for linea in v['lineas']]))
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(
+            producto_id=linea['producto_id'],
+            lote_id=linea['lote_id'],
+            cantidad=-linea['cantidad'],  # Negativo porque es una salida
+            tipo_movimiento='salida',
+            descripcion=f"Venta #{v['venta'].id} - {productos[linea['producto_id']].nombre} (sincronizada)",
+            venta=v['venta'],
+        )
+        for v in aceptadas for linea in v['lineas']
+    ])
+    resumen.acumular_ventas(v['venta'].id for v in aceptadas)
+    facturas.generar_al_confirmar(v['venta'].id for v in aceptadas)
+    invalidar_al_confirmar({linea['producto_id'] for v in aceptadas for linea in v['lineas']})
+    catalogo.invalidar_agotados(
+        productos, catalogo.vendido_por_producto(linea for v in aceptadas for linea in v['lineas'])
+    )
+
+    # Puntos de fidelización: solo el libro; el acumulador los suma a puntos_totales
+    movimientos_puntos = []
+    for v in aceptadas:
+        v['puntos'] = calcular_puntos(v['cliente_id'], v['total'])
+        if v['puntos']:
+            movimientos_puntos.append(
+                puntos.movimiento_ganancia(v['cliente_id'], v['puntos'], v['venta'].id, v['total'])
+            )
+    PuntosFidelizacion.objects.bulk_create(movimientos_puntos)
+
+    solicitudes = []
+    for v in aceptadas:
+        respuesta = {
+            'success': True,
+            'venta_id': v['venta'].id,
+            'total': float(v['total']),
+            'puntos_ganados': float(v['puntos']),
+            'mensaje': f"Venta #{v['venta'].id} procesada con éxito.",
+        }
+        v['resultado'].update(respuesta, estado=REGISTRADA)
+        solicitudes.append(SolicitudIdempotente(
+            clave=v['clave'], usuario=usuario, huella=v['huella'], venta=v['venta'], respuesta=respuesta
+        ))
+    SolicitudIdempotente.objects.bulk_create(solicitudes)
+    return resultados
@@ -0,0 +1,147 @@
+"""
+Tablero de mesas en tiempo real (server-sent events).
+
+Cada cambio de ``Mesa`` o ``ItemMesa`` (pos/signals.py y api_cerrar_mesa)
+publica, al confirmarse la transacción, un evento con la foto de la fila ya
+guardada: las pantallas aplican el cambio sin volver a pedir la lista de
+mesas ni recalcular totales.
+
+Los eventos viven en la caché (Redis en producción): un contador
+``pos:mesas:evento`` numera los eventos y cada uno se guarda en su propia
+clave durante ``POS_MESAS_EVENTOS_TTL`` segundos. ``api_eventos_mesas`` lee
+de la caché, nunca de la base de datos: la conexión queda abierta hasta
+``POS_MESAS_SSE_DURACION`` segundos y revisa el contador cada
+``POS_MESAS_SSE_INTERVALO`` segundos.
+
+El sitio sigue servido por gunicorn (WSGI), donde cada pantalla ocuparía un
+worker síncrono. Por eso el endpoint solo transmite en el proceso ASGI aparte
+(``la_playita_project.asgi`` con uvicorn, lanzado por procesos_fondo.sh), al
+que el proxy envía únicamente esa ruta. Si la petición llega a gunicorn (o a
+``runserver``) responde 204 y el modal vuelve a pedir ``api/mesas/`` al
+abrirse.
+
+Las pantallas solo mantienen la conexión mientras el modal de mesas está
+abierto. Los ids salen de ``cache.incr``, que solo Redis hace atómico entre
+procesos: en memoria local cada worker tendría su propio contador y en la
+caché de archivos dos workers pueden sacar el mismo id y pisar un evento. Sin
+Redis (``REDIS_URL`` sin definir, ``CACHE_COMPARTIDA`` False) no se publica
+nada y el endpoint también responde 204.
+
+Si un cliente se atrasa más de lo que guarda la caché recibe
+``resincronizar`` y vuelve a pedir ``api/mesas/``.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_SECUENCIA = 'pos:mesas:evento'
+CLAVE_EVENTO = 'pos:mesas:evento:{}'
+TTL_EVENTOS = getattr(settings, 'POS_MESAS_EVENTOS_TTL', 60 * 10)
+MAX_EVENTOS = 500
+INTERVALO = getattr(settings, 'POS_MESAS_SSE_INTERVALO', 1)
+DURACION = getattr(settings, 'POS_MESAS_SSE_DURACION', 60 * 5)
+REINTENTO_MS = getattr(settings, 'POS_MESAS_SSE_REINTENTO_MS', 3000)
+LATIDO = 15
+
+
+def mesa_a_dict(mesa):
+    """Lo mismo que devuelve api_listar_mesas por mesa."""
+    return {
+        'id': mesa.id,
+        'numero': mesa.numero,
+        'nombre': mesa.nombre,
+        'capacidad': mesa.capacidad,
+        'estado': mesa.estado,
+        'cuenta_abierta': mesa.cuenta_abierta,
+        'total_cuenta': float(mesa.total_cuenta),
+        'cliente': {
+            'id': mesa.cliente.id,
+            'nombre': f"{mesa.cliente.nombres} {mesa.cliente.apellidos}"
+        } if mesa.cliente else None
+    }
+
+
+def item_a_dict(item):
+    """Lo mismo que devuelve api_items_mesa por item."""
+    return {
+        'id': item.id,
+        'producto': item.producto.nombre,
+        'producto_id': item.producto.id,
+        'lote_id': item.lote.id if item.lote else None,
+        'cantidad': item.cantidad,
+        'precio_unitario': float(item.precio_unitario),
+        'subtotal': float(item.subtotal),
+        'anotacion': item.anotacion or ''
+    }
+
+
+def ultimo_evento():
+    return cache.get(CLAVE_SECUENCIA) or 0
+
+
+def publicar(tipo, datos):
+    cache.add(CLAVE_SECUENCIA, 0, timeout=None)
+    try:
+        numero = cache.incr(CLAVE_SECUENCIA)
+    except ValueError:
+        cache.set(CLAVE_SECUENCIA, 1, timeout=None)
+        numero = 1
+    cache.set(CLAVE_EVENTO.format(numero), {'id': numero, 'tipo': tipo, 'datos': datos}, TTL_EVENTOS)
+    return numero
+
+
+def publicar_al_confirmar(tipo, datos):
+    """Publica cuando la transacción se confirme (las pantallas no ven cambios revertidos)."""
+    if not disponible():
+        return
+    transaction.on_commit(lambda: publicar(tipo, datos))
+
+
+def eventos_desde(desde, hasta):
+    """
+    Eventos con id en (desde, hasta]. Si alguno ya expiró de la caché, el
+    cliente está demasiado atrasado o el contador se reinició (caché
+    vaciada) devuelve un único ``resincronizar``.
+    """
+    if hasta == desde:
+        return []
+    if hasta < desde or hasta - desde > MAX_EVENTOS:
+        return [{'id': hasta, 'tipo': 'resincronizar', 'datos': {}}]
+    claves = [CLAVE_EVENTO.format(n) for n in range(desde + 1, hasta + 1)]
+    guardados = cache.get_many(claves)
+    if len(guardados) != len(claves):
+        return [{'id': hasta, 'tipo': 'resincronizar', 'datos': {}}]
+    return [guardados[clave] for clave in claves]
+
+
+def formatear(evento):
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+
+
+def disponible():
+    """Los eventos solo son confiables con Redis: caché compartida e ``incr`` atómico."""
+    return getattr(settings, 'CACHE_COMPARTIDA', False)
+
+
+async def flujo_asincrono(desde):
+    """Conexión abierta; solo lee el contador de la caché mientras no haya cambios."""
+    yield f'retry: {REINTENTO_MS}\n: desde {desde}\n\n'
+    fin = time.monotonic() + DURACION
+    ultimo_latido = time.monotonic()
+    while time.monotonic() < fin:
+        hasta = await cache.aget(CLAVE_SECUENCIA) or 0
+        if hasta != desde:
+            for evento in await sync_to_async(eventos_desde)(desde, hasta):
+                yield formatear(evento)
+            desde = hasta
+            ultimo_latido = time.monotonic()
+        elif time.monotonic() - ultimo_latido >= LATIDO:
+            # Comentario SSE: mantiene viva la conexión a través de proxies
+            yield ': latido\n\n'
+            ultimo_latido = time.monotonic()
+        await asyncio.sleep(INTERVALO)
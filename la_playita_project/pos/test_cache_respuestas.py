@@ -0,0 +1,77 @@
+"""
+Tests para la caché de respuestas de reportes (core/cache_respuestas.py)
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+
+from core import cache_respuestas
+from inventory.models import MovimientoInventario
+from users.models import Rol
+from .checkout import registrar_venta
+from .test_checkout import CheckoutTestMixin
+
+Usuario = get_user_model()
+
+
+@override_settings(CACHE_RESPUESTAS_ACTIVA=True)
+class CacheRespuestasTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.papas, self.lote = self.crear_producto('Papas')
+        self.vendedor = Client()
+        self.vendedor.force_login(self.usuario)
+
+    def vender(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': self.papas.id, 'cantidad': 1},
+                ])
+
+    def test_venta_invalida_el_grafico_de_ventas(self):
+        primera = self.vendedor.get('/pos/api/ventas-por-fecha/')
+        self.assertEqual(primera['X-Cache'], 'MISS')
+        self.assertEqual(self.vendedor.get('/pos/api/ventas-por-fecha/')['X-Cache'], 'HIT')
+        # Otra ventana es otra clave
+        self.assertEqual(self.vendedor.get('/pos/api/ventas-por-fecha/?dias=7')['X-Cache'], 'MISS')
+
+        self.vender()
+
+        respuesta = self.vendedor.get('/pos/api/ventas-por-fecha/')
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(respuesta.json()['cantidades'], [1])
+
+    def test_clave_por_rol(self):
+        admin = Usuario.objects.create_user(
+            username='33333333', password='testpass123', email='admin@test.com',
+            rol=Rol.objects.create(nombre='Administrador')
+        )
+        http_admin = Client()
+        http_admin.force_login(admin)
+
+        self.assertEqual(self.vendedor.get('/api/inventory/dashboard-stats/')['X-Cache'], 'MISS')
+        self.assertEqual(http_admin.get('/api/inventory/dashboard-stats/')['X-Cache'], 'MISS')
+        self.assertEqual(http_admin.get('/api/inventory/dashboard-stats/')['X-Cache'], 'HIT')
+
+    def test_movimiento_invalida_dashboards_de_inventario(self):
+        self.vendedor.get('/api/inventory/dashboard-stats/')
+        self.assertEqual(self.vendedor.get('/api/inventory/dashboard-stats/')['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MovimientoInventario.objects.create(
+                producto=self.papas, lote=self.lote, cantidad=5, tipo_movimiento='entrada', descripcion='Ingreso'
+            )
+
+        respuesta = self.vendedor.get('/api/inventory/dashboard-stats/')
+        self.assertEqual(respuesta['X-Cache'], 'MISS')
+        self.assertEqual(respuesta.json()['movimientos_hoy'], 1)
+
+    def test_se_puede_desactivar(self):
+        with self.settings(CACHE_RESPUESTAS_ACTIVA=False):
+            self.vendedor.get('/pos/api/ventas-por-fecha/')
+            self.assertFalse(self.vendedor.get('/pos/api/ventas-por-fecha/').has_header('X-Cache'))
+        self.assertIn('dashboard_stats', cache_respuestas.TTL_ENDPOINTS)
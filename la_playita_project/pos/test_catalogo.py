@@ -0,0 +1,94 @@
+"""
+Tests para el catálogo precalculado del POS (pos/catalogo.py)
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.models import Categoria, Producto
+from . import catalogo
+from .checkout import registrar_venta
+from .test_checkout import CheckoutTestMixin
+
+
+class CatalogoTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.papas, _ = self.crear_producto('Papas', cantidad=5)
+        self.bebidas = Categoria.objects.create(nombre='Bebidas')
+        self.jugo = Producto.objects.create(
+            nombre='Jugo', precio_unitario='3.00', stock_actual=2, categoria=self.bebidas
+        )
+        self.http = Client()
+        self.http.force_login(self.usuario)
+
+    def nombres(self, documento):
+        return {p['nombre'] for c in documento['categorias'] for p in c['productos']}
+
+    def test_segunda_lectura_sale_de_la_cache(self):
+        documento = catalogo.catalogo()
+        self.assertEqual(self.nombres(documento), {'Papas', 'Jugo'})
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(catalogo.catalogo()['categorias'], documento['categorias'])
+        self.assertEqual(len(consultas), 0)
+
+    def test_cambio_de_precio_regenera_solo_su_categoria(self):
+        catalogo.catalogo()
+        version = catalogo.version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jugo.precio_unitario = '3.50'
+            self.jugo.save()
+
+        self.assertGreater(catalogo.version(), version)
+        self.assertIsNotNone(cache.get(catalogo.CLAVE_CATEGORIA.format(self.categoria.id)))
+        self.assertIsNone(cache.get(catalogo.CLAVE_CATEGORIA.format(self.bebidas.id)))
+
+        bebidas = next(c for c in catalogo.catalogo()['categorias'] if c['id'] == self.bebidas.id)
+        self.assertEqual(bebidas['productos'][0]['precio'], '3.50')
+
+    def test_guardar_sin_cambios_no_invalida(self):
+        self.jugo.refresh_from_db()
+        catalogo.catalogo()
+        version = catalogo.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jugo.save()
+        self.assertEqual(catalogo.version(), version)
+
+    def test_venta_que_agota_el_stock_invalida(self):
+        catalogo.catalogo()
+        version = catalogo.version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': self.papas.id, 'cantidad': 5},
+                ])
+
+        self.assertGreater(catalogo.version(), version)
+
+    @override_settings(CACHE_COMPARTIDA=True)
+    def test_endpoint_con_etag(self):
+        url = reverse('pos:catalogo_pos')
+        respuesta = self.http.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('categorias', respuesta.json())
+
+        sin_cambios = self.http.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(sin_cambios.status_code, 304)
+
+        catalogo.invalidar_categorias([self.bebidas.id])
+        self.assertEqual(self.http.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+    def test_etag_vence_sin_cache_compartida(self):
+        with mock.patch.object(catalogo.time, 'time', return_value=1000 * catalogo.TIMEOUT):
+            antes = catalogo.etag()
+        with mock.patch.object(catalogo.time, 'time', return_value=1001 * catalogo.TIMEOUT):
+            self.assertNotEqual(catalogo.etag(), antes)
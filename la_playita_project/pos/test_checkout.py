@@ -0,0 +1,325 @@
+"""
+Tests para el motor de checkout en bloque (pos/checkout.py)
+"""
+import json
+import threading
+import unittest
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clients.models import Cliente
+from inventory.models import Categoria, Lote, MovimientoInventario, Producto
+from users.models import Rol
+from .checkout import StockInsuficiente, descontar_lotes, registrar_venta
+from .models import Pago, SolicitudIdempotente, Venta, VentaDetalle
+
+Usuario = get_user_model()
+
+
+class CheckoutTestMixin:
+    """Datos base compartidos por los tests del checkout"""
+
+    def setUp(self):
+        self.rol = Rol.objects.create(nombre='Vendedor')
+        self.usuario = Usuario.objects.create_user(
+            username='11111111',
+            password='testpass123',
+            first_name='Caja',
+            last_name='Uno',
+            email='caja@test.com',
+            rol=self.rol
+        )
+        self.cliente = Cliente.objects.create(
+            nombres='Cliente',
+            apellidos='Checkout',
+            documento='22222222',
+            telefono='3000000000',
+            correo='checkout@test.com'
+        )
+        self.categoria = Categoria.objects.create(nombre='Snacks')
+
+    def crear_producto(self, nombre, cantidad=100, precio='10.00', dias_caducidad=365, numero_lote=None):
+        producto = Producto.objects.create(
+            nombre=nombre,
+            precio_unitario=Decimal(precio),
+            stock_actual=cantidad,
+            categoria=self.categoria
+        )
+        lote = Lote.objects.create(
+            producto=producto,
+            numero_lote=numero_lote or f'L-{nombre}',
+            cantidad_disponible=cantidad,
+            costo_unitario_lote=Decimal('5.00'),
+            fecha_caducidad=timezone.localdate() + timedelta(days=dias_caducidad)
+        )
+        return producto, lote
+
+
+class RegistrarVentaTest(CheckoutTestMixin, TestCase):
+    """Tests del registro de ventas en bloque"""
+
+    def test_registra_detalles_movimientos_y_descuenta_lotes(self):
+        producto1, lote1 = self.crear_producto('Papas')
+        producto2, lote2 = self.crear_producto('Gaseosa', precio='3.50')
+
+        with transaction.atomic():
+            venta = registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                {'producto_id': producto1.id, 'lote_id': lote1.id, 'cantidad': 2, 'precio': '10.00'},
+                {'producto_id': producto2.id, 'lote_id': lote2.id, 'cantidad': 4, 'precio': '3.50'},
+                {'producto_id': producto1.id, 'lote_id': lote1.id, 'cantidad': 1, 'precio': '10.00'},
+            ])
+
+        self.assertEqual(venta.total_venta, Decimal('44.00'))
+        self.assertEqual(Pago.objects.get(venta=venta).monto, Decimal('44.00'))
+        self.assertEqual(VentaDetalle.objects.filter(venta=venta).count(), 3)
+        self.assertEqual(MovimientoInventario.objects.filter(venta=venta).count(), 3)
+
+        lote1.refresh_from_db()
+        lote2.refresh_from_db()
+        self.assertEqual(lote1.cantidad_disponible, 97)
+        self.assertEqual(lote2.cantidad_disponible, 96)
+
+    def test_numero_de_consultas_no_depende_de_las_lineas(self):
+        items = []
+        for i in range(20):
+            producto, lote = self.crear_producto(f'Producto {i}')
+            items.append({'producto_id': producto.id, 'lote_id': lote.id, 'cantidad': 1, 'precio': '10.00'})
+
+        with CaptureQueriesContext(connection) as una_linea:
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', items[:1])
+        # Productos distintos a la primera venta: las dos crean sus filas del resumen diario
+        with CaptureQueriesContext(connection) as varias_lineas:
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', items[1:])
+
+        self.assertEqual(len(una_linea), len(varias_lineas))
+
+    def test_stock_insuficiente_no_escribe_nada(self):
+        producto, lote = self.crear_producto('Chocolate', cantidad=5)
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': producto.id, 'lote_id': lote.id, 'cantidad': 3, 'precio': '10.00'},
+                    {'producto_id': producto.id, 'lote_id': lote.id, 'cantidad': 3, 'precio': '10.00'},
+                ])
+
+        lote.refresh_from_db()
+        self.assertEqual(lote.cantidad_disponible, 5)
+        self.assertFalse(VentaDetalle.objects.exists())
+
+    def test_lote_de_otro_producto(self):
+        producto1, _ = self.crear_producto('Arepa')
+        _, lote2 = self.crear_producto('Queso')
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': producto1.id, 'lote_id': lote2.id, 'cantidad': 1, 'precio': '10.00'},
+                ])
+
+
+class AsignacionFefoTest(CheckoutTestMixin, TestCase):
+    """Tests de la asignación automática de lotes (FEFO)"""
+
+    def test_reparte_la_cantidad_del_lote_que_vence_primero_al_ultimo(self):
+        producto, lote_tardio = self.crear_producto('Yogur', cantidad=10, dias_caducidad=60)
+        lote_proximo = Lote.objects.create(
+            producto=producto, numero_lote='YOG-PRONTO', cantidad_disponible=4,
+            costo_unitario_lote=Decimal('5.00'), fecha_caducidad=date.today() + timedelta(days=5)
+        )
+        lote_vencido = Lote.objects.create(
+            producto=producto, numero_lote='YOG-VENCIDO', cantidad_disponible=50,
+            costo_unitario_lote=Decimal('5.00'), fecha_caducidad=date.today() - timedelta(days=1)
+        )
+
+        with transaction.atomic():
+            venta = registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                {'producto_id': producto.id, 'cantidad': 6},
+            ])
+
+        detalles = {d.lote_id: d.cantidad for d in VentaDetalle.objects.filter(venta=venta)}
+        self.assertEqual(detalles, {lote_proximo.id: 4, lote_tardio.id: 2})
+        # Sin precio en el item se usa el precio del producto
+        self.assertEqual(venta.total_venta, Decimal('60.00'))
+
+        lote_vencido.refresh_from_db()
+        self.assertEqual(lote_vencido.cantidad_disponible, 50)
+
+    def test_sin_stock_suficiente_en_ningun_lote(self):
+        producto, _ = self.crear_producto('Kumis', cantidad=3)
+
+        with self.assertRaises(StockInsuficiente):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': producto.id, 'cantidad': 2},
+                    {'producto_id': producto.id, 'cantidad': 2},
+                ])
+
+
+class DescontarLotesTest(CheckoutTestMixin, TestCase):
+    """Tests del descuento condicional de lotes"""
+
+    def test_no_descuenta_si_el_lote_no_alcanza(self):
+        _, lote1 = self.crear_producto('Leche', cantidad=10)
+        _, lote2 = self.crear_producto('Pan', cantidad=2)
+
+        with self.assertRaises(StockInsuficiente):
+            with transaction.atomic():
+                descontar_lotes({lote1.id: 5, lote2.id: 3})
+
+        lote1.refresh_from_db()
+        lote2.refresh_from_db()
+        self.assertEqual(lote1.cantidad_disponible, 10)
+        self.assertEqual(lote2.cantidad_disponible, 2)
+
+    def test_descuenta_sobre_el_valor_vigente(self):
+        _, lote = self.crear_producto('Huevos', cantidad=10)
+        lote_en_memoria = Lote.objects.get(pk=lote.pk)
+
+        # Otra caja vende 4 unidades después de que leímos el lote
+        descontar_lotes({lote.id: 4})
+        descontar_lotes({lote_en_memoria.id: 5})
+
+        lote.refresh_from_db()
+        self.assertEqual(lote.cantidad_disponible, 1)
+
+
+class ProcesarVentaIdempotenteTest(CheckoutTestMixin, TestCase):
+    """Tests de los reintentos con Idempotency-Key"""
+
+    def setUp(self):
+        super().setUp()
+        self.producto, self.lote = self.crear_producto('Empanada', cantidad=10)
+        self.http = Client()
+        self.http.force_login(self.usuario)
+
+    def vender(self, clave, cantidad=2):
+        return self.http.post(
+            reverse('pos:procesar_venta'),
+            data=json.dumps({
+                'cliente_id': self.cliente.id,
+                'metodo_pago': 'efectivo',
+                'canal_venta': 'mostrador',
+                'items': [{'producto_id': self.producto.id, 'cantidad': cantidad}],
+            }),
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=str(clave),
+        )
+
+    def test_reintento_devuelve_la_misma_venta(self):
+        clave = uuid.uuid4()
+        primera = self.vender(clave)
+        segunda = self.vender(clave)
+
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Venta.objects.count(), 1)
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.cantidad_disponible, 8)
+
+    def test_clave_reutilizada_con_otro_contenido(self):
+        clave = uuid.uuid4()
+        self.vender(clave)
+        respuesta = self.vender(clave, cantidad=3)
+
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_venta_fallida_no_guarda_la_clave(self):
+        clave = uuid.uuid4()
+        self.assertEqual(self.vender(clave, cantidad=50).status_code, 400)
+        self.assertFalse(SolicitudIdempotente.objects.exists())
+
+        self.assertEqual(self.vender(clave, cantidad=50).status_code, 400)
+
+    def test_clave_invalida(self):
+        self.assertEqual(self.vender('no-es-un-uuid').status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', 'SQLite serializa las escrituras; requiere MySQL/PostgreSQL')
+class CheckoutConcurrenteTest(CheckoutTestMixin, TransactionTestCase):
+    """Stress test: N cajas vendiendo al mismo tiempo del mismo lote"""
+
+    CAJAS = 12
+    CANTIDAD_POR_VENTA = 3
+    STOCK_INICIAL = 20
+
+    def test_no_se_sobrevende_un_lote_caliente(self):
+        producto, lote = self.crear_producto('Hielo', cantidad=self.STOCK_INICIAL)
+        item = {'producto_id': producto.id, 'lote_id': lote.id,
+                'cantidad': self.CANTIDAD_POR_VENTA, 'precio': '10.00'}
+        barrera = threading.Barrier(self.CAJAS)
+        resultados = []
+
+        def vender():
+            try:
+                barrera.wait()
+                with transaction.atomic():
+                    registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [item])
+                resultados.append('ok')
+            except StockInsuficiente:
+                resultados.append('sin_stock')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=vender) for _ in range(self.CAJAS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        vendidas = resultados.count('ok')
+        lote.refresh_from_db()
+        self.assertEqual(len(resultados), self.CAJAS)
+        self.assertEqual(vendidas, self.STOCK_INICIAL // self.CANTIDAD_POR_VENTA)
+        self.assertEqual(lote.cantidad_disponible, self.STOCK_INICIAL - vendidas * self.CANTIDAD_POR_VENTA)
+        self.assertEqual(Venta.objects.count(), vendidas)
+        self.assertEqual(
+            MovimientoInventario.objects.filter(lote=lote).count(), vendidas
+        )
+
+    def test_el_lote_que_vence_primero_se_agota_en_otra_caja(self):
+        producto, lote_tardio = self.crear_producto('Leche', cantidad=20, dias_caducidad=60)
+        lote_proximo = Lote.objects.create(
+            producto=producto, numero_lote='LECHE-PRONTO', cantidad_disponible=self.CANTIDAD_POR_VENTA,
+            costo_unitario_lote=Decimal('5.00'), fecha_caducidad=timezone.localdate() + timedelta(days=2)
+        )
+        item = {'producto_id': producto.id, 'cantidad': self.CANTIDAD_POR_VENTA}
+        barrera = threading.Barrier(2)
+        resultados = []
+
+        def vender():
+            try:
+                barrera.wait()
+                with transaction.atomic():
+                    registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [item])
+                resultados.append('ok')
+            except StockInsuficiente:
+                resultados.append('sin_stock')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=vender) for _ in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # La caja que llega tarde pasa al siguiente lote en vez de fallar
+        self.assertEqual(resultados, ['ok', 'ok'])
+        lote_proximo.refresh_from_db()
+        lote_tardio.refresh_from_db()
+        self.assertEqual(lote_proximo.cantidad_disponible, 0)
+        self.assertEqual(lote_tardio.cantidad_disponible, 20 - self.CANTIDAD_POR_VENTA)
@@ -0,0 +1,68 @@
+"""
+Tests para el selector de clientes del POS (clients/busqueda.py)
+"""
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from clients.busqueda import buscar_clientes
+from clients.models import Cliente
+from .test_checkout import CheckoutTestMixin
+
+
+class BuscarClientesTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        datos = [
+            ('Ana María', 'Gómez', '1032001'),
+            ('Andrés', 'Pérez', '1032002'),
+            ('Luis', 'Anaya', '2040003'),
+            ('Carlos', 'Ruiz', '3050004'),
+        ]
+        for i, (nombres, apellidos, documento) in enumerate(datos):
+            Cliente.objects.create(nombres=nombres, apellidos=apellidos, documento=documento,
+                                   telefono='300', correo=f'c{i}@test.com')
+
+    def nombres(self, query, **kwargs):
+        clientes, _ = buscar_clientes(query, **kwargs)
+        return [f'{c.nombres} {c.apellidos}' for c in clientes]
+
+    def test_prefijo_de_nombre_o_apellido(self):
+        self.assertEqual(self.nombres('ana'), ['Ana María Gómez', 'Luis Anaya'])
+
+    def test_nombre_y_apellido(self):
+        self.assertEqual(self.nombres('andrés pé'), ['Andrés Pérez'])
+        self.assertEqual(self.nombres('gómez ana'), ['Ana María Gómez'])
+
+    def test_prefijo_de_documento(self):
+        self.assertEqual(self.nombres('1032'), ['Ana María Gómez', 'Andrés Pérez'])
+
+    def test_paginacion(self):
+        primera, hay_mas = buscar_clientes('', pagina=1, por_pagina=2)
+        segunda, hay_mas_2 = buscar_clientes('', pagina=2, por_pagina=2)
+        self.assertTrue(hay_mas)
+        self.assertTrue(set(primera).isdisjoint(segunda))
+
+    def test_endpoint_obtener_clientes(self):
+        http = Client()
+        http.force_login(self.usuario)
+        datos = http.get(reverse('pos:obtener_clientes'), {'q': 'ruiz'}).json()
+        self.assertTrue(datos['success'])
+        self.assertEqual([c['documento'] for c in datos['clientes']], ['3050004'])
+        self.assertFalse(datos['hay_mas'])
+
+    def test_endpoint_sin_q_devuelve_todos(self):
+        # Compatibilidad con el modal de pago de carrito.js
+        http = Client()
+        http.force_login(self.usuario)
+        datos = http.get(reverse('pos:obtener_clientes')).json()
+        self.assertTrue(datos['success'])
+        self.assertEqual(datos['total'], Cliente.objects.count())
+        self.assertFalse(datos['hay_mas'])
+
+    def test_endpoint_pagina_invalida(self):
+        http = Client()
+        http.force_login(self.usuario)
+        respuesta = http.get(reverse('pos:obtener_clientes'), {'q': 'ana', 'pagina': 'abc'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(respuesta.json()['success'])
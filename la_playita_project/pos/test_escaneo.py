@@ -0,0 +1,93 @@
+"""
+Tests para el escaneo de códigos de barras y su caché (pos/escaneo.py)
+"""
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .checkout import registrar_venta
+from .escaneo import CacheProductos, buscar_por_codigo, cache_productos
+from .test_checkout import CheckoutTestMixin
+
+
+class CacheProductosTest(TestCase):
+    """Tests de la caché LRU en memoria"""
+
+    def test_expulsa_el_menos_usado(self):
+        cache = CacheProductos(max_items=2, ttl=60)
+        cache.guardar('A', {'id': 1})
+        cache.guardar('B', {'id': 2})
+        cache.obtener('A')
+        cache.guardar('C', {'id': 3})
+
+        self.assertIsNotNone(cache.obtener('A'))
+        self.assertIsNone(cache.obtener('B'))
+        self.assertIsNotNone(cache.obtener('C'))
+
+    def test_invalidar_quita_todos_los_codigos_del_producto(self):
+        cache = CacheProductos(max_items=10, ttl=60)
+        cache.guardar('770123', {'id': 1})
+        cache.guardar('SKU-1', {'id': 1})
+        cache.invalidar([1])
+
+        self.assertIsNone(cache.obtener('770123'))
+        self.assertIsNone(cache.obtener('SKU-1'))
+
+
+class EscaneoTest(CheckoutTestMixin, TestCase):
+    """Tests de la búsqueda por código y su invalidación"""
+
+    def setUp(self):
+        super().setUp()
+        cache_productos.limpiar()
+        self.producto, self.lote = self.crear_producto('Galletas', cantidad=30)
+        self.producto.codigo_barras = '7701234567890'
+        self.producto.sku_alternativo = 'GAL-01'
+        self.producto.save()
+
+    def tearDown(self):
+        cache_productos.limpiar()
+
+    def test_segundo_escaneo_no_consulta_la_base(self):
+        foto = buscar_por_codigo('7701234567890')
+        self.assertEqual(foto['id'], self.producto.id)
+        self.assertEqual(foto['lote']['id'], self.lote.id)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(buscar_por_codigo('7701234567890'), foto)
+        self.assertEqual(len(consultas), 0)
+
+    def test_busca_por_sku_alternativo(self):
+        self.assertEqual(buscar_por_codigo('GAL-01')['id'], self.producto.id)
+        self.assertIsNone(buscar_por_codigo('NO-EXISTE'))
+
+    def test_cambio_de_precio_invalida_la_foto(self):
+        buscar_por_codigo('7701234567890')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio_unitario = 12
+            self.producto.save()
+
+        self.assertEqual(buscar_por_codigo('7701234567890')['precio'], '12.00')
+
+    def test_venta_invalida_el_stock(self):
+        buscar_por_codigo('7701234567890')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                    {'producto_id': self.producto.id, 'cantidad': 5},
+                ])
+
+        self.assertEqual(buscar_por_codigo('7701234567890')['lote']['cantidad'], 25)
+
+    def test_endpoint(self):
+        cliente_http = Client()
+        cliente_http.force_login(self.usuario)
+
+        respuesta = cliente_http.get(reverse('pos:escanear_producto', args=['GAL-01']))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['producto']['nombre'], 'Galletas')
+
+        respuesta = cliente_http.get(reverse('pos:escanear_producto', args=['000']))
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertFalse(respuesta.json()['success'])
@@ -0,0 +1,107 @@
+"""
+Tests para el almacén de facturas PDF (pos/facturas.py)
+"""
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from . import facturas
+from .checkout import registrar_venta
+from .models import Venta
+from .test_checkout import CheckoutTestMixin
+
+
+class PoolSincronico:
+    """Registra lo encolado en lugar de usar hilos."""
+
+    def __init__(self):
+        self.encoladas = []
+
+    def submit(self, funcion, *args):
+        self.encoladas.append(args)
+
+
+class FacturasTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        parche = mock.patch.object(facturas, 'DIRECTORIO', directorio)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        # WeasyPrint falso: cuenta cuántas veces se genera un PDF
+        self.html = mock.patch.object(facturas, 'HTML').start()
+        self.html.return_value.write_pdf.return_value = b'%PDF-falso'
+        self.addCleanup(mock.patch.stopall)
+
+        producto, _ = self.crear_producto('Papas')
+        with transaction.atomic():
+            self.venta = registrar_venta(self.usuario, self.cliente, 'mostrador', 'efectivo', [
+                {'producto_id': producto.id, 'cantidad': 2},
+            ])
+
+    def test_se_genera_una_sola_vez(self):
+        ruta = facturas.obtener_pdf(self.venta)
+        self.assertEqual(facturas.obtener_pdf(self.venta), ruta)
+        self.assertEqual(self.html.call_count, 1)
+        self.assertTrue(ruta.startswith(facturas.DIRECTORIO))
+        self.assertEqual(facturas.leer_pdf(self.venta), b'%PDF-falso')
+
+    def test_cambio_en_la_venta_vuelve_a_generar(self):
+        ruta = facturas.obtener_pdf(self.venta)
+        Venta.objects.filter(pk=self.venta.pk).update(canal_venta='domicilio')
+        self.venta.refresh_from_db()
+
+        self.assertNotEqual(facturas.obtener_pdf(self.venta), ruta)
+        self.assertEqual(self.html.call_count, 2)
+
+    def test_purga_los_pdf_sin_uso(self):
+        vieja = facturas.obtener_pdf(self.venta)
+        hace_60_dias = time.time() - 60 * 24 * 60 * 60
+        os.utime(vieja, (hace_60_dias, hace_60_dias))
+        Venta.objects.filter(pk=self.venta.pk).update(canal_venta='domicilio')
+        self.venta.refresh_from_db()
+        vigente = facturas.obtener_pdf(self.venta)
+
+        self.assertEqual(facturas.purgar(), 1)
+
+        self.assertFalse(os.path.exists(vieja))
+        self.assertTrue(os.path.exists(vigente))
+
+    def test_usar_un_pdf_lo_conserva(self):
+        ruta = facturas.obtener_pdf(self.venta)
+        hace_60_dias = time.time() - 60 * 24 * 60 * 60
+        os.utime(ruta, (hace_60_dias, hace_60_dias))
+
+        facturas.obtener_pdf(self.venta)
+
+        self.assertEqual(facturas.purgar(), 0)
+        self.assertEqual(self.html.call_count, 1)
+
+    def test_descarga_usa_el_archivo_guardado(self):
+        facturas.obtener_pdf(self.venta)
+        http = Client()
+        http.force_login(self.usuario)
+
+        respuesta = http.get(reverse('pos:descargar_factura', args=[self.venta.id]))
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), b'%PDF-falso')
+        self.assertIn('factura_venta_', respuesta['Content-Disposition'])
+        self.assertEqual(self.html.call_count, 1)
+
+    def test_encola_al_confirmar(self):
+        pool = PoolSincronico()
+        with mock.patch.object(facturas, '_obtener_pool', return_value=pool):
+            with self.captureOnCommitCallbacks(execute=True):
+                facturas.generar_al_confirmar([self.venta.id])
+                self.assertEqual(pool.encoladas, [])
+        self.assertEqual(pool.encoladas, [(self.venta.id,)])
@@ -0,0 +1,87 @@
+"""
+Tests para el mapa de calor de ventas (pos/mapa_calor.py)
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Rol
+from . import mapa_calor
+from .models import Venta
+from .test_checkout import CheckoutTestMixin
+
+Usuario = get_user_model()
+
+
+class MapaCalorTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.admin = Usuario.objects.create_user(
+            username='33333333', password='testpass123', email='admin@test.com',
+            rol=Rol.objects.create(nombre='Administrador')
+        )
+
+    def venta(self, usuario, fecha, total='10.00'):
+        return Venta.objects.create(cliente=self.cliente, usuario=usuario, canal_venta='mostrador',
+                                    total_venta=total, fecha_venta=fecha)
+
+    def lunes_reciente_utc(self, hora):
+        """Lunes reciente a la ``hora`` UTC (= domingo por la noche en Bogotá si hora < 5)."""
+        hoy = timezone.now().astimezone(dt_timezone.utc).date()
+        lunes = hoy - timedelta(days=hoy.weekday())
+        return datetime(lunes.year, lunes.month, lunes.day, hora, 30, tzinfo=dt_timezone.utc)
+
+    def test_agrupa_en_hora_local(self):
+        # Lunes 03:30 UTC = domingo 22:30 en Bogotá
+        fecha = self.lunes_reciente_utc(3)
+        if fecha > timezone.now():
+            fecha -= timedelta(days=7)
+        self.venta(self.usuario, fecha, total='25.00')
+        self.venta(self.admin, fecha + timedelta(minutes=10), total='5.00')
+
+        datos = mapa_calor.mapa_calor(dias=14)
+
+        self.assertEqual(datos['cantidades'][6][22], 2)
+        self.assertEqual(datos['totales'][6][22], 30.0)
+        self.assertEqual(sum(map(sum, datos['cantidades'])), 2)
+        self.assertEqual(datos['hora_pico'], 22)
+
+        propias = mapa_calor.mapa_calor(dias=14, usuario_id=self.usuario.id)
+        self.assertEqual(propias['totales'][6][22], 25.0)
+
+    def test_cache_por_ventana(self):
+        self.venta(self.usuario, timezone.now() - timedelta(days=20))
+        self.assertEqual(sum(map(sum, mapa_calor.mapa_calor(dias=7)['cantidades'])), 0)
+
+        with CaptureQueriesContext(connection) as consultas:
+            mapa_calor.mapa_calor(dias=7)
+        self.assertEqual(len(consultas), 0)
+
+        self.assertEqual(sum(map(sum, mapa_calor.mapa_calor(dias=30)['cantidades'])), 1)
+
+    def test_api(self):
+        self.venta(self.usuario, timezone.now() - timedelta(hours=1))
+        self.venta(self.admin, timezone.now() - timedelta(hours=1))
+        url = reverse('pos:api_mapa_calor_ventas')
+
+        http = Client()
+        http.force_login(self.usuario)
+        # Un vendedor solo ve sus ventas aunque pida las de otro
+        datos = http.get(url, {'dias': 90, 'vendedor': self.admin.id}).json()
+        self.assertEqual(sum(map(sum, datos['cantidades'])), 1)
+        self.assertEqual(http.get(url, {'dias': 'x'}).status_code, 400)
+        self.assertEqual(http.get(url, {'dias': 5000}).status_code, 400)
+
+        http.force_login(self.admin)
+        self.assertEqual(sum(map(sum, http.get(url, {'dias': 90}).json()['cantidades'])), 2)
+
+        por_hora = http.get(reverse('pos:api_ventas_por_hora')).json()
+        self.assertEqual(sum(por_hora['cantidades']), 2)
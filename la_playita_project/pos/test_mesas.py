@@ -0,0 +1,155 @@
+"""
+Tests para las cuentas de mesa: total incremental (pos/cuentas_mesa.py) y cierre en bloque (api_cerrar_mesa)
+"""
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.models import Lote, MovimientoInventario
+from . import cuentas_mesa
+from .models import ItemMesa, Mesa, Venta, VentaDetalle
+from .test_checkout import CheckoutTestMixin
+
+
+class CerrarMesaTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def abrir_mesa(self, numero, items):
+        """items: [(producto, lote, cantidad)]"""
+        mesa = Mesa.objects.create(numero=numero, cuenta_abierta=True, estado=Mesa.ESTADO_OCUPADA,
+                                   cliente=self.cliente)
+        total = Decimal('0')
+        for producto, lote, cantidad in items:
+            subtotal = producto.precio_unitario * cantidad
+            ItemMesa.objects.create(mesa=mesa, producto=producto, lote=lote, cantidad=cantidad,
+                                    precio_unitario=producto.precio_unitario, subtotal=subtotal)
+            total += subtotal
+        Mesa.objects.filter(pk=mesa.pk).update(total_cuenta=total)
+        return mesa
+
+    def cerrar(self, mesa):
+        return self.client.post(reverse('pos:api_cerrar_mesa', args=[mesa.id]),
+                                json.dumps({'metodo_pago': 'efectivo'}), content_type='application/json')
+
+    def test_cierra_en_bloque(self):
+        papas, lote_papas = self.crear_producto('Papas', cantidad=10)
+        gaseosa, lote_gaseosa = self.crear_producto('Gaseosa', cantidad=10, precio='3.50')
+        mesa = self.abrir_mesa('1', [(papas, lote_papas, 2), (gaseosa, lote_gaseosa, 1), (papas, lote_papas, 3)])
+
+        response = self.cerrar(mesa)
+
+        self.assertEqual(response.status_code, 200)
+        venta = Venta.objects.get(pk=response.json()['venta_id'])
+        self.assertEqual(venta.total_venta, Decimal('53.50'))
+        self.assertEqual(VentaDetalle.objects.filter(venta=venta).count(), 3)
+        self.assertEqual(MovimientoInventario.objects.filter(venta=venta).count(), 3)
+        self.assertEqual(Lote.objects.get(pk=lote_papas.pk).cantidad_disponible, 5)
+        self.assertEqual(Lote.objects.get(pk=lote_gaseosa.pk).cantidad_disponible, 9)
+        self.assertFalse(ItemMesa.objects.filter(mesa=mesa, facturado=False).exists())
+        mesa.refresh_from_db()
+        self.assertFalse(mesa.cuenta_abierta)
+
+    def test_sin_stock_no_deja_nada_a_medias(self):
+        papas, lote_papas = self.crear_producto('Papas', cantidad=3)
+        mesa = self.abrir_mesa('1', [(papas, lote_papas, 2), (papas, lote_papas, 2)])
+
+        response = self.cerrar(mesa)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(Lote.objects.get(pk=lote_papas.pk).cantidad_disponible, 3)
+        self.assertEqual(ItemMesa.objects.filter(mesa=mesa, facturado=False).count(), 2)
+
+    def test_consultas_no_crecen_con_los_items(self):
+        pequena = self.abrir_mesa('1', [self.crear_producto(f'P{n}')[:2] + (1,) for n in range(2)])
+        grande = self.abrir_mesa('2', [self.crear_producto(f'G{n}')[:2] + (1,) for n in range(8)])
+
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(self.cerrar(pequena).status_code, 200)
+        with CaptureQueriesContext(connection) as muchas:
+            self.assertEqual(self.cerrar(grande).status_code, 200)
+
+        self.assertEqual(len(muchas), len(pocas))
+
+
+class TotalMesaTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+        self.papas, self.lote = self.crear_producto('Papas', cantidad=50)
+        self.mesa = Mesa.objects.create(numero='1', cuenta_abierta=True, estado=Mesa.ESTADO_OCUPADA)
+
+    def agregar(self, *cantidades):
+        items = [{'producto_id': self.papas.id, 'lote_id': self.lote.id, 'cantidad': c} for c in cantidades]
+        return self.client.post(reverse('pos:api_agregar_item_mesa', args=[self.mesa.id]),
+                                json.dumps({'items': items}), content_type='application/json')
+
+    def test_suma_y_resta_sin_recorrer_la_cuenta(self):
+        self.assertEqual(self.agregar(2, 1).json()['total_cuenta'], 30.0)
+        self.agregar(1)
+        item = ItemMesa.objects.filter(mesa=self.mesa).first()
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('pos:api_eliminar_item_mesa', args=[self.mesa.id, item.id]))
+        self.assertEqual(response.json()['nuevo_total'], 20.0)
+        self.assertFalse(any('SUM(' in q['sql'].upper() for q in consultas.captured_queries))
+
+        # Un segundo clic sobre el mismo item no resta dos veces
+        self.client.post(reverse('pos:api_eliminar_item_mesa', args=[self.mesa.id, item.id]))
+        self.mesa.refresh_from_db()
+        self.assertEqual(self.mesa.total_cuenta, Decimal('20.00'))
+        self.assertEqual(cuentas_mesa.diferencias(), [])
+
+    def test_agregar_con_error_no_deja_items_sin_sumar(self):
+        response = self.client.post(reverse('pos:api_agregar_item_mesa', args=[self.mesa.id]), json.dumps({'items': [
+            {'producto_id': self.papas.id, 'lote_id': self.lote.id, 'cantidad': 1},
+            {'producto_id': 999999, 'lote_id': self.lote.id, 'cantidad': 1},
+        ]}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ItemMesa.objects.filter(mesa=self.mesa).exists())
+
+    def test_eliminar_con_error_no_borra_el_item(self):
+        self.agregar(2)
+        item = ItemMesa.objects.get(mesa=self.mesa)
+
+        with mock.patch.object(cuentas_mesa, 'sumar', side_effect=RuntimeError('caída')):
+            response = self.client.post(reverse('pos:api_eliminar_item_mesa', args=[self.mesa.id, item.id]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(ItemMesa.objects.filter(pk=item.pk).exists())
+        self.assertEqual(cuentas_mesa.diferencias(), [])
+
+    def test_no_agrega_a_una_mesa_cerrada(self):
+        Mesa.objects.filter(pk=self.mesa.pk).update(cuenta_abierta=False)
+
+        self.assertEqual(self.agregar(1).status_code, 400)
+        self.assertFalse(ItemMesa.objects.filter(mesa=self.mesa).exists())
+
+    def test_verificar_y_reparar_en_bloque(self):
+        self.agregar(2)
+        otra = Mesa.objects.create(numero='2', cuenta_abierta=True, estado=Mesa.ESTADO_OCUPADA,
+                                   total_cuenta=Decimal('5.00'))
+        Mesa.objects.filter(pk=self.mesa.pk).update(total_cuenta=Decimal('99.00'))
+
+        salida = StringIO()
+        call_command('cuadrar_totales_mesas', stdout=salida)
+        self.assertIn('2 mesas con el total desviado', salida.getvalue())
+
+        call_command('cuadrar_totales_mesas', '--reparar', stdout=StringIO())
+        self.assertEqual(Mesa.objects.get(pk=self.mesa.pk).total_cuenta, Decimal('20.00'))
+        self.assertEqual(Mesa.objects.get(pk=otra.pk).total_cuenta, Decimal('0.00'))
+        self.assertEqual(cuentas_mesa.diferencias(), [])
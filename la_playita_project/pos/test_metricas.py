@@ -0,0 +1,110 @@
+"""
+Tests para el motor de métricas del dashboard (pos/metricas.py)
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Rol
+from . import resumen
+from .checkout import registrar_venta
+from .metricas import MetricasDashboard, calcular_metricas
+from .models import Venta
+from .test_checkout import CheckoutTestMixin
+
+Usuario = get_user_model()
+
+# Consultas máximas de la vista: 13 del motor de métricas más sesión, usuario
+# y rol (y el guardado de la sesión). Si este número sube, alguna métrica
+# volvió a consultarse por separado.
+PRESUPUESTO_CONSULTAS = 19
+
+
+class MetricasDashboardTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user(
+            username='33333333', password='testpass123', email='admin@test.com',
+            rol=Rol.objects.create(nombre='Administrador')
+        )
+        self.papas, _ = self.crear_producto('Papas', precio='10.00')
+        self.jugo, _ = self.crear_producto('Jugo', precio='4.00')
+
+    def vender(self, usuario, lineas, dias_atras=0):
+        with transaction.atomic():
+            venta = registrar_venta(usuario, self.cliente, 'mostrador', 'efectivo', [
+                {'producto_id': producto.id, 'cantidad': cantidad} for producto, cantidad in lineas
+            ])
+        if dias_atras:
+            Venta.objects.filter(pk=venta.pk).update(
+                fecha_venta=timezone.now() - timedelta(days=dias_atras)
+            )
+            # La fecha cambió después de acumularla: recalcular el resumen
+            hoy = timezone.localdate()
+            resumen.reconstruir(hoy - timedelta(days=90), hoy)
+        return venta
+
+    def test_kpis(self):
+        self.vender(self.usuario, [(self.papas, 2), (self.jugo, 1)])   # 24, hoy
+        self.vender(self.admin, [(self.jugo, 5)], dias_atras=10)        # 20
+        self.vender(self.admin, [(self.papas, 1)], dias_atras=45)       # 10, período anterior
+
+        metricas = calcular_metricas()
+
+        self.assertIsInstance(metricas, MetricasDashboard)
+        self.assertEqual(metricas.total_hoy, Decimal('24.00'))
+        self.assertEqual(metricas.cantidad_7dias, 1)
+        self.assertEqual(metricas.total_30dias, Decimal('44.00'))
+        self.assertEqual(metricas.ticket_promedio, Decimal('22.00'))
+        self.assertEqual(metricas.crecimiento, Decimal('340'))
+        # Costo de 5.00 por unidad en todos los lotes: 8 unidades en 30 días
+        self.assertEqual(metricas.costos_30dias, Decimal('40.00'))
+        self.assertEqual(metricas.ganancia_bruta, Decimal('4.00'))
+        self.assertEqual([p['producto__nombre'] for p in metricas.top_productos], ['Jugo', 'Papas'])
+        self.assertEqual(metricas.producto_dia, {'producto__nombre': 'Papas', 'cantidad_total': 2})
+        self.assertEqual(len(metricas.ventas_fechas), 2)
+        self.assertEqual(sorted(metricas.ventas_totales), [20.0, 24.0])
+        self.assertEqual(len(metricas.top_vendedores), 2)
+
+    def test_vendedor_ve_solo_sus_ventas(self):
+        self.vender(self.usuario, [(self.papas, 1)])
+        self.vender(self.admin, [(self.jugo, 5)])
+
+        metricas = calcular_metricas(usuario=self.usuario)
+
+        self.assertEqual(metricas.total_hoy, Decimal('10.00'))
+        self.assertEqual(metricas.cantidad_30dias, 1)
+        self.assertEqual([p['producto__nombre'] for p in metricas.top_productos], ['Papas'])
+        self.assertEqual(metricas.top_vendedores, [])
+        # El margen y el producto del día son del negocio completo
+        self.assertEqual(metricas.ingresos_30dias, Decimal('30.00'))
+        self.assertEqual(metricas.producto_dia['producto__nombre'], 'Jugo')
+
+    def test_conteos_de_alertas_no_se_limitan_a_la_lista(self):
+        for i in range(12):
+            self.crear_producto(f'Agotado {i}', cantidad=0, numero_lote=f'A-{i}')
+
+        metricas = calcular_metricas()
+
+        self.assertEqual(metricas.productos_agotados, 12)
+        self.assertEqual(len(metricas.lista_productos_agotados), 10)
+        self.assertEqual(metricas.productos_sin_movimiento, 2)
+
+    def test_presupuesto_de_consultas_de_la_vista(self):
+        for dias in range(0, 60, 3):
+            self.vender(self.admin, [(self.papas, 1), (self.jugo, 1)], dias_atras=dias)
+
+        http = Client()
+        http.force_login(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = http.get(reverse('pos:dashboard_reportes'))
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertLessEqual(len(consultas), PRESUPUESTO_CONSULTAS)
@@ -0,0 +1,121 @@
+"""
+Tests para el resumen diario de ventas (pos/resumen.py)
+"""
+import importlib
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import resumen
+from .checkout import StockInsuficiente, registrar_venta
+from .models import Venta, VentaResumenDiario
+from .test_checkout import CheckoutTestMixin
+
+
+class ResumenDiarioTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.papas, _ = self.crear_producto('Papas', precio='10.00')
+        self.jugo, _ = self.crear_producto('Jugo', cantidad=3, precio='4.00')
+        self.http = Client()
+        self.http.force_login(self.usuario)
+
+    def vender(self, lineas, metodo='efectivo'):
+        with transaction.atomic():
+            return registrar_venta(self.usuario, self.cliente, 'mostrador', metodo, [
+                {'producto_id': producto.id, 'cantidad': cantidad} for producto, cantidad in lineas
+            ])
+
+    def filas(self):
+        return {
+            (f.metodo_pago, f.producto_id): (f.cantidad, f.subtotal, f.costo, f.numero_ventas, f.total_ventas)
+            for f in VentaResumenDiario.objects.all()
+        }
+
+    def test_cada_venta_suma_al_resumen(self):
+        self.vender([(self.papas, 2), (self.jugo, 1)])
+        self.vender([(self.papas, 1)])
+        self.vender([(self.jugo, 1)], metodo='nequi')
+
+        self.assertEqual(self.filas(), {
+            ('efectivo', self.papas.id): (3, Decimal('30.00'), Decimal('15.00'), 2, Decimal('34.00')),
+            ('efectivo', self.jugo.id): (1, Decimal('4.00'), Decimal('5.00'), 0, Decimal('0.00')),
+            ('nequi', self.jugo.id): (1, Decimal('4.00'), Decimal('5.00'), 1, Decimal('4.00')),
+        })
+        self.assertTrue(all(f.fecha == timezone.localdate() for f in VentaResumenDiario.objects.all()))
+
+    def test_venta_revertida_no_queda_en_el_resumen(self):
+        with self.assertRaises(StockInsuficiente):
+            self.vender([(self.papas, 1), (self.jugo, 10)])
+        self.assertFalse(VentaResumenDiario.objects.exists())
+
+    def test_sincronizacion_suma_al_resumen(self):
+        ventas = [
+            {'idempotency_key': str(uuid.uuid4()), 'cliente_id': self.cliente.id, 'metodo_pago': 'efectivo',
+             'canal_venta': 'mostrador', 'items': [{'producto_id': self.papas.id, 'cantidad': c}]}
+            for c in (1, 2)
+        ]
+        self.http.post(reverse('pos:sincronizar_ventas'), data=json.dumps({'ventas': ventas}),
+                       content_type='application/json')
+
+        fila = VentaResumenDiario.objects.get()
+        self.assertEqual((fila.cantidad, fila.numero_ventas, fila.total_ventas), (3, 2, Decimal('30.00')))
+
+    def test_reconstruir_coincide_con_lo_acumulado(self):
+        self.vender([(self.papas, 2), (self.jugo, 1)])
+        self.vender([(self.jugo, 2)], metodo='nequi')
+        acumulado = self.filas()
+
+        hoy = timezone.localdate()
+        VentaResumenDiario.objects.update(cantidad=999)
+        resumen.reconstruir(hoy - timedelta(days=1), hoy)
+
+        self.assertEqual(self.filas(), acumulado)
+
+    def test_ventas_sin_detalle_comparten_fila(self):
+        self.vender([(self.papas, 1)])
+        for _ in range(2):
+            with transaction.atomic():
+                venta = Venta.objects.create(cliente=self.cliente, usuario=self.usuario, canal_venta='mostrador',
+                                             total_venta=Decimal('5.00'))
+                resumen.acumular_ventas([venta.id])
+
+        fila = VentaResumenDiario.objects.get(producto_id=resumen.SIN_PRODUCTO)
+        self.assertEqual((fila.metodo_pago, fila.numero_ventas, fila.total_ventas),
+                         (resumen.METODO_SIN_PAGO, 2, Decimal('10.00')))
+        self.assertEqual(VentaResumenDiario.objects.count(), 2)
+
+    def test_migracion_llena_el_historial(self):
+        self.vender([(self.papas, 2), (self.jugo, 1)])
+        acumulado = self.filas()
+        VentaResumenDiario.objects.all().delete()
+
+        migracion = importlib.import_module('pos.migrations.0009_llenar_resumen_diario')
+        migracion.llenar_resumen(apps, connection.schema_editor())
+
+        self.assertEqual(self.filas(), acumulado)
+
+    def test_reportes_leen_el_resumen(self):
+        self.vender([(self.papas, 2)])
+        self.vender([(self.jugo, 1)], metodo='nequi')
+
+        datos = self.http.get(reverse('pos:api_ventas_por_fecha')).json()
+        self.assertEqual(datos['totales'], [24.0])
+        self.assertEqual(datos['cantidades'], [2])
+
+        metodos = self.http.get(reverse('pos:api_comparativa_metodos_pago')).json()
+        self.assertEqual(dict(zip(metodos['metodos'], metodos['totales'])), {'efectivo': 20.0, 'nequi': 4.0})
+
+        reporte = self.http.get(reverse('reportes:reporte_ventas'), {'metodo_pago': 'efectivo'})
+        self.assertEqual(reporte.status_code, 200)
+        self.assertEqual(reporte.context['total_ventas'], Decimal('20.00'))
+        self.assertEqual(reporte.context['cantidad_ventas'], 1)
+        self.assertEqual(reporte.context['total_ventas_hoy'], Decimal('24.00'))
@@ -0,0 +1,101 @@
+"""
+Tests para la sincronización de ventas sin conexión (pos/sincronizacion.py)
+"""
+import json
+import uuid
+from decimal import Decimal
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from clients.models import Cliente, PuntosFidelizacion
+from clients.puntos import aplicar_pendientes
+from inventory.models import MovimientoInventario
+from .models import Pago, Venta, VentaDetalle
+from .test_checkout import CheckoutTestMixin
+
+
+class SincronizarVentasTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.producto, self.lote = self.crear_producto('Tinto', cantidad=10, precio='2000.00')
+        # El cliente #1 es "Consumidor Final" y no acumula puntos
+        self.cliente = Cliente.objects.create(
+            nombres='Cliente', apellidos='Frecuente', documento='44444444',
+            telefono='3000000001', correo='frecuente@test.com'
+        )
+        self.http = Client()
+        self.http.force_login(self.usuario)
+
+    def venta(self, cantidad, **extra):
+        datos = {
+            'idempotency_key': str(uuid.uuid4()),
+            'cliente_id': self.cliente.id,
+            'metodo_pago': 'efectivo',
+            'canal_venta': 'mostrador',
+            'items': [{'producto_id': self.producto.id, 'cantidad': cantidad}],
+        }
+        datos.update(extra)
+        return datos
+
+    def sincronizar(self, ventas):
+        return self.http.post(
+            reverse('pos:sincronizar_ventas'),
+            data=json.dumps({'ventas': ventas}),
+            content_type='application/json',
+        )
+
+    def test_registra_el_lote_y_reporta_conflictos_por_venta(self):
+        ventas = [
+            self.venta(4, fecha_venta='2025-12-20T10:15:00-05:00'),
+            self.venta(8),  # ya no alcanza
+            self.venta(6),
+            self.venta(1, items=[]),
+        ]
+        respuesta = self.sincronizar(ventas)
+
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual([r['estado'] for r in datos['resultados']],
+                         ['registrada', 'conflicto', 'registrada', 'invalida'])
+        self.assertEqual(datos['registradas'], 2)
+
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.cantidad_disponible, 0)
+        self.assertEqual(Venta.objects.count(), 2)
+        self.assertEqual(Pago.objects.count(), 2)
+        self.assertEqual(VentaDetalle.objects.count(), 2)
+        self.assertEqual(MovimientoInventario.objects.filter(tipo_movimiento='salida').count(), 2)
+
+        primera = Venta.objects.get(pk=datos['resultados'][0]['venta_id'])
+        self.assertEqual(primera.fecha_venta.date().isoformat(), '2025-12-20')
+        self.assertEqual(primera.total_venta, Decimal('8000.00'))
+
+        # Los puntos quedan pendientes en el libro hasta que corra el acumulador
+        self.assertEqual(PuntosFidelizacion.objects.filter(cliente=self.cliente, aplicado=False).count(), 2)
+        aplicar_pendientes()
+        self.cliente.refresh_from_db()
+        self.assertGreater(self.cliente.puntos_totales, 0)
+
+    def test_reenviar_el_lote_no_duplica(self):
+        ventas = [self.venta(2), self.venta(3)]
+        primera = self.sincronizar(ventas).json()
+        segunda = self.sincronizar(ventas).json()
+
+        self.assertEqual([r['estado'] for r in segunda['resultados']], ['duplicada', 'duplicada'])
+        self.assertEqual([r['venta_id'] for r in segunda['resultados']],
+                         [r['venta_id'] for r in primera['resultados']])
+        self.assertEqual(Venta.objects.count(), 2)
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.cantidad_disponible, 5)
+
+    def test_clave_repetida_dentro_del_lote(self):
+        venta = self.venta(1)
+        datos = self.sincronizar([venta, dict(venta)]).json()
+        self.assertEqual([r['estado'] for r in datos['resultados']], ['registrada', 'invalida'])
+
+    def test_cliente_inexistente(self):
+        datos = self.sincronizar([self.venta(1, cliente_id=99999)]).json()
+        self.assertEqual(datos['resultados'][0]['estado'], 'invalida')
+        self.assertFalse(Venta.objects.exists())
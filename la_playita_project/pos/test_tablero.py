@@ -0,0 +1,132 @@
+"""
+Tests para el tablero de mesas en tiempo real (pos/tablero.py)
+"""
+import asyncio
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import tablero
+from .models import ItemMesa, Mesa
+from .test_checkout import CheckoutTestMixin
+
+
+# Los tests corren en un solo proceso: la memoria local se comporta como Redis
+@override_settings(CACHE_COMPARTIDA=True)
+class TableroMesasTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def tipos(self, desde=0):
+        return [e['tipo'] for e in tablero.eventos_desde(desde, tablero.ultimo_evento())]
+
+    def test_publica_cambios_al_confirmar(self):
+        producto, lote = self.crear_producto('Papas')
+        with self.captureOnCommitCallbacks(execute=True):
+            mesa = Mesa.objects.create(numero='1', cuenta_abierta=True, estado=Mesa.ESTADO_OCUPADA)
+            item = ItemMesa.objects.create(mesa=mesa, producto=producto, lote=lote, cantidad=2,
+                                           precio_unitario=Decimal('10.00'), subtotal=Decimal('20.00'))
+            mesa.total_cuenta = Decimal('20.00')
+            mesa.save()
+        self.assertEqual(self.tipos(), ['mesa', 'item', 'mesa'])
+        ultimo = tablero.eventos_desde(0, tablero.ultimo_evento())[-1]
+        self.assertEqual(ultimo['datos']['total_cuenta'], 20.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+            mesa.activa = False
+            mesa.save()
+        self.assertEqual(self.tipos(3), ['item_eliminado', 'mesa_eliminada'])
+
+    def test_sin_commit_no_se_publica(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            Mesa.objects.create(numero='1')
+        self.assertEqual(tablero.ultimo_evento(), 0)
+
+    def test_bajo_wsgi_no_hay_eventos(self):
+        tablero.publicar('mesa', {'id': 1})
+        response = self.client.get(reverse('pos:api_eventos_mesas'), {'desde': 0})
+        self.assertEqual(response.status_code, 204)
+
+    @mock.patch.object(tablero, 'INTERVALO', 0.01)
+    @mock.patch.object(tablero, 'DURACION', 0.05)
+    async def test_flujo_asgi_entrega_lo_pendiente(self):
+        tablero.publicar('mesa', {'id': 1})
+        tablero.publicar('mesa_eliminada', {'id': 2})
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.usuario)
+
+        async def pedir(**extra):
+            response = await cliente.get(reverse('pos:api_eventos_mesas'), **extra)
+            return response, ''.join([parte.decode() async for parte in response.streaming_content])
+
+        response, cuerpo = await pedir(data={'desde': 1})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(f'retry: {tablero.REINTENTO_MS}\n', cuerpo)
+        self.assertNotIn('event: mesa\n', cuerpo)
+        self.assertIn('id: 2\nevent: mesa_eliminada\ndata: {"id": 2}\n\n', cuerpo)
+
+        _, cuerpo = await pedir(headers={'Last-Event-ID': '2'})
+        self.assertNotIn('event:', cuerpo)
+
+    @override_settings(CACHE_COMPARTIDA=False)
+    def test_sin_redis_no_hay_eventos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Mesa.objects.create(numero='1')
+        self.assertEqual(tablero.ultimo_evento(), 0)
+
+        response = self.client.get(reverse('pos:api_eventos_mesas'), {'desde': 0})
+        self.assertEqual(response.status_code, 204)
+
+    def test_resincronizar_si_se_perdieron_eventos(self):
+        for n in range(3):
+            tablero.publicar('mesa', {'id': n})
+        cache.delete(tablero.CLAVE_EVENTO.format(2))
+        self.assertEqual(self.tipos(), ['resincronizar'])
+        # Caché vaciada: el contador vuelve a empezar por debajo del cliente
+        self.assertEqual([e['tipo'] for e in tablero.eventos_desde(50, 3)], ['resincronizar'])
+
+    @mock.patch.object(tablero, 'INTERVALO', 0.01)
+    @mock.patch.object(tablero, 'DURACION', 0.2)
+    def test_flujo_asgi_empuja_eventos_nuevos(self):
+        async def escuchar():
+            recibidos = []
+            async for parte in tablero.flujo_asincrono(0):
+                recibidos.append(parte)
+                if len(recibidos) == 1:
+                    await asyncio.sleep(0.02)
+                    await cache.aset(tablero.CLAVE_EVENTO.format(1), {'id': 1, 'tipo': 'mesa', 'datos': {}})
+                    await cache.aset(tablero.CLAVE_SECUENCIA, 1)
+            return ''.join(recibidos)
+
+        self.assertIn('id: 1\nevent: mesa\n', asyncio.run(escuchar()))
+
+
+class ProcesoAsgiEventosTest(SimpleTestCase):
+    """El proceso ASGI (la_playita_project/asgi.py) solo atiende el flujo de eventos"""
+
+    def test_otras_rutas_no_llegan_a_django(self):
+        from la_playita_project import asgi
+
+        enviados = []
+
+        async def send(mensaje):
+            enviados.append(mensaje)
+
+        async def pedir(ruta):
+            await asgi.application({'type': 'http', 'path': ruta}, None, send)
+
+        with mock.patch.object(asgi, 'django_application', new_callable=mock.AsyncMock) as django_app:
+            asyncio.run(pedir('/pos/api/mesas/'))
+            self.assertEqual(enviados[0]['status'], 404)
+            django_app.assert_not_awaited()
+
+            asyncio.run(pedir(reverse('pos:api_eventos_mesas')))
+            django_app.assert_awaited_once()
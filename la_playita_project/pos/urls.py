@@ -10,8 +10,11 @@ urlpatterns = [
     # APIs para el POS
     path('api/buscar-productos/', views.buscar_productos, name='buscar_productos'),
     path('api/producto/<int:producto_id>/', views.obtener_producto, name='obtener_producto'),
+    path('api/catalogo/', views.catalogo_pos, name='catalogo_pos'),
+    path('api/escanear/<str:codigo>/', views.escanear_producto, name='escanear_producto'),
     path('api/obtener-clientes/', views.obtener_clientes, name='obtener_clientes'),
     path('api/procesar-venta/', views.procesar_venta, name='procesar_venta'),
+    path('api/sincronizar-ventas/', views.sincronizar_ventas, name='sincronizar_ventas'),
     
     # Vistas de ventas
     path('venta/<int:venta_id>/', views.venta_detalle, name='venta_detalle'),
@@ -30,9 +33,11 @@ urlpatterns = [
     path('api/ventas-por-fecha/', views.api_ventas_por_fecha, name='api_ventas_por_fecha'),
     path('api/comparativa-metodos-pago/', views.api_comparativa_metodos_pago, name='api_comparativa_metodos_pago'),
     path('api/ventas-por-hora/', views.api_ventas_por_hora, name='api_ventas_por_hora'),
+    path('api/mapa-calor-ventas/', views.api_mapa_calor_ventas, name='api_mapa_calor_ventas'),
     
     # APIs de Mesas
     path('api/mesas/', views.api_listar_mesas, name='api_listar_mesas'),
+    path('api/mesas/eventos/', views.api_eventos_mesas, name='api_eventos_mesas'),
 
     path('api/mesa/crear/', views.api_crear_mesa, name='api_crear_mesa'),
     path('api/mesa/<int:mesa_id>/editar/', views.api_editar_mesa, name='api_editar_mesa'),
@@ -1,29 +1,32 @@
 from django.shortcuts import render, get_object_or_404
 from decimal import Decimal
 import json
-from django.db import transaction
-from django.db.models import Sum, F, Count, Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, F, Count, Avg, Q
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_POST, require_http_methods
-from django.template.loader import render_to_string
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST, require_http_methods
+from django.utils.cache import patch_cache_control
 from django.contrib import messages
 from django.conf import settings
-from weasyprint import HTML
 from inventory.models import Producto, Lote, MovimientoInventario
+from inventory import busqueda
 from clients.models import Cliente, PuntosFidelizacion
+from clients.busqueda import buscar_clientes
+from clients import puntos
 from .models import Venta, VentaDetalle, Pago, Mesa, ItemMesa
 from .forms import ProductoSearchForm, VentaForm
+from .checkout import registrar_venta, registrar_lineas, calcular_puntos
+from .escaneo import buscar_por_codigo
+from . import catalogo, cuentas_mesa, facturas, idempotencia, mapa_calor, metricas, resumen, sincronizacion, tablero
 from users.decorators import check_user_role
+from core.cache_respuestas import VENTAS, cache_respuesta
 from django.core.mail import EmailMessage
 from datetime import datetime, timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models.functions import TruncDate
 
-# Constante: 5.5 puntos por cada $66,000 pesos
-PUNTOS_POR_COMPRA = Decimal('5.5')
-VALOR_BASE_PUNTOS = Decimal('66000')
 # VALOR_PUNTO = Decimal('15000.00')
 
 @login_required
@@ -32,10 +35,8 @@ def pos_view(request):
     from inventory.models import Categoria
     from django.db.models import Count, Sum, Q
     
-    # Obtener categorías con conteo de productos disponibles
-    categorias = Categoria.objects.annotate(
-        total_productos=Count('producto', filter=Q(producto__stock_actual__gt=0))
-    ).filter(total_productos__gt=0).order_by('nombre')
+    # Categorías con conteo de productos disponibles (catálogo precalculado en caché)
+    categorias = catalogo.categorias()
     
     # Si se selecciona una categoría, cargar sus productos
     categoria_id = request.GET.get('categoria')
@@ -55,8 +56,7 @@ def pos_view(request):
     search_form = ProductoSearchForm()
     venta_form = VentaForm()
     
-    # Cargar clientes para el selector (excluyendo Consumidor Final que se muestra por defecto)
-    clientes = Cliente.objects.exclude(id=1).order_by('nombres', 'apellidos')
+    # Los clientes se buscan desde el selector con /pos/api/obtener-clientes/?q=
     
     context = {
         'categorias': categorias,
@@ -64,7 +64,6 @@ def pos_view(request):
         'categoria_seleccionada': categoria_seleccionada,
         'search_form': search_form,
         'venta_form': venta_form,
-        'clientes': clientes,
     }
     return render(request, 'pos/pos_main.html', context)
 
@@ -143,7 +142,11 @@ def listar_ventas(request):
 @login_required
 def buscar_productos(request):
     query = request.GET.get('q', '')
-    productos = Producto.objects.filter(nombre__icontains=query, stock_actual__gt=0).select_related('categoria')
+    # Índice de búsqueda: insensible a tildes, ordenado por relevancia y con límite
+    productos = busqueda.buscar_productos(
+        query,
+        productos=Producto.objects.filter(stock_actual__gt=0).select_related('categoria'),
+    )
     productos_data = [{
         'id': p.id,
         'nombre': p.nombre,
@@ -182,6 +185,22 @@ def obtener_producto(request, producto_id):
     }
     return JsonResponse(producto_data)
 
+@login_required
+@condition(etag_func=catalogo.etag)
+def catalogo_pos(request):
+    """Catálogo completo para la caja; responde 304 si el ETag no cambió"""
+    response = JsonResponse(catalogo.catalogo())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+def escanear_producto(request, codigo):
+    """API de escaneo: busca por código de barras o SKU alternativo (con caché en memoria)"""
+    producto = buscar_por_codigo(codigo)
+    if producto is None:
+        return JsonResponse({'success': False, 'error': f'No existe un producto con el código {codigo}'}, status=404)
+    return JsonResponse({'success': True, 'producto': producto})
+
 @login_required
 @require_POST
 @transaction.atomic
@@ -193,90 +212,74 @@ def procesar_venta(request):
         if not cart_items:
             return JsonResponse({'success': False, 'error': 'El carrito está vacío.'}, status=400)
         
+        # Reintento de una venta ya registrada: devolver la respuesta original
+        clave = idempotencia.obtener_clave(request, data)
+        if clave:
+            guardada = idempotencia.respuesta_guardada(clave, request)
+            if guardada:
+                return guardada
+            if not idempotencia.reservar_clave(clave, request):
+                return idempotencia.respuesta_guardada(clave, request, bloquear=True)
+        
         cliente_id = data.get('cliente_id')
         cliente = get_object_or_404(Cliente, pk=cliente_id) if cliente_id else get_object_or_404(Cliente, pk=1)
         
-        total_venta = sum(Decimal(item['precio']) * int(item['cantidad']) for item in cart_items)
-        
-        nueva_venta = Venta.objects.create(
-            cliente=cliente,
+        # Detalles, movimientos y descuento de lotes en bloque (ver pos/checkout.py)
+        nueva_venta = registrar_venta(
             usuario=request.user,
+            cliente=cliente,
             canal_venta=data['canal_venta'],
-            total_venta=total_venta
-        )
-        
-        Pago.objects.create(
-            venta=nueva_venta,
-            monto=total_venta,
             metodo_pago=data['metodo_pago'],
-            estado='completado'
+            cart_items=cart_items
         )
-        
-        productos_a_actualizar = set()
-        for item in cart_items:
-            producto = get_object_or_404(Producto, pk=item['producto_id'])
-            lote = get_object_or_404(Lote, pk=item['lote_id'])
-            cantidad = int(item['cantidad'])
-            
-            if lote.cantidad_disponible < cantidad:
-                raise Exception(f"No hay suficiente stock de '{producto.nombre}'. Solicitado: {cantidad}, Disponible: {lote.cantidad_disponible} (Lote: {lote.numero_lote})")
-            
-            VentaDetalle.objects.create(
-                venta=nueva_venta,
-                producto=producto,
-                lote=lote,
-                cantidad=cantidad,
-                subtotal=Decimal(item['precio']) * cantidad
-            )
-            
-            # Actualizar cantidad disponible del lote
-            lote.cantidad_disponible -= cantidad
-            lote.save()
-            
-            # ===== REGISTRAR MOVIMIENTO DE INVENTARIO =====
-            MovimientoInventario.objects.create(
-                producto=producto,
-                lote=lote,
-                cantidad=-cantidad,  # Negativo porque es una salida
-                tipo_movimiento='salida',
-                descripcion=f'Venta #{nueva_venta.id} - {producto.nombre}',
-                venta=nueva_venta
-            )
-            
-            productos_a_actualizar.add(producto)
-
-        for producto in productos_a_actualizar:
-            # producto.actualizar_costo_promedio_y_stock()  # Comentado: los triggers de BD ya actualizan esto
-            pass  # Los triggers de MySQL manejan la actualización automáticamente
+        total_venta = nueva_venta.total_venta
         
         # ===== AGREGAR PUNTOS AL CLIENTE =====
-        puntos_ganados = Decimal('0')
-        if cliente.id != 1:  # No agregar puntos a "Consumidor Final"
-            # Calcular puntos: (total_venta / 66000) * 5.5
-            puntos_ganados = ((total_venta / VALOR_BASE_PUNTOS) * PUNTOS_POR_COMPRA).quantize(Decimal('0.01'))
-            
-            # Actualizar puntos del cliente
-            cliente.puntos_totales += puntos_ganados
-            cliente.save()
-            
-            # Registrar transacción de puntos
-            PuntosFidelizacion.objects.create(
-                cliente=cliente,
-                tipo=PuntosFidelizacion.TIPO_GANANCIA,
-                puntos=puntos_ganados,
-                descripcion=f'Compra de ${total_venta} - Venta #{nueva_venta.id}',
-                venta_id=nueva_venta.id
-            )
+        # Calcular puntos: (total_venta / 66000) * 5.5
+        puntos_ganados = calcular_puntos(cliente.id, total_venta)
+        if puntos_ganados:
+            # Solo se agrega al libro; el acumulador lo suma a puntos_totales (ver clients/puntos.py)
+            puntos.registrar_ganancia(cliente.id, puntos_ganados, nueva_venta.id, total_venta)
         
-        return JsonResponse({
+        respuesta = {
             'success': True,
             'venta_id': nueva_venta.id,
             'total': float(total_venta),
             'puntos_ganados': float(puntos_ganados) if cliente.id != 1 else 0,
             'mensaje': f'Venta #{nueva_venta.id} procesada con éxito.'
-        })
+        }
+        if clave:
+            idempotencia.guardar_respuesta(clave, nueva_venta, respuesta)
+        facturas.generar_al_confirmar([nueva_venta.id])
+        return JsonResponse(respuesta)
     
     except Exception as e:
+        # Revertir lo ya escrito (p. ej. si otra caja agotó el lote mientras se vendía)
+        transaction.set_rollback(True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required
+@require_POST
+@transaction.atomic
+def sincronizar_ventas(request):
+    """
+    Recibe un lote de ventas hechas sin conexión (ver pos/sincronizacion.py).
+    Las ventas con conflicto se reportan una a una; las demás se registran.
+    """
+    try:
+        data = json.loads(request.body)
+        resultados = sincronizacion.sincronizar_ventas(request.user, data.get('ventas', []))
+        return JsonResponse({
+            'success': True,
+            'registradas': sum(1 for r in resultados if r['estado'] == sincronizacion.REGISTRADA),
+            'resultados': resultados,
+        })
+    except IntegrityError:
+        # Otra solicitud registró alguna de las claves mientras se procesaba el lote
+        transaction.set_rollback(True)
+        return JsonResponse({'success': False, 'error': 'Algunas ventas se están registrando en otra solicitud. Reintente.'}, status=409)
+    except Exception as e:
+        transaction.set_rollback(True)
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @login_required
@@ -294,19 +297,41 @@ def venta_detalle(request, venta_id):
 
 @login_required
 def obtener_clientes(request):
+    """
+    Typeahead de clientes para la caja: ?q= (prefijo de documento o nombre)
+    y ?pagina=. Devuelve una página a la vez en lugar de toda la tabla.
+
+    Sin ?q ni ?pagina devuelve todos los clientes, como antes: el modal de
+    pago de carrito.js todavía llena su select así. Quitar cuando pase al
+    typeahead.
+    """
+    q = request.GET.get('q')
+    pagina = request.GET.get('pagina')
+    if pagina is not None:
+        try:
+            pagina = int(pagina)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'El parámetro pagina debe ser un número entero.',
+                'clientes': []
+            }, status=400)
     try:
-        clientes = list(Cliente.objects.all().values('id', 'nombres', 'apellidos').order_by('nombres'))
-        clientes_formateados = []
-        for c in clientes:
-            nombre_completo = f"{c['nombres']} {c['apellidos']}".strip()
-            clientes_formateados.append({
-                'id': c['id'],
-                'nombre': nombre_completo
-            })
+        if q is None and pagina is None:
+            clientes = Cliente.objects.only('id', 'nombres', 'apellidos', 'documento').order_by('nombres')
+            hay_mas = False
+        else:
+            clientes, hay_mas = buscar_clientes(q or '', pagina=pagina or 1)
+        clientes_formateados = [{
+            'id': c.id,
+            'nombre': f"{c.nombres} {c.apellidos}".strip(),
+            'documento': c.documento,
+        } for c in clientes]
         return JsonResponse({
             'success': True,
             'clientes': clientes_formateados,
-            'total': len(clientes_formateados)
+            'total': len(clientes_formateados),
+            'hay_mas': hay_mas
         })
     except Exception as e:
         import traceback
@@ -320,19 +345,13 @@ def obtener_clientes(request):
 @login_required
 def descargar_factura(request, venta_id):
     venta = get_object_or_404(Venta.objects.select_related('cliente', 'usuario'), pk=venta_id)
-    detalles = VentaDetalle.objects.filter(venta=venta).select_related('producto', 'lote')
-    pago = Pago.objects.filter(venta=venta).first()
-    impuesto = float(venta.total_venta) * 0.19
-    html_string = render_to_string('pos/factura.html', {
-        'venta': venta,
-        'detalles': detalles,
-        'pago': pago,
-        'impuesto': impuesto
-    })
-    pdf = HTML(string=html_string).write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="factura_venta_{venta.id}.pdf"'
-    return response
+    # PDF guardado al confirmar la venta (ver pos/facturas.py); se genera aquí solo si falta
+    return FileResponse(
+        open(facturas.obtener_pdf(venta), 'rb'),
+        as_attachment=True,
+        filename=f'factura_venta_{venta.id}.pdf',
+        content_type='application/pdf',
+    )
 
 @login_required
 def enviar_factura(request, venta_id):
@@ -567,38 +586,31 @@ def railway_status(request):
 @login_required
 def emails_pendientes(request):
     """
-    Vista para mostrar correos que no se pudieron enviar
+    Vista para mostrar correos que no se han podido enviar: los descartados
+    y los que están esperando un reintento en la bandeja de salida
     """
-    import os
-    
-    log_file = os.path.join(settings.BASE_DIR, 'emails_pendientes.log')
-    emails_pendientes = []
-    
-    try:
-        if os.path.exists(log_file):
-            with open(log_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Parsear el contenido del log
-            email_blocks = content.split('=' * 50)
-            for block in email_blocks:
-                if block.strip():
-                    lines = block.strip().split('\n')
-                    email_data = {}
-                    for line in lines:
-                        if ':' in line:
-                            key, value = line.split(':', 1)
-                            email_data[key.strip()] = value.strip()
-                    
-                    if email_data:
-                        emails_pendientes.append(email_data)
-    
-    except Exception as e:
-        messages.error(request, f'Error leyendo correos pendientes: {e}')
+    from core import correos
+    from core.models import CorreoSaliente
+    
+    pendientes = CorreoSaliente.objects.filter(
+        Q(estado=CorreoSaliente.ESTADO_FALLIDO) |
+        Q(estado=CorreoSaliente.ESTADO_PENDIENTE, intentos__gt=0)
+    ).order_by('-creado')[:200]
+    emails_pendientes = [{
+        'Fecha': timezone.localtime(correo.creado).strftime('%Y-%m-%d %H:%M:%S'),
+        'Para': ', '.join(correo.destinatarios),
+        'Asunto': correo.asunto,
+        'Mensaje': correo.cuerpo_texto,
+        'HTML': correo.cuerpo_html,
+        'Estado': correo.get_estado_display(),
+        'Intentos': correo.intentos,
+        'Error': correo.ultimo_error,
+    } for correo in pendientes]
     
     return render(request, 'pos/emails_pendientes.html', {
         'emails_pendientes': emails_pendientes,
-        'total_pendientes': len(emails_pendientes)
+        'total_pendientes': len(emails_pendientes),
+        'metricas': correos.metricas()
     })
 
 @csrf_exempt
@@ -643,233 +655,27 @@ def crear_cliente(request):
 @check_user_role(allowed_roles=['Administrador', 'Vendedor'])
 def dashboard_reportes(request):
     """Dashboard principal con métricas y KPIs de ventas"""
-    from django.db.models import F
-    
-    ahora = timezone.now()
-    hoy_inicio = ahora.replace(hour=0, minute=0, second=0, microsecond=0)
-    hace_7_dias = ahora - timedelta(days=7)
-    hace_30_dias = ahora - timedelta(days=30)
-    
     # Determinar si es vendedor para filtrar sus propias ventas
     es_vendedor = request.user.rol.nombre == 'Vendedor'
-    filtro_usuario = {'usuario': request.user} if es_vendedor else {}
-    
-    # Datos de inventario para accesos rápidos
-    total_productos = Producto.objects.count()
-    
-    # Listas de productos con alertas
-    lista_productos_stock_bajo = Producto.objects.filter(stock_actual__lt=F('stock_minimo')).order_by('stock_actual')[:10]
-    productos_bajos_stock = lista_productos_stock_bajo.count()
-    
-    lista_productos_agotados = Producto.objects.filter(stock_actual=0).order_by('nombre')[:10]
-    productos_agotados = lista_productos_agotados.count()
-    
-    # Valor total del inventario
-    from django.db.models import Sum as DbSum
-    valor_inventario = Producto.objects.aggregate(
-        total=DbSum(F('stock_actual') * F('costo_promedio'))
-    )['total'] or Decimal('0')
-    
-    # Calcular margen de ganancia (últimos 30 días)
-    ventas_con_costo = VentaDetalle.objects.filter(
-        venta__fecha_venta__gte=hace_30_dias
-    ).aggregate(
-        ingresos=Sum('subtotal'),
-        costos=Sum(F('cantidad') * F('lote__costo_unitario_lote'))
-    )
-    
-    ingresos_30dias = ventas_con_costo['ingresos'] or Decimal('0')
-    costos_30dias = ventas_con_costo['costos'] or Decimal('0')
-    ganancia_bruta = ingresos_30dias - costos_30dias
-    margen_porcentaje = (ganancia_bruta / ingresos_30dias * 100) if ingresos_30dias > 0 else Decimal('0')
-    
-    # Productos con bajo movimiento (últimos 30 días)
-    productos_vendidos = VentaDetalle.objects.filter(
-        venta__fecha_venta__gte=hace_30_dias
-    ).values('producto_id').distinct()
-    
-    lista_productos_sin_movimiento = Producto.objects.exclude(
-        id__in=productos_vendidos
-    ).filter(stock_actual__gt=0).order_by('nombre')[:10]
-    productos_sin_movimiento = lista_productos_sin_movimiento.count()
-    
-    # Ventas del día
-    ventas_hoy = Venta.objects.filter(fecha_venta__gte=hoy_inicio, **filtro_usuario)
-    total_hoy = ventas_hoy.aggregate(Sum('total_venta'))['total_venta__sum'] or Decimal('0')
-    cantidad_hoy = ventas_hoy.count()
-    
-    # Ventas últimos 7 días
-    ventas_7dias = Venta.objects.filter(fecha_venta__gte=hace_7_dias, **filtro_usuario)
-    total_7dias = ventas_7dias.aggregate(Sum('total_venta'))['total_venta__sum'] or Decimal('0')
-    cantidad_7dias = ventas_7dias.count()
-    
-    # Ventas últimos 30 días
-    ventas_30dias = Venta.objects.filter(fecha_venta__gte=hace_30_dias, **filtro_usuario)
-    total_30dias = ventas_30dias.aggregate(Sum('total_venta'))['total_venta__sum'] or Decimal('0')
-    cantidad_30dias = ventas_30dias.count()
-    
-    # Ticket promedio
-    ticket_promedio = total_30dias / cantidad_30dias if cantidad_30dias > 0 else Decimal('0')
-    
-    # Métodos de pago (últimos 30 días)
-    metodos_pago = Pago.objects.filter(
-        venta__fecha_venta__gte=hace_30_dias
-    ).values('metodo_pago').annotate(
-        total=Sum('monto'),
-        cantidad=Count('id')
-    ).order_by('-total')
-    
-    # Canales de venta (últimos 30 días)
-    canales_venta = Venta.objects.filter(
-        fecha_venta__gte=hace_30_dias
-    ).values('canal_venta').annotate(
-        total=Sum('total_venta'),
-        cantidad=Count('id')
-    ).order_by('-total')
-    
-    # Top 5 productos más vendidos (últimos 30 días)
-    top_productos = VentaDetalle.objects.filter(
-        venta__fecha_venta__gte=hace_30_dias,
-        **{f'venta__{k}': v for k, v in filtro_usuario.items()}
-    ).values('producto__nombre').annotate(
-        cantidad_total=Sum('cantidad'),
-        ingresos=Sum('subtotal')
-    ).order_by('-cantidad_total')[:5]
-    
-    # Top 5 vendedores (solo para administradores)
-    if not es_vendedor:
-        top_vendedores = Venta.objects.filter(
-            fecha_venta__gte=hace_30_dias
-        ).values(
-            'usuario__first_name', 
-            'usuario__last_name',
-            'usuario__username'
-        ).annotate(
-            total_ventas=Sum('total_venta'),
-            cantidad=Count('id')
-        ).order_by('-total_ventas')[:5]
-    else:
-        top_vendedores = []
-    
-    # Top 5 clientes (últimos 30 días)
-    top_clientes = Venta.objects.filter(
-        fecha_venta__gte=hace_30_dias,
-        **filtro_usuario
-    ).exclude(
-        cliente__nombres='Consumidor',
-        cliente__apellidos='Final'
-    ).values(
-        'cliente__nombres',
-        'cliente__apellidos'
-    ).annotate(
-        total_compras=Sum('total_venta'),
-        cantidad=Count('id')
-    ).order_by('-total_compras')[:5]
-    
-    # Estadísticas adicionales
-    total_clientes = Cliente.objects.exclude(
-        nombres='Consumidor',
-        apellidos='Final'
-    ).count()
-    
-    # Comparativa con período anterior (30 días vs 60 días)
-    hace_60_dias = ahora - timedelta(days=60)
-    ventas_periodo_anterior = Venta.objects.filter(
-        fecha_venta__gte=hace_60_dias,
-        fecha_venta__lt=hace_30_dias
-    )
-    total_periodo_anterior = ventas_periodo_anterior.aggregate(Sum('total_venta'))['total_venta__sum'] or Decimal('0')
-    
-    # Calcular crecimiento
-    if total_periodo_anterior > 0:
-        crecimiento = ((total_30dias - total_periodo_anterior) / total_periodo_anterior * 100)
-    else:
-        crecimiento = 100 if total_30dias > 0 else 0
-    
-    # Producto más vendido del día
-    producto_dia = VentaDetalle.objects.filter(
-        venta__fecha_venta__gte=hoy_inicio
-    ).values('producto__nombre').annotate(
-        cantidad_total=Sum('cantidad')
-    ).order_by('-cantidad_total').first()
-    
-    # Hora pico de ventas (últimos 7 días)
-    ventas_por_hora_analisis = {}
-    for venta in Venta.objects.filter(fecha_venta__gte=hace_7_dias):
-        hora = venta.fecha_venta.hour
-        ventas_por_hora_analisis[hora] = ventas_por_hora_analisis.get(hora, 0) + 1
-    
-    hora_pico = max(ventas_por_hora_analisis.items(), key=lambda x: x[1])[0] if ventas_por_hora_analisis else 0
-    
-    # Ventas por fecha (últimos 30 días) para el gráfico
-    import json
-    from collections import defaultdict
-    
-    ventas_por_fecha_dict = defaultdict(lambda: {'total': Decimal('0'), 'cantidad': 0})
-    
-    for venta in Venta.objects.filter(fecha_venta__gte=hace_30_dias, **filtro_usuario):
-        fecha_str = venta.fecha_venta.date().strftime('%Y-%m-%d')
-        ventas_por_fecha_dict[fecha_str]['total'] += venta.total_venta
-        ventas_por_fecha_dict[fecha_str]['cantidad'] += 1
-    
-    # Ordenar por fecha
-    ventas_ordenadas = sorted(ventas_por_fecha_dict.items())
-    
-    # Preparar datos para el gráfico
-    ventas_fechas = [fecha for fecha, _ in ventas_ordenadas]
-    ventas_totales = [float(datos['total']) for _, datos in ventas_ordenadas]
-    
-    context = {
-        'total_hoy': float(total_hoy),
-        'cantidad_hoy': cantidad_hoy,
-        'total_7dias': float(total_7dias),
-        'cantidad_7dias': cantidad_7dias,
-        'total_30dias': float(total_30dias),
-        'cantidad_30dias': cantidad_30dias,
-        'ticket_promedio': float(ticket_promedio),
-        'metodos_pago': list(metodos_pago),
-        'canales_venta': list(canales_venta),
-        'top_productos': list(top_productos),
-        'top_vendedores': list(top_vendedores),
-        'top_clientes': list(top_clientes),
-        'total_productos': total_productos,
-        'productos_bajos_stock': productos_bajos_stock,
-        'productos_agotados': productos_agotados,
-        'valor_inventario': float(valor_inventario),
-        'total_clientes': total_clientes,
-        'crecimiento': float(crecimiento),
-        'producto_dia': producto_dia,
-        'hora_pico': hora_pico,
-        'ganancia_bruta': float(ganancia_bruta),
-        'margen_porcentaje': float(margen_porcentaje),
-        'productos_sin_movimiento': productos_sin_movimiento,
-        'ingresos_30dias': float(ingresos_30dias),
-        'costos_30dias': float(costos_30dias),
-        'ventas_fechas_json': json.dumps(ventas_fechas),
-        'ventas_totales_json': json.dumps(ventas_totales),
-        'lista_productos_stock_bajo': lista_productos_stock_bajo,
-        'lista_productos_agotados': lista_productos_agotados,
-        'lista_productos_sin_movimiento': lista_productos_sin_movimiento,
-        'es_vendedor': es_vendedor,
-    }
+    resultado = metricas.calcular_metricas(usuario=request.user if es_vendedor else None)
+
+    context = resultado.como_contexto()
+    context['es_vendedor'] = es_vendedor
     
     return render(request, 'pos/dashboard_reportes.html', context)
 
 
 @login_required
+@cache_respuesta('api_ventas_por_fecha', grupos=(VENTAS,))
 def api_ventas_por_fecha(request):
     """API para gráfico de ventas por fecha (últimos 30 días)"""
     dias = int(request.GET.get('dias', 30))
-    fecha_inicio = timezone.now() - timedelta(days=dias)
+    fecha_inicio = timezone.localdate() - timedelta(days=dias)
     
-    ventas_por_fecha = Venta.objects.filter(
-        fecha_venta__gte=fecha_inicio
-    ).annotate(
-        fecha=TruncDate('fecha_venta')
-    ).values('fecha').annotate(
-        total=Sum('total_venta'),
-        cantidad=Count('id')
-    ).order_by('fecha')
+    ventas_por_fecha = resumen.resumen(desde=fecha_inicio).values('fecha').annotate(
+        total=Sum('total_ventas'),
+        cantidad=Sum('numero_ventas')
+    ).filter(cantidad__gt=0).order_by('fecha')
     
     datos = {
         'fechas': [v['fecha'].strftime('%Y-%m-%d') for v in ventas_por_fecha],
@@ -884,14 +690,14 @@ def api_ventas_por_fecha(request):
 def api_comparativa_metodos_pago(request):
     """API para comparativa de métodos de pago"""
     dias = int(request.GET.get('dias', 30))
-    fecha_inicio = timezone.now() - timedelta(days=dias)
+    fecha_inicio = timezone.localdate() - timedelta(days=dias)
     
-    datos = Pago.objects.filter(
-        venta__fecha_venta__gte=fecha_inicio
+    datos = resumen.resumen(desde=fecha_inicio).exclude(
+        metodo_pago=resumen.METODO_SIN_PAGO
     ).values('metodo_pago').annotate(
-        total=Sum('monto'),
-        cantidad=Count('id')
-    ).order_by('-total')
+        total=Sum('total_ventas'),
+        cantidad=Sum('numero_ventas')
+    ).filter(cantidad__gt=0).order_by('-total')
     
     return JsonResponse({
         'metodos': [d['metodo_pago'] for d in datos],
@@ -903,30 +709,48 @@ def api_comparativa_metodos_pago(request):
 @login_required
 def api_ventas_por_hora(request):
     """API para análisis de ventas por hora del día"""
-    dias = int(request.GET.get('dias', 7))
-    fecha_inicio = timezone.now() - timedelta(days=dias)
-    
-    ventas = Venta.objects.filter(fecha_venta__gte=fecha_inicio)
+    try:
+        dias = mapa_calor.validar_dias(request.GET.get('dias'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
-    # Agrupar por hora
-    ventas_por_hora = {}
-    for venta in ventas:
-        hora = venta.fecha_venta.hour
-        if hora not in ventas_por_hora:
-            ventas_por_hora[hora] = {'cantidad': 0, 'total': 0}
-        ventas_por_hora[hora]['cantidad'] += 1
-        ventas_por_hora[hora]['total'] += float(venta.total_venta)
+    datos = mapa_calor.mapa_calor(dias)
     
-    # Ordenar por hora
-    horas = sorted(ventas_por_hora.keys())
+    # Sumar los días de la semana y dejar solo las horas con ventas
+    cantidades = [sum(dia[h] for dia in datos['cantidades']) for h in range(24)]
+    totales = [sum(dia[h] for dia in datos['totales']) for h in range(24)]
+    horas = [h for h in range(24) if cantidades[h]]
     
     return JsonResponse({
         'horas': [f"{h:02d}:00" for h in horas],
-        'cantidades': [ventas_por_hora[h]['cantidad'] for h in horas],
-        'totales': [ventas_por_hora[h]['total'] for h in horas],
+        'cantidades': [cantidades[h] for h in horas],
+        'totales': [totales[h] for h in horas],
     })
 
 
+@login_required
+@check_user_role(allowed_roles=['Administrador', 'Vendedor'])
+def api_mapa_calor_ventas(request):
+    """
+    API del mapa de calor de ventas (día de la semana × hora local).
+
+    Parámetros: ``dias`` (ventana, 7 por defecto) y ``vendedor`` (id del
+    usuario, solo para administradores; un vendedor siempre ve sus ventas).
+    """
+    try:
+        dias = mapa_calor.validar_dias(request.GET.get('dias'))
+        if request.user.rol.nombre == 'Vendedor':
+            usuario_id = request.user.id
+        elif request.GET.get('vendedor'):
+            usuario_id = int(request.GET['vendedor'])
+        else:
+            usuario_id = None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse(dict(mapa_calor.mapa_calor(dias, usuario_id), success=True))
+
+
 # ==================== GESTIÓN DE MESAS ====================
 
 @login_required
@@ -934,25 +758,12 @@ def api_listar_mesas(request):
     """API para listar todas las mesas con su estado"""
     from .models import Mesa
     
-    mesas = Mesa.objects.filter(activa=True).order_by('numero')
+    # Antes de la consulta: el tablero en vivo sigue desde aquí sin perder cambios
+    ultimo_evento = tablero.ultimo_evento()
+    mesas = Mesa.objects.filter(activa=True).select_related('cliente').order_by('numero')
+    mesas_data = [tablero.mesa_a_dict(mesa) for mesa in mesas]
     
-    mesas_data = []
-    for mesa in mesas:
-        mesas_data.append({
-            'id': mesa.id,
-            'numero': mesa.numero,
-            'nombre': mesa.nombre,
-            'capacidad': mesa.capacidad,
-            'estado': mesa.estado,
-            'cuenta_abierta': mesa.cuenta_abierta,
-            'total_cuenta': float(mesa.total_cuenta),
-            'cliente': {
-                'id': mesa.cliente.id,
-                'nombre': f"{mesa.cliente.nombres} {mesa.cliente.apellidos}"
-            } if mesa.cliente else None
-        })
-    
-    return JsonResponse({'success': True, 'mesas': mesas_data})
+    return JsonResponse({'success': True, 'mesas': mesas_data, 'ultimo_evento': ultimo_evento})
 
 
 @login_required
@@ -1124,18 +935,22 @@ def api_abrir_mesa(request, mesa_id):
 
 @login_required
 @require_POST
+@transaction.atomic
 def api_agregar_item_mesa(request, mesa_id):
     """API para agregar items a una mesa"""
     from .models import Mesa, ItemMesa
     
     try:
         data = json.loads(request.body)
-        mesa = get_object_or_404(Mesa, pk=mesa_id)
+        # Bloquear la mesa: si otra caja la está cerrando se espera y se ve
+        # cuenta_abierta ya en False, en vez de colgar items de una cuenta cerrada
+        mesa = get_object_or_404(Mesa.objects.select_for_update(), pk=mesa_id)
         
         if not mesa.cuenta_abierta:
             return JsonResponse({'success': False, 'error': 'La mesa no tiene una cuenta abierta'}, status=400)
         
         items = data.get('items', [])
+        agregado = Decimal('0.00')
         
         for item_data in items:
             producto = get_object_or_404(Producto, pk=item_data['producto_id'])
@@ -1154,15 +969,10 @@ def api_agregar_item_mesa(request, mesa_id):
                 subtotal=subtotal,
                 anotacion=anotacion
             )
+            agregado += subtotal
         
-        # Actualizar total de la mesa
-        from .models import ItemMesa
-        total = ItemMesa.objects.filter(mesa=mesa, facturado=False).aggregate(
-            Sum('subtotal')
-        )['subtotal__sum'] or Decimal('0.00')
-        
-        mesa.total_cuenta = total
-        mesa.save()
+        # Sumar lo agregado al total de la mesa sin recorrer sus items
+        total = cuentas_mesa.sumar(mesa, agregado)
         
         return JsonResponse({
             'success': True,
@@ -1171,6 +981,8 @@ def api_agregar_item_mesa(request, mesa_id):
         })
     
     except Exception as e:
+        # Si un producto falla no quedan items sueltos sin sumar al total
+        transaction.set_rollback(True)
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
@@ -1182,18 +994,7 @@ def api_items_mesa(request, mesa_id):
     mesa = get_object_or_404(Mesa, pk=mesa_id)
     items = ItemMesa.objects.filter(mesa=mesa, facturado=False).select_related('producto', 'lote')
     
-    items_data = []
-    for item in items:
-        items_data.append({
-            'id': item.id,
-            'producto': item.producto.nombre,
-            'producto_id': item.producto.id,
-            'lote_id': item.lote.id if item.lote else None,
-            'cantidad': item.cantidad,
-            'precio_unitario': float(item.precio_unitario),
-            'subtotal': float(item.subtotal),
-            'anotacion': item.anotacion or ''
-        })
+    items_data = [tablero.item_a_dict(item) for item in items]
     
     return JsonResponse({
         'success': True,
@@ -1203,6 +1004,30 @@ def api_items_mesa(request, mesa_id):
     })
 
 
+@login_required
+def api_eventos_mesas(request):
+    """
+    Server-sent events con los cambios de mesas e items (ver pos/tablero.py).
+    El cliente empieza desde ``ultimo_evento`` de api/mesas/ (``?desde=``) y
+    al reconectarse el navegador envía ``Last-Event-ID``.
+    """
+    if not tablero.disponible() or not isinstance(request, ASGIRequest):
+        # Sin Redis o en gunicorn (WSGI, ver la_playita_project/asgi.py) no hay
+        # eventos: el navegador no reintenta y pide api/mesas/ al abrir el modal
+        return HttpResponse(status=204)
+
+    desde = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    try:
+        desde = int(desde) if desde not in (None, '') else tablero.ultimo_evento()
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'El parámetro desde debe ser un número entero.'}, status=400)
+    
+    response = StreamingHttpResponse(tablero.flujo_asincrono(desde), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # sin buffer en nginx/proxies
+    return response
+
+
 @login_required
 @require_POST
 def api_editar_item_mesa(request, item_id):
@@ -1230,6 +1055,7 @@ def api_editar_item_mesa(request, item_id):
 
 @login_required
 @require_POST
+@transaction.atomic
 def api_eliminar_item_mesa(request, item_id):
     """API para eliminar un item de una mesa"""
     from .models import ItemMesa
@@ -1241,15 +1067,9 @@ def api_eliminar_item_mesa(request, item_id):
         if item.facturado:
             return JsonResponse({'success': False, 'error': 'No se puede eliminar un item ya facturado'}, status=400)
         
-        item.delete()
-        
-        # Recalcular total de la mesa
-        total = ItemMesa.objects.filter(mesa=mesa, facturado=False).aggregate(
-            Sum('subtotal')
-        )['subtotal__sum'] or Decimal('0.00')
-        
-        mesa.total_cuenta = total
-        mesa.save()
+        # Solo descuenta quien de verdad borró la fila (dos clics seguidos no restan dos veces)
+        eliminados, _ = ItemMesa.objects.filter(pk=item.pk, facturado=False).delete()
+        total = cuentas_mesa.sumar(mesa, -item.subtotal if eliminados else Decimal('0.00'))
         
         return JsonResponse({
             'success': True,
@@ -1258,6 +1078,8 @@ def api_eliminar_item_mesa(request, item_id):
         })
     
     except Exception as e:
+        # El borrado y la resta del total van juntos o no va ninguno
+        transaction.set_rollback(True)
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
@@ -1270,29 +1092,26 @@ def api_cerrar_mesa(request, mesa_id):
     
     try:
         data = json.loads(request.body)
-        print(f"DEBUG - Datos recibidos en cerrar mesa: {data}")
         
-        mesa = get_object_or_404(Mesa, pk=mesa_id)
+        # Bloquear la mesa para que dos cajas no la cierren a la vez
+        mesa = get_object_or_404(Mesa.objects.select_for_update(), pk=mesa_id)
         
         if not mesa.cuenta_abierta:
             return JsonResponse({'success': False, 'error': 'La mesa no tiene una cuenta abierta'}, status=400)
         
-        items = ItemMesa.objects.filter(mesa=mesa, facturado=False)
+        # Una sola consulta con producto y lote de cada item (sin N+1)
+        items = list(ItemMesa.objects.filter(mesa=mesa, facturado=False).select_related('producto', 'lote'))
         
-        if not items.exists():
+        if not items:
             return JsonResponse({'success': False, 'error': 'No hay items en la mesa'}, status=400)
         
         # Obtener el cliente del request o usar el de la mesa como fallback
         cliente_id = data.get('cliente_id')
-        print(f"DEBUG - Cliente ID recibido: {cliente_id}")
-        print(f"DEBUG - Cliente de la mesa: {mesa.cliente}")
         
         if cliente_id:
             cliente = get_object_or_404(Cliente, pk=cliente_id)
-            print(f"DEBUG - Usando cliente del request: {cliente}")
         else:
             cliente = mesa.cliente if mesa.cliente else get_object_or_404(Cliente, pk=1)
-            print(f"DEBUG - Usando cliente fallback: {cliente}")
         
         # Crear la venta
         nueva_venta = Venta.objects.create(
@@ -1310,33 +1129,27 @@ def api_cerrar_mesa(request, mesa_id):
             estado='completado'
         )
         
-        # Crear detalles de venta y actualizar lotes
-        for item in items:
-            VentaDetalle.objects.create(
-                venta=nueva_venta,
-                producto=item.producto,
-                lote=item.lote,
-                cantidad=item.cantidad,
-                subtotal=item.subtotal
-            )
-            
-            # Actualizar lote
-            item.lote.cantidad_disponible -= item.cantidad
-            item.lote.save()
-            
-            # Registrar movimiento de inventario
-            MovimientoInventario.objects.create(
-                producto=item.producto,
-                lote=item.lote,
-                cantidad=-item.cantidad,
-                tipo_movimiento='salida',
-                descripcion=f'Venta Mesa {mesa.numero} - Venta #{nueva_venta.id}',
-                venta=nueva_venta
-            )
-            
-            # Marcar item como facturado
-            item.facturado = True
-            item.save()
+        # Detalles y movimientos con bulk_create y un único UPDATE condicional
+        # sobre los lotes (sumando lo de todos los items de cada lote)
+        registrar_lineas(
+            nueva_venta,
+            [{
+                'producto_id': item.producto_id,
+                'lote_id': item.lote_id,
+                'cantidad': item.cantidad,
+                'precio': item.precio_unitario,
+            } for item in items],
+            {item.producto_id: item.producto for item in items},
+            {item.lote_id: item.lote for item in items},
+            f'Venta Mesa {mesa.numero} - Venta #{{venta.id}}'
+        )
+        
+        # Marcar los items como facturados con un solo UPDATE
+        ItemMesa.objects.filter(id__in=[item.id for item in items]).update(facturado=True)
+        tablero.publicar_al_confirmar('items_facturados', {'mesa_id': mesa.id, 'ids': [item.id for item in items]})
+        
+        resumen.acumular_ventas([nueva_venta.id])
+        facturas.generar_al_confirmar([nueva_venta.id])
         
         # Cerrar y eliminar la mesa
         mesa.cuenta_abierta = False
@@ -1354,6 +1167,7 @@ def api_cerrar_mesa(request, mesa_id):
         })
     
     except Exception as e:
+        transaction.set_rollback(True)
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
@@ -1382,6 +1196,7 @@ def api_editar_item_mesa(request, mesa_id, item_id):
 
 
 @require_http_methods(["POST"])
+@transaction.atomic
 def api_eliminar_item_mesa(request, mesa_id, item_id):
     """API para eliminar un item de una mesa"""
     try:
@@ -1392,17 +1207,9 @@ def api_eliminar_item_mesa(request, mesa_id, item_id):
         # Guardar el subtotal antes de eliminar
         subtotal = item.subtotal
         
-        # Eliminar el item
-        item.delete()
-        
-        # Recalcular el total de la mesa
-        mesa.total_cuenta = ItemMesa.objects.filter(
-            mesa=mesa,
-            facturado=False
-        ).aggregate(
-            total=Sum('subtotal')
-        )['total'] or Decimal('0.00')
-        mesa.save()
+        # Eliminar el item y restar su subtotal del total de la mesa
+        eliminados, _ = ItemMesa.objects.filter(pk=item.pk).delete()
+        cuentas_mesa.sumar(mesa, -subtotal if eliminados and not item.facturado else Decimal('0.00'))
         
         return JsonResponse({
             'success': True,
@@ -1413,6 +1220,7 @@ def api_eliminar_item_mesa(request, mesa_id, item_id):
     except ItemMesa.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Item no encontrado'}, status=404)
     except Exception as e:
+        transaction.set_rollback(True)
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
@@ -7,12 +7,14 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 import logging
 
+from core.correos import encolar
+
 logger = logging.getLogger(__name__)
 
 
 def enviar_correo_respuesta(pqrs, respuesta):
     """
-    Envía un correo al cliente con la respuesta del PQRS usando templates HTML elegantes
+    Deja en la bandeja de salida el correo al cliente con la respuesta del PQRS usando templates HTML elegantes
     """
     try:
         # Preparar contexto para los templates
@@ -38,15 +40,10 @@ def enviar_correo_respuesta(pqrs, respuesta):
         )
         email.attach_alternative(html_content, "text/html")
         
-        # Enviar email
-        result = email.send(fail_silently=False)
-        
-        if result:
-            logger.info(f"[PQRS] ✓ Email de respuesta enviado exitosamente para caso {pqrs.numero_caso} a {pqrs.cliente.correo}")
-            return True
-        else:
-            logger.error(f"[PQRS] ✗ Error enviando email de respuesta para caso {pqrs.numero_caso}")
-            return False
+        # Lo envía el comando enviar_correos (core/correos.py)
+        encolar(email, origen='pqrs_respuesta')
+        logger.info(f"[PQRS] ✓ Email de respuesta en cola para caso {pqrs.numero_caso} a {pqrs.cliente.correo}")
+        return True
             
     except Exception as e:
         logger.error(f"[PQRS] ✗ Error al enviar correo de respuesta para caso {pqrs.numero_caso}: {e}", exc_info=True)
@@ -55,7 +52,7 @@ def enviar_correo_respuesta(pqrs, respuesta):
 
 def enviar_correo_cambio_estado(pqrs, estado_anterior, estado_nuevo, observacion=None):
     """
-    Envía un correo al cliente notificando el cambio de estado usando templates HTML elegantes
+    Deja en la bandeja de salida el correo al cliente notificando el cambio de estado usando templates HTML elegantes
     """
     try:
         # Mapear estados para obtener la clave
@@ -94,15 +91,10 @@ def enviar_correo_cambio_estado(pqrs, estado_anterior, estado_nuevo, observacion
         )
         email.attach_alternative(html_content, "text/html")
         
-        # Enviar email
-        result = email.send(fail_silently=False)
-        
-        if result:
-            logger.info(f"[PQRS] ✓ Email de cambio de estado enviado exitosamente para caso {pqrs.numero_caso} a {pqrs.cliente.correo}")
-            return True
-        else:
-            logger.error(f"[PQRS] ✗ Error enviando email de cambio de estado para caso {pqrs.numero_caso}")
-            return False
+        # Lo envía el comando enviar_correos (core/correos.py)
+        encolar(email, origen='pqrs_estado')
+        logger.info(f"[PQRS] ✓ Email de cambio de estado en cola para caso {pqrs.numero_caso} a {pqrs.cliente.correo}")
+        return True
             
     except Exception as e:
         logger.error(f"[PQRS] ✗ Error al enviar correo de cambio de estado para caso {pqrs.numero_caso}: {e}", exc_info=True)
@@ -305,10 +305,10 @@ def pqrs_update(request, pk):
                     evento.fecha_envio_correo = timezone.now()
                     evento.save()
                     logger.info(f"[RESPUESTA] Correo enviado exitosamente")
-                    messages.success(request, 'Respuesta guardada y correo enviado exitosamente.')
+                    messages.success(request, 'Respuesta guardada y correo en cola de envío.')
                 else:
                     logger.warning(f"[RESPUESTA] Error al enviar correo")
-                    messages.warning(request, 'Respuesta guardada, pero hubo un error al enviar el correo.')
+                    messages.warning(request, 'Respuesta guardada, pero no se pudo preparar el correo.')
 
             # 2. Handle State Changes
             estado_anterior = pqrs.estado
@@ -0,0 +1,33 @@
+#!/bin/bash
+# Procesos de fondo de La Playita.
+# Un solo proceso de Django (python manage.py procesos_fondo, ver
+# core/procesos_fondo.py) corre todas las tareas: correos, reportes, puntos,
+# purgas y métricas diarias. Usa la memoria de un worker de gunicorn más.
+# Corre en el mismo contenedor que gunicorn (los reportes y las facturas van
+# a su disco local) y se reinicia solo si termina.
+# Lo lanzan start.sh, import_backup.sh, Procfile (web) y nixpacks.toml antes
+# de gunicorn. PROCESOS_FONDO=0 lo desactiva, si corre en otro servicio.
+# También arranca el proceso ASGI de los eventos del tablero (abajo).
+
+cd "$(dirname "$0")"
+
+# Eventos del tablero de mesas (pos/tablero.py): un proceso ASGI pequeño que
+# solo atiende /pos/api/mesas/eventos/ (la_playita_project/asgi.py). El proxy
+# debe enviar esa ruta a EVENTOS_ASGI_PUERTO; si llega a gunicorn responde 204
+# y el modal pide la lista al abrirse. EVENTOS_ASGI=0 lo desactiva.
+if [ "${EVENTOS_ASGI:-1}" != "0" ]; then
+    echo "Iniciando eventos del tablero en el puerto ${EVENTOS_ASGI_PUERTO:-8001}..."
+    ( while true; do
+        uvicorn la_playita_project.asgi:application --host 0.0.0.0 \
+            --port "${EVENTOS_ASGI_PUERTO:-8001}" --lifespan off
+        sleep 5
+    done ) &
+fi
+
+if [ "${PROCESOS_FONDO:-1}" = "0" ]; then
+    echo "Procesos de fondo desactivados (PROCESOS_FONDO=0)"
+    exit 0
+fi
+
+echo "Iniciando procesos de fondo..."
+( while true; do python manage.py procesos_fondo; sleep 5; done ) &
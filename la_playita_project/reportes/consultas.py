@@ -0,0 +1,29 @@
+"""
+Lectura por bloques de tablas grandes para las exportaciones.
+
+``QuerySet.iterator(chunk_size=...)`` no alcanza con MySQL/MariaDB: el
+driver trae igual el resultado completo a memoria. ``recorrer_por_id`` pide
+bloques de ``tamano`` filas ordenadas por id (``WHERE id > ultimo``), así que
+la memoria no depende del largo del reporte y cada consulta usa la clave
+primaria.
+"""
+from django.conf import settings
+
+TAMANO_BLOQUE = getattr(settings, 'REPORTES_TAMANO_BLOQUE', 2000)
+
+
+def recorrer_por_id(queryset, *campos, tamano=None, despues_de=None):
+    """
+    Tuplas de ``campos`` (el primero debe ser ``'id'``) en orden de id, de
+    a ``tamano`` por consulta, empezando después del id ``despues_de``.
+    """
+    tamano = tamano or TAMANO_BLOQUE
+    queryset = queryset.order_by('id').values_list(*campos)
+    ultimo = despues_de
+    while True:
+        bloque = queryset if ultimo is None else queryset.filter(id__gt=ultimo)
+        filas = list(bloque[:tamano])
+        yield from filas
+        if len(filas) < tamano:
+            return
+        ultimo = filas[-1][0]
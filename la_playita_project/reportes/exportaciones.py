@@ -0,0 +1,189 @@
+"""
+Exportación masiva de tablas para análisis (CSV o columnar).
+
+``GET /reportes/exportar/<tabla>/`` devuelve en una sola respuesta, enviada
+por partes, todas las filas de ``venta``, ``venta_detalle``,
+``movimiento_inventario`` o ``lote`` del rango pedido, sin pasar por las
+páginas de 25 filas de la API:
+
+- ``desde`` / ``hasta`` (AAAA-MM-DD, días locales inclusive) filtran por la
+  fecha de cada tabla con un rango sobre la columna, no con ``__date``.
+- ``despues_de`` (id) y ``limite`` permiten paginar por clave: la respuesta
+  trae en ``X-Siguiente-Despues-De`` el id desde el que sigue la próxima
+  página cuando quedan más filas.
+- ``formato=csv`` (por defecto) o ``formato=columnas``: JSON por líneas, una
+  línea de cabecera con las columnas y luego un bloque por línea con los
+  valores agrupados por columna (más compacto y directo de cargar en
+  pandas: ``pd.DataFrame(bloque['datos'])`` por línea).
+
+Las filas se leen de a ``REPORTES_TAMANO_BLOQUE`` por id
+(``consultas.recorrer_por_id``), así que la memoria no depende del rango.
+"""
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.models import Lote, MovimientoInventario
+from pos.models import Venta, VentaDetalle
+from . import consultas
+
+# tabla -> (modelo, campo de fecha, [(columna, campo)])
+TABLAS = {
+    'venta': (Venta, 'fecha_venta', [
+        ('id', 'id'), ('fecha_venta', 'fecha_venta'), ('cliente_id', 'cliente_id'),
+        ('usuario_id', 'usuario_id'), ('canal_venta', 'canal_venta'), ('total_venta', 'total_venta'),
+        ('pedido_id', 'pedido_id'),
+    ]),
+    'venta_detalle': (VentaDetalle, 'venta__fecha_venta', [
+        ('id', 'id'), ('venta_id', 'venta_id'), ('fecha_venta', 'venta__fecha_venta'),
+        ('producto_id', 'producto_id'), ('lote_id', 'lote_id'), ('cantidad', 'cantidad'),
+        ('subtotal', 'subtotal'),
+    ]),
+    'movimiento_inventario': (MovimientoInventario, 'fecha_movimiento', [
+        ('id', 'id'), ('fecha_movimiento', 'fecha_movimiento'), ('producto_id', 'producto_id'),
+        ('lote_id', 'lote_id'), ('tipo_movimiento', 'tipo_movimiento'), ('cantidad', 'cantidad'),
+        ('costo_unitario', 'costo_unitario'), ('venta_id', 'venta_id'),
+        ('reabastecimiento_id', 'reabastecimiento_id'), ('usuario_id', 'usuario_id'),
+        ('descripcion', 'descripcion'),
+    ]),
+    'lote': (Lote, 'fecha_entrada', [
+        ('id', 'id'), ('fecha_entrada', 'fecha_entrada'), ('producto_id', 'producto_id'),
+        ('numero_lote', 'numero_lote'), ('cantidad_disponible', 'cantidad_disponible'),
+        ('costo_unitario_lote', 'costo_unitario_lote'), ('fecha_caducidad', 'fecha_caducidad'),
+        ('estado', 'estado'), ('reabastecimiento_detalle_id', 'reabastecimiento_detalle_id'),
+    ]),
+}
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'columnas': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def _fecha(texto, nombre):
+    if not texto:
+        return None
+    fecha = parse_date(texto)
+    if fecha is None:
+        raise ValueError(f'{nombre} debe tener el formato AAAA-MM-DD')
+    return fecha
+
+
+class Exportacion:
+    """Una tabla con sus filtros, lista para ``filas()`` o ``generar()``."""
+
+    def __init__(self, tabla, desde=None, hasta=None, despues_de=None, limite=None, formato='csv'):
+        if tabla not in TABLAS:
+            raise ValueError(f'Tabla desconocida: {tabla}. Opciones: {", ".join(TABLAS)}')
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato desconocido: {formato}. Opciones: {", ".join(FORMATOS)}')
+        self.tabla = tabla
+        self.formato = formato
+        self.desde = _fecha(desde, 'desde')
+        self.hasta = _fecha(hasta, 'hasta')
+        try:
+            self.despues_de = int(despues_de) if despues_de else None
+            self.limite = int(limite) if limite else None
+        except ValueError:
+            raise ValueError('despues_de y limite deben ser números enteros')
+        if self.limite is not None and self.limite <= 0:
+            raise ValueError('limite debe ser mayor a 0')
+
+        modelo, campo_fecha, columnas = TABLAS[tabla]
+        self.columnas = [columna for columna, _ in columnas]
+        self.campos = [campo for _, campo in columnas]
+        queryset = modelo.objects.all()
+        if self.desde:
+            queryset = queryset.filter(**{f'{campo_fecha}__gte': _inicio_del_dia(self.desde)})
+        if self.hasta:
+            queryset = queryset.filter(**{f'{campo_fecha}__lt': _inicio_del_dia(self.hasta + timedelta(days=1))})
+        self.queryset = queryset
+
+    @property
+    def content_type(self):
+        return FORMATOS[self.formato][0]
+
+    @property
+    def nombre_archivo(self):
+        rango = '_'.join(str(fecha) for fecha in (self.desde, self.hasta) if fecha)
+        return f"{self.tabla}{'_' + rango if rango else ''}.{FORMATOS[self.formato][1]}"
+
+    def siguiente(self):
+        """Con ``limite``: id para ``despues_de`` de la página siguiente, o None si no quedan filas."""
+        if not self.limite:
+            return None
+        pendientes = self.queryset.order_by('id')
+        if self.despues_de is not None:
+            pendientes = pendientes.filter(id__gt=self.despues_de)
+        ids = list(pendientes.values_list('id', flat=True)[self.limite - 1:self.limite + 1])
+        return ids[0] if len(ids) == 2 else None
+
+    def filas(self):
+        filas = consultas.recorrer_por_id(self.queryset, *self.campos, despues_de=self.despues_de,
+                                          tamano=min(self.limite or consultas.TAMANO_BLOQUE, consultas.TAMANO_BLOQUE))
+        for numero, fila in enumerate(filas, start=1):
+            yield fila
+            if numero == self.limite:
+                return
+
+    def _bloques(self):
+        bloque = []
+        for fila in self.filas():
+            bloque.append(fila)
+            if len(bloque) >= consultas.TAMANO_BLOQUE:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+
+    def generar(self):
+        """Contenido por partes (una por bloque de filas)."""
+        if self.formato == 'columnas':
+            return self._generar_columnas()
+        return self._generar_csv()
+
+    def _generar_csv(self):
+        salida = io.StringIO()
+        escritor = csv.writer(salida)
+        escritor.writerow(self.columnas)
+        for bloque in self._bloques():
+            escritor.writerows([_texto(valor) for valor in fila] for fila in bloque)
+            yield salida.getvalue().encode('utf-8')
+            salida.seek(0)
+            salida.truncate()
+        if salida.tell():
+            yield salida.getvalue().encode('utf-8')
+
+    def _generar_columnas(self):
+        yield _json({'tabla': self.tabla, 'columnas': self.columnas})
+        for bloque in self._bloques():
+            yield _json({'filas': len(bloque), 'datos': dict(zip(self.columnas, map(list, zip(*bloque))))})
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+    return valor
+
+
+def _valor_json(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, datetime):
+        return _texto(valor)
+    return valor.isoformat()
+
+
+def _json(objeto):
+    return (json.dumps(objeto, default=_valor_json, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
@@ -0,0 +1,125 @@
+"""
+Foto diaria del reporte de inventario.
+
+El reporte (pantalla y Excel) se arma con consultas anotadas, sin cálculos
+por fila en Python:
+
+- el valor de cada producto (``stock_actual * precio_unitario``) sale de la
+  base con ``ExpressionWrapper`` (``VALOR_STOCK``);
+- los productos sin movimiento en 30 días se buscan con ``NOT EXISTS``
+  correlacionado por producto, en vez de ``NOT IN`` sobre todos los
+  movimientos (MySQL materializa la subconsulta completa);
+- los días restantes de cada lote se calculan contra una sola fecha ``hoy``.
+
+``foto()`` devuelve listas de diccionarios, listas para pintar o guardar. Se
+guardan en la caché con una clave que incluye la fecha local y la versión de
+los grupos ``inventario`` y ``ventas`` de ``core/cache_respuestas.py``: la
+foto vale por el día y se descarta sola en cuanto se registra una venta o un
+movimiento. ``REPORTE_INVENTARIO_TTL`` (segundos, 1 hora por defecto) acota
+cuánto vive si no hay cambios. Sin caché compartida entre procesos
+(``CACHE_RESPUESTAS_ACTIVA`` False) la foto se calcula en cada pedido.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, Sum
+from django.utils import timezone
+
+from core import cache_respuestas
+from inventory.models import Lote, MovimientoInventario, Producto
+from pos.models import VentaDetalle
+
+TTL = getattr(settings, 'REPORTE_INVENTARIO_TTL', 60 * 60)
+CLAVE = 'reporte_inventario:{fecha}:{versiones}'
+
+VALOR_STOCK = ExpressionWrapper(
+    F('stock_actual') * F('precio_unitario'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def _clave(hoy):
+    versiones = '.'.join(
+        str(cache_respuestas.version(grupo))
+        for grupo in (cache_respuestas.INVENTARIO, cache_respuestas.VENTAS)
+    )
+    return CLAVE.format(fecha=hoy.isoformat(), versiones=versiones)
+
+
+def foto():
+    """Datos del reporte de inventario, desde la caché si la foto del día sigue vigente."""
+    hoy = timezone.localdate()
+    if not cache_respuestas.activa():
+        return calcular(hoy)
+
+    clave = _clave(hoy)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular(hoy)
+        cache.set(clave, datos, TTL)
+    return datos
+
+
+def calcular(hoy):
+    """Arma la foto del inventario para la fecha ``hoy`` (seis consultas)."""
+    ahora = timezone.now()
+    hace_30_dias = ahora - timedelta(days=30)
+    productos = Producto.objects.annotate(valor=VALOR_STOCK)
+
+    # Productos con stock bajo
+    productos_stock_bajo = list(productos.filter(
+        stock_actual__lte=F('stock_minimo')
+    ).order_by('stock_actual').values(
+        'id', 'nombre', 'stock_actual', 'stock_minimo', 'precio_unitario', 'valor'
+    ))
+
+    # Productos próximos a vencer (30 días)
+    lotes_por_vencer = list(Lote.objects.filter(
+        fecha_caducidad__lte=hoy + timedelta(days=30),
+        cantidad_disponible__gt=0
+    ).order_by('fecha_caducidad').values(
+        'id', 'producto__nombre', 'numero_lote', 'cantidad_disponible', 'fecha_caducidad'
+    ))
+    for lote in lotes_por_vencer:
+        lote['dias_restantes'] = (lote['fecha_caducidad'] - hoy).days
+
+    # Valor total del inventario
+    valor_inventario = Producto.objects.aggregate(
+        valor_total=Sum(VALOR_STOCK)
+    )['valor_total'] or 0
+
+    # Productos sin movimiento (últimos 30 días)
+    movimientos_recientes_producto = MovimientoInventario.objects.filter(
+        producto=OuterRef('pk'), fecha_movimiento__gte=hace_30_dias
+    )
+    productos_sin_movimiento = list(productos.filter(
+        stock_actual__gt=0
+    ).filter(
+        ~Exists(movimientos_recientes_producto)
+    ).order_by('nombre').values(
+        'id', 'nombre', 'stock_actual', 'precio_unitario', 'valor'
+    ))
+
+    # Top productos por rotación
+    productos_mas_vendidos = list(VentaDetalle.objects.filter(
+        venta__fecha_venta__gte=hace_30_dias
+    ).values('producto__nombre').annotate(
+        cantidad_vendida=Sum('cantidad'),
+        ingresos=Sum('subtotal')
+    ).order_by('-cantidad_vendida')[:10])
+
+    # Movimientos recientes
+    movimientos_recientes = list(MovimientoInventario.objects.order_by('-fecha_movimiento').values(
+        'id', 'fecha_movimiento', 'producto__nombre', 'tipo_movimiento', 'cantidad', 'lote__numero_lote'
+    )[:20])
+
+    return {
+        'fecha': hoy,
+        'productos_stock_bajo': productos_stock_bajo,
+        'lotes_por_vencer': lotes_por_vencer,
+        'valor_inventario': valor_inventario,
+        'productos_sin_movimiento': productos_sin_movimiento,
+        'productos_mas_vendidos': productos_mas_vendidos,
+        'movimientos_recientes': movimientos_recientes,
+    }
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes.trabajos import WORKERS, procesar_pendientes, purgar
+
+
+class Command(BaseCommand):
+    help = 'Genera las exportaciones pendientes de la cola de reportes (tabla trabajo_reporte).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=10,
+                            help='Trabajos tomados por vuelta')
+        parser.add_argument('--workers', type=int, default=WORKERS,
+                            help=f'Trabajos generados en paralelo (por defecto {WORKERS})')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Si es mayor a 0, se queda corriendo y revisa la cola cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            totales = {'listos': 0, 'fallidos': 0}
+            while True:
+                resultado = procesar_pendientes(options['lote'], options['workers'])
+                for clave, valor in resultado.items():
+                    totales[clave] += valor
+                if sum(resultado.values()) < options['lote']:
+                    break
+
+            eliminados = purgar()
+            if totales['fallidos']:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  {totales['listos']} reportes generados, {totales['fallidos']} con error."
+                ))
+            elif totales['listos'] or options['intervalo'] <= 0:
+                self.stdout.write(self.style.SUCCESS(f"✅ {totales['listos']} reportes generados."))
+            if eliminados:
+                self.stdout.write(f'{eliminados} trabajos vencidos eliminados.')
+
+            if options['intervalo'] <= 0:
+                return
+            time.sleep(options['intervalo'])
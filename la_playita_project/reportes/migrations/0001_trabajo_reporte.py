@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:31
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador público para consultar y descargar', unique=True)),
+                ('tipo', models.CharField(max_length=40)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('huella', models.CharField(help_text='SHA-256 de tipo + parámetros', max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('fallido', 'Fallido')], default='pendiente', max_length=12)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('bloqueado_hasta', models.DateTimeField(blank=True, null=True)),
+                ('archivo', models.CharField(blank=True, help_text='Ruta relativa a REPORTES_DIR', max_length=255)),
+                ('nombre_archivo', models.CharField(blank=True, max_length=150)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trabajo_reporte',
+                'indexes': [models.Index(fields=['huella', 'estado'], name='idx_trabajo_huella_estado'), models.Index(fields=['estado', 'bloqueado_hasta'], name='idx_trabajo_estado_bloqueo')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_trabajo_reporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='roles',
+            field=models.JSONField(blank=True, default=list, help_text='Roles que pueden ver y descargar el trabajo; vacío, cualquier usuario'),
+        ),
+        migrations.AlterField(
+            model_name='trabajoreporte',
+            name='huella',
+            field=models.CharField(help_text='SHA-256 de tipo + parámetros + roles', max_length=64),
+        ),
+    ]
@@ -1,11 +1,57 @@
-# admin.py
-from django.contrib import admin
+import uuid
 
-# models.py
-# Crea modelos aquí si los necesitas en el futuro.
+from django.conf import settings
+from django.db import models
 
-# tests.py
-# Para pruebas unitarias.
 
-# __init__.py
-# Indica que la carpeta es un módulo Python.
+class TrabajoReporte(models.Model):
+    """
+    Exportación pesada (Excel/PDF) generada en segundo plano (ver reportes/trabajos.py).
+
+    La vista solo registra el trabajo y responde; el comando
+    ``procesar_reportes`` lo genera, guarda el archivo en ``REPORTES_DIR`` y
+    la pantalla consulta el estado hasta que puede descargarlo. Dos pedidos
+    con el mismo tipo y parámetros (``huella``) dentro de ``REPORTES_TTL``
+    comparten el trabajo y el archivo. ``roles`` copia los roles que exige la
+    vista que lo pidió: la página de espera y la descarga los vuelven a
+    exigir, y forman parte de la huella.
+    """
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_PROCESANDO = 'procesando'
+    ESTADO_LISTO = 'listo'
+    ESTADO_FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_PROCESANDO, 'Procesando'),
+        (ESTADO_LISTO, 'Listo'),
+        (ESTADO_FALLIDO, 'Fallido'),
+    ]
+
+    clave = models.UUIDField(default=uuid.uuid4, unique=True, editable=False,
+                             help_text="Identificador público para consultar y descargar")
+    tipo = models.CharField(max_length=40)
+    parametros = models.JSONField(default=dict, blank=True)
+    huella = models.CharField(max_length=64, help_text="SHA-256 de tipo + parámetros + roles")
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    roles = models.JSONField(default=list, blank=True,
+                             help_text="Roles que pueden ver y descargar el trabajo; vacío, cualquier usuario")
+    intentos = models.PositiveIntegerField(default=0)
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)
+    archivo = models.CharField(max_length=255, blank=True, help_text="Ruta relativa a REPORTES_DIR")
+    nombre_archivo = models.CharField(max_length=150, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.tipo} ({self.estado})"
+
+    class Meta:
+        db_table = 'trabajo_reporte'
+        indexes = [
+            models.Index(fields=['huella', 'estado'], name='idx_trabajo_huella_estado'),
+            models.Index(fields=['estado', 'bloqueado_hasta'], name='idx_trabajo_estado_bloqueo'),
+        ]
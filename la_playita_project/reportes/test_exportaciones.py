@@ -0,0 +1,95 @@
+"""
+Tests para la exportación masiva de tablas (reportes/exportaciones.py)
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from pos.models import Venta, VentaDetalle
+from pos.test_checkout import CheckoutTestMixin
+from users.models import Rol
+from . import consultas
+
+
+class ExportacionesTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario.rol = Rol.objects.create(nombre='Administrador')
+        self.usuario.save()
+        self.client = Client()
+        self.client.force_login(self.usuario)
+        self.producto, self.lote = self.crear_producto('Papas')
+        self.ventas = []
+        for dia in (1, 2, 2, 3):
+            fecha = timezone.make_aware(datetime(2025, 3, dia, 23, 30))
+            venta = Venta.objects.create(cliente=self.cliente, usuario=self.usuario, fecha_venta=fecha,
+                                         total_venta=Decimal('12.50'))
+            VentaDetalle.objects.create(venta=venta, producto=self.producto, lote=self.lote,
+                                        cantidad=1, subtotal=Decimal('12.50'))
+            self.ventas.append(venta)
+
+    def exportar(self, tabla, **parametros):
+        return self.client.get(reverse('reportes:exportar_tabla', args=[tabla]), parametros)
+
+    def leer_csv(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_csv_por_rango_de_fechas(self):
+        response = self.exportar('venta', desde='2025-03-02', hasta='2025-03-02')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('venta_2025-03-02_2025-03-02.csv', response['Content-Disposition'])
+        filas = self.leer_csv(response)
+        self.assertEqual(filas[0][:3], ['id', 'fecha_venta', 'cliente_id'])
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], [v.id for v in self.ventas[1:3]])
+        self.assertTrue(filas[1][1].startswith('2025-03-02T23:30:00'))
+        self.assertEqual(filas[1][5], '12.50')
+
+        detalle = self.leer_csv(self.exportar('venta_detalle', desde='2025-03-03'))
+        self.assertEqual([int(fila[1]) for fila in detalle[1:]], [self.ventas[3].id])
+
+    @mock.patch.object(consultas, 'TAMANO_BLOQUE', 2)
+    def test_paginacion_por_clave(self):
+        ids, despues_de, paginas = [], '', 0
+        while True:
+            response = self.exportar('venta', limite=3, despues_de=despues_de)
+            ids += [int(fila[0]) for fila in self.leer_csv(response)[1:]]
+            paginas += 1
+            despues_de = response.get('X-Siguiente-Despues-De')
+            if not despues_de:
+                break
+        self.assertEqual(paginas, 2)
+        self.assertEqual(ids, [v.id for v in self.ventas])
+
+    @mock.patch.object(consultas, 'TAMANO_BLOQUE', 3)
+    def test_formato_columnar(self):
+        response = self.exportar('lote', formato='columnas')
+        lineas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lineas[0]['tabla'], 'lote')
+        self.assertEqual(lineas[1]['datos']['numero_lote'], ['L-Papas'])
+        self.assertEqual(lineas[1]['datos']['fecha_caducidad'], [str(self.lote.fecha_caducidad)])
+
+        response = self.exportar('venta', formato='columnas')
+        cabecera, *bloques = [json.loads(l) for l in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([b['filas'] for b in bloques], [3, 1])
+        self.assertEqual(set(bloques[0]['datos']), set(cabecera['columnas']))
+        self.assertEqual(bloques[0]['datos']['total_venta'], ['12.50'] * 3)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.exportar('usuarios').status_code, 400)
+        self.assertEqual(self.exportar('venta', desde='03/02/2025').status_code, 400)
+        self.assertEqual(self.exportar('venta', formato='xml').status_code, 400)
+
+    def test_solo_administradores(self):
+        self.usuario.rol = self.rol
+        self.usuario.save()
+        self.assertEqual(self.exportar('venta').status_code, 302)
@@ -0,0 +1,112 @@
+"""
+Tests para la foto diaria del reporte de inventario (reportes/inventario.py)
+"""
+import os
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from core import cache_respuestas
+from inventory.models import MovimientoInventario, Producto
+from pos.test_checkout import CheckoutTestMixin
+from . import inventario
+from .views import exportar_inventario
+
+
+@override_settings(CACHE_RESPUESTAS_ACTIVA=True)
+class ReporteInventarioTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.bajo, self.lote_bajo = self.crear_producto('Papas', cantidad=4, precio='2.50', dias_caducidad=5)
+        self.quieto, _ = self.crear_producto('Maní', cantidad=30, precio='1.25')
+        self.movido, _ = self.crear_producto('Gaseosa', cantidad=50, precio='3.00')
+        MovimientoInventario.objects.create(producto=self.movido, cantidad=-2, tipo_movimiento='SALIDA')
+        MovimientoInventario.objects.create(
+            producto=self.quieto, cantidad=-1, tipo_movimiento='SALIDA',
+            fecha_movimiento=timezone.now() - timedelta(days=45)
+        )
+
+    def test_valoracion_y_productos_sin_movimiento(self):
+        datos = inventario.calcular(timezone.localdate())
+
+        self.assertEqual(datos['valor_inventario'], Decimal('197.50'))
+        self.assertEqual([p['nombre'] for p in datos['productos_stock_bajo']], ['Papas'])
+        self.assertEqual(datos['productos_stock_bajo'][0]['valor'], Decimal('10.00'))
+        self.assertEqual([p['nombre'] for p in datos['productos_sin_movimiento']], ['Maní', 'Papas'])
+        self.assertEqual(datos['lotes_por_vencer'][0]['dias_restantes'], 5)
+        self.assertEqual(datos['movimientos_recientes'][0]['producto__nombre'], 'Gaseosa')
+
+    def test_excel_usa_la_foto(self):
+        nombre, content_type, contenido = exportar_inventario({})
+
+        libro = load_workbook(BytesIO(contenido))
+        self.assertEqual(nombre, 'reporte_inventario.xlsx')
+        self.assertEqual(list(libro['Stock Bajo'].values)[1], ('Papas', 4, 10, 2.5, 10))
+        self.assertEqual(list(libro['Por Vencer'].values)[1][4], 5)
+        self.assertEqual([fila[0] for fila in libro['Sin Movimiento'].values][1:], ['Maní', 'Papas'])
+
+    def test_pantalla_usa_la_foto(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('reportes:reporte_inventario'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<h3>$197,50</h3>', html=True)
+        self.assertContains(response, '<td>5</td>', html=True)
+
+    def test_foto_en_cache_hasta_que_cambia_el_inventario(self):
+        primera = inventario.foto()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(inventario.foto(), primera)
+        self.assertEqual(len(consultas), 0)
+
+        Producto.objects.filter(pk=self.quieto.pk).update(stock_actual=0)
+        cache_respuestas.invalidar(cache_respuestas.INVENTARIO)
+
+        self.assertEqual([p['nombre'] for p in inventario.foto()['productos_sin_movimiento']], ['Papas'])
+
+    def crear_historial(self):
+        """500 productos y 50.000 movimientos de hace un año."""
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {n}', precio_unitario=Decimal('1.00'),
+                     stock_actual=n % 20, categoria=self.categoria)
+            for n in range(500)
+        ])
+        hace_un_año = timezone.now() - timedelta(days=365)
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                producto=productos[n % 400], cantidad=1, tipo_movimiento='ENTRADA',
+                fecha_movimiento=hace_un_año + timedelta(minutes=n)
+            )
+            for n in range(50000)
+        ], batch_size=5000)
+
+    def test_consultas_con_50k_movimientos(self):
+        self.crear_historial()
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = inventario.calcular(timezone.localdate())
+
+        self.assertEqual(len(consultas), 6)
+        self.assertEqual(len(datos['productos_sin_movimiento']), 2 + 475)
+
+    @unittest.skipUnless(os.environ.get('BENCHMARKS'), 'Medición de tiempo: correr con BENCHMARKS=1')
+    def test_benchmark_50k_movimientos(self):
+        self.crear_historial()
+
+        inicio = time.perf_counter()
+        inventario.calcular(timezone.localdate())
+        duracion = time.perf_counter() - inicio
+
+        self.assertLess(duracion, 2)
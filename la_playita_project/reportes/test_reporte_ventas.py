@@ -0,0 +1,67 @@
+"""
+Tests para la descarga en Excel del reporte de ventas (reportes/xlsx.py)
+"""
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from openpyxl import load_workbook
+
+from pos.models import Pago, Venta
+from pos.test_checkout import CheckoutTestMixin
+from . import consultas, xlsx
+from .views import exportar_ventas
+
+
+class ReporteVentasExcelTest(CheckoutTestMixin, TestCase):
+
+    def crear_ventas(self, cantidad, metodo='efectivo'):
+        for n in range(cantidad):
+            venta = Venta.objects.create(cliente=self.cliente, usuario=self.usuario,
+                                         canal_venta='mostrador', total_venta=Decimal('10.50'))
+            if metodo:
+                Pago.objects.create(venta=venta, monto=venta.total_venta, metodo_pago=metodo)
+
+    def descargar(self, parametros=None):
+        nombre, content_type, contenido = exportar_ventas(parametros or {})
+        self.assertEqual(nombre, 'reporte_ventas_detallado.xlsx')
+        return load_workbook(BytesIO(b''.join(contenido)))
+
+    def test_libro_con_detalle_y_estilos(self):
+        self.crear_ventas(3)
+        self.crear_ventas(1, metodo=None)
+
+        libro = self.descargar()
+
+        self.assertEqual(libro.sheetnames, ['Resumen', 'Detalle Ventas', 'Top Productos'])
+        detalle = list(libro['Detalle Ventas'].values)
+        self.assertEqual(detalle[0], ('ID', 'Fecha', 'Cliente', 'Canal', 'Método Pago', 'Total'))
+        self.assertEqual(len(detalle), 5)
+        self.assertEqual([fila[4] for fila in detalle[1:]], ['Efectivo'] * 3 + ['N/A'])
+        self.assertEqual(detalle[1][2], 'Cliente Checkout')
+        self.assertEqual(libro['Detalle Ventas']['F2'].number_format, '#,##0.00')
+        self.assertTrue(libro['Detalle Ventas']['A1'].font.b)
+        self.assertEqual(libro['Resumen']['A1'].value, 'REPORTE DE VENTAS - LA PLAYITA')
+
+    def test_consultas_no_crecen_con_las_ventas(self):
+        self.crear_ventas(2)
+        with CaptureQueriesContext(connection) as pocas:
+            self.descargar()
+        self.crear_ventas(20)
+        with CaptureQueriesContext(connection) as muchas:
+            self.descargar()
+        self.assertEqual(len(muchas), len(pocas))
+
+    @mock.patch.object(consultas, 'TAMANO_BLOQUE', 3)
+    @mock.patch.object(xlsx, 'FILAS_POR_BLOQUE', 2)
+    def test_recorre_y_envia_por_bloques(self):
+        self.crear_ventas(7)
+
+        partes = list(exportar_ventas({})[2])
+
+        self.assertGreater(len(partes), 3)
+        ids = [fila[0] for fila in load_workbook(BytesIO(b''.join(partes)))['Detalle Ventas'].values][1:]
+        self.assertEqual(ids, sorted(Venta.objects.values_list('id', flat=True)))
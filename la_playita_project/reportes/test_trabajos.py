@@ -0,0 +1,137 @@
+"""
+Tests para la cola de exportaciones en segundo plano (reportes/trabajos.py)
+"""
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from pos.models import Venta
+from pos.test_checkout import CheckoutTestMixin
+from . import trabajos
+from .models import TrabajoReporte
+
+
+class TrabajosReporteTest(CheckoutTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        parche = mock.patch.object(trabajos, 'DIRECTORIO', directorio.name)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def estado(self, trabajo):
+        return self.client.get(reverse('reportes:trabajo_estado', args=[trabajo.clave]),
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+
+    def test_descarga_en_segundo_plano_y_reutiliza(self):
+        Venta.objects.create(cliente=self.cliente, usuario=self.usuario, total_venta=Decimal('12.00'))
+        url = reverse('reportes:reporte_ventas')
+
+        response = self.client.get(url, {'descargar': '1', 'canal_venta': ''})
+        trabajo = TrabajoReporte.objects.get()
+        self.assertRedirects(response, reverse('reportes:trabajo_estado', args=[trabajo.clave]))
+        self.assertEqual(self.estado(trabajo)['estado'], TrabajoReporte.ESTADO_PENDIENTE)
+
+        self.assertEqual(trabajos.procesar_pendientes(workers=1), {'listos': 1, 'fallidos': 0})
+        datos = self.estado(trabajo)
+        self.assertEqual(datos['estado'], TrabajoReporte.ESTADO_LISTO)
+        descarga = self.client.get(datos['url_descarga'])
+        libro = load_workbook(BytesIO(b''.join(descarga.streaming_content)))
+        self.assertEqual(len(list(libro['Detalle Ventas'].values)), 2)
+
+        # Mismos parámetros dentro del TTL: mismo trabajo, sin generar de nuevo
+        self.client.get(url, {'descargar': '1'})
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+        self.assertEqual(trabajos.procesar_pendientes(workers=1), {'listos': 0, 'fallidos': 0})
+
+        # Otros filtros o TTL vencido: trabajo nuevo
+        self.client.get(url, {'descargar': '1', 'canal_venta': 'mostrador'})
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(terminado=timezone.now() - timedelta(hours=1))
+        self.client.get(url, {'descargar': '1'})
+        self.assertEqual(TrabajoReporte.objects.count(), 3)
+
+    def test_exportar_productos_por_ajax(self):
+        self.crear_producto('Papas')
+
+        response = self.client.get(reverse('inventory:exportar_productos'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['estado'], TrabajoReporte.ESTADO_PENDIENTE)
+        trabajos.procesar_pendientes(workers=1)
+        trabajo = TrabajoReporte.objects.get()
+        filas = list(load_workbook(trabajos.ruta(trabajo))['Productos'].values)
+        self.assertEqual(filas[1][1:4], ('Papas', '', 'Snacks'))
+
+    def test_respeta_los_roles_de_la_vista(self):
+        de_admin = trabajos.solicitar('inventario', {}, roles=['Administrador'])
+        # El Vendedor (self.usuario) no comparte el trabajo ni puede verlo
+        propio = trabajos.solicitar('inventario', {})
+        self.assertNotEqual(propio.pk, de_admin.pk)
+        self.assertEqual(trabajos.solicitar('inventario', {}, roles=['Administrador']).pk, de_admin.pk)
+
+        trabajos.procesar_pendientes(workers=1)
+        self.assertEqual(self.client.get(reverse('reportes:trabajo_estado', args=[de_admin.clave])).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('reportes:trabajo_descargar', args=[de_admin.clave])).status_code, 404
+        )
+        self.assertEqual(self.estado(propio)['estado'], TrabajoReporte.ESTADO_LISTO)
+
+    def test_reintenta_y_marca_fallido(self):
+        trabajo = trabajos.solicitar('clientes', {})
+        with mock.patch('reportes.views.exportar_clientes', side_effect=RuntimeError('sin memoria')):
+            for _ in range(trabajos.MAX_INTENTOS):
+                self.assertEqual(trabajos.procesar_pendientes(workers=1)['fallidos'], 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoReporte.ESTADO_FALLIDO)
+        self.assertFalse(self.estado(trabajo)['success'])
+        # Un pedido nuevo no reutiliza el fallido
+        self.assertNotEqual(trabajos.solicitar('clientes', {}).pk, trabajo.pk)
+
+    def test_recupera_trabajos_de_un_worker_caido(self):
+        trabajo = trabajos.solicitar('inventario', {})
+        self.assertEqual(len(trabajos.reclamar(5)), 1)
+        self.assertEqual(trabajos.reclamar(5), [])
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(bloqueado_hasta=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(trabajos.procesar_pendientes(workers=1)['listos'], 1)
+
+    def test_trabajo_que_tumba_al_worker_termina_fallido(self):
+        trabajo = trabajos.solicitar('inventario', {})
+        vencido = timezone.now() - timedelta(seconds=1)
+        for _ in range(trabajos.MAX_INTENTOS):
+            self.assertEqual(len(trabajos.reclamar(5)), 1)
+            TrabajoReporte.objects.filter(pk=trabajo.pk).update(bloqueado_hasta=vencido)
+
+        self.assertEqual(trabajos.reclamar(5), [])
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), (TrabajoReporte.ESTADO_FALLIDO, trabajos.MAX_INTENTOS))
+
+    def test_renueva_el_bloqueo_mientras_genera(self):
+        trabajos.solicitar('inventario', {})
+        trabajo = trabajos.reclamar(5)[0]
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(bloqueado_hasta=timezone.now())
+
+        self.assertEqual(trabajos.renovar_bloqueo(trabajo), 1)
+
+        self.assertEqual(trabajos.reclamar(5), [])
+
+    def test_purga_archivos_vencidos(self):
+        trabajo = trabajos.solicitar('inventario', {})
+        trabajos.procesar_pendientes(workers=1)
+        trabajo.refresh_from_db()
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(creado=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(trabajos.purgar(), 1)
+        self.assertFalse(os.path.exists(trabajos.ruta(trabajo)))
@@ -0,0 +1,275 @@
+"""
+Cola de exportaciones pesadas (Excel/PDF) en segundo plano.
+
+Las vistas de descarga no generan el archivo: llaman a
+``responder(request, tipo, parametros)``, que registra un ``TrabajoReporte``
+y devuelve la página de espera (o JSON si la petición es AJAX). Esa página
+consulta el estado del trabajo y descarga el archivo cuando está listo.
+
+- **Permisos**: la vista pasa los roles que exige (``roles``); se guardan en
+  el trabajo y ``trabajo_estado``/``trabajo_descargar`` los vuelven a
+  comprobar con ``puede_ver``, así que conocer la URL no basta.
+- **Deduplicación**: tipo + parámetros + roles forman la ``huella``. Si ya hay un
+  trabajo con la misma huella pendiente, en proceso o terminado hace menos de
+  ``REPORTES_TTL`` segundos (y su archivo sigue en disco), se reutiliza.
+- **Procesamiento**: ``python manage.py procesar_reportes --workers 2``
+  toma trabajos con ``SELECT ... FOR UPDATE SKIP LOCKED``, los
+  aparta ``REPORTES_BLOQUEO_SEGUNDOS`` y los genera en un pool de hilos.
+  Mientras se genera, el bloqueo se renueva cada tercio de ese tiempo, así
+  que un reporte lento no se reclama dos veces. Si el proceso muere (por
+  ejemplo sin memoria), el trabajo vuelve a estar disponible al vencer el
+  bloqueo; tras ``REPORTES_MAX_INTENTOS`` queda ``fallido``, falle el
+  generador o caiga el worker. En el deploy corre cada 5 segundos desde
+  ``procesos_fondo`` (core/procesos_fondo.py), en el mismo contenedor que
+  gunicorn: tiene que ver el mismo disco que la vista de descarga.
+- **Archivos**: se escriben en ``REPORTES_DIR`` (primero a un temporal y luego
+  se renombran) y se borran junto con el trabajo ``REPORTES_RETENCION_HORAS``
+  después de creados.
+
+Cada tipo apunta a una función ``generador(parametros)`` que devuelve
+``(nombre_archivo, content_type, contenido)``; ``contenido`` son bytes o un
+iterable de bytes (por ejemplo ``LibroStreaming.generar()``).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO = getattr(settings, 'REPORTES_DIR', os.path.join(settings.BASE_DIR, 'reportes_generados'))
+TTL = getattr(settings, 'REPORTES_TTL', 60 * 10)
+RETENCION_HORAS = getattr(settings, 'REPORTES_RETENCION_HORAS', 24)
+BLOQUEO_SEGUNDOS = getattr(settings, 'REPORTES_BLOQUEO_SEGUNDOS', 60 * 10)
+MAX_INTENTOS = getattr(settings, 'REPORTES_MAX_INTENTOS', 3)
+WORKERS = getattr(settings, 'REPORTES_WORKERS', 2)
+
+GENERADORES = {
+    'ventas': 'reportes.views.exportar_ventas',
+    'inventario': 'reportes.views.exportar_inventario',
+    'clientes': 'reportes.views.exportar_clientes',
+    'productos': 'inventory.views.exportar_productos',
+    'reabastecimiento_pdf': 'suppliers.reports.exportar_reabastecimiento_pdf',
+}
+
+
+def calcular_huella(tipo, parametros, roles=()):
+    texto = json.dumps([tipo, parametros, sorted(roles)], sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def ruta(trabajo):
+    return os.path.join(DIRECTORIO, trabajo.archivo)
+
+
+def puede_ver(trabajo, usuario):
+    """El usuario tiene alguno de los roles del trabajo (o el trabajo no exige ninguno)."""
+    if not trabajo.roles:
+        return True
+    rol = getattr(getattr(usuario, 'rol', None), 'nombre', None)
+    return rol in trabajo.roles
+
+
+@transaction.atomic
+def solicitar(tipo, parametros, usuario=None, roles=()):
+    """
+    Trabajo para ``tipo`` con ``parametros``: uno vigente con la misma
+    huella o uno nuevo pendiente. ``roles`` son los que exige la vista que lo
+    pide; dos vistas con distintos roles nunca comparten trabajo.
+
+    Raises:
+        ValueError: si el tipo no existe.
+    """
+    if tipo not in GENERADORES:
+        raise ValueError(f'Tipo de reporte desconocido: {tipo}')
+    parametros = {clave: valor for clave, valor in parametros.items() if valor not in (None, '')}
+    roles = sorted(roles)
+    huella = calcular_huella(tipo, parametros, roles)
+
+    vigentes = TrabajoReporte.objects.filter(huella=huella).filter(
+        Q(estado__in=[TrabajoReporte.ESTADO_PENDIENTE, TrabajoReporte.ESTADO_PROCESANDO])
+        | Q(estado=TrabajoReporte.ESTADO_LISTO, terminado__gte=timezone.now() - timedelta(seconds=TTL))
+    ).order_by('-id')
+    for trabajo in vigentes[:1]:
+        if trabajo.estado != TrabajoReporte.ESTADO_LISTO or os.path.exists(ruta(trabajo)):
+            return trabajo
+
+    return TrabajoReporte.objects.create(tipo=tipo, parametros=parametros, huella=huella,
+                                         usuario=usuario, roles=roles)
+
+
+def estado(trabajo):
+    """Lo que consulta la página de espera."""
+    datos = {
+        'success': trabajo.estado != TrabajoReporte.ESTADO_FALLIDO,
+        'clave': str(trabajo.clave),
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'url_estado': reverse('reportes:trabajo_estado', args=[trabajo.clave]),
+    }
+    if trabajo.estado == TrabajoReporte.ESTADO_LISTO:
+        datos['url_descarga'] = reverse('reportes:trabajo_descargar', args=[trabajo.clave])
+        datos['nombre_archivo'] = trabajo.nombre_archivo
+    elif trabajo.estado == TrabajoReporte.ESTADO_FALLIDO:
+        datos['error'] = 'No se pudo generar el reporte. Intente de nuevo más tarde.'
+    return datos
+
+
+def responder(request, tipo, parametros, roles=()):
+    """
+    Registra el trabajo y responde con JSON (AJAX) o con la página de espera.
+    ``roles`` deben ser los mismos de ``check_user_role`` en la vista.
+    """
+    usuario = request.user if request.user.is_authenticated else None
+    trabajo = solicitar(tipo, parametros, usuario, roles)
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse(estado(trabajo), status=202)
+    return redirect('reportes:trabajo_estado', clave=trabajo.clave)
+
+
+@transaction.atomic
+def reclamar(limite):
+    """
+    Toma hasta ``limite`` trabajos pendientes (o en proceso con el bloqueo
+    vencido, de un worker que murió) y los aparta ``BLOQUEO_SEGUNDOS``. Los
+    de bloqueo vencido que ya agotaron ``MAX_INTENTOS`` quedan ``fallido``.
+    """
+    ahora = timezone.now()
+    vencidos = Q(estado=TrabajoReporte.ESTADO_PROCESANDO, bloqueado_hasta__lte=ahora)
+    TrabajoReporte.objects.filter(vencidos, intentos__gte=MAX_INTENTOS).update(
+        estado=TrabajoReporte.ESTADO_FALLIDO,
+        error='El worker no terminó el trabajo en ninguno de sus intentos.',
+    )
+
+    disponibles = TrabajoReporte.objects.filter(
+        Q(estado=TrabajoReporte.ESTADO_PENDIENTE) | (vencidos & Q(intentos__lt=MAX_INTENTOS))
+    ).order_by('id')
+    if connection.features.has_select_for_update_skip_locked:
+        disponibles = disponibles.select_for_update(skip_locked=True)
+    else:
+        disponibles = disponibles.select_for_update()
+    ids = list(disponibles.values_list('id', flat=True)[:limite])
+    if not ids:
+        return []
+
+    TrabajoReporte.objects.filter(id__in=ids).update(
+        estado=TrabajoReporte.ESTADO_PROCESANDO,
+        intentos=F('intentos') + 1,
+        bloqueado_hasta=ahora + timedelta(seconds=BLOQUEO_SEGUNDOS),
+    )
+    return list(TrabajoReporte.objects.filter(id__in=ids).order_by('id'))
+
+
+def renovar_bloqueo(trabajo):
+    """Extiende el bloqueo de un trabajo que se sigue generando."""
+    return TrabajoReporte.objects.filter(pk=trabajo.pk, estado=TrabajoReporte.ESTADO_PROCESANDO).update(
+        bloqueado_hasta=timezone.now() + timedelta(seconds=BLOQUEO_SEGUNDOS)
+    )
+
+
+def _renovar_mientras(trabajo, terminado):
+    try:
+        while not terminado.wait(BLOQUEO_SEGUNDOS / 3):
+            renovar_bloqueo(trabajo)
+    finally:
+        connection.close()
+
+
+def _escribir(destino, contenido):
+    tamano = 0
+    temporal = f'{destino}.{os.getpid()}.tmp'
+    try:
+        with open(temporal, 'wb') as archivo:
+            for parte in [contenido] if isinstance(contenido, (bytes, bytearray)) else contenido:
+                archivo.write(parte)
+                tamano += len(parte)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return tamano
+
+
+def procesar(trabajo):
+    """Genera el archivo de ``trabajo`` (ya reclamado). Devuelve True si quedó listo."""
+    terminado = threading.Event()
+    threading.Thread(target=_renovar_mientras, args=(trabajo, terminado), daemon=True).start()
+    try:
+        nombre, content_type, contenido = import_string(GENERADORES[trabajo.tipo])(trabajo.parametros)
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        trabajo.archivo = f'{trabajo.clave}{os.path.splitext(nombre)[1]}'
+        trabajo.tamano = _escribir(ruta(trabajo), contenido)
+    except Exception as e:
+        trabajo.error = str(e)[:2000]
+        trabajo.estado = (TrabajoReporte.ESTADO_FALLIDO if trabajo.intentos >= MAX_INTENTOS
+                          else TrabajoReporte.ESTADO_PENDIENTE)
+        trabajo.save(update_fields=['estado', 'error'])
+        logger.error(f"[REPORTES] ✗ Trabajo #{trabajo.id} ({trabajo.tipo}) falló "
+                     f"(intento {trabajo.intentos}): {e}", exc_info=True)
+        return False
+    finally:
+        terminado.set()
+
+    trabajo.nombre_archivo = nombre
+    trabajo.content_type = content_type
+    trabajo.estado = TrabajoReporte.ESTADO_LISTO
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=['archivo', 'nombre_archivo', 'content_type', 'tamano', 'estado', 'terminado'])
+    logger.info(f"[REPORTES] ✓ Trabajo #{trabajo.id} ({trabajo.tipo}) listo: {trabajo.tamano} bytes")
+    return True
+
+
+def _procesar_en_hilo(trabajo):
+    try:
+        return procesar(trabajo)
+    finally:
+        # Cada hilo del pool abre su propia conexión; no dejarla colgada
+        connection.close()
+
+
+def procesar_pendientes(limite=10, workers=None):
+    """
+    Reclama y genera un lote de trabajos. Con ``workers`` > 1 los genera en
+    paralelo en un pool de hilos.
+
+    Returns:
+        dict: ``listos`` y ``fallidos`` del lote.
+    """
+    workers = workers or WORKERS
+    trabajos = reclamar(limite)
+    if workers > 1 and len(trabajos) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reportes') as pool:
+            resultados = list(pool.map(_procesar_en_hilo, trabajos))
+    else:
+        resultados = [procesar(trabajo) for trabajo in trabajos]
+    return {'listos': resultados.count(True), 'fallidos': resultados.count(False)}
+
+
+def purgar():
+    """Borra los trabajos terminados (y sus archivos) pasada la retención. Devuelve cuántos."""
+    limite = timezone.now() - timedelta(hours=RETENCION_HORAS)
+    viejos = TrabajoReporte.objects.filter(
+        creado__lt=limite, estado__in=[TrabajoReporte.ESTADO_LISTO, TrabajoReporte.ESTADO_FALLIDO]
+    )
+    for archivo in viejos.exclude(archivo='').values_list('archivo', flat=True):
+        try:
+            os.remove(os.path.join(DIRECTORIO, archivo))
+        except FileNotFoundError:
+            pass
+    eliminados, _ = viejos.delete()
+    return eliminados
@@ -8,4 +8,7 @@ urlpatterns = [
     path('ventas/', views.reporte_ventas, name='reporte_ventas'),
     path('inventario/', views.reporte_inventario, name='reporte_inventario'),
     path('clientes/', views.reporte_clientes, name='reporte_clientes'),
+    path('exportar/<str:tabla>/', views.exportar_tabla, name='exportar_tabla'),
+    path('trabajos/<uuid:clave>/', views.trabajo_estado, name='trabajo_estado'),
+    path('trabajos/<uuid:clave>/descargar/', views.trabajo_descargar, name='trabajo_descargar'),
 ]
@@ -1,28 +1,41 @@
-from django.shortcuts import render
-from django.db.models import Sum, Count, Avg, F, Q, Max, Min
+from django.shortcuts import render, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.db.models import Sum, Count, Avg, F, Q, Max, Min, OuterRef, Subquery
 from django.db.models.functions import TruncDate, TruncHour
+from pos import resumen
 from pos.models import Venta, VentaDetalle, Pago
 from inventory.models import Producto, Lote, MovimientoInventario
-from clients.models import Cliente, PuntosFidelizacion
+from clients.models import Cliente, MetricaCliente, PuntosFidelizacion
 from django.utils.dateparse import parse_date
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import date, timedelta
 from decimal import Decimal
+from io import BytesIO
 import csv
+import itertools
+import os
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
+from users.decorators import check_user_role
+from . import consultas, exportaciones, inventario, trabajos, xlsx
+from .models import TrabajoReporte
+
+
+def _parametros(request, *claves):
+    """Filtros de la petición que definen el reporte (y su huella en la cola de trabajos)."""
+    return {clave: request.GET.get(clave, '') for clave in claves}
 
 def panel_reportes(request):
     return render(request, 'reportes/panel_reportes.html', {})
 
-def reporte_ventas(request):
-    """Reporte mejorado de ventas con análisis detallado"""
+def _datos_ventas(parametros):
+    """Consultas del reporte de ventas (pantalla y Excel) con los filtros de ``parametros``."""
     # Obtener parámetros de fecha
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
-    metodo_pago = request.GET.get('metodo_pago', '')
-    canal_venta = request.GET.get('canal_venta', '')
+    fecha_inicio = parametros.get('fecha_inicio')
+    fecha_fin = parametros.get('fecha_fin')
+    metodo_pago = parametros.get('metodo_pago', '')
+    canal_venta = parametros.get('canal_venta', '')
 
     # Filtrar ventas
     ventas = Venta.objects.select_related('cliente', 'usuario').all()
@@ -36,31 +49,46 @@ def reporte_ventas(request):
     if canal_venta:
         ventas = ventas.filter(canal_venta=canal_venta)
 
+    # Los totales salen del resumen diario (pos/resumen.py), con los mismos filtros
+    filas = resumen.resumen(
+        desde=parse_date(fecha_inicio) if fecha_inicio else None,
+        hasta=parse_date(fecha_fin) if fecha_fin else None,
+    )
+    if metodo_pago:
+        filas = filas.filter(metodo_pago=metodo_pago)
+    if canal_venta:
+        filas = filas.filter(canal_venta=canal_venta)
+
     # Ventas del día
-    hoy = timezone.now().date()
-    ventas_hoy = Venta.objects.filter(fecha_venta__date=hoy)
+    hoy = timezone.localdate()
+    datos_hoy = resumen.resumen(desde=hoy, hasta=hoy).aggregate(
+        total=Sum('total_ventas'), cantidad=Sum('numero_ventas')
+    )
 
     # KPIs principales
-    total_ventas = ventas.aggregate(total=Sum('total_venta'))['total'] or Decimal('0')
-    total_ventas_hoy = ventas_hoy.aggregate(total=Sum('total_venta'))['total'] or Decimal('0')
-    cantidad_ventas = ventas.count()
-    cantidad_ventas_hoy = ventas_hoy.count()
+    kpis = filas.aggregate(total=Sum('total_ventas'), cantidad=Sum('numero_ventas'))
+    total_ventas = kpis['total'] or Decimal('0')
+    total_ventas_hoy = datos_hoy['total'] or Decimal('0')
+    cantidad_ventas = kpis['cantidad'] or 0
+    cantidad_ventas_hoy = datos_hoy['cantidad'] or 0
     ticket_promedio = total_ventas / cantidad_ventas if cantidad_ventas > 0 else Decimal('0')
 
+    con_ventas = filas.filter(numero_ventas__gt=0)
+
     # Ventas por método de pago
-    ventas_por_metodo = Pago.objects.filter(venta__in=ventas).values('metodo_pago').annotate(
-        total=Sum('monto'),
-        cantidad=Count('id')
+    ventas_por_metodo = con_ventas.exclude(metodo_pago=resumen.METODO_SIN_PAGO).values('metodo_pago').annotate(
+        total=Sum('total_ventas'),
+        cantidad=Sum('numero_ventas')
     ).order_by('-total')
 
     # Ventas por canal
-    ventas_por_canal = ventas.values('canal_venta').annotate(
-        total=Sum('total_venta'),
-        cantidad=Count('id')
+    ventas_por_canal = con_ventas.values('canal_venta').annotate(
+        total=Sum('total_ventas'),
+        cantidad=Sum('numero_ventas')
     ).order_by('-total')
 
     # Productos más vendidos
-    productos_mas_vendidos = VentaDetalle.objects.filter(venta__in=ventas).values(
+    productos_mas_vendidos = filas.exclude(producto_id=resumen.SIN_PRODUCTO).values(
         'producto__nombre'
     ).annotate(
         cantidad_total=Sum('cantidad'),
@@ -75,111 +103,8 @@ def reporte_ventas(request):
         cantidad=Count('id')
     ).order_by('hora')
 
-    # Exportar a Excel
-    if 'descargar' in request.GET:
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="reporte_ventas_detallado.xlsx"'
-
-        wb = Workbook()
-        
-        # Estilos
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        title_font = Font(bold=True, size=14, color="2F5496")
-        currency_format = '#,##0.00'
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Hoja 1: Resumen
-        ws1 = wb.active
-        ws1.title = "Resumen"
-        
-        # Título
-        ws1['A1'] = 'REPORTE DE VENTAS - LA PLAYITA'
-        ws1['A1'].font = Font(bold=True, size=16, color="2F5496")
-        ws1.merge_cells('A1:B1')
-        ws1.append([])
-        
-        # KPIs
-        ws1.append(['Total Ventas:', float(total_ventas)])
-        ws1['B3'].number_format = currency_format
-        ws1['A3'].font = Font(bold=True)
-        
-        ws1.append(['Cantidad Ventas:', cantidad_ventas])
-        ws1['A4'].font = Font(bold=True)
-        
-        ws1.append(['Ticket Promedio:', float(ticket_promedio)])
-        ws1['B5'].number_format = currency_format
-        ws1['A5'].font = Font(bold=True)
-        
-        ws1.append([])
-        
-        # Tabla de métodos de pago
-        ws1.append(['Método de Pago', 'Total', 'Cantidad'])
-        for cell in ws1[7]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for metodo in ventas_por_metodo:
-            ws1.append([metodo['metodo_pago'].title(), float(metodo['total']), metodo['cantidad']])
-            ws1.cell(ws1.max_row, 2).number_format = currency_format
-        
-        # Ajustar anchos
-        ws1.column_dimensions['A'].width = 20
-        ws1.column_dimensions['B'].width = 15
-
-        # Hoja 2: Detalle de ventas
-        ws2 = wb.create_sheet("Detalle Ventas")
-        ws2.append(['ID', 'Fecha', 'Cliente', 'Canal', 'Método Pago', 'Total'])
-        
-        for cell in ws2[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for venta in ventas:
-            pago = venta.pago_set.first()
-            ws2.append([
-                venta.id,
-                venta.fecha_venta.strftime('%d/%m/%Y %H:%M'),
-                f"{venta.cliente.nombres} {venta.cliente.apellidos}",
-                venta.canal_venta.title(),
-                pago.metodo_pago.title() if pago else 'N/A',
-                float(venta.total_venta)
-            ])
-            ws2.cell(ws2.max_row, 6).number_format = currency_format
-        
-        # Ajustar anchos
-        ws2.column_dimensions['A'].width = 8
-        ws2.column_dimensions['B'].width = 18
-        ws2.column_dimensions['C'].width = 30
-        ws2.column_dimensions['D'].width = 12
-        ws2.column_dimensions['E'].width = 15
-        ws2.column_dimensions['F'].width = 12
-
-        # Hoja 3: Productos más vendidos
-        ws3 = wb.create_sheet("Top Productos")
-        ws3.append(['Producto', 'Cantidad Vendida', 'Ingresos'])
-        
-        for cell in ws3[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for prod in productos_mas_vendidos:
-            ws3.append([prod['producto__nombre'], prod['cantidad_total'], float(prod['ingresos'])])
-            ws3.cell(ws3.max_row, 3).number_format = currency_format
-        
-        # Ajustar anchos
-        ws3.column_dimensions['A'].width = 40
-        ws3.column_dimensions['B'].width = 18
-        ws3.column_dimensions['C'].width = 15
-
-        wb.save(response)
-        return response
-
-    return render(request, 'reportes/reporte_ventas.html', {
-        'ventas': ventas[:50],  # Limitar a 50 para performance
+    return {
+        'ventas': ventas,
         'total_ventas': total_ventas,
         'total_ventas_hoy': total_ventas_hoy,
         'cantidad_ventas': cantidad_ventas,
@@ -189,317 +114,381 @@ def reporte_ventas(request):
         'ventas_por_canal': ventas_por_canal,
         'productos_mas_vendidos': productos_mas_vendidos,
         'ventas_por_hora': ventas_por_hora,
-    })
+    }
+
+
+def exportar_ventas(parametros):
+    """Excel del reporte de ventas, generado en segundo plano (reportes/trabajos.py)."""
+    datos = _datos_ventas(parametros)
+    libro = xlsx.LibroStreaming()
+
+    # Hoja 1: Resumen
+    libro.hoja('Resumen', [
+        [('REPORTE DE VENTAS - LA PLAYITA', xlsx.TITULO)],
+        [],
+        [('Total Ventas:', xlsx.NEGRITA), (float(datos['total_ventas']), xlsx.MONEDA)],
+        [('Cantidad Ventas:', xlsx.NEGRITA), datos['cantidad_ventas']],
+        [('Ticket Promedio:', xlsx.NEGRITA), (float(datos['ticket_promedio']), xlsx.MONEDA)],
+        [],
+        xlsx.encabezado(['Método de Pago', 'Total', 'Cantidad']),
+    ] + [
+        [metodo['metodo_pago'].title(), (float(metodo['total']), xlsx.MONEDA), metodo['cantidad']]
+        for metodo in datos['ventas_por_metodo']
+    ], anchos=[20, 15], combinar=['A1:B1'])
+
+    # Hoja 2: Detalle de ventas, por bloques y con el método de pago en la misma consulta
+    primer_pago = Pago.objects.filter(venta=OuterRef('pk')).order_by('pk').values('metodo_pago')[:1]
+    detalle = consultas.recorrer_por_id(
+        datos['ventas'].annotate(metodo=Subquery(primer_pago)).distinct(),
+        'id', 'fecha_venta', 'cliente__nombres', 'cliente__apellidos', 'canal_venta', 'metodo', 'total_venta',
+    )
+    libro.hoja('Detalle Ventas', itertools.chain([
+        xlsx.encabezado(['ID', 'Fecha', 'Cliente', 'Canal', 'Método Pago', 'Total']),
+    ], (
+        [
+            venta_id,
+            fecha.strftime('%d/%m/%Y %H:%M'),
+            f"{nombres} {apellidos}",
+            canal.title(),
+            metodo.title() if metodo else 'N/A',
+            (float(total), xlsx.MONEDA),
+        ]
+        for venta_id, fecha, nombres, apellidos, canal, metodo, total in detalle
+    )), anchos=[8, 18, 30, 12, 15, 12])
+
+    # Hoja 3: Productos más vendidos
+    libro.hoja('Top Productos', [
+        xlsx.encabezado(['Producto', 'Cantidad Vendida', 'Ingresos']),
+    ] + [
+        [prod['producto__nombre'], prod['cantidad_total'], (float(prod['ingresos']), xlsx.MONEDA)]
+        for prod in datos['productos_mas_vendidos']
+    ], anchos=[40, 18, 15])
+
+    return 'reporte_ventas_detallado.xlsx', libro.CONTENT_TYPE, libro.generar()
 
 
-def reporte_inventario(request):
-    """Reporte completo de inventario"""
-    # Productos con stock bajo
-    productos_stock_bajo = Producto.objects.filter(
-        stock_actual__lte=F('stock_minimo')
-    ).order_by('stock_actual')
-
-    # Productos próximos a vencer (30 días)
-    fecha_limite = timezone.now().date() + timedelta(days=30)
-    lotes_por_vencer = Lote.objects.filter(
-        fecha_caducidad__lte=fecha_limite,
-        cantidad_disponible__gt=0
-    ).select_related('producto').order_by('fecha_caducidad')
-
-    # Valor total del inventario
-    valor_inventario = Producto.objects.aggregate(
-        valor_total=Sum(F('stock_actual') * F('precio_unitario'))
-    )['valor_total'] or Decimal('0')
-
-    # Productos sin movimiento (últimos 30 días)
-    hace_30_dias = timezone.now() - timedelta(days=30)
-    productos_con_movimiento = MovimientoInventario.objects.filter(
-        fecha_movimiento__gte=hace_30_dias
-    ).values_list('producto_id', flat=True).distinct()
-    
-    productos_sin_movimiento = Producto.objects.exclude(
-        id__in=productos_con_movimiento
-    ).filter(stock_actual__gt=0)
-
-    # Top productos por rotación
-    productos_mas_vendidos = VentaDetalle.objects.filter(
-        venta__fecha_venta__gte=hace_30_dias
-    ).values('producto__nombre').annotate(
-        cantidad_vendida=Sum('cantidad'),
-        ingresos=Sum('subtotal')
-    ).order_by('-cantidad_vendida')[:10]
+def reporte_ventas(request):
+    """Reporte mejorado de ventas con análisis detallado"""
+    parametros = _parametros(request, 'fecha_inicio', 'fecha_fin', 'metodo_pago', 'canal_venta')
+
+    # Exportar a Excel: se genera en segundo plano (reportes/trabajos.py)
+    if 'descargar' in request.GET:
+        return trabajos.responder(request, 'ventas', parametros)
+
+    datos = _datos_ventas(parametros)
+    datos['ventas'] = datos['ventas'][:50]  # Limitar a 50 para performance
+    return render(request, 'reportes/reporte_ventas.html', datos)
+
+
+def exportar_inventario(parametros):
+    """Excel del reporte de inventario, generado en segundo plano (reportes/trabajos.py)."""
+    datos = inventario.foto()
+
+    wb = Workbook()
+
+    # Estilos
+    header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    danger_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+    warning_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+    currency_format = '#,##0.00'
+    center_alignment = Alignment(horizontal='center', vertical='center')
+
+    # Hoja 1: Stock Bajo
+    ws1 = wb.active
+    ws1.title = "Stock Bajo"
+    ws1.append(['Producto', 'Stock Actual', 'Stock Mínimo', 'Precio', 'Valor Total'])
+
+    for cell in ws1[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    for prod in datos['productos_stock_bajo']:
+        row = [
+            prod['nombre'],
+            prod['stock_actual'],
+            prod['stock_minimo'],
+            float(prod['precio_unitario']),
+            float(prod['valor'])
+        ]
+        ws1.append(row)
+
+        # Colorear según criticidad
+        if prod['stock_actual'] == 0:
+            ws1.cell(ws1.max_row, 2).fill = danger_fill
+        else:
+            ws1.cell(ws1.max_row, 2).fill = warning_fill
+
+        ws1.cell(ws1.max_row, 4).number_format = currency_format
+        ws1.cell(ws1.max_row, 5).number_format = currency_format
+
+    ws1.column_dimensions['A'].width = 40
+    ws1.column_dimensions['B'].width = 12
+    ws1.column_dimensions['C'].width = 12
+    ws1.column_dimensions['D'].width = 12
+    ws1.column_dimensions['E'].width = 15
+
+    # Hoja 2: Próximos a Vencer
+    ws2 = wb.create_sheet("Por Vencer")
+    ws2.append(['Producto', 'Lote', 'Cantidad', 'Fecha Caducidad', 'Días Restantes'])
+
+    for cell in ws2[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    for lote in datos['lotes_por_vencer']:
+        ws2.append([
+            lote['producto__nombre'],
+            lote['numero_lote'],
+            lote['cantidad_disponible'],
+            lote['fecha_caducidad'].strftime('%d/%m/%Y'),
+            lote['dias_restantes']
+        ])
+
+        # Colorear según urgencia
+        if lote['dias_restantes'] <= 7:
+            ws2.cell(ws2.max_row, 5).fill = danger_fill
+        else:
+            ws2.cell(ws2.max_row, 5).fill = warning_fill
+
+    ws2.column_dimensions['A'].width = 40
+    ws2.column_dimensions['B'].width = 20
+    ws2.column_dimensions['C'].width = 12
+    ws2.column_dimensions['D'].width = 18
+    ws2.column_dimensions['E'].width = 15
+
+    # Hoja 3: Sin Movimiento
+    ws3 = wb.create_sheet("Sin Movimiento")
+    ws3.append(['Producto', 'Stock', 'Valor Inmovilizado'])
+
+    for cell in ws3[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    for prod in datos['productos_sin_movimiento']:
+        ws3.append([
+            prod['nombre'],
+            prod['stock_actual'],
+            float(prod['valor'])
+        ])
+        ws3.cell(ws3.max_row, 3).number_format = currency_format
+
+    ws3.column_dimensions['A'].width = 40
+    ws3.column_dimensions['B'].width = 12
+    ws3.column_dimensions['C'].width = 18
+
+    salida = BytesIO()
+    wb.save(salida)
+    return 'reporte_inventario.xlsx', xlsx.LibroStreaming.CONTENT_TYPE, salida.getvalue()
 
-    # Movimientos recientes
-    movimientos_recientes = MovimientoInventario.objects.select_related(
-        'producto', 'lote'
-    ).order_by('-fecha_movimiento')[:20]
 
-    # Exportar a Excel
+def reporte_inventario(request):
+    """Reporte completo de inventario"""
     if 'descargar' in request.GET:
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="reporte_inventario.xlsx"'
-
-        wb = Workbook()
-        
-        # Estilos
-        header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        danger_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        warning_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-        currency_format = '#,##0.00'
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Hoja 1: Stock Bajo
-        ws1 = wb.active
-        ws1.title = "Stock Bajo"
-        ws1.append(['Producto', 'Stock Actual', 'Stock Mínimo', 'Precio', 'Valor Total'])
-        
-        for cell in ws1[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for prod in productos_stock_bajo:
-            row = [
-                prod.nombre,
-                prod.stock_actual,
-                prod.stock_minimo,
-                float(prod.precio_unitario),
-                float(prod.stock_actual * prod.precio_unitario)
-            ]
-            ws1.append(row)
-            
-            # Colorear según criticidad
-            if prod.stock_actual == 0:
-                ws1.cell(ws1.max_row, 2).fill = danger_fill
-            else:
-                ws1.cell(ws1.max_row, 2).fill = warning_fill
-            
-            ws1.cell(ws1.max_row, 4).number_format = currency_format
-            ws1.cell(ws1.max_row, 5).number_format = currency_format
-        
-        ws1.column_dimensions['A'].width = 40
-        ws1.column_dimensions['B'].width = 12
-        ws1.column_dimensions['C'].width = 12
-        ws1.column_dimensions['D'].width = 12
-        ws1.column_dimensions['E'].width = 15
-
-        # Hoja 2: Próximos a Vencer
-        ws2 = wb.create_sheet("Por Vencer")
-        ws2.append(['Producto', 'Lote', 'Cantidad', 'Fecha Caducidad', 'Días Restantes'])
-        
-        for cell in ws2[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for lote in lotes_por_vencer:
-            dias_restantes = (lote.fecha_caducidad - timezone.now().date()).days
-            ws2.append([
-                lote.producto.nombre,
-                lote.numero_lote,
-                lote.cantidad_disponible,
-                lote.fecha_caducidad.strftime('%d/%m/%Y'),
-                dias_restantes
-            ])
-            
-            # Colorear según urgencia
-            if dias_restantes <= 7:
-                ws2.cell(ws2.max_row, 5).fill = danger_fill
-            else:
-                ws2.cell(ws2.max_row, 5).fill = warning_fill
-        
-        ws2.column_dimensions['A'].width = 40
-        ws2.column_dimensions['B'].width = 20
-        ws2.column_dimensions['C'].width = 12
-        ws2.column_dimensions['D'].width = 18
-        ws2.column_dimensions['E'].width = 15
-
-        # Hoja 3: Sin Movimiento
-        ws3 = wb.create_sheet("Sin Movimiento")
-        ws3.append(['Producto', 'Stock', 'Valor Inmovilizado'])
-        
-        for cell in ws3[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for prod in productos_sin_movimiento:
-            ws3.append([
-                prod.nombre,
-                prod.stock_actual,
-                float(prod.stock_actual * prod.precio_unitario)
-            ])
-            ws3.cell(ws3.max_row, 3).number_format = currency_format
-        
-        ws3.column_dimensions['A'].width = 40
-        ws3.column_dimensions['B'].width = 12
-        ws3.column_dimensions['C'].width = 18
-
-        wb.save(response)
-        return response
-
-    return render(request, 'reportes/reporte_inventario.html', {
-        'productos_stock_bajo': productos_stock_bajo,
-        'lotes_por_vencer': lotes_por_vencer,
-        'valor_inventario': valor_inventario,
-        'productos_sin_movimiento': productos_sin_movimiento,
-        'productos_mas_vendidos': productos_mas_vendidos,
-        'movimientos_recientes': movimientos_recientes,
-    })
+        return trabajos.responder(request, 'inventario', {})
 
+    return render(request, 'reportes/reporte_inventario.html', inventario.foto())
 
-def reporte_clientes(request):
-    """Reporte completo de clientes"""
-    # Excluir "Consumidor Final"
-    clientes = Cliente.objects.exclude(id=1)
+
+def _datos_clientes():
+    """Reporte de clientes (pantalla y Excel), leído de metrica_cliente (clients/metricas.py)."""
+    metricas = MetricaCliente.objects.select_related('cliente')
+    hace_30_dias = timezone.now() - timedelta(days=30)
+    hace_60_dias = timezone.now() - timedelta(days=60)
 
     # Top clientes por compras
-    top_clientes = clientes.annotate(
-        total_compras=Sum('venta__total_venta'),
-        cantidad_compras=Count('venta'),
-        ultima_compra=Max('venta__fecha_venta')
-    ).filter(total_compras__isnull=False).order_by('-total_compras')[:20]
+    top_clientes = metricas.filter(cantidad_compras__gt=0).order_by('-total_compras')[:20]
 
-    # Clientes con más puntos (usar el campo existente del modelo)
-    clientes_puntos = clientes.filter(
-        puntos_totales__gt=0
-    ).order_by('-puntos_totales')[:10]
+    # Clientes con más puntos
+    clientes_puntos = metricas.filter(puntos__gt=0).order_by('-puntos')[:10]
 
     # Clientes nuevos (últimos 30 días) - basado en primera compra
-    hace_30_dias = timezone.now() - timedelta(days=30)
-    clientes_nuevos = clientes.annotate(
-        primera_compra=Min('venta__fecha_venta')
-    ).filter(
-        primera_compra__gte=hace_30_dias
-    ).order_by('-primera_compra')
+    clientes_nuevos = metricas.filter(primera_compra__gte=hace_30_dias).order_by('-primera_compra')
 
     # Clientes inactivos (sin compras en 60 días)
-    hace_60_dias = timezone.now() - timedelta(days=60)
-    clientes_con_compras_recientes = Venta.objects.filter(
-        fecha_venta__gte=hace_60_dias
-    ).values_list('cliente_id', flat=True).distinct()
-    
-    clientes_inactivos = clientes.exclude(
-        id__in=clientes_con_compras_recientes
-    ).annotate(
-        ultima_compra=Max('venta__fecha_venta')
-    ).filter(ultima_compra__isnull=False).order_by('ultima_compra')
+    clientes_inactivos = metricas.filter(ultima_compra__lt=hace_60_dias).order_by('ultima_compra')
 
     # Estadísticas generales
-    total_clientes = clientes.count()
-    clientes_activos = clientes.filter(id__in=clientes_con_compras_recientes).count()
-    ticket_promedio_general = Venta.objects.exclude(cliente_id=1).aggregate(
-        promedio=Avg('total_venta')
-    )['promedio'] or Decimal('0')
-
-    # Exportar a Excel
-    if 'descargar' in request.GET:
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="reporte_clientes.xlsx"'
-
-        wb = Workbook()
-        
-        # Estilos
-        header_fill = PatternFill(start_color="5B9BD5", end_color="5B9BD5", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        gold_fill = PatternFill(start_color="FFD966", end_color="FFD966", fill_type="solid")
-        danger_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        currency_format = '#,##0.00'
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Hoja 1: Top Clientes
-        ws1 = wb.active
-        ws1.title = "Top Clientes"
-        ws1.append(['Cliente', 'Total Compras', 'Cantidad Compras', 'Ticket Promedio', 'Última Compra'])
-        
-        for cell in ws1[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for idx, cliente in enumerate(top_clientes, 1):
-            ticket_prom = cliente.total_compras / cliente.cantidad_compras if cliente.cantidad_compras > 0 else 0
-            ws1.append([
-                f"{cliente.nombres} {cliente.apellidos}",
-                float(cliente.total_compras),
-                cliente.cantidad_compras,
-                float(ticket_prom),
-                cliente.ultima_compra.strftime('%d/%m/%Y') if cliente.ultima_compra else 'N/A'
-            ])
-            
-            # Destacar top 3
-            if idx <= 3:
-                ws1.cell(ws1.max_row, 1).fill = gold_fill
-            
-            ws1.cell(ws1.max_row, 2).number_format = currency_format
-            ws1.cell(ws1.max_row, 4).number_format = currency_format
-        
-        ws1.column_dimensions['A'].width = 35
-        ws1.column_dimensions['B'].width = 15
-        ws1.column_dimensions['C'].width = 18
-        ws1.column_dimensions['D'].width = 18
-        ws1.column_dimensions['E'].width = 15
-
-        # Hoja 2: Clientes con Puntos
-        ws2 = wb.create_sheet("Puntos Fidelización")
-        ws2.append(['Cliente', 'Puntos Totales', 'Teléfono', 'Correo'])
-        
-        for cell in ws2[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for cliente in clientes_puntos:
-            ws2.append([
-                f"{cliente.nombres} {cliente.apellidos}",
-                float(cliente.puntos_totales),
-                cliente.telefono,
-                cliente.correo
-            ])
-            ws2.cell(ws2.max_row, 2).number_format = '#,##0'
-        
-        ws2.column_dimensions['A'].width = 35
-        ws2.column_dimensions['B'].width = 15
-        ws2.column_dimensions['C'].width = 15
-        ws2.column_dimensions['D'].width = 30
-
-        # Hoja 3: Clientes Inactivos
-        ws3 = wb.create_sheet("Clientes Inactivos")
-        ws3.append(['Cliente', 'Última Compra', 'Días Inactivo', 'Teléfono'])
-        
-        for cell in ws3[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-        
-        for cliente in clientes_inactivos:
-            dias_inactivo = (timezone.now().date() - cliente.ultima_compra.date()).days if cliente.ultima_compra else 0
-            ws3.append([
-                f"{cliente.nombres} {cliente.apellidos}",
-                cliente.ultima_compra.strftime('%d/%m/%Y') if cliente.ultima_compra else 'N/A',
-                dias_inactivo,
-                cliente.telefono
-            ])
-            
-            # Colorear según días inactivos
-            if dias_inactivo > 90:
-                ws3.cell(ws3.max_row, 3).fill = danger_fill
-        
-        ws3.column_dimensions['A'].width = 35
-        ws3.column_dimensions['B'].width = 15
-        ws3.column_dimensions['C'].width = 15
-        ws3.column_dimensions['D'].width = 15
-
-        wb.save(response)
-        return response
-
-    return render(request, 'reportes/reporte_clientes.html', {
+    totales = MetricaCliente.objects.aggregate(
+        total_clientes=Count('pk'),
+        clientes_activos=Count('pk', filter=Q(ultima_compra__gte=hace_60_dias)),
+        total_compras=Sum('total_compras'),
+        cantidad_compras=Sum('cantidad_compras'),
+        actualizado=Max('actualizado'),
+    )
+    ticket_promedio_general = (
+        totales['total_compras'] / totales['cantidad_compras'] if totales['cantidad_compras'] else Decimal('0')
+    )
+
+    return {
         'top_clientes': top_clientes,
         'clientes_puntos': clientes_puntos,
         'clientes_nuevos': clientes_nuevos,
         'clientes_inactivos': clientes_inactivos,
-        'total_clientes': total_clientes,
-        'clientes_activos': clientes_activos,
+        'total_clientes': totales['total_clientes'],
+        'clientes_activos': totales['clientes_activos'],
         'ticket_promedio_general': ticket_promedio_general,
-    })
+        'actualizado': totales['actualizado'],
+    }
+
+
+def exportar_clientes(parametros):
+    """Excel del reporte de clientes, generado en segundo plano (reportes/trabajos.py)."""
+    datos = _datos_clientes()
+
+    wb = Workbook()
+
+    # Estilos
+    header_fill = PatternFill(start_color="5B9BD5", end_color="5B9BD5", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    gold_fill = PatternFill(start_color="FFD966", end_color="FFD966", fill_type="solid")
+    danger_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+    currency_format = '#,##0.00'
+    center_alignment = Alignment(horizontal='center', vertical='center')
+
+    # Hoja 1: Top Clientes
+    ws1 = wb.active
+    ws1.title = "Top Clientes"
+    ws1.append(['Cliente', 'Total Compras', 'Cantidad Compras', 'Ticket Promedio', 'Última Compra'])
+
+    for cell in ws1[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    for idx, metrica in enumerate(datos['top_clientes'], 1):
+        ws1.append([
+            str(metrica.cliente),
+            float(metrica.total_compras),
+            metrica.cantidad_compras,
+            float(metrica.ticket_promedio),
+            timezone.localtime(metrica.ultima_compra).strftime('%d/%m/%Y') if metrica.ultima_compra else 'N/A'
+        ])
+
+        # Destacar top 3
+        if idx <= 3:
+            ws1.cell(ws1.max_row, 1).fill = gold_fill
+
+        ws1.cell(ws1.max_row, 2).number_format = currency_format
+        ws1.cell(ws1.max_row, 4).number_format = currency_format
+
+    ws1.column_dimensions['A'].width = 35
+    ws1.column_dimensions['B'].width = 15
+    ws1.column_dimensions['C'].width = 18
+    ws1.column_dimensions['D'].width = 18
+    ws1.column_dimensions['E'].width = 15
+
+    # Hoja 2: Clientes con Puntos
+    ws2 = wb.create_sheet("Puntos Fidelización")
+    ws2.append(['Cliente', 'Puntos Totales', 'Teléfono', 'Correo'])
+
+    for cell in ws2[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    for metrica in datos['clientes_puntos']:
+        ws2.append([
+            str(metrica.cliente),
+            float(metrica.puntos),
+            metrica.cliente.telefono,
+            metrica.cliente.correo
+        ])
+        ws2.cell(ws2.max_row, 2).number_format = '#,##0'
+
+    ws2.column_dimensions['A'].width = 35
+    ws2.column_dimensions['B'].width = 15
+    ws2.column_dimensions['C'].width = 15
+    ws2.column_dimensions['D'].width = 30
+
+    # Hoja 3: Clientes Inactivos
+    ws3 = wb.create_sheet("Clientes Inactivos")
+    ws3.append(['Cliente', 'Última Compra', 'Días Inactivo', 'Teléfono'])
+
+    for cell in ws3[1]:
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+
+    hoy = timezone.localdate()
+    for metrica in datos['clientes_inactivos']:
+        dias_inactivo = (hoy - timezone.localdate(metrica.ultima_compra)).days
+        ws3.append([
+            str(metrica.cliente),
+            timezone.localtime(metrica.ultima_compra).strftime('%d/%m/%Y'),
+            dias_inactivo,
+            metrica.cliente.telefono
+        ])
+
+        # Colorear según días inactivos
+        if dias_inactivo > 90:
+            ws3.cell(ws3.max_row, 3).fill = danger_fill
+
+    ws3.column_dimensions['A'].width = 35
+    ws3.column_dimensions['B'].width = 15
+    ws3.column_dimensions['C'].width = 15
+    ws3.column_dimensions['D'].width = 15
+
+    salida = BytesIO()
+    wb.save(salida)
+    return 'reporte_clientes.xlsx', xlsx.LibroStreaming.CONTENT_TYPE, salida.getvalue()
+
+
+def reporte_clientes(request):
+    """Reporte completo de clientes"""
+    if 'descargar' in request.GET:
+        return trabajos.responder(request, 'clientes', {})
+
+    return render(request, 'reportes/reporte_clientes.html', _datos_clientes())
+
+
+@login_required
+def trabajo_estado(request, clave):
+    """Página de espera de una exportación; con AJAX devuelve el estado en JSON."""
+    trabajo = get_object_or_404(TrabajoReporte, clave=clave)
+    if not trabajos.puede_ver(trabajo, request.user):
+        raise Http404('Reporte no encontrado')
+    datos = trabajos.estado(trabajo)
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse(datos)
+    return render(request, 'reportes/trabajo.html', {'trabajo': trabajo, 'datos': datos})
+
+
+@login_required
+def trabajo_descargar(request, clave):
+    """Archivo generado por el worker de reportes."""
+    trabajo = get_object_or_404(TrabajoReporte, clave=clave, estado=TrabajoReporte.ESTADO_LISTO)
+    if not trabajos.puede_ver(trabajo, request.user):
+        raise Http404('Reporte no encontrado')
+    ruta = trabajos.ruta(trabajo)
+    if not os.path.exists(ruta):
+        raise Http404('El archivo del reporte ya no está disponible')
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=trabajo.nombre_archivo,
+                        content_type=trabajo.content_type)
+
+
+@login_required
+@check_user_role(allowed_roles=['Administrador'])
+def exportar_tabla(request, tabla):
+    """Exportación masiva de una tabla en CSV o columnar, en una sola respuesta (reportes/exportaciones.py)."""
+    try:
+        exportacion = exportaciones.Exportacion(
+            tabla,
+            desde=request.GET.get('desde'),
+            hasta=request.GET.get('hasta'),
+            despues_de=request.GET.get('despues_de'),
+            limite=request.GET.get('limite'),
+            formato=request.GET.get('formato', 'csv'),
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    response = StreamingHttpResponse(exportacion.generar(), content_type=exportacion.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{exportacion.nombre_archivo}"'
+    siguiente = exportacion.siguiente()
+    if siguiente is not None:
+        response['X-Siguiente-Despues-De'] = str(siguiente)
+    return response
@@ -0,0 +1,208 @@
+"""
+Libros de Excel (.xlsx) generados por partes, para descargas grandes.
+
+``openpyxl`` arma el libro completo antes de guardarlo (incluso en modo
+``write_only`` el ZIP se escribe al final), así que la respuesta no sale
+hasta haber recorrido todas las filas. ``LibroStreaming`` escribe el XLSX
+directamente como ZIP: cada hoja consume su iterable de filas a medida que
+se envía y solo se mantiene en memoria el bloque comprimido pendiente, sin
+importar cuántas filas tenga el reporte.
+
+Uso::
+
+    libro = LibroStreaming()
+    libro.hoja('Detalle', filas, anchos=[8, 18, 30])
+    return StreamingHttpResponse(libro.generar(), content_type=libro.CONTENT_TYPE)
+
+Cada fila es una lista de valores; un valor puede ir como ``(valor, estilo)``
+con uno de los estilos del módulo (``TITULO``, ``ENCABEZADO``, ``NEGRITA``,
+``MONEDA``), los mismos que usaban los reportes con openpyxl.
+"""
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.utils import get_column_letter
+
+# Índices de cellXfs en ESTILOS_XML
+TITULO = 1
+ENCABEZADO = 2
+NEGRITA = 3
+MONEDA = 4
+
+FILAS_POR_BLOQUE = 500
+
+# Caracteres de control que Excel no admite en el XML
+_CARACTERES_ILEGALES = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_TIPO_HOJA = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+ESTILOS_XML = (
+    _XML + f'<styleSheet xmlns="{_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="#,##0.00"/></numFmts>'
+    '<fonts count="4">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="16"/><color rgb="FF2F5496"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="12"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF4472C4"/><bgColor rgb="FF4472C4"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="0" fontId="2" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="3" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _Salida:
+    """Destino del ZIP: acumula lo escrito hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def encabezado(titulos):
+    """Fila de títulos de columna con el estilo de encabezado."""
+    return [(titulo, ENCABEZADO) for titulo in titulos]
+
+
+def _celda(referencia, valor):
+    estilo = 0
+    if isinstance(valor, tuple):
+        valor, estilo = valor
+    if valor is None:
+        return ''
+    s = f' s="{estilo}"' if estilo else ''
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}"{s} t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{referencia}"{s}><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_ILEGALES.sub('', str(valor)))
+    return f'<c r="{referencia}"{s} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(numero, valores):
+    celdas = ''.join(
+        _celda(f'{get_column_letter(columna)}{numero}', valor)
+        for columna, valor in enumerate(valores, start=1)
+    )
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+class LibroStreaming:
+    CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self):
+        self.hojas = []
+
+    def hoja(self, titulo, filas, anchos=None, combinar=None):
+        """
+        Agrega una hoja. ``filas`` se recorre recién al generar (puede ser un
+        ``.iterator()`` de Django); ``anchos`` son los anchos de columna y
+        ``combinar`` una lista de rangos a combinar (``['A1:B1']``).
+        """
+        self.hojas.append((titulo[:31], filas, anchos or [], combinar or []))
+
+    def _contenido_fijo(self):
+        hojas = range(1, len(self.hojas) + 1)
+        yield '[Content_Types].xml', (
+            _XML + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{_TIPO_HOJA}"/>' for n in hojas)
+            + '</Types>'
+        )
+        yield '_rels/.rels', (
+            _XML + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_NS_R}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        )
+        yield 'xl/workbook.xml', (
+            _XML + f'<workbook xmlns="{_NS}" xmlns:r="{_NS_R}"><sheets>'
+            + ''.join(
+                f'<sheet name={quoteattr(titulo)} sheetId="{n}" r:id="rId{n}"/>'
+                for n, (titulo, _, _, _) in enumerate(self.hojas, start=1)
+            )
+            + '</sheets></workbook>'
+        )
+        yield 'xl/_rels/workbook.xml.rels', (
+            _XML + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(
+                f'<Relationship Id="rId{n}" Type="{_NS_R}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                for n in hojas
+            )
+            + f'<Relationship Id="rId{len(self.hojas) + 1}" Type="{_NS_R}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        )
+        yield 'xl/styles.xml', ESTILOS_XML
+
+    def generar(self):
+        """Bytes del .xlsx por bloques, listos para un StreamingHttpResponse."""
+        for datos in self._generar():
+            if datos:
+                yield datos
+
+    def _generar(self):
+        salida = _Salida()
+        # Sobre un destino sin seek, zipfile escribe cada archivo en flujo (con data descriptor)
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+            for nombre, contenido in self._contenido_fijo():
+                archivo.writestr(nombre, contenido)
+            yield salida.vaciar()
+
+            for n, (_, filas, anchos, combinar) in enumerate(self.hojas, start=1):
+                with archivo.open(f'xl/worksheets/sheet{n}.xml', 'w') as hoja:
+                    hoja.write((_XML + f'<worksheet xmlns="{_NS}">').encode())
+                    if anchos:
+                        hoja.write(('<cols>' + ''.join(
+                            f'<col min="{c}" max="{c}" width="{ancho}" customWidth="1"/>'
+                            for c, ancho in enumerate(anchos, start=1)
+                        ) + '</cols>').encode())
+                    hoja.write(b'<sheetData>')
+                    bloque = []
+                    for numero, valores in enumerate(filas, start=1):
+                        bloque.append(_fila(numero, valores))
+                        if len(bloque) >= FILAS_POR_BLOQUE:
+                            hoja.write(''.join(bloque).encode())
+                            bloque = []
+                            yield salida.vaciar()
+                    hoja.write((''.join(bloque) + '</sheetData>').encode())
+                    if combinar:
+                        hoja.write((f'<mergeCells count="{len(combinar)}">' + ''.join(
+                            f'<mergeCell ref="{rango}"/>' for rango in combinar
+                        ) + '</mergeCells>').encode())
+                    hoja.write(b'</worksheet>')
+                yield salida.vaciar()
+        yield salida.vaciar()
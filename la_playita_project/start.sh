@@ -10,6 +10,9 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Background workers (see procesos_fondo.sh)
+bash procesos_fondo.sh
+
 # Start the application
 echo "Starting Gunicorn server..."
 exec gunicorn la_playita_project.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --timeout 120
\ No newline at end of file
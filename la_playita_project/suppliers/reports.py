@@ -14,6 +14,7 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.drawing.image import Image as XLImage
 from datetime import datetime
+import hashlib
 import os
 
 
@@ -202,6 +203,33 @@ def generate_reabastecimiento_pdf(reabastecimiento):
     return buffer
 
 
+def version_reabastecimiento(reabastecimiento):
+    """
+    Huella del contenido del PDF: si el reabastecimiento o sus detalles
+    cambian, la cola de reportes no reutiliza un PDF anterior.
+    """
+    detalles = [
+        (d.id, d.producto_id, d.cantidad, d.cantidad_recibida, str(d.costo_unitario), str(d.iva),
+         str(d.fecha_caducidad), d.numero_lote)
+        for d in reabastecimiento.reabastecimientodetalle_set.all()
+    ]
+    datos = [reabastecimiento.estado, str(reabastecimiento.costo_total), str(reabastecimiento.iva),
+             reabastecimiento.forma_pago, reabastecimiento.observaciones, reabastecimiento.proveedor_id,
+             sorted(detalles)]
+    return hashlib.sha256(repr(datos).encode('utf-8')).hexdigest()[:16]
+
+
+def exportar_reabastecimiento_pdf(parametros):
+    """PDF de un reabastecimiento para la cola de reportes (reportes/trabajos.py)."""
+    from .models import Reabastecimiento
+
+    reabastecimiento = Reabastecimiento.objects.select_related('proveedor').prefetch_related(
+        'reabastecimientodetalle_set__producto'
+    ).get(pk=parametros['reabastecimiento_id'])
+    filename = f'Reabastecimiento_{reabastecimiento.id}_{datetime.now().strftime("%Y%m%d")}.pdf'
+    return filename, 'application/pdf', generate_reabastecimiento_pdf(reabastecimiento).getvalue()
+
+
 def generate_reabastecimiento_excel(reabastecimiento):
     """
     Genera un archivo Excel elegante para un reabastecimiento
@@ -16,17 +16,18 @@ from email.mime.image import MIMEImage # Import MIMEImage
 from django.urls import reverse # Added import for reverse
 import logging
 from django.contrib import messages
-import threading
 
 from django.db.models import Q, Sum # Added for OR queries
 from django.db import models
 from django.core.serializers.json import DjangoJSONEncoder
 from users.decorators import check_user_role
+from core.correos import encolar
+from reportes import trabajos
 from .models import Proveedor, Reabastecimiento, ReabastecimientoDetalle
 from inventory.models import Producto, Categoria, Lote, MovimientoInventario, TasaIVA
 from inventory.forms import ReabastecimientoForm, ReabastecimientoDetalleFormSet, ProductoForm, ProductoAjaxForm
 from suppliers.forms import ReabastecimientoDetalleFormSetEdit
-from .reports import generate_reabastecimiento_pdf, generate_reabastecimiento_excel
+from .reports import generate_reabastecimiento_excel, version_reabastecimiento
 
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
@@ -101,7 +102,7 @@ def search_products_ajax(request):
 
 def send_supply_request_email(reabastecimiento, request=None):
     """
-    Envía un correo al proveedor notificando sobre una nueva solicitud de reabastecimiento.
+    Deja en la bandeja de salida el correo al proveedor sobre una nueva solicitud de reabastecimiento.
     """
     logger.info(f"[EMAIL] Iniciando envío de correo para reabastecimiento {reabastecimiento.id}")
     
@@ -167,10 +168,10 @@ def send_supply_request_email(reabastecimiento, request=None):
         #     logger.error(f"[EMAIL] Error al adjuntar el logo: {logo_error}", exc_info=True)
         logger.info("[EMAIL] Logo deshabilitado temporalmente (problema con formato en Brevo)")
 
-        # Enviar correo
-        email.send(fail_silently=False)
+        # Lo envía el comando enviar_correos (core/correos.py)
+        encolar(email, origen='reabastecimiento')
         
-        logger.info(f"[EMAIL] ✓ Correo para reabastecimiento {reabastecimiento.id} enviado exitosamente a {proveedor.correo}")
+        logger.info(f"[EMAIL] ✓ Correo para reabastecimiento {reabastecimiento.id} en cola para {proveedor.correo}")
         return True
 
     except Exception as e:
@@ -239,10 +240,10 @@ def send_discrepancy_email(reabastecimiento, discrepancias):
         #     logger.error(f"[EMAIL] Error al adjuntar el logo al correo de discrepancia: {logo_error}", exc_info=True)
         logger.info("[EMAIL] Logo deshabilitado temporalmente (problema con formato en Brevo)")
 
-        # Enviar correo
-        email.send(fail_silently=False)
+        # Lo envía el comando enviar_correos (core/correos.py)
+        encolar(email, origen='discrepancia')
         
-        logger.info(f"[EMAIL] ✓ Correo de discrepancia para reabastecimiento {reabastecimiento.id} enviado exitosamente a {proveedor.correo}")
+        logger.info(f"[EMAIL] ✓ Correo de discrepancia para reabastecimiento {reabastecimiento.id} en cola para {proveedor.correo}")
         return True
 
     except Exception as e:
@@ -485,16 +486,9 @@ def reabastecimiento_create(request):
                     logger.info(f"[REAB] Detalles guardados: {len(detalles_a_crear)}")
 
                     if reab.estado == Reabastecimiento.ESTADO_SOLICITADO:
-                        logger.info(f"[REAB] Programando envío de correo para reabastecimiento {reab.id}")
-                        # Enviar correo en segundo plano con delay para asegurar que se guarden los detalles
-                        def send_email_with_delay():
-                            import time
-                            time.sleep(2)  # Esperar 2 segundos para que se guarden los detalles
-                            send_supply_request_email(reab, request)
-                        
-                        email_thread = threading.Thread(target=send_email_with_delay)
-                        email_thread.daemon = True
-                        email_thread.start()
+                        logger.info(f"[REAB] Encolando correo para reabastecimiento {reab.id}")
+                        # Se guarda en la misma transacción que los detalles
+                        send_supply_request_email(reab, request)
                     
                     logger.info("[REAB] Reabastecimiento creado exitosamente")
                     
@@ -688,15 +682,8 @@ def reabastecimiento_update(request, pk):
                 logger.info(f"[UPDATE] Reabastecimiento {reab_instance.id} guardado exitosamente")
 
                 if reab_instance.estado == Reabastecimiento.ESTADO_SOLICITADO:
-                    # Enviar correo en segundo plano con delay para asegurar que se guarden los detalles
-                    def send_email_with_delay():
-                        import time
-                        time.sleep(2)  # Esperar 2 segundos para que se guarden los detalles
-                        send_supply_request_email(reab_instance, request)
-                    
-                    email_thread = threading.Thread(target=send_email_with_delay)
-                    email_thread.daemon = True
-                    email_thread.start()
+                    # Se guarda en la bandeja de salida junto con los detalles
+                    send_supply_request_email(reab_instance, request)
 
                 return JsonResponse({
                     'success': True,
@@ -941,16 +928,9 @@ def reabastecimiento_enviar_borrador(request, pk):
             reab.estado = Reabastecimiento.ESTADO_SOLICITADO
             reab.save()
             
-            # Enviar correo al proveedor en segundo plano
-            logger.info(f"[REAB] Programando envío de correo para borrador {reab.id}")
-            def send_email_with_delay():
-                import time
-                time.sleep(1)  # Esperar 1 segundo para asegurar que se guarden los cambios
-                send_supply_request_email(reab, request)
-            
-            email_thread = threading.Thread(target=send_email_with_delay)
-            email_thread.daemon = True
-            email_thread.start()
+            # Correo al proveedor por la bandeja de salida
+            logger.info(f"[REAB] Encolando correo para borrador {reab.id}")
+            send_supply_request_email(reab, request)
             
             return JsonResponse({
                 'success': True,
@@ -1390,17 +1370,13 @@ def reabastecimiento_download_pdf(request, pk):
             pk=pk
         )
         
-        # Generar PDF
-        pdf_buffer = generate_reabastecimiento_pdf(reabastecimiento)
-        
-        # Crear respuesta HTTP
-        response = HttpResponse(pdf_buffer, content_type='application/pdf')
-        filename = f'Reabastecimiento_{reabastecimiento.id}_{datetime.now().strftime("%Y%m%d")}.pdf'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        logger.info(f"[PDF] Usuario {request.user.username} descargó PDF de reabastecimiento {pk}")
-        
-        return response
+        # El PDF se genera en segundo plano (reportes/trabajos.py); la versión
+        # evita reutilizar un PDF de antes de editar el reabastecimiento
+        logger.info(f"[PDF] Usuario {request.user.username} solicitó PDF de reabastecimiento {pk}")
+        return trabajos.responder(request, 'reabastecimiento_pdf', {
+            'reabastecimiento_id': reabastecimiento.id,
+            'version': version_reabastecimiento(reabastecimiento),
+        }, roles=['Administrador'])
         
     except Exception as e:
         logger.error(f"[PDF] Error al generar PDF para reabastecimiento {pk}: {e}", exc_info=True)